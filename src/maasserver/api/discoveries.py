@@ -252,7 +252,8 @@ class DiscoveriesHandler(OperationsHandler):
 
         This command causes each connected rack controller to execute the
         'maas-rack scan-network' command, which will scan all CIDRs configured
-        on the rack controller using 'nmap' (if it is installed) or 'ping'.
+        on the rack controller using 'nmap' (if it is installed), 'ping', or
+        ICMP echo requests sent by the scanning process itself.
 
         Network discovery must not be set to 'disabled' for this command to be
         useful.
@@ -296,9 +297,15 @@ class DiscoveriesHandler(OperationsHandler):
         @param (string) "always_use_ping" [required=false] If True, will force
         the scan to use 'ping' even if 'nmap' is installed. Default: False.
 
-        @param (string) "slow" [required=false] If True, and 'nmap' is being
-        used, will limit the scan to nine packets per second. If the scanner is
-        'ping', this option has no effect. Default: False.
+        @param (string) "always_use_icmp" [required=false] If True, will scan
+        by sending ICMP echo requests from the scanning process, rather than
+        using 'nmap' or 'ping'. This is much faster than 'ping' on large
+        networks. Default: False.
+
+        @param (string) "slow" [required=false] If True, and 'nmap' or ICMP
+        echo requests are being used, will limit the scan to nine packets per
+        second. If the scanner is 'ping', this option has no effect. Default:
+        False.
 
         @param (string) "threads" [required=false] The number of threads to use
         during scanning. If 'nmap' is the scanner, the default is one thread
@@ -325,6 +332,12 @@ class DiscoveriesHandler(OperationsHandler):
             default=False,
             validator=StringBool,
         )
+        always_use_icmp = get_optional_param(
+            request.POST,
+            "always_use_icmp",
+            default=False,
+            validator=StringBool,
+        )
         slow = get_optional_param(
             request.POST, "slow", default=False, validator=StringBool
         )
@@ -347,12 +360,17 @@ class DiscoveriesHandler(OperationsHandler):
         elif len(cidrs) == 0 and force is True:
             # No CIDRs specified and force==True, so scan all networks.
             results = scan_all_rack_networks(
-                scan_all=True, ping=always_use_ping, slow=slow, threads=threads
+                scan_all=True,
+                ping=always_use_ping,
+                icmp=always_use_icmp,
+                slow=slow,
+                threads=threads,
             )
         else:
             results = scan_all_rack_networks(
                 cidrs=ipnetworks,
                 ping=always_use_ping,
+                icmp=always_use_icmp,
                 slow=slow,
                 threads=threads,
             )
@@ -411,7 +429,7 @@ def get_controller_summary(controllers):
 
 
 def scan_all_rack_networks(
-    scan_all=None, cidrs=None, ping=None, threads=None, slow=None
+    scan_all=None, cidrs=None, ping=None, threads=None, slow=None, icmp=None
 ) -> RPCResults:
     """Call each rack controller and instruct it to scan its attached networks.
 
@@ -443,6 +461,8 @@ def scan_all_rack_networks(
     :param threads: If specified, overrides the default number of concurrent
         scanning threads.
     :param slow: If True, forces 'nmap' to scan slower (if it is being used).
+    :param icmp: If True, forces the use of ICMP echo requests sent by the
+        scanning process, rather than 'nmap' or 'ping'.
     :return: dict
     """
     kwargs = {}
@@ -454,6 +474,8 @@ def scan_all_rack_networks(
         controllers = set(RackController.objects.filter_by_subnet_cidrs(cidrs))
     if ping is not None:
         kwargs["force_ping"] = ping
+    if icmp is not None:
+        kwargs["force_icmp"] = icmp
     if threads is not None:
         kwargs["threads"] = threads
     if slow is not None:
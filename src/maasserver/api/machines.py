@@ -318,6 +318,37 @@ def get_allocation_options(request) -> AllocationOptions:
     )
 
 
+def set_constraints_by_type(machine, storage, interfaces, verbose=False):
+    """Annotate an allocated machine with the constraints it matched."""
+    machine.constraint_map = storage.get(machine.id, {})
+    machine.constraints_by_type = {}
+    # Need to get the interface constraints map into the proper format
+    # to return it here.
+    # Backward compatibility: provide the storage constraints in both
+    # formats.
+    if len(machine.constraint_map) > 0:
+        machine.constraints_by_type["storage"] = {}
+        new_storage = machine.constraints_by_type["storage"]
+        # Convert this to the "new style" constraints map format.
+        for storage_key in machine.constraint_map:
+            # Each key in the storage map is actually a value which
+            # contains the ID of the matching storage device.
+            # Convert this to a label: list-of-matches format, to
+            # match how the constraints will be done going forward.
+            new_key = machine.constraint_map[storage_key]
+            matches = new_storage.get(new_key, [])
+            matches.append(storage_key)
+            new_storage[new_key] = matches
+    if len(interfaces) > 0:
+        machine.constraints_by_type["interfaces"] = {
+            label: interfaces.get(label, {}).get(machine.id)
+            for label in interfaces
+        }
+    if verbose:
+        machine.constraints_by_type["verbose_storage"] = storage
+        machine.constraints_by_type["verbose_interfaces"] = interfaces
+
+
 def get_allocated_composed_machine(
     request, data, storage, interfaces, pods, form, input_constraints
 ):
@@ -2508,44 +2539,51 @@ class MachinesHandler(NodesHandler, PowersMixin):
         if not form.is_valid():
             raise MAASAPIValidationError(form.errors)
 
-        # This lock prevents a machine we've picked as available from
-        # becoming unavailable before our transaction commits.
-        with locks.node_acquire:
-            machines = (
-                self.base_model.objects.get_available_machines_for_acquisition(
-                    request.user
-                )
+        machines = (
+            self.base_model.objects.get_available_machines_for_acquisition(
+                request.user
             )
-            machines, storage, interfaces = form.filter_nodes(machines)
+        )
+        machines, storage, interfaces = form.filter_nodes(machines)
+        if dry_run:
             machine = get_first(machines)
-            if machine is None:
-                cores = form.cleaned_data.get("cpu_count")
-                if cores is not None:
-                    cores = int(cores)
-                memory = form.cleaned_data.get("mem")
-                if memory is not None:
-                    memory = int(memory)
-                architecture = None
-                architectures = form.cleaned_data.get("arch")
-                if architectures is not None:
-                    architecture = (
-                        None if len(architectures) == 0 else min(architectures)
-                    )
-                storage = form.cleaned_data.get("storage")
-                interfaces = form.cleaned_data.get("interfaces")
-                data = {
-                    "cores": cores,
-                    "memory": memory,
-                    "architecture": architecture,
-                    "storage": storage,
-                    "interfaces": interfaces,
-                }
-                pods = Pod.objects.get_pods(
-                    request.user, PodPermission.dynamic_compose
+        else:
+            # Lock the row of the machine we pick so that it can't become
+            # unavailable before our transaction commits. Machines locked by
+            # concurrent allocations are skipped rather than waited for.
+            machine = form.lock_first_node(machines)
+        if machine is None:
+            cores = form.cleaned_data.get("cpu_count")
+            if cores is not None:
+                cores = int(cores)
+            memory = form.cleaned_data.get("mem")
+            if memory is not None:
+                memory = int(memory)
+            architecture = None
+            architectures = form.cleaned_data.get("arch")
+            if architectures is not None:
+                architecture = (
+                    None if len(architectures) == 0 else min(architectures)
                 )
-                if zone is not None:
-                    pods = pods.filter(zone__name=zone)
-                if pods:
+            storage = form.cleaned_data.get("storage")
+            interfaces = form.cleaned_data.get("interfaces")
+            data = {
+                "cores": cores,
+                "memory": memory,
+                "architecture": architecture,
+                "storage": storage,
+                "interfaces": interfaces,
+            }
+            pods = Pod.objects.get_pods(
+                request.user, PodPermission.dynamic_compose
+            )
+            if zone is not None:
+                pods = pods.filter(zone__name=zone)
+            if pods:
+                # Row locks only cover existing machines, so concurrent
+                # compositions would over-commit the pods' resources.
+                # Compose one machine at a time.
+                with locks.node_acquire:
                     (
                         machine,
                         storage,
@@ -2560,19 +2598,150 @@ class MachinesHandler(NodesHandler, PowersMixin):
                         input_constraints,
                     )
 
-            if machine is None:
-                constraints = form.describe_constraints()
-                if constraints == "":
-                    # No constraints. That means no machines at all were
-                    # available.
-                    message = "No machine available."
-                else:
-                    message = (
-                        "No available machine matches constraints: %s "
-                        '(resolved to "%s")'
-                        % (str(input_constraints), constraints)
+        if machine is None:
+            constraints = form.describe_constraints()
+            if constraints == "":
+                # No constraints. That means no machines at all were
+                # available.
+                message = "No machine available."
+            else:
+                message = (
+                    "No available machine matches constraints: %s "
+                    '(resolved to "%s")'
+                    % (str(input_constraints), constraints)
+                )
+            raise NodesNotAvailable(message)
+        if not dry_run:
+            machine.acquire(
+                request.user,
+                agent_name=options.agent_name,
+                comment=options.comment,
+                bridge_all=options.bridge_all,
+                bridge_type=options.bridge_type,
+                bridge_stp=options.bridge_stp,
+                bridge_fd=options.bridge_fd,
+            )
+        set_constraints_by_type(machine, storage, interfaces, verbose)
+        return machine
+
+    @operation(idempotent=False)
+    def allocate_many(self, request):
+        """@description-title Allocate multiple machines
+        @description Allocates ``count`` available machines matching the
+        given constraints in a single request.
+
+        Accepts the same constraints parameters as ``allocate``. Either all
+        the requested machines are allocated, or none are. Machines composed
+        in pods are never allocated by this operation.
+
+        @param (int) "count" [required=true] The number of machines to
+        allocate.
+
+        @param (string) "spread" [required=false] Spread the allocated
+        machines across availability zones (``zone``) or resource pools
+        (``pool``), picking the cheapest machine of each in turn. By default
+        the cheapest machines are allocated.
+
+        @param (string) "agent_name" [required=false] An optional agent name
+        to attach to the acquired machines.
+
+        @param (string) "comment" [required=false] Comment for the event log.
+
+        @param (boolean) "bridge_all" [required=false] Optionally create a
+        bridge interface for every configured interface on the machines. The
+        created bridges will be removed once the machines are released.
+        (Default: False)
+
+        @param (string) "bridge_type" [required=false] Optionally create the
+        bridges with this type. Possible values are: ``standard``, ``ovs``.
+
+        @param (boolean) "bridge_stp" [required=false] Optionally turn
+        spanning tree protocol on or off for the bridges created on every
+        configured interface.  (Default: False)
+
+        @param (int) "bridge_fd" [required=false] Optionally adjust the
+        forward delay to time seconds.  (Default: 15)
+
+        @param (boolean) "dry_run" [required=false] Optional boolean to
+        indicate that the machines should not actually be acquired.
+        Defaults to False.
+
+        @param (boolean) "verbose" [required=false] Optional boolean to
+        indicate that the user would like additional verbosity in the
+        constraints_by_type field of each machine.
+
+        @success (http-status-code) "200" 200
+        @success (json) "success-json" A JSON object containing a list of the
+        newly allocated machine objects.
+        @success-example "success-json" [exkey=machines-placeholder]
+        placeholder text
+
+        @error (http-status-code) "409" 409
+        @error (content) "no-match" Not enough machines matching the given
+        constraints could be found.
+        """
+        form = AcquireNodeForm(data=request.data)
+        input_constraints = [
+            param for param in request.data.lists() if param[0] != "op"
+        ]
+        count = get_mandatory_param(
+            request.POST, "count", validator=validators.Int(min=1)
+        )
+        spread = get_optional_param(
+            request.POST,
+            "spread",
+            default=None,
+            validator=validators.OneOf(["zone", "pool"]),
+        )
+        maaslog.info(
+            "Request from user %s to acquire %d machines with constraints: %s",
+            request.user.username,
+            count,
+            str(input_constraints),
+        )
+        options = get_allocation_options(request)
+        verbose = get_optional_param(
+            request.POST, "verbose", default=False, validator=StringBool
+        )
+        dry_run = get_optional_param(
+            request.POST, "dry_run", default=False, validator=StringBool
+        )
+
+        if not form.is_valid():
+            raise MAASAPIValidationError(form.errors)
+
+        # Filter once for all the machines, then lock as many rows as needed,
+        # skipping machines locked by concurrent allocations. Dry runs don't
+        # lock anything.
+        machines = (
+            self.base_model.objects.get_available_machines_for_acquisition(
+                request.user
+            )
+        )
+        machines, storage, interfaces = form.filter_nodes(machines)
+        machines = form.lock_nodes(
+            machines, count, spread_by=spread, lock=not dry_run
+        )
+        if len(machines) < count:
+            constraints = form.describe_constraints()
+            if constraints == "":
+                message = "%d of %d machines available." % (
+                    len(machines),
+                    count,
+                )
+            else:
+                message = (
+                    "%d of %d machines available matching constraints: %s "
+                    '(resolved to "%s")'
+                    % (
+                        len(machines),
+                        count,
+                        str(input_constraints),
+                        constraints,
                     )
-                raise NodesNotAvailable(message)
+                )
+            raise NodesNotAvailable(message)
+        for machine in machines:
             if not dry_run:
                 machine.acquire(
                     request.user,
@@ -2583,34 +2752,8 @@ class MachinesHandler(NodesHandler, PowersMixin):
                     bridge_stp=options.bridge_stp,
                     bridge_fd=options.bridge_fd,
                 )
-            machine.constraint_map = storage.get(machine.id, {})
-            machine.constraints_by_type = {}
-            # Need to get the interface constraints map into the proper format
-            # to return it here.
-            # Backward compatibility: provide the storage constraints in both
-            # formats.
-            if len(machine.constraint_map) > 0:
-                machine.constraints_by_type["storage"] = {}
-                new_storage = machine.constraints_by_type["storage"]
-                # Convert this to the "new style" constraints map format.
-                for storage_key in machine.constraint_map:
-                    # Each key in the storage map is actually a value which
-                    # contains the ID of the matching storage device.
-                    # Convert this to a label: list-of-matches format, to
-                    # match how the constraints will be done going forward.
-                    new_key = machine.constraint_map[storage_key]
-                    matches = new_storage.get(new_key, [])
-                    matches.append(storage_key)
-                    new_storage[new_key] = matches
-            if len(interfaces) > 0:
-                machine.constraints_by_type["interfaces"] = {
-                    label: interfaces.get(label, {}).get(machine.id)
-                    for label in interfaces
-                }
-            if verbose:
-                machine.constraints_by_type["verbose_storage"] = storage
-                machine.constraints_by_type["verbose_interfaces"] = interfaces
-            return machine
+            set_constraints_by_type(machine, storage, interfaces, verbose)
+        return machines
 
     def _get_chassis_param(self, request):
         power_type_names = [
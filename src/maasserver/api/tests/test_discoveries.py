@@ -198,7 +198,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         self.assertThat(
             self.scan_all_rack_networks_mock,
             MockCalledOnceWith(
-                scan_all=True, ping=False, slow=False, threads=None
+                scan_all=True, ping=False, icmp=False, slow=False, threads=None
             ),
         )
 
@@ -210,7 +210,19 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         self.assertThat(
             self.scan_all_rack_networks_mock,
             MockCalledOnceWith(
-                scan_all=True, ping=True, slow=False, threads=None
+                scan_all=True, ping=True, icmp=False, slow=False, threads=None
+            ),
+        )
+
+    def test_scan__passes_icmp(self):
+        result = self.post_api_results(
+            {"op": "scan", "force": "true", "always_use_icmp": "true"}
+        )
+        self.assertThat(result, Equals(result))
+        self.assertThat(
+            self.scan_all_rack_networks_mock,
+            MockCalledOnceWith(
+                scan_all=True, ping=False, icmp=True, slow=False, threads=None
             ),
         )
 
@@ -222,7 +234,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         self.assertThat(
             self.scan_all_rack_networks_mock,
             MockCalledOnceWith(
-                scan_all=True, ping=False, slow=True, threads=None
+                scan_all=True, ping=False, icmp=False, slow=True, threads=None
             ),
         )
 
@@ -234,7 +246,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
         self.assertThat(
             self.scan_all_rack_networks_mock,
             MockCalledOnceWith(
-                scan_all=True, ping=False, slow=False, threads=3
+                scan_all=True, ping=False, icmp=False, slow=False, threads=3
             ),
         )
 
@@ -255,6 +267,7 @@ class TestDiscoveriesScanAPI(APITestCase.ForUser):
                     IPNetwork("192.168.1.0/24"),
                 ],
                 ping=False,
+                icmp=False,
                 slow=False,
                 threads=None,
             ),
@@ -625,6 +638,17 @@ class TestScanAllRackNetworksInterpretsRPCResults(MAASServerTestCase):
             ),
         )
 
+    def test_calls_racks_synchronously_with_force_icmp(self):
+        scan_all_rack_networks(icmp=True)
+        self.assertThat(
+            self.call_racks_sync_mock,
+            MockCalledOnceWith(
+                cluster.ScanNetworks,
+                controllers=None,
+                kwargs={"force_icmp": True},
+            ),
+        )
+
     def test_calls_racks_synchronously_with_threads(self):
         threads = random.randint(1, 99)
         scan_all_rack_networks(threads=threads)
@@ -359,6 +359,36 @@ class TestMAASHandlerAPI(APITestCase.ForUser):
         self.assertEqual(http.client.OK, response.status_code)
         self.assertTrue(Config.objects.get_config("boot_images_no_proxy"))
 
+    def test_set_config_boot_resources_storage(self):
+        self.become_admin()
+        response = self.client.post(
+            reverse("maas_handler"),
+            {
+                "op": "set_config",
+                "name": "boot_resources_storage",
+                "value": "filesystem",
+            },
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(
+            "filesystem", Config.objects.get_config("boot_resources_storage")
+        )
+
+    def test_set_config_boot_resources_storage_rejects_unknown(self):
+        self.become_admin()
+        response = self.client.post(
+            reverse("maas_handler"),
+            {
+                "op": "set_config",
+                "name": "boot_resources_storage",
+                "value": factory.make_name("storage"),
+            },
+        )
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+        self.assertEqual(
+            "database", Config.objects.get_config("boot_resources_storage")
+        )
+
     def test_get_config_maas_internal_domain(self):
         internal_domain = factory.make_name("internal")
         Config.objects.set_config("maas_internal_domain", internal_domain)
@@ -44,6 +44,7 @@ from maasserver.utils import ignore_unused
 from maasserver.utils.orm import reload_object
 from maastesting.djangotestcase import CountQueries
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
     MockNotCalled,
@@ -1434,19 +1435,76 @@ class TestMachinesAPI(APITestCase.ForUser):
         machine = Machine.objects.get(system_id=machine.system_id)
         self.assertEqual(self.user, machine.owner)
 
-    def test_POST_allocate_uses_machine_acquire_lock(self):
-        # The "allocate" operation allocates the machine it returns.
+    def test_POST_allocate_does_not_use_machine_acquire_lock(self):
+        # Concurrent allocations lock only the rows of the machines they
+        # pick, instead of serializing on the global acquire lock.
         available_status = NODE_STATUS.READY
         factory.make_Node(
             status=available_status, owner=None, with_boot_disk=True
         )
         machine_acquire = self.patch(machines_module.locks, "node_acquire")
-        self.client.post(self.machines_url, {"op": "allocate"})
+        response = self.client.post(self.machines_url, {"op": "allocate"})
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertThat(machine_acquire.__enter__, MockNotCalled())
+
+    def test_POST_allocate_uses_machine_acquire_lock_to_compose(self):
+        # Composing a machine is still serialized, as row locks don't stop
+        # concurrent compositions from over-committing a pod.
+        def compose_machine(*args, **kwargs):
+            return factory.make_Node(
+                status=NODE_STATUS.READY,
+                owner=None,
+                with_boot_disk=True,
+                bmc=pod,
+            )
+
+        pool = factory.make_ResourcePool()
+        pod = factory.make_Pod(architectures=["amd64/generic"], pool=pool)
+        pod.hints.cores = random.randint(8, 16)
+        pod.hints.memory = random.randint(4096, 8192)
+        pod.hints.save()
+        self.patch(
+            forms_module, "list_all_usable_architectures"
+        ).return_value = sorted(pod.architectures)
+        self.patch(ComposeMachineForm, "compose").side_effect = compose_machine
+        machine_acquire = self.patch(machines_module.locks, "node_acquire")
+        response = self.client.post(
+            self.machines_url,
+            {
+                "op": "allocate",
+                "cpu_count": pod.hints.cores,
+                "mem": pod.hints.memory,
+                "arch": "amd64",
+            },
+        )
+        self.assertEqual(http.client.OK, response.status_code)
         self.assertThat(machine_acquire.__enter__, MockCalledOnceWith())
         self.assertThat(
             machine_acquire.__exit__, MockCalledOnceWith(None, None, None)
         )
 
+    def test_POST_allocate_locks_first_node(self):
+        available_status = NODE_STATUS.READY
+        machine = factory.make_Node(
+            status=available_status, owner=None, with_boot_disk=True
+        )
+        lock_first_node = self.patch(AcquireNodeForm, "lock_first_node")
+        lock_first_node.return_value = machine
+        self.client.post(self.machines_url, {"op": "allocate"})
+        self.assertThat(lock_first_node, MockCalledOnce())
+
+    def test_POST_allocate_dry_run_does_not_lock_node(self):
+        available_status = NODE_STATUS.READY
+        factory.make_Node(
+            status=available_status, owner=None, with_boot_disk=True
+        )
+        lock_first_node = self.patch(AcquireNodeForm, "lock_first_node")
+        response = self.client.post(
+            self.machines_url, {"op": "allocate", "dry_run": True}
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertThat(lock_first_node, MockNotCalled())
+
     def test_POST_allocate_sets_agent_name(self):
         available_status = NODE_STATUS.READY
         machine = factory.make_Node(
@@ -3590,6 +3648,125 @@ class TestMachinesAPI(APITestCase.ForUser):
             http.client.NO_CONTENT, response.status_code, response.content
         )
 
+    def test_POST_allocate_many_allocates_machines(self):
+        machines = [
+            factory.make_Node(
+                status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+            )
+            for _ in range(3)
+        ]
+        response = self.client.post(
+            self.machines_url, {"op": "allocate_many", "count": 2}
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        system_ids = {machine["system_id"] for machine in parsed_result}
+        self.assertEqual(2, len(system_ids))
+        for machine in machines:
+            machine = reload_object(machine)
+            if machine.system_id in system_ids:
+                self.assertEqual(self.user, machine.owner)
+                self.assertEqual(NODE_STATUS.ALLOCATED, machine.status)
+            else:
+                self.assertIsNone(machine.owner)
+
+    def test_POST_allocate_many_allocates_nothing_if_not_enough(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+        )
+        response = self.client.post(
+            self.machines_url, {"op": "allocate_many", "count": 2}
+        )
+        self.assertEqual(http.client.CONFLICT, response.status_code)
+        self.assertEqual(
+            "1 of 2 machines available.",
+            response.content.decode(settings.DEFAULT_CHARSET),
+        )
+        self.assertIsNone(reload_object(machine).owner)
+
+    def test_POST_allocate_many_applies_constraints(self):
+        tag = factory.make_Tag()
+        tagged = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+        )
+        tagged.tags.add(tag)
+        factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+        )
+        response = self.client.post(
+            self.machines_url,
+            {"op": "allocate_many", "count": 1, "tags": tag.name},
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        self.assertEqual(
+            [tagged.system_id],
+            [machine["system_id"] for machine in parsed_result],
+        )
+
+    def test_POST_allocate_many_spreads_across_zones(self):
+        zones = [factory.make_Zone() for _ in range(2)]
+        for zone in zones:
+            for _ in range(2):
+                factory.make_Node(
+                    status=NODE_STATUS.READY,
+                    owner=None,
+                    zone=zone,
+                    with_boot_disk=True,
+                )
+        response = self.client.post(
+            self.machines_url,
+            {"op": "allocate_many", "count": 2, "spread": "zone"},
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        self.assertCountEqual(
+            [zone.name for zone in zones],
+            [machine["zone"]["name"] for machine in parsed_result],
+        )
+
+    def test_POST_allocate_many_dry_run_does_not_allocate(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+        )
+        response = self.client.post(
+            self.machines_url,
+            {"op": "allocate_many", "count": 1, "dry_run": True},
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertIsNone(reload_object(machine).owner)
+
+    def test_POST_allocate_many_dry_run_does_not_lock_machines(self):
+        machine = factory.make_Node(
+            status=NODE_STATUS.READY, owner=None, with_boot_disk=True
+        )
+        lock_nodes = self.patch(AcquireNodeForm, "lock_nodes")
+        lock_nodes.return_value = [machine]
+        response = self.client.post(
+            self.machines_url,
+            {"op": "allocate_many", "count": 1, "dry_run": True},
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertThat(lock_nodes, MockCalledOnce())
+        self.assertFalse(lock_nodes.call_args[1]["lock"])
+
+    def test_POST_allocate_many_requires_count(self):
+        response = self.client.post(self.machines_url, {"op": "allocate_many"})
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
+    def test_POST_allocate_many_rejects_unknown_spread(self):
+        response = self.client.post(
+            self.machines_url,
+            {"op": "allocate_many", "count": 1, "spread": "fabric"},
+        )
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
 
 class TestPowerState(APITransactionTestCase.ForUser):
     def setUp(self):
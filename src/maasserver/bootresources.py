@@ -17,6 +17,7 @@ __all__ = [
 from datetime import timedelta
 from operator import itemgetter
 import os
+import re
 from subprocess import CalledProcessError
 from textwrap import dedent
 import threading
@@ -24,7 +25,7 @@ import time
 
 from django.db import connection, connections
 from django.db.utils import load_backend
-from django.http import HttpResponse, StreamingHttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from pkg_resources import parse_version
 from simplestreams import util as sutil
 from simplestreams.mirrors import BasicMirrorWriter, UrlMirrorReader
@@ -55,6 +56,7 @@ from maasserver.enum import (
 from maasserver.eventloop import services
 from maasserver.exceptions import MAASAPINotFound
 from maasserver.fields import LargeObjectFile
+from maasserver.largefilestore import largefile_store
 from maasserver.models import (
     BootResource,
     BootResourceFile,
@@ -181,6 +183,115 @@ class ConnectionWrapper:
             self._connection = None
 
 
+class StoreMigrationWrapper:
+    """Copies the content streamed by a `ConnectionWrapper` into the store.
+
+    The copy is only kept if all the content was streamed and its SHA256 is
+    the expected one. Failing to write the copy doesn't interrupt the
+    stream.
+    """
+
+    def __init__(self, stream, writer):
+        self.stream = stream
+        self.writer = writer
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            data = next(self.stream)
+        except StopIteration:
+            if self.writer is not None:
+                writer, self.writer = self.writer, None
+                try:
+                    if not writer.commit():
+                        maaslog.warning(
+                            "Boot resource file %s does not match its "
+                            "SHA256; not stored." % writer.sha256
+                        )
+                except OSError as error:
+                    self._failed(writer, error)
+            raise
+        if self.writer is not None:
+            try:
+                self.writer.write(data)
+            except OSError as error:
+                writer, self.writer = self.writer, None
+                self._failed(writer, error)
+        return data
+
+    def _failed(self, writer, error):
+        maaslog.warning(
+            "Unable to store boot resource file %s: %s"
+            % (writer.sha256, error)
+        )
+        writer.abort()
+
+    def close(self):
+        """Discard any incomplete copy, and close the stream."""
+        if self.writer is not None:
+            self.writer.abort()
+            self.writer = None
+        self.stream.close()
+
+
+class FileRangeWrapper:
+    """Iterates over a range of bytes of a file, closing it once done."""
+
+    block_size = 1 << 16
+
+    def __init__(self, stream, start, stop):
+        self.stream = stream
+        self.stream.seek(start)
+        self.remaining = stop - start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.remaining <= 0:
+            raise StopIteration
+        data = self.stream.read(min(self.block_size, self.remaining))
+        if len(data) == 0:
+            raise StopIteration
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+def get_byte_range(header, size):
+    """Return the `(start, stop)` of the byte range requested by `header`.
+
+    Only a single range is supported. `None` is returned when `header` is
+    empty, malformed or asks for several ranges; all the content should be
+    sent then.
+
+    :raise ValueError: If the range can't be satisfied.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if not last:
+            stop = size
+        elif int(last) < start:
+            return None
+        else:
+            stop = min(int(last) + 1, size)
+    elif last:
+        start, stop = max(size - int(last), 0), size
+    else:
+        return None
+    if start >= stop:
+        raise ValueError("Range not satisfiable: %s" % header)
+    return start, stop
+
+
 class SimpleStreamsHandler:
     """Simplestreams endpoint, that the racks talk to.
 
@@ -360,12 +471,70 @@ class SimpleStreamsHandler:
             rfile = resource_set.files.get(filename=filename)
         except BootResourceFile.DoesNotExist:
             raise MAASAPINotFound()
+        largefile = rfile.largefile
+        storage = Config.objects.get_config("boot_resources_storage")
+        if storage == "filesystem" and largefile.complete:
+            return self._store_response(request, largefile)
         response = StreamingHttpResponse(
-            ConnectionWrapper(rfile.largefile.content),
+            ConnectionWrapper(largefile.content),
             content_type="application/octet-stream",
         )
         return response
 
+    def _store_response(self, request, largefile):
+        """Serve the content of `largefile` from the `LargeFileStore`.
+
+        Content missing from the store is streamed from the database, and
+        copied into the store on the way.
+        """
+        sha256 = largefile.sha256
+        accel = request.META.get("HTTP_X_SENDFILE_TYPE") == "X-Accel-Redirect"
+        if accel and largefile_store.has_file(sha256):
+            # The reverse proxy serves the file, with sendfile and ranges.
+            response = HttpResponse(content_type="application/octet-stream")
+            response["X-Accel-Redirect"] = "/image-store/%s" % (
+                largefile_store.get_relative_path(sha256)
+            )
+            return response
+        stream = largefile_store.open(sha256)
+        if stream is None:
+            return StreamingHttpResponse(
+                StoreMigrationWrapper(
+                    ConnectionWrapper(largefile.content),
+                    largefile_store.writer(sha256),
+                ),
+                content_type="application/octet-stream",
+            )
+        size = largefile.total_size
+        try:
+            byte_range = get_byte_range(
+                request.META.get("HTTP_RANGE", ""), size
+            )
+        except ValueError:
+            stream.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */%d" % size
+            return response
+        if byte_range is None:
+            response = FileResponse(
+                stream, content_type="application/octet-stream"
+            )
+        else:
+            start, stop = byte_range
+            response = StreamingHttpResponse(
+                FileRangeWrapper(stream, start, stop),
+                status=206,
+                content_type="application/octet-stream",
+            )
+            response["Content-Range"] = "bytes %d-%d/%d" % (
+                start,
+                stop - 1,
+                size,
+            )
+            response["Content-Length"] = stop - start
+        response["Accept-Ranges"] = "bytes"
+        return response
+
 
 def simplestreams_stream_handler(request, filename):
     handler = SimpleStreamsHandler()
@@ -0,0 +1,88 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Invalidate the boot configurations cached by rack controllers."""
+
+
+import threading
+
+from twisted.internet.defer import DeferredList
+
+from maasserver.rpc import getAllClients
+from maasserver.utils.orm import post_commit_do
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.rpc.cluster import InvalidateBootConfigCache
+from provisioningserver.utils.twisted import asynchronous, FOREVER
+
+log = LegacyLogger()
+
+
+@asynchronous(timeout=FOREVER)
+def invalidate_boot_configs(system_ids=None):
+    """Ask all connected rack controllers to forget cached boot configs.
+
+    :param system_ids: The system_ids of the machines whose boot
+        configurations should be forgotten. All are forgotten if not given.
+    :return: A `DeferredList` that fires once all racks have replied; it
+        consumes errors, as a rack that misses an invalidation will expire
+        its cached configurations soon enough.
+    """
+    if system_ids is None:
+        arguments = {}
+    else:
+        arguments = {"system_ids": list(system_ids)}
+
+    def call(client):
+        d = client(InvalidateBootConfigCache, **arguments)
+        d.addErrback(
+            log.err,
+            "Failed to invalidate boot configurations on %s." % client.ident,
+        )
+        return d
+
+    return DeferredList(map(call, getAllClients()), consumeErrors=True)
+
+
+class BootConfigInvalidations(threading.local):
+    """Boot configuration invalidations pending on this thread's transaction.
+
+    A transaction can change many machines, or the same machine many times.
+    The changes are collected here, and a single invalidation is sent to
+    the rack controllers once the transaction has been committed. Nothing is
+    sent if the transaction is rolled back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._hook = None
+        self._system_ids = None
+
+    def add(self, system_ids=None):
+        """Invalidate after commit.
+
+        :param system_ids: The system_ids of the machines whose boot
+            configurations are changing. All are invalidated if not given.
+        """
+        # The hook has been called or cancelled if the previous transaction
+        # on this thread was committed or rolled back.
+        if self._hook is None or self._hook.called:
+            # The hook is called in the reactor, so it's given this set
+            # rather than finding it on the current thread.
+            self._system_ids = set()
+            self._hook = post_commit_do(self._send, self._system_ids)
+        if system_ids is None:
+            # None stands for all machines.
+            self._system_ids.add(None)
+        else:
+            self._system_ids.update(system_ids)
+
+    @staticmethod
+    def _send(system_ids):
+        # Not waited for, so as not to hold up the committing thread.
+        if None in system_ids:
+            invalidate_boot_configs()
+        else:
+            invalidate_boot_configs(sorted(system_ids))
+
+
+boot_config_invalidations = BootConfigInvalidations()
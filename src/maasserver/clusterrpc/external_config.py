@@ -0,0 +1,126 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Announce new versions of the external services configuration to racks.
+
+Rack controllers configure NTP, DNS, the proxy and syslog from settings held
+by the region. They fetch those settings again only when the version
+announced here changes, or every few minutes regardless.
+"""
+
+
+from hashlib import sha256
+import json
+import threading
+
+from django.db.models import Count, Max
+from twisted.internet.defer import DeferredList
+
+from maasserver.models.config import Config
+from maasserver.models.node import Controller
+from maasserver.models.subnet import Subnet
+from maasserver.rpc import getAllClients
+from maasserver.utils.orm import post_commit_do, transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.rpc.cluster import UpdateExternalConfigVersion
+from provisioningserver.utils.twisted import asynchronous, FOREVER
+
+log = LegacyLogger()
+
+# Settings used to configure the external services of rack controllers, by
+# `GetTimeConfiguration`, `GetDNSConfiguration`, `GetProxyConfiguration` and
+# `GetSyslogConfiguration`.
+EXTERNAL_CONFIG_NAMES = (
+    "ntp_servers",
+    "ntp_external_only",
+    "dns_trusted_acl",
+    "enable_http_proxy",
+    "maas_proxy_port",
+    "prefer_v4_proxy",
+    "maas_syslog_port",
+    "promtail_enabled",
+    "promtail_port",
+)
+
+
+@transactional
+def get_external_config_version():
+    """Return the current version of the external services configuration.
+
+    The version is derived from the settings, subnets and controllers that
+    the configuration is made from. Changing those doesn't have to record a
+    new version too, which concurrent transactions would conflict on.
+    """
+    state = [
+        sorted(Config.objects.get_configs(EXTERNAL_CONFIG_NAMES).items()),
+        Subnet.objects.aggregate(count=Count("id"), updated=Max("updated")),
+        Controller.objects.aggregate(
+            count=Count("id"), updated=Max("updated")
+        ),
+    ]
+    state = json.dumps(state, sort_keys=True, default=str)
+    return sha256(state.encode("utf-8")).hexdigest()
+
+
+@asynchronous(timeout=FOREVER)
+def announce_external_config_version(version):
+    """Tell all connected rack controllers the configuration `version`.
+
+    :return: A `DeferredList` that fires once all racks have replied; it
+        consumes errors, as a rack that misses an announcement will fetch
+        the configuration again soon enough.
+    """
+
+    def call(client):
+        d = client(UpdateExternalConfigVersion, version=version)
+        d.addErrback(
+            log.err,
+            "Failed to announce external services configuration to %s."
+            % client.ident,
+        )
+        return d
+
+    return DeferredList(map(call, getAllClients()), consumeErrors=True)
+
+
+@asynchronous(timeout=FOREVER)
+def announce_current_external_config_version():
+    """Tell all connected rack controllers the current configuration version.
+
+    :return: A `Deferred` that fires once all racks have replied.
+    """
+    d = deferToDatabase(get_external_config_version)
+    d.addCallback(announce_external_config_version)
+    d.addErrback(
+        log.err, "Failed to announce external services configuration."
+    )
+    return d
+
+
+class ExternalConfigChanges(threading.local):
+    """External services configuration changes in this thread's transaction.
+
+    A single announcement of the new version is sent to the rack
+    controllers once the transaction has been committed. Nothing is sent if
+    the transaction is rolled back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._hook = None
+
+    def add(self):
+        """Announce the new version after commit."""
+        # The hook has been called or cancelled if the previous transaction
+        # on this thread was committed or rolled back.
+        if self._hook is None or self._hook.called:
+            self._hook = post_commit_do(self._send)
+
+    @staticmethod
+    def _send():
+        # Not waited for, so as not to hold up the committing thread.
+        announce_current_external_config_version()
+
+
+external_config_changes = ExternalConfigChanges()
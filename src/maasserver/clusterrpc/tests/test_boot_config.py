@@ -0,0 +1,131 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for :py:mod:`maasserver.clusterrpc.boot_config`."""
+
+
+from unittest.mock import call, Mock
+
+from twisted.internet.defer import fail, inlineCallbacks, succeed
+
+from maasserver.clusterrpc import boot_config as boot_config_module
+from maasserver.clusterrpc.boot_config import (
+    BootConfigInvalidations,
+    invalidate_boot_configs,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import post_commit_hooks
+from maastesting.crochet import wait_for
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.rpc.cluster import InvalidateBootConfigCache
+
+wait_for_reactor = wait_for()
+
+
+class TestInvalidateBootConfigs(MAASTestCase):
+    def make_clients(self, *results):
+        clients = []
+        for result in results:
+            client = Mock()
+            client.ident = factory.make_name("system_id")
+            client.return_value = result
+            clients.append(client)
+        self.patch(boot_config_module, "getAllClients").return_value = clients
+        return clients
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_all_clients_with_system_ids(self):
+        clients = self.make_clients(succeed({}), succeed({}))
+        system_ids = [factory.make_name("system_id") for _ in range(3)]
+        yield invalidate_boot_configs(system_ids)
+        for client in clients:
+            self.assertThat(
+                client,
+                MockCalledOnceWith(
+                    InvalidateBootConfigCache, system_ids=system_ids
+                ),
+            )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_all_clients_for_everything(self):
+        clients = self.make_clients(succeed({}), succeed({}))
+        yield invalidate_boot_configs()
+        for client in clients:
+            self.assertThat(
+                client, MockCalledOnceWith(InvalidateBootConfigCache)
+            )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_suppresses_failures(self):
+        clients = self.make_clients(fail(ZeroDivisionError()), succeed({}))
+        with TwistedLoggerFixture() as logger:
+            yield invalidate_boot_configs()
+        self.assertThat(
+            clients[1], MockCalledOnceWith(InvalidateBootConfigCache)
+        )
+        self.assertIn(
+            "Failed to invalidate boot configurations on %s."
+            % clients[0].ident,
+            logger.output,
+        )
+
+
+class TestBootConfigInvalidations(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.invalidate_boot_configs = self.patch(
+            boot_config_module, "invalidate_boot_configs"
+        )
+
+    def test_does_not_invalidate_before_commit(self):
+        invalidations = BootConfigInvalidations()
+        invalidations.add([factory.make_name("system_id")])
+        self.assertThat(self.invalidate_boot_configs, MockNotCalled())
+        post_commit_hooks.reset()
+
+    def test_invalidates_system_ids_once_after_commit(self):
+        invalidations = BootConfigInvalidations()
+        invalidations.add(["b", "a"])
+        invalidations.add(["a", "c"])
+        post_commit_hooks.fire()
+        self.assertThat(
+            self.invalidate_boot_configs, MockCalledOnceWith(["a", "b", "c"])
+        )
+
+    def test_invalidates_everything_after_commit(self):
+        invalidations = BootConfigInvalidations()
+        invalidations.add(["a"])
+        invalidations.add()
+        post_commit_hooks.fire()
+        self.assertThat(self.invalidate_boot_configs, MockCalledOnceWith())
+
+    def test_forgets_system_ids_after_commit(self):
+        invalidations = BootConfigInvalidations()
+        invalidations.add(["a"])
+        post_commit_hooks.fire()
+        invalidations.add(["b"])
+        post_commit_hooks.fire()
+        self.assertThat(
+            self.invalidate_boot_configs,
+            MockCallsMatch(call(["a"]), call(["b"])),
+        )
+
+    def test_forgets_system_ids_after_rollback(self):
+        invalidations = BootConfigInvalidations()
+        invalidations.add(["a"])
+        post_commit_hooks.reset()
+        invalidations.add(["b"])
+        post_commit_hooks.fire()
+        self.assertThat(
+            self.invalidate_boot_configs, MockCalledOnceWith(["b"])
+        )
@@ -0,0 +1,170 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for :py:mod:`maasserver.clusterrpc.external_config`."""
+
+
+from unittest.mock import call, Mock
+
+from twisted.internet.defer import (
+    fail,
+    inlineCallbacks,
+    maybeDeferred,
+    succeed,
+)
+
+from maasserver.clusterrpc import external_config as external_config_module
+from maasserver.clusterrpc.external_config import (
+    announce_current_external_config_version,
+    announce_external_config_version,
+    ExternalConfigChanges,
+    get_external_config_version,
+)
+from maasserver.models import Config
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import post_commit_hooks
+from maastesting.crochet import wait_for
+from maastesting.djangotestcase import count_queries
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.rpc.cluster import UpdateExternalConfigVersion
+
+wait_for_reactor = wait_for()
+
+
+class TestGetExternalConfigVersion(MAASServerTestCase):
+    def test_is_stable(self):
+        self.assertEqual(
+            get_external_config_version(), get_external_config_version()
+        )
+
+    def test_changes_with_external_config(self):
+        version = get_external_config_version()
+        Config.objects.set_config("ntp_servers", factory.make_hostname())
+        self.assertNotEqual(version, get_external_config_version())
+
+    def test_ignores_other_config(self):
+        version = get_external_config_version()
+        Config.objects.set_config(factory.make_name("name"), "value")
+        self.assertEqual(version, get_external_config_version())
+
+    def test_changes_with_subnets(self):
+        version = get_external_config_version()
+        subnet = factory.make_Subnet()
+        self.assertNotEqual(version, get_external_config_version())
+        version = get_external_config_version()
+        subnet.delete()
+        self.assertNotEqual(version, get_external_config_version())
+
+    def test_changes_with_controllers(self):
+        version = get_external_config_version()
+        factory.make_RackController()
+        self.assertNotEqual(version, get_external_config_version())
+
+    def test_ignores_machines(self):
+        version = get_external_config_version()
+        factory.make_Machine()
+        self.assertEqual(version, get_external_config_version())
+
+
+class TestAnnounceExternalConfigVersion(MAASTestCase):
+    def make_clients(self, *results):
+        clients = []
+        for result in results:
+            client = Mock()
+            client.ident = factory.make_name("system_id")
+            client.return_value = result
+            clients.append(client)
+        self.patch(
+            external_config_module, "getAllClients"
+        ).return_value = clients
+        return clients
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_all_clients(self):
+        clients = self.make_clients(succeed({}), succeed({}))
+        version = factory.make_name("version")
+        yield announce_external_config_version(version)
+        for client in clients:
+            self.assertThat(
+                client,
+                MockCalledOnceWith(
+                    UpdateExternalConfigVersion, version=version
+                ),
+            )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_suppresses_failures(self):
+        clients = self.make_clients(fail(ZeroDivisionError()), succeed({}))
+        version = factory.make_name("version")
+        with TwistedLoggerFixture() as logger:
+            yield announce_external_config_version(version)
+        self.assertThat(
+            clients[1],
+            MockCalledOnceWith(UpdateExternalConfigVersion, version=version),
+        )
+        self.assertIn(
+            "Failed to announce external services configuration to %s."
+            % clients[0].ident,
+            logger.output,
+        )
+
+
+class TestAnnounceCurrentExternalConfigVersion(MAASTestCase):
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_announces_current_version(self):
+        version = factory.make_name("version")
+        self.patch(external_config_module, "deferToDatabase", maybeDeferred)
+        self.patch(
+            external_config_module, "get_external_config_version"
+        ).return_value = version
+        announce = self.patch(
+            external_config_module, "announce_external_config_version"
+        )
+        yield announce_current_external_config_version()
+        self.assertThat(announce, MockCalledOnceWith(version))
+
+
+class TestExternalConfigChanges(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.announce = self.patch(
+            external_config_module, "announce_current_external_config_version"
+        )
+
+    def test_announces_once_after_commit(self):
+        changes = ExternalConfigChanges()
+        changes.add()
+        changes.add()
+        self.assertThat(self.announce, MockNotCalled())
+        post_commit_hooks.fire()
+        self.assertThat(self.announce, MockCalledOnceWith())
+
+    def test_announces_again_for_next_transaction(self):
+        changes = ExternalConfigChanges()
+        changes.add()
+        post_commit_hooks.fire()
+        changes.add()
+        post_commit_hooks.fire()
+        self.assertThat(self.announce, MockCallsMatch(call(), call()))
+
+    def test_does_not_announce_after_rollback(self):
+        changes = ExternalConfigChanges()
+        changes.add()
+        post_commit_hooks.reset()
+        self.assertThat(self.announce, MockNotCalled())
+
+    def test_does_not_write_to_the_database(self):
+        changes = ExternalConfigChanges()
+        count, _ = count_queries(changes.add)
+        post_commit_hooks.reset()
+        self.assertEqual(0, count)
@@ -5,7 +5,9 @@
 
 
 from collections import defaultdict, namedtuple
+import hashlib
 from itertools import groupby
+import json
 from operator import itemgetter
 from typing import Iterable, Optional, Union
 
@@ -14,6 +16,7 @@ from django.core.exceptions import ValidationError
 from django.db.models import Q
 from netaddr import IPAddress, IPNetwork
 from twisted.internet.defer import inlineCallbacks
+from twisted.protocols.amp import UnhandledCommand
 
 from maasserver.dns.zonegenerator import (
     get_dns_search_paths,
@@ -42,14 +45,20 @@ from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.dhcp.omapi import generate_omapi_key
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4,
     ConfigureDHCPv6,
+    UpdateDHCPv4,
+    UpdateDHCPv6,
     ValidateDHCPv4Config,
     ValidateDHCPv6Config,
 )
 from provisioningserver.rpc.clusterservice import DHCP_TIMEOUT
-from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+from provisioningserver.rpc.exceptions import (
+    DHCPConfigVersionMismatch,
+    NoConnectionsAvailable,
+)
 from provisioningserver.utils.network import get_source_address
 from provisioningserver.utils.text import split_string_list
 from provisioningserver.utils.twisted import asynchronous, synchronous
@@ -864,6 +873,108 @@ DHCPConfigurationForRack = namedtuple(
 )
 
 
+# The DHCP configuration each rack controller last acknowledged, with its
+# version, by system_id and IP version.
+_acknowledged_dhcp_configs = {}
+
+
+def get_dhcp_config_version(arguments):
+    """Return the version of the DHCP configuration in `arguments`.
+
+    This is the SHA256 of the configuration, so identical configurations have
+    the same version whichever region controller computed them.
+    """
+    data = json.dumps(arguments, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def get_dhcp_config_changes(old, new):
+    """Return the arguments for `UpdateDHCPv4` or `UpdateDHCPv6`.
+
+    :param old: The arguments of the configuration the DHCP server has.
+    :param new: The arguments of the configuration it should have.
+    """
+    old_hosts = {host["mac"]: host for host in old["hosts"]}
+    new_hosts = {host["mac"]: host for host in new["hosts"]}
+    changes = {
+        "omapi_key": new["omapi_key"],
+        "removed_hosts": sorted(old_hosts.keys() - new_hosts.keys()),
+        "changed_hosts": [
+            host
+            for mac, host in new_hosts.items()
+            if old_hosts.get(mac) != host
+        ],
+    }
+    for name in (
+        "failover_peers",
+        "shared_networks",
+        "interfaces",
+        "global_dhcp_snippets",
+    ):
+        if new[name] != old[name]:
+            changes[name] = new[name]
+    return changes
+
+
+def _record_dhcp_config(sync, hosts_changed):
+    # The size of the configuration is recorded by `RegionServer` as it's
+    # sent.
+    PROMETHEUS_METRICS.update(
+        "maas_dhcp_config_hosts_changed",
+        "observe",
+        value=hosts_changed,
+        labels={"sync": sync},
+    )
+
+
+@inlineCallbacks
+def send_dhcp_config(client, system_id, ip_version, arguments):
+    """Send a DHCP configuration to a rack controller.
+
+    Only the changes since the configuration the rack controller last
+    acknowledged are sent, if this region controller knows it. The full
+    configuration is sent when the rack controller no longer has that
+    configuration, or predates `UpdateDHCPv4` and `UpdateDHCPv6`.
+
+    :param arguments: The arguments for `ConfigureDHCPv4` or
+        `ConfigureDHCPv6`, except the version.
+    """
+    if ip_version == 4:
+        configure, update = ConfigureDHCPv4, UpdateDHCPv4
+    else:
+        configure, update = ConfigureDHCPv6, UpdateDHCPv6
+    key = system_id, ip_version
+    version = get_dhcp_config_version(arguments)
+    # Until the rack controller acknowledges this configuration, which one
+    # it has is unknown.
+    acknowledged = _acknowledged_dhcp_configs.pop(key, None)
+    if acknowledged is not None:
+        base_version, base_arguments = acknowledged
+        changes = get_dhcp_config_changes(base_arguments, arguments)
+        changes["base_version"] = base_version
+        changes["version"] = version
+        hosts_changed = len(changes["removed_hosts"]) + len(
+            changes["changed_hosts"]
+        )
+        _record_dhcp_config("delta", hosts_changed)
+        try:
+            yield client(update, _timeout=DHCP_TIMEOUT + 5, **changes)
+        except (DHCPConfigVersionMismatch, UnhandledCommand):
+            log.msg(
+                "Sending full DHCPv%d configuration to rack controller %s."
+                % (ip_version, system_id)
+            )
+        else:
+            _acknowledged_dhcp_configs[key] = version, arguments
+            return
+    arguments_with_version = dict(arguments, version=version)
+    _record_dhcp_config("full", len(arguments["hosts"]))
+    yield client(
+        configure, _timeout=DHCP_TIMEOUT + 5, **arguments_with_version
+    )
+    _acknowledged_dhcp_configs[key] = version, arguments
+
+
 @asynchronous
 @inlineCallbacks
 def configure_dhcp(rack_controller):
@@ -895,15 +1006,18 @@ def configure_dhcp(rack_controller):
     ipv4_status, ipv6_status = SERVICE_STATUS.UNKNOWN, SERVICE_STATUS.UNKNOWN
 
     try:
-        yield client(
-            ConfigureDHCPv4,
-            _timeout=DHCP_TIMEOUT + 5,
-            failover_peers=config.failover_peers_v4,
-            interfaces=interfaces_v4,
-            shared_networks=config.shared_networks_v4,
-            hosts=config.hosts_v4,
-            global_dhcp_snippets=config.global_dhcp_snippets,
-            omapi_key=config.omapi_key,
+        yield send_dhcp_config(
+            client,
+            rack_controller.system_id,
+            4,
+            {
+                "failover_peers": config.failover_peers_v4,
+                "interfaces": interfaces_v4,
+                "shared_networks": config.shared_networks_v4,
+                "hosts": config.hosts_v4,
+                "global_dhcp_snippets": config.global_dhcp_snippets,
+                "omapi_key": config.omapi_key,
+            },
         )
     except Exception as exc:
         ipv4_exc = exc
@@ -924,15 +1038,18 @@ def configure_dhcp(rack_controller):
         )
 
     try:
-        yield client(
-            ConfigureDHCPv6,
-            _timeout=DHCP_TIMEOUT + 5,
-            failover_peers=config.failover_peers_v6,
-            interfaces=interfaces_v6,
-            shared_networks=config.shared_networks_v6,
-            hosts=config.hosts_v6,
-            global_dhcp_snippets=config.global_dhcp_snippets,
-            omapi_key=config.omapi_key,
+        yield send_dhcp_config(
+            client,
+            rack_controller.system_id,
+            6,
+            {
+                "failover_peers": config.failover_peers_v6,
+                "interfaces": interfaces_v6,
+                "shared_networks": config.shared_networks_v6,
+                "hosts": config.hosts_v6,
+                "global_dhcp_snippets": config.global_dhcp_snippets,
+                "omapi_key": config.omapi_key,
+            },
         )
     except Exception as exc:
         ipv6_exc = exc
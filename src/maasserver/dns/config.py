@@ -24,10 +24,13 @@ from maasserver.models.subnet import Subnet
 from provisioningserver.dns.actions import (
     bind_reload,
     bind_reload_with_retries,
+    bind_reload_zones,
     bind_write_configuration,
     bind_write_options,
     bind_write_zones,
+    DynamicZoneUpdater,
 )
+from provisioningserver.dns.config import get_named_rndc_key
 from provisioningserver.logger import get_maas_logger
 
 maaslog = get_maas_logger("dns")
@@ -61,7 +64,9 @@ def forward_domains_to_forwarded_zones(forward_domains):
     ]
 
 
-def dns_update_all_zones(reload_retry=False, reload_timeout=2):
+def dns_update_all_zones(
+    reload_retry=False, reload_timeout=2, zone_state=None
+):
     """Update all zone files for all domains.
 
     Serving these zone files means updating BIND's configuration to include
@@ -70,6 +75,15 @@ def dns_update_all_zones(reload_retry=False, reload_timeout=2):
     :param reload_retry: Should the DNS server reload be retried in case
         of failure? Defaults to `False`.
     :type reload_retry: bool
+    :param zone_state: Optional dict of fingerprints for the zone files as
+        last written, kept by the caller between updates. When given, only
+        zones whose records have changed are rewritten (with a new serial)
+        and only those are reloaded, unless BIND's configuration changed too.
+        It's updated in place; clear it to force a full rewrite next time.
+        If the `dns_dynamic_updates` option is set, changes to the records of
+        existing zones are sent to BIND as dynamic updates instead.
+    :return: A tuple of the serial, whether BIND reloaded, and the names of
+        the domains that were rewritten with that serial.
     """
     if not is_dns_enabled():
         return
@@ -88,39 +102,75 @@ def dns_update_all_zones(reload_retry=False, reload_timeout=2):
         serial,
         internal_domains=[get_internal_domain()],
     ).as_list()
-    bind_write_zones(zones)
+    full_reload = zone_state is None or len(zone_state) == 0
+    if zone_state is not None and Config.objects.get_config(
+        "dns_dynamic_updates"
+    ):
+        dynamic_update_key, _, _ = get_named_rndc_key()
+        updater = DynamicZoneUpdater()
+    else:
+        dynamic_update_key = updater = None
+    written = set(
+        bind_write_zones(zones, zone_state=zone_state, updater=updater)
+    )
 
     # We should not be calling bind_write_options() here; call-sites should be
     # making a separate call. It's a historical legacy, where many sites now
     # expect this side-effect from calling dns_update_all_zones_now(), and
     # some that call it for this side-effect alone. At present all it does is
     # set the upstream DNS servers, nothing to do with serving zones at all!
-    bind_write_options(
+    if bind_write_options(
         upstream_dns=get_upstream_dns(),
         dnssec_validation=get_dnssec_validation(),
-    )
+    ):
+        full_reload = True
 
     # Nor should we be rewriting ACLs that are related only to allowing
     # recursive queries to the upstream DNS servers. Again, this is legacy,
     # where the "trusted" ACL ended up in the same configuration file as the
     # zone stanzas, and so both need to be rewritten at the same time.
-    bind_write_configuration(
+    if bind_write_configuration(
         zones,
         trusted_networks=get_trusted_networks(),
         forwarded_zones=forwarded_zones,
-    )
+        dynamic_update_key=dynamic_update_key,
+    ):
+        full_reload = True
+
+    # Zones that were frozen for rewriting are reloaded by thawing them.
+    if updater is None:
+        thawed, updated = True, set()
+    else:
+        written_unfrozen = written.difference(updater.frozen)
+        thawed, updated = updater.thaw(), set(updater.updated)
 
     # Reloading with retries may be a legacy from Celery days, or it may be
     # necessary to recover from races during start-up. We're not sure if it is
     # actually needed but it seems safer to maintain this behaviour until we
     # have a better understanding.
-    if reload_retry:
-        reloaded = bind_reload_with_retries(timeout=reload_timeout)
+    if full_reload:
+        if reload_retry:
+            reloaded = bind_reload_with_retries(timeout=reload_timeout)
+        else:
+            reloaded = bind_reload(timeout=reload_timeout)
+    elif updater is not None:
+        if len(written_unfrozen) > 0:
+            reloaded = bind_reload_zones(sorted(written_unfrozen))
+        else:
+            reloaded = True
+    elif len(written) > 0:
+        reloaded = bind_reload_zones(sorted(written))
     else:
-        reloaded = bind_reload(timeout=reload_timeout)
+        # Nothing changed, so there is nothing for BIND to load.
+        reloaded = True
 
     # Return the current serial and list of domain names.
-    return serial, reloaded, [domain.name for domain in domains]
+    published = written | updated
+    return (
+        serial,
+        reloaded and thawed,
+        [domain.name for domain in domains if domain.name in published],
+    )
 
 
 def get_upstream_dns():
@@ -39,7 +39,7 @@ from maasserver.models.dnspublication import DNSPublication
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from provisioningserver.dns.commands import get_named_conf, setup_dns
 from provisioningserver.dns.config import compose_config_path, DNSConfig
 from provisioningserver.dns.testing import (
@@ -432,6 +432,103 @@ class TestDNSConfigModifications(TestDNSServer):
             ),
         )
 
+    def test_dns_update_all_zones_with_zone_state_reloads_changed_zones(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        domain = factory.make_Domain()
+        node, static = self.create_node_with_static_ip(domain=domain)
+        zone_state = {}
+        dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones"
+        )
+        bind_reload_zones.return_value = True
+        self.create_node_with_static_ip(domain=domain, subnet=static.subnet)
+        serial, reloaded, domains = dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        self.assertTrue(reloaded)
+        self.assertEqual([domain.name], domains)
+        self.assertThat(bind_reload, MockNotCalled())
+        [zone_names] = bind_reload_zones.call_args[0]
+        self.assertIn(domain.name, zone_names)
+        self.assertNotIn(Domain.objects.get_default_domain().name, zone_names)
+
+    def test_dns_update_all_zones_with_zone_state_skips_unchanged(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        self.create_node_with_static_ip()
+        zone_state = {}
+        dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones"
+        )
+        serial, reloaded, domains = dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        self.assertTrue(reloaded)
+        self.assertEqual([], domains)
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertThat(bind_reload_zones, MockNotCalled())
+
+    def test_dns_update_all_zones_publishes_dynamic_updates(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        Config.objects.set_config("dns_dynamic_updates", True)
+        self.patch_autospec(
+            dns_config_module, "get_named_rndc_key"
+        ).return_value = ("rndc-maas-key", "hmac-md5", "secret")
+        updater = self.patch(dns_config_module, "DynamicZoneUpdater")
+        updater.return_value.frozen = []
+        updater.return_value.updated = []
+        updater.return_value.thaw.return_value = True
+        domain = factory.make_Domain()
+        node, static = self.create_node_with_static_ip(domain=domain)
+        zone_state = {}
+        dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        self.assertThat(
+            compose_config_path(DNSConfig.target_file_name),
+            FileContains(
+                matcher=Contains('allow-update { key "rndc-maas-key"; };')
+            ),
+        )
+
+        def update(zone_name, soa, removed, added):
+            updater.return_value.updated.append(zone_name)
+            return True
+
+        updater.return_value.update.side_effect = update
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones"
+        )
+        self.create_node_with_static_ip(domain=domain, subnet=static.subnet)
+        serial, reloaded, domains = dns_update_all_zones(
+            reload_timeout=RELOAD_TIMEOUT, zone_state=zone_state
+        )
+        self.assertTrue(reloaded)
+        self.assertEqual([domain.name], domains)
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertThat(bind_reload_zones, MockNotCalled())
+        zone_names = [
+            call_args[0][0]
+            for call_args in updater.return_value.update.call_args_list
+        ]
+        self.assertIn(domain.name, zone_names)
+
+    def test_dns_update_all_zones_ignores_dynamic_updates_without_state(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        Config.objects.set_config("dns_dynamic_updates", True)
+        updater = self.patch(dns_config_module, "DynamicZoneUpdater")
+        self.create_node_with_static_ip()
+        dns_update_all_zones(reload_timeout=RELOAD_TIMEOUT)
+        self.assertThat(updater, MockNotCalled())
+
 
 class TestDNSDynamicIPAddresses(TestDNSServer):
     """Allocated nodes with IP addresses in the dynamic range get a DNS
@@ -66,11 +66,11 @@ def make_RegionControllerService(postgresListener):
     return RegionControllerService(postgresListener)
 
 
-def make_RegionService(ipcWorker):
+def make_RegionService(ipcWorker, postgresListener):
     # Import here to avoid a circular import.
     from maasserver.rpc import regionservice
 
-    return regionservice.RegionService(ipcWorker)
+    return regionservice.RegionService(ipcWorker, postgresListener)
 
 
 def make_NonceCleanupService():
@@ -118,7 +118,15 @@ def make_ImportResourcesProgressService():
 def make_PostgresListenerService():
     from maasserver.listener import PostgresListenerService
 
-    return PostgresListenerService()
+    # Bulk operations on machines emit many updates for the same machine in a
+    # short interval; coalesce them before the websocket handlers run.
+    return PostgresListenerService(debounce={"machine_update": 0.25})
+
+
+def make_ConfigCacheService(postgresListener):
+    from maasserver.regiondservices.config_cache import ConfigCacheService
+
+    return ConfigCacheService(postgresListener)
 
 
 def make_RackControllerService(ipcWorker, postgresListener):
@@ -286,7 +294,7 @@ class RegionEventLoop:
         "rpc": {
             "only_on_master": False,
             "factory": make_RegionService,
-            "requires": ["ipc-worker"],
+            "requires": ["ipc-worker", "postgres-listener-worker"],
         },
         "nonce-cleanup": {
             "only_on_master": True,
@@ -335,6 +343,16 @@ class RegionEventLoop:
             "factory": make_PostgresListenerService,
             "requires": [],
         },
+        "config-cache-master": {
+            "only_on_master": True,
+            "factory": make_ConfigCacheService,
+            "requires": ["postgres-listener-master"],
+        },
+        "config-cache-worker": {
+            "only_on_master": False,
+            "factory": make_ConfigCacheService,
+            "requires": ["postgres-listener-worker"],
+        },
         "web": {
             "only_on_master": False,
             "factory": make_WebApplicationService,
@@ -1735,6 +1735,7 @@ class DNSForm(ConfigForm):
     upstream_dns = get_config_field("upstream_dns")
     dnssec_validation = get_config_field("dnssec_validation")
     dns_trusted_acl = get_config_field("dns_trusted_acl")
+    dns_dynamic_updates = get_config_field("dns_dynamic_updates")
 
 
 class NTPForm(ConfigForm):
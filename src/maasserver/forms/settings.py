@@ -28,6 +28,7 @@ from maasserver.fields import (
 from maasserver.models import BootResource
 from maasserver.models.config import (
     ACTIVE_DISCOVERY_INTERVAL_CHOICES,
+    BOOT_RESOURCES_STORAGE_CHOICES,
     Config,
     DEFAULT_OS,
     DNSSEC_VALIDATION_CHOICES,
@@ -231,6 +232,21 @@ def make_dnssec_validation_field(*args, **kwargs):
     return field
 
 
+def make_boot_resources_storage_field(*args, **kwargs):
+    """Build and return the boot_resources_storage field."""
+    field = forms.ChoiceField(
+        initial=CONFIG_ITEMS["boot_resources_storage"]["default"],
+        choices=BOOT_RESOURCES_STORAGE_CHOICES,
+        error_messages={
+            "invalid_choice": compose_invalid_choice_text(
+                "boot_resources_storage", BOOT_RESOURCES_STORAGE_CHOICES
+            )
+        },
+        **kwargs,
+    )
+    return field
+
+
 def make_network_discovery_field(*args, **kwargs):
     """Build and return the network_discovery field."""
     field = forms.ChoiceField(
@@ -411,6 +427,20 @@ CONFIG_ITEMS = {
             ),
         },
     },
+    "dns_dynamic_updates": {
+        "default": False,
+        "form": forms.BooleanField,
+        "form_kwargs": {
+            "label": "Publish DNS changes as dynamic updates",
+            "required": False,
+            "help_text": (
+                "Only used when MAAS is running its own DNS server. If set, "
+                "changes to the records of existing zones are sent to the DNS "
+                "server as signed dynamic updates (RFC 2136), rather than "
+                "rewriting and reloading the zone files."
+            ),
+        },
+    },
     "maas_internal_domain": {
         "default": "_maas_internal",
         "form": make_maas_internal_domain_field,
@@ -677,6 +707,20 @@ CONFIG_ITEMS = {
             ),
         },
     },
+    "boot_resources_storage": {
+        "default": "database",
+        "form": make_boot_resources_storage_field,
+        "form_kwargs": {
+            "label": "Storage used to serve boot resources to rack controllers",
+            "required": False,
+            "help_text": (
+                "Boot resources are always kept in the database. When the "
+                "filesystem is selected, each region controller also keeps "
+                "a copy of them on its own disk, made the first time they "
+                "are downloaded, and serves them from there."
+            ),
+        },
+    },
     "curtin_verbose": {
         "default": False,
         "form": forms.BooleanField,
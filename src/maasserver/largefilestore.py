@@ -0,0 +1,131 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Copies of `LargeFile` content on the region controller's disk."""
+
+__all__ = [
+    "LargeFileStore",
+    "LargeFileWriter",
+    "largefile_store",
+]
+
+import hashlib
+import os
+import re
+import tempfile
+
+from provisioningserver.path import get_maas_data_path
+
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class LargeFileStore:
+    """Content-addressed store for the content of `LargeFile`s.
+
+    Each file is named by its SHA256, in a directory named by the first two
+    characters of it. Files only ever appear complete and verified, through
+    `LargeFileWriter`, so any file found in the store can be served.
+
+    The database remains the source of truth: every region controller keeps
+    its own store, and fills it from the database as files are requested.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+
+    @property
+    def path(self):
+        """The directory of the store; under the MAAS data path by default."""
+        if self._path is None:
+            return get_maas_data_path("image-store")
+        return self._path
+
+    def get_relative_path(self, sha256):
+        """Return the path of the file for `sha256`, relative to the store."""
+        if SHA256_RE.fullmatch(sha256) is None:
+            raise ValueError("Invalid SHA256: %r" % (sha256,))
+        return os.path.join(sha256[:2], sha256)
+
+    def get_path(self, sha256):
+        """Return the path of the file for `sha256`."""
+        return os.path.join(self.path, self.get_relative_path(sha256))
+
+    def has_file(self, sha256):
+        """True if the store has the file for `sha256`."""
+        return os.path.isfile(self.get_path(sha256))
+
+    def open(self, sha256):
+        """Open the file for `sha256` for reading, or return `None`."""
+        try:
+            return open(self.get_path(sha256), "rb")
+        except FileNotFoundError:
+            return None
+
+    def writer(self, sha256):
+        """Return a `LargeFileWriter` for adding the file for `sha256`."""
+        return LargeFileWriter(self.get_path(sha256), sha256)
+
+    def delete(self, sha256):
+        """Delete the file for `sha256`, if the store has it."""
+        try:
+            os.unlink(self.get_path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+class LargeFileWriter:
+    """Writes a file into a `LargeFileStore`.
+
+    The content is written to a temporary file next to its final path, and
+    only moved into place by `commit` if its SHA256 is the expected one.
+    """
+
+    def __init__(self, path, sha256):
+        self.path = path
+        self.sha256 = sha256
+        self._checksum = hashlib.sha256()
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            self._file = tempfile.NamedTemporaryFile(
+                dir=directory, prefix=".%s." % self.sha256, delete=False
+            )
+        return self._file
+
+    def write(self, data):
+        """Write the next part of the content."""
+        self._open().write(data)
+        self._checksum.update(data)
+
+    def commit(self):
+        """Move the content into place if its SHA256 is the expected one.
+
+        :return: Whether the content was moved into place. It is discarded
+            if not.
+        """
+        tmpfile = self._open()
+        tmpfile.close()
+        if self._checksum.hexdigest() != self.sha256:
+            self.abort()
+            return False
+        # The file may be served directly by the reverse proxy.
+        os.chmod(tmpfile.name, 0o644)
+        os.rename(tmpfile.name, self.path)
+        self._file = None
+        return True
+
+    def abort(self):
+        """Discard the content written so far."""
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+            self._file = None
+
+
+largefile_store = LargeFileStore()
@@ -4,7 +4,7 @@
 """Listens for NOTIFY events from the postgres database."""
 
 
-from collections import defaultdict, deque
+from collections import defaultdict, OrderedDict
 from errno import ENOENT
 import threading
 
@@ -24,6 +24,7 @@ from twisted.logger import Logger
 from twisted.python.failure import Failure
 from zope.interface import implementer
 
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.events import EventGroup
 from provisioningserver.utils.twisted import callOut, suppress, synchronous
@@ -50,6 +51,80 @@ class PostgresListenerUnregistrationError(Exception):
     """Error raised when unregistering a handler fails."""
 
 
+class NotificationQueue:
+    """Ordered queue of pending notifications that coalesces duplicates.
+
+    Pending notifications are kept in insertion-ordered mappings, so adding a
+    notification, checking whether it is already pending and taking the next
+    one are all O(1).
+
+    Notifications received on a channel with a debounce window are held back
+    until the window has passed since the first of them was received, so that
+    every duplicate received meanwhile is coalesced into it.
+
+    :ivar debounce: A mapping of postgres channel names (e.g.
+        "machine_update") to their debounce window in seconds.
+    """
+
+    def __init__(self, debounce=None, clock=reactor):
+        self.debounce = {} if debounce is None else dict(debounce)
+        self.clock = clock
+        self._ready = OrderedDict()
+        self._delayed = {}
+
+    def __len__(self):
+        return len(self._ready) + len(self._delayed)
+
+    def __iter__(self):
+        yield from self._ready
+        yield from self._delayed
+
+    def __contains__(self, notification):
+        return notification in self._ready or notification in self._delayed
+
+    def add(self, notification):
+        """Queue `notification`.
+
+        :return: False if `notification` was coalesced with one that is
+            already pending, True otherwise.
+        """
+        if notification in self:
+            return False
+        channel, _ = notification
+        window = self.debounce.get(channel)
+        if window:
+            self._delayed[notification] = self.clock.seconds() + window
+        else:
+            self._ready[notification] = None
+        return True
+
+    def popleft(self):
+        """Remove and return the oldest notification ready to be handled.
+
+        :raise IndexError: When no notification is ready.
+        """
+        if not self._ready:
+            self._release()
+        try:
+            notification, _ = self._ready.popitem(last=False)
+        except KeyError:
+            raise IndexError("no notification ready to be handled")
+        return notification
+
+    def _release(self):
+        """Move notifications whose debounce window has passed to the ready
+        queue, keeping the order in which they were received."""
+        now = self.clock.seconds()
+        released = [
+            notification
+            for notification, due in self._delayed.items()
+            if due <= now
+        ]
+        for notification in released:
+            del self._delayed[notification]
+            self._ready[notification] = None
+
+
 @implementer(interfaces.IReadDescriptor)
 class PostgresListenerService(Service):
     """Listens for NOTIFY messages from postgres.
@@ -75,13 +150,13 @@ class PostgresListenerService(Service):
     HANDLE_NOTIFY_DELAY = 0.5
     CHANNEL_REGISTRAR_DELAY = 0.5
 
-    def __init__(self, alias="default"):
+    def __init__(self, alias="default", debounce=None):
         self.alias = alias
         self.listeners = defaultdict(list)
         self.autoReconnect = False
         self.connection = None
         self.connectionFileno = None
-        self.notifications = deque()
+        self.notifications = NotificationQueue(debounce=debounce)
         self.notifier = task.LoopingCall(self.handleNotifies)
         self.notifierDone = None
         self.connecting = None
@@ -434,7 +509,14 @@ class PostgresListenerService(Service):
 
         def gen_notifications(notifications):
             while notifications:
-                yield notifications.popleft()
+                try:
+                    notification = notifications.popleft()
+                except IndexError:
+                    # Only debounced notifications are left; they will be
+                    # handled on a later iteration.
+                    break
+                self._update_queue_depth()
+                yield notification
 
         return task.coiterate(
             self.handleNotify(notification, clock=clock)
@@ -453,6 +535,8 @@ class PostgresListenerService(Service):
                 "Failed to convert channel {channel!r}.", channel=channel
             )
         else:
+            # Include the handlers' synchronous work in the latency.
+            started = clock.seconds()
             defers = []
             handlers = self.listeners[channel]
             # XXX: There could be an arbitrary number of listeners. Should we
@@ -469,7 +553,17 @@ class PostgresListenerService(Service):
                     )
                 )
                 defers.append(d)
-            return defer.DeferredList(defers)
+            d = defer.DeferredList(defers)
+            d.addCallback(
+                callOut,
+                lambda: PROMETHEUS_METRICS.update(
+                    "maas_listener_handler_latency",
+                    "observe",
+                    value=clock.seconds() - started,
+                    labels={"channel": channel},
+                ),
+            )
+            return d
 
     def _process_notifies(self):
         """Add each notify to to the notifications set.
@@ -477,7 +571,8 @@ class PostgresListenerService(Service):
         This removes duplicate notifications when one entity in the database is
         updated multiple times in a short interval. Accumulating notifications
         and allowing the listener to pick them up in batches is imperfect but
-        good enough, and simple.
+        good enough, and simple. Channels with a debounce window coalesce
+        duplicates over that window too; see `NotificationQueue`.
 
         """
         notifies = self.connection.connection.notifies
@@ -503,8 +598,20 @@ class PostgresListenerService(Service):
                 # Place non-system messages into the queue to be
                 # processed.
                 notification = (notify.channel, notify.payload)
-                if notification not in self.notifications:
-                    self.notifications.append(notification)
+                if not self.notifications.add(notification):
+                    PROMETHEUS_METRICS.update(
+                        "maas_listener_notifications_coalesced",
+                        "inc",
+                        labels={"channel": notify.channel},
+                    )
         # Delete the contents of the connection's notifies list so
         # that we don't process them a second time.
         del notifies[:]
+        self._update_queue_depth()
+
+    def _update_queue_depth(self):
+        PROMETHEUS_METRICS.update(
+            "maas_listener_queue_depth",
+            "set",
+            value=len(self.notifications),
+        )
@@ -4,15 +4,19 @@
 """Configuration items."""
 
 
-from collections import defaultdict, namedtuple
+from collections import Counter, defaultdict, namedtuple
 import copy
 from datetime import timedelta
+from functools import partial
 from socket import gethostname
+import threading
 
 from django.db.models import CharField, Manager, Model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
+from twisted.python.failure import Failure
 
 from maasserver.fields import JSONObjectField
+from maasserver.utils.orm import post_commit
 from provisioningserver.drivers.osystem.ubuntu import UbuntuOS
 from provisioningserver.events import EVENT_TYPES
 
@@ -26,6 +30,11 @@ DNSSEC_VALIDATION_CHOICES = [
 
 NETWORK_DISCOVERY_CHOICES = [("enabled", "Enabled"), ("disabled", "Disabled")]
 
+BOOT_RESOURCES_STORAGE_CHOICES = [
+    ("database", "Database (PostgreSQL large objects)"),
+    ("filesystem", "Filesystem (region controller disk)"),
+]
+
 
 def _timedelta_to_whole_seconds(**kwargs) -> int:
     """Convert arbitrary timedelta to whole seconds."""
@@ -72,6 +81,7 @@ def get_default_config():
         "upstream_dns": None,
         "dnssec_validation": "auto",
         "dns_trusted_acl": None,
+        "dns_dynamic_updates": False,
         "maas_internal_domain": "maas-internal",
         # NTP settings
         "ntp_servers": "ntp.ubuntu.com",
@@ -91,6 +101,7 @@ def get_default_config():
         # Images.
         "boot_images_auto_import": True,
         "boot_images_no_proxy": False,
+        "boot_resources_storage": "database",
         # Third Party
         "enable_third_party_drivers": True,
         # Disk erasing.
@@ -157,6 +168,172 @@ NetworkDiscoveryConfig = namedtuple(
 )
 
 
+# Marks a config item that is cached as not being set in the database.
+_UNSET = object()
+
+
+class ConfigCache:
+    """Process-local cache of config values.
+
+    The cache is only used while at least one database listener is connected
+    to invalidate it: config items that change are reported on the
+    `sys_config` channel, and `invalidate` drops them from the cache until
+    `refresh` loads them again.
+
+    Readers never fill the cache themselves. Their transaction might not see
+    the latest committed values, or might have changed values that it has not
+    yet committed. Instead `refresh` loads values in a transaction of its own,
+    started after the changes it's catching up with were reported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # The listeners that are connected to invalidate the cache.
+        self._sources = set()
+        # All config items in the database, once loaded.
+        self._values = None
+        # Bumped whenever the cache is cleared, so that a load that was
+        # started before then is discarded.
+        self._generation = 0
+        # Config items that have been invalidated since they were loaded,
+        # mapped to a token of the invalidation.
+        self._stale = {}
+        # Config items changed in this process that have not yet been
+        # reported as committed, mapped to the number of transactions that
+        # changed them.
+        self._written = Counter()
+
+    @property
+    def enabled(self):
+        return len(self._sources) > 0
+
+    @property
+    def loaded(self):
+        return self._values is not None
+
+    def enable(self, source):
+        """Use the cache while `source` is connected to invalidate it."""
+        with self._lock:
+            self._sources.add(source)
+
+    def disable(self, source):
+        """Stop using the cache unless another source is still connected.
+
+        Changes may be missed while no source is connected, so the cache is
+        cleared and must be loaded again when one connects.
+        """
+        with self._lock:
+            self._sources.discard(source)
+            if not self.enabled:
+                self._clear()
+
+    def clear(self):
+        """Forget all cached values."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._values = None
+        self._stale.clear()
+        self._written.clear()
+        self._generation += 1
+
+    def invalidate(self, name, written=False):
+        """Forget the cached value of the config item `name`.
+
+        :param written: Whether `name` has been changed by a transaction in
+            this process. Its value is not cached again until the change is
+            reported, or the transaction is rolled back, because until then
+            the transaction may still need to read its own change.
+        """
+        with self._lock:
+            if not self.enabled:
+                # Nothing is cached, and everything is loaded when enabled.
+                return
+            was_stale = name in self._stale
+            token = self._stale[name] = object()
+            if not written:
+                self._written.pop(name, None)
+                return
+            self._written[name] += 1
+            generation = self._generation
+        # A change that is rolled back is never reported, so stop waiting for
+        # it then. A committed change is reported on `sys_config`.
+        post_commit(
+            partial(self._write_ended, name, token, was_stale, generation)
+        )
+
+    def _write_ended(self, name, token, was_stale, generation, result):
+        if not isinstance(result, Failure):
+            return
+        with self._lock:
+            if generation != self._generation or name not in self._written:
+                # Cleared, or the item has been reported since.
+                return
+            self._written[name] -= 1
+            if self._written[name] <= 0:
+                del self._written[name]
+            if not was_stale and self._stale.get(name) is token:
+                # Nothing else invalidated the cached value meanwhile, so it
+                # is still the committed one.
+                del self._stale[name]
+
+    def needs_refresh(self):
+        """Return whether `refresh` has work to do."""
+        return self.enabled and (not self.loaded or len(self._stale) > 0)
+
+    def get(self, names):
+        """Return the cached values of the given config items.
+
+        :return: A dict mapping those of `names` that are cached to their
+            values, or `_UNSET` for those that are not in the database.
+        """
+        with self._lock:
+            if not self.enabled or self._values is None:
+                return {}
+            return {
+                name: copy.deepcopy(self._values.get(name, _UNSET))
+                for name in names
+                if name not in self._stale and name not in self._written
+            }
+
+    def refresh(self):
+        """Load all config items, or only those invalidated since then.
+
+        This must be called in a transaction that started after the
+        invalidations it is catching up with.
+        """
+        with self._lock:
+            if not self.enabled:
+                return
+            generation = self._generation
+            stale = self._stale.copy()
+            loaded = self._values is not None
+        if loaded:
+            values = dict(
+                Config.objects.filter(name__in=list(stale)).values_list(
+                    "name", "value"
+                )
+            )
+        else:
+            values = dict(Config.objects.values_list("name", "value"))
+        with self._lock:
+            if generation != self._generation:
+                return
+            if loaded:
+                for name in stale:
+                    if name in values:
+                        self._values[name] = values[name]
+                    else:
+                        self._values.pop(name, None)
+            else:
+                self._values = values
+            # Items invalidated during the load must be loaded again.
+            for name, token in stale.items():
+                if self._stale.get(name) is token:
+                    del self._stale[name]
+
+
 class ConfigManager(Manager):
     """Manager for Config model class.
 
@@ -166,6 +343,7 @@ class ConfigManager(Manager):
     def __init__(self):
         super().__init__()
         self._config_changed_connections = defaultdict(set)
+        self.cache = ConfigCache()
 
     def get_config(self, name, default=None):
         """Return the config value corresponding to the given config name.
@@ -180,6 +358,12 @@ class ConfigManager(Manager):
         :return: A config value.
         :raises: Config.MultipleObjectsReturned
         """
+        cached = self.cache.get((name,))
+        if name in cached:
+            if cached[name] is _UNSET:
+                return copy.deepcopy(DEFAULT_CONFIG.get(name, default))
+            else:
+                return cached[name]
         try:
             return self.get(name=name).value
         except Config.DoesNotExist:
@@ -199,12 +383,16 @@ class ConfigManager(Manager):
         """
         if defaults is None:
             defaults = [None for _ in range(len(names))]
-        configs = {
-            config.name: config for config in self.filter(name__in=names)
-        }
+        values = self.cache.get(names)
+        uncached = [name for name in names if name not in values]
+        if len(uncached) > 0:
+            values.update(
+                (config.name, config.value)
+                for config in self.filter(name__in=uncached)
+            )
         return {
-            name: configs.get(name).value
-            if configs.get(name)
+            name: values[name]
+            if values.get(name, _UNSET) is not _UNSET
             else copy.deepcopy(DEFAULT_CONFIG.get(name, default))
             for name, default in zip(names, defaults)
         }
@@ -274,6 +462,11 @@ class ConfigManager(Manager):
         for connection in self._config_changed_connections[instance.name]:
             connection(sender, instance, created, **kwargs)
 
+    def _config_written(self, sender, instance, **kwargs):
+        # This transaction must read its own changes from the database. Other
+        # processes find out about them when they're committed.
+        self.cache.invalidate(instance.name, written=True)
+
     def get_network_discovery_config_from_value(self, value):
         """Given the configuration value for `network_discovery`, return
         a `namedtuple` (`NetworkDiscoveryConfig`) of booleans: (active,
@@ -314,3 +507,6 @@ class Config(Model):
 
 # Connect config manager's _config_changed to Config's post-save signal.
 post_save.connect(Config.objects._config_changed, sender=Config)
+# Keep the config cache from serving values that were changed in this process.
+post_save.connect(Config.objects._config_written, sender=Config)
+post_delete.connect(Config.objects._config_written, sender=Config)
@@ -4,6 +4,9 @@
 """Model definition for mDNS. (Multicast DNS, or RFC 6762.)"""
 
 
+from collections import defaultdict
+
+from django.db import connection
 from django.db.models import (
     CASCADE,
     CharField,
@@ -11,11 +14,12 @@ from django.db.models import (
     GenericIPAddressField,
     IntegerField,
     Manager,
+    Q,
 )
 from netaddr import IPAddress
 
 from maasserver.models.cleansave import CleanSave
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.utils.orm import get_one, UniqueViolation
 from provisioningserver.logger import get_maas_logger
 
@@ -65,6 +69,140 @@ class MDNSManager(Manager):
             deleted = True
         return deleted
 
+    def update_entries(self, observations):
+        """Record many mDNS observations at once.
+
+        This has the same effect as calling `Interface.update_mdns_entry` for
+        each observation in turn, but reads the existing entries in one query
+        and writes the changes with at most three more: a delete of obsolete
+        entries, an update of those seen again, and an insert of new ones.
+
+        There is no unique constraint on entries for an upsert to conflict
+        on, so entries are inserted in bulk instead.
+
+        :param observations: An iterable of `(interface, hostname, ip)`
+            tuples, in the order they were observed.
+        :return: A `(created, updated, deleted)` tuple of row counts.
+        """
+        observations = [
+            (interface, hostname, str(IPAddress(ip)))
+            for interface, hostname, ip in observations
+        ]
+        if len(observations) == 0:
+            return 0, 0, 0
+        query = self.filter(
+            interface_id__in={interface.id for interface, _, _ in observations}
+        ).filter(
+            Q(hostname__in={hostname for _, hostname, _ in observations})
+            | Q(ip__in={ip for _, _, ip in observations})
+        )
+
+        # The entries for each (interface, hostname, ip), as [id, seen] where
+        # `id` is that of an existing entry or None for a new one, indexed
+        # by hostname and by IP address too.
+        entries = {}
+        by_hostname = defaultdict(set)
+        by_ip = defaultdict(set)
+
+        def add(key, entry):
+            interface_id, hostname, ip = key
+            entries[key] = entry
+            by_hostname[interface_id, hostname].add(key)
+            by_ip[interface_id, ip].add(key)
+
+        def remove(key):
+            interface_id, hostname, ip = key
+            by_hostname[interface_id, hostname].discard(key)
+            by_ip[interface_id, ip].discard(key)
+            return entries.pop(key)
+
+        for entry in query:
+            key = (entry.interface_id, entry.hostname, entry.ip)
+            add(key, [entry.id, 0])
+
+        obsolete = []
+        for interface, hostname, ip in observations:
+            deleted = False
+            ip_version = IPAddress(ip).version
+            for key in list(by_hostname[interface.id, hostname]):
+                previous_ip = key[2]
+                if previous_ip == ip:
+                    continue
+                if IPAddress(previous_ip).version != ip_version:
+                    # Don't move hostnames between address families.
+                    continue
+                maaslog.info(
+                    "%s: Hostname '%s' moved from %s to %s."
+                    % (interface.get_log_string(), hostname, previous_ip, ip)
+                )
+                obsolete.append(remove(key)[0])
+                deleted = True
+            for key in list(by_ip[interface.id, ip]):
+                previous_hostname = key[1]
+                if previous_hostname == hostname:
+                    continue
+                maaslog.info(
+                    "%s: Hostname for %s updated from '%s' to '%s'."
+                    % (
+                        interface.get_log_string(),
+                        ip,
+                        previous_hostname,
+                        hostname,
+                    )
+                )
+                obsolete.append(remove(key)[0])
+                deleted = True
+            key = (interface.id, hostname, ip)
+            if key in entries:
+                entries[key][1] += 1
+            else:
+                add(key, [None, 1])
+                # If we deleted a previous mDNS entry, then we have already
+                # generated a log statement about this mDNS entry.
+                if not deleted:
+                    maaslog.info(
+                        "%s: New mDNS entry resolved: '%s' on %s."
+                        % (interface.get_log_string(), hostname, ip)
+                    )
+
+        obsolete = [entry_id for entry_id in obsolete if entry_id is not None]
+        deleted = 0
+        if len(obsolete) != 0:
+            deleted, _ = self.filter(id__in=obsolete).delete()
+        timestamp = now()
+        updates, inserts = [], []
+        for (interface_id, hostname, ip), (entry_id, seen) in entries.items():
+            if entry_id is None:
+                inserts.append(
+                    self.model(
+                        created=timestamp,
+                        updated=timestamp,
+                        interface_id=interface_id,
+                        hostname=hostname,
+                        ip=ip,
+                        count=seen,
+                    )
+                )
+            elif seen != 0:
+                updates.append((entry_id, seen))
+        if len(updates) != 0:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    self._sql_update_entries
+                    % ", ".join(["(%s, %s)"] * len(updates)),
+                    [timestamp, *(value for row in updates for value in row)],
+                )
+        if len(inserts) != 0:
+            self.bulk_create(inserts)
+        return len(inserts), len(updates), deleted
+
+    _sql_update_entries = """\
+    UPDATE maasserver_mdns AS mdns
+    SET count = mdns.count + observed.seen, updated = %%s
+    FROM (VALUES %s) AS observed (id, seen)
+    WHERE mdns.id = observed.id
+    """
+
     def get_current_entry(self, hostname: str, ip: str, interface: str):
         """Returns the current mDNS data for the specified values.
 
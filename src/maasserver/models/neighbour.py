@@ -4,6 +4,9 @@
 """Model definition for Neighbour."""
 
 
+from collections import defaultdict
+
+from django.db import connection
 from django.db.models import (
     CASCADE,
     ForeignKey,
@@ -12,14 +15,15 @@ from django.db.models import (
     Manager,
 )
 from django.db.models.query import QuerySet
+from netaddr import EUI, IPAddress
 
 from maasserver.fields import MACAddressField
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.interface import Interface
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.utils.orm import MAASQueriesMixin
 from provisioningserver.logger import get_maas_logger
-from provisioningserver.utils.network import get_mac_organization
+from provisioningserver.utils.network import format_eui, get_mac_organization
 
 maaslog = get_maas_logger("neighbour")
 
@@ -38,7 +42,7 @@ class NeighbourQueriesMixin(MAASQueriesMixin):
             specifiers,
             specifier_types=specifier_types,
             separator=separator,
-            **kwargs
+            **kwargs,
         )
 
 
@@ -110,6 +114,147 @@ class NeighbourManager(Manager, NeighbourQueriesMixin):
             deleted = True
         return deleted
 
+    def update_neighbours(self, observations):
+        """Record many neighbour observations at once.
+
+        This has the same effect as calling `Interface.update_neighbour` for
+        each observation in turn, but reads the existing neighbours in one
+        query and writes the changes with at most three more: a delete of
+        obsolete neighbours, an update of those seen again, and an upsert of
+        new ones.
+
+        :param observations: An iterable of `(interface, ip, mac, time, vid)`
+            tuples, in the order they were observed.
+        :return: A `(created, updated, deleted)` tuple of row counts.
+        """
+        observations = [
+            (interface, str(IPAddress(ip)), format_eui(EUI(mac)), time, vid)
+            for interface, ip, mac, time, vid in observations
+        ]
+        if len(observations) == 0:
+            return 0, 0, 0
+        existing = defaultdict(list)
+        for neighbour in self.filter(
+            interface_id__in={interface.id for interface, *_ in observations},
+            ip__in={ip for _, ip, *_ in observations},
+        ):
+            key = (neighbour.interface_id, neighbour.ip, neighbour.vid)
+            existing[key].append(neighbour)
+
+        # The binding for each (interface, ip, vid), as [mac, id, time, seen]
+        # where `id` is that of an existing neighbour or None for a new one.
+        bindings = {}
+        obsolete = []
+        for interface, ip, mac, time, vid in observations:
+            key = (interface.id, ip, vid)
+            binding = bindings.get(key)
+            if binding is None:
+                moved = False
+                for neighbour in existing.pop(key, ()):
+                    neighbour_mac = format_eui(EUI(str(neighbour.mac_address)))
+                    if neighbour_mac == mac and binding is None:
+                        binding = [mac, neighbour.id, time, 1]
+                        continue
+                    if neighbour_mac != mac:
+                        self._log_moved(interface, ip, vid, neighbour_mac, mac)
+                        moved = True
+                    obsolete.append(neighbour.id)
+                if binding is None:
+                    binding = [mac, None, time, 1]
+                    # The move has been logged already.
+                    if not moved:
+                        self._log_new(interface, ip, vid, mac)
+                bindings[key] = binding
+            elif binding[0] == mac:
+                binding[2] = time
+                binding[3] += 1
+            else:
+                self._log_moved(interface, ip, vid, binding[0], mac)
+                if binding[1] is not None:
+                    obsolete.append(binding[1])
+                bindings[key] = [mac, None, time, 1]
+
+        deleted = 0
+        if len(obsolete) != 0:
+            deleted, _ = self.filter(id__in=obsolete).delete()
+        timestamp = now()
+        updates, inserts = [], []
+        for key, (mac, neighbour_id, time, seen) in bindings.items():
+            interface_id, ip, vid = key
+            if neighbour_id is None:
+                inserts.append(
+                    (
+                        timestamp,
+                        timestamp,
+                        interface_id,
+                        vid,
+                        mac,
+                        ip,
+                        time,
+                        seen,
+                    )
+                )
+            else:
+                updates.append((neighbour_id, time, seen))
+        with connection.cursor() as cursor:
+            if len(updates) != 0:
+                cursor.execute(
+                    self._sql_update_neighbours
+                    % ", ".join(["(%s, %s, %s)"] * len(updates)),
+                    [timestamp, *(value for row in updates for value in row)],
+                )
+            if len(inserts) != 0:
+                cursor.execute(
+                    self._sql_upsert_neighbours
+                    % ", ".join(
+                        ["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(inserts)
+                    ),
+                    [value for row in inserts for value in row],
+                )
+        return len(inserts), len(updates), deleted
+
+    _sql_update_neighbours = """\
+    UPDATE maasserver_neighbour AS neighbour
+    SET time = observed.time,
+        count = neighbour.count + observed.seen,
+        updated = %%s
+    FROM (VALUES %s) AS observed (id, time, seen)
+    WHERE neighbour.id = observed.id
+    """
+
+    # Neighbours can be created concurrently by another region process, in
+    # which case they are updated instead. This does not catch neighbours
+    # without a VID, as NULLs never conflict, but the window is small.
+    _sql_upsert_neighbours = """\
+    INSERT INTO maasserver_neighbour
+      (created, updated, interface_id, vid, mac_address, ip, time, count)
+    VALUES %s
+    ON CONFLICT (interface_id, vid, mac_address, ip) DO UPDATE
+    SET time = EXCLUDED.time,
+        count = maasserver_neighbour.count + EXCLUDED.count,
+        updated = EXCLUDED.updated
+    """
+
+    def _log_moved(self, interface, ip, vid, old_mac, new_mac):
+        maaslog.info(
+            "%s: IP address %s%s moved from %s to %s"
+            % (
+                interface.get_log_string(),
+                ip,
+                self.get_vid_log_snippet(vid),
+                old_mac,
+                new_mac,
+            )
+        )
+
+    def _log_new(self, interface, ip, vid, mac):
+        maaslog.info(
+            f"{interface.get_log_string()}: "
+            "New MAC, IP binding "
+            f"observed{self.get_vid_log_snippet(vid)}: "
+            f"{mac}, {ip}"
+        )
+
     def get_by_updated_with_related_nodes(self):
         """Returns a `QuerySet` of neighbours, while also selecting related
         interfaces and nodes.
@@ -129,7 +129,7 @@ from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.resourcepool import ResourcePool
 from maasserver.models.service import Service
 from maasserver.models.staticipaddress import StaticIPAddress
-from maasserver.models.subnet import Subnet
+from maasserver.models.subnet import free_range_cursor, Subnet
 from maasserver.models.tag import Tag
 from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.models.vlan import VLAN
@@ -185,6 +185,7 @@ from provisioningserver.drivers.power.ipmi import IPMI_BOOT_TYPE
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import EVENT_DETAILS, EVENT_TYPES
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.refresh.node_info_scripts import (
     COMMISSIONING_OUTPUT_NAME,
     LIST_MODALIASES_OUTPUT_NAME,
@@ -867,6 +868,28 @@ class RegionControllerManager(ControllerManager):
         return maas_uuid
 
 
+def _record_discovery_report(kind, changes, started):
+    """Record the rows changed by, and time taken for, a discovery report.
+
+    :param kind: "neighbour" or "mdns".
+    :param changes: A `(created, updated, deleted)` tuple of row counts.
+    :param started: The `time.monotonic` time the report was started.
+    """
+    for action, rows in zip(("created", "updated", "deleted"), changes):
+        PROMETHEUS_METRICS.update(
+            "maas_discovery_report_rows",
+            "inc",
+            value=rows,
+            labels={"kind": kind, "action": action},
+        )
+    PROMETHEUS_METRICS.update(
+        "maas_discovery_report_latency",
+        "observe",
+        value=time.monotonic() - started,
+        labels={"kind": kind},
+    )
+
+
 def get_default_domain():
     """Get the default domain name."""
     return Domain.objects.get_default_domain().id
@@ -4444,21 +4467,25 @@ class Node(CleanSave, TimestampedModel):
         # Query for the interfaces again here; if we use the cached
         # interface_set, we could skip a newly-created bridge if it was created
         # at deployment time.
-        for interface in Interface.objects.filter(
-            node_config=self.current_config
-        ):
-            maaslog.debug(f"Claiming IP for {self.system_id}:{interface.name}")
-            claimed_ips = interface.claim_auto_ips(
-                temp_expires_after=temp_expires_after,
-                exclude_addresses=exclude_addresses,
-            )
-            for ip in claimed_ips:
+        interfaces = Interface.objects.filter(node_config=self.current_config)
+        # Work out the free ranges of each subnet once, rather than once per
+        # interface, since nothing but these allocations changes them here.
+        with free_range_cursor():
+            for interface in interfaces:
                 maaslog.debug(
-                    f"Claimed IP for {self.system_id}:{interface.name}: "
-                    f"{ip.ip}"
+                    f"Claiming IP for {self.system_id}:{interface.name}"
+                )
+                claimed_ips = interface.claim_auto_ips(
+                    temp_expires_after=temp_expires_after,
+                    exclude_addresses=exclude_addresses,
                 )
-                exclude_addresses.add(str(ip.ip))
-                allocated_ips.add(ip)
+                for ip in claimed_ips:
+                    maaslog.debug(
+                        f"Claimed IP for {self.system_id}:{interface.name}: "
+                        f"{ip.ip}"
+                    )
+                    exclude_addresses.add(str(ip.ip))
+                    allocated_ips.add(ip)
         return allocated_ips
 
     @inlineCallbacks
@@ -6370,24 +6397,38 @@ class Controller(Node):
             Neighbour data is gathered directly from the ARP monitoring process
             running on each rack interface.
         """
+        # Circular imports.
+        from maasserver.models.neighbour import Neighbour
+
+        started = time.monotonic()
         # Determine which interfaces' neighbours need updating.
         interface_set = {neighbour["interface"] for neighbour in neighbours}
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set, fetch_fabric_vlan=True
         )
+        observations = []
+        reported_vids = set()
         for neighbour in neighbours:
             interface = interfaces.get(neighbour["interface"], None)
             if interface is not None:
                 vid = neighbour.get("vid", None)
                 if interface.neighbour_discovery_state:
-                    interface.update_neighbour(
-                        neighbour["ip"],
-                        neighbour["mac"],
-                        neighbour["time"],
-                        vid=vid,
+                    observations.append(
+                        (
+                            interface,
+                            neighbour["ip"],
+                            neighbour["mac"],
+                            neighbour["time"],
+                            vid,
+                        )
                     )
                 if vid is not None:
-                    interface.report_vid(vid, ip=neighbour["ip"])
+                    key = (interface.id, vid, neighbour["ip"])
+                    if key not in reported_vids:
+                        reported_vids.add(key)
+                        interface.report_vid(vid, ip=neighbour["ip"])
+        changes = Neighbour.objects.update_neighbours(observations)
+        _record_discovery_report("neighbour", changes, started)
 
     def report_mdns_entries(self, entries):
         """Update the mDNS entries on this controller.
@@ -6396,15 +6437,24 @@ class Controller(Node):
             entries. mDNS data is gathered from an `avahi-browse` process
             running on each rack interface.
         """
+        # Circular imports.
+        from maasserver.models.mdns import MDNS
+
+        started = time.monotonic()
         # Determine which interfaces' entries need updating.
         interface_set = {entry["interface"] for entry in entries}
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set
         )
+        observations = []
         for entry in entries:
             interface = interfaces.get(entry["interface"], None)
-            if interface is not None:
-                interface.update_mdns_entry(entry)
+            if interface is not None and interface.mdns_discovery_state:
+                observations.append(
+                    (interface, entry["hostname"], entry["address"])
+                )
+        changes = MDNS.objects.update_entries(observations)
+        _record_discovery_report("mdns", changes, started)
 
     def get_discovery_state(self):
         """Returns the interface monitoring state for this Controller.
@@ -9,6 +9,7 @@ topology information derived from LLDP.
 
 __all__ = [
     "get_probed_details",
+    "get_probed_details_versions",
     "get_single_probed_details",
     "script_output_nsmap",
 ]
@@ -98,3 +99,46 @@ def get_probed_details(nodes):
             stdout_decoded = base64.b64decode(stdout)
             ret[system_id][namespace] = stdout_decoded
     return ret
+
+
+def get_probed_details_versions(nodes):
+    """Return the versions of the details of the nodes in the given list.
+
+    A version identifies the commissioning output that a node's details are
+    made from, without fetching that output: it changes whenever the node is
+    recommissioned or the output is stored again.
+
+    :return: A ``{system_id: version}`` map, where ``version`` is a tuple of
+        ``(script result id, updated)`` tuples.
+    """
+    node_ids = {node.id: node for node in nodes}
+    ret = {node.system_id: [] for node in nodes}
+    if len(node_ids) == 0:
+        return {}
+    with connection.cursor() as cursor:
+        sql_query = """
+            SELECT
+              script_set.node_id, script_result.id, script_result.updated
+            FROM
+              metadataserver_scriptresult AS script_result,
+              metadataserver_scriptset AS script_set,
+              maasserver_node AS node
+            WHERE
+              script_set.node_id IN %s AND
+              script_set.id = script_result.script_set_id AND
+              script_result.status = %s AND
+              script_result.script_name IN %s AND
+              script_set.id = node.current_commissioning_script_set_id
+            ORDER BY script_result.id;
+        """
+        cursor.execute(
+            sql_query,
+            [
+                tuple(node_ids),
+                SCRIPT_STATUS.PASSED,
+                tuple(script_output_nsmap),
+            ],
+        )
+        for node_id, result_id, updated in cursor.fetchall():
+            ret[node_ids[node_id].system_id].append((result_id, updated))
+    return {system_id: tuple(results) for system_id, results in ret.items()}
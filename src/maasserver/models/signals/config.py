@@ -4,6 +4,7 @@
 """Signals called when config values changed."""
 
 
+from maasserver.clusterrpc import boot_config, external_config
 from maasserver.utils.signals import SignalsManager
 
 signals = SignalsManager()
@@ -19,5 +20,35 @@ def dns_kms_setting_changed(sender, instance, created, **kwargs):
 signals.watch_config(dns_kms_setting_changed, "windows_kms_host")
 
 
+def invalidate_boot_configs(sender, instance, created, **kwargs):
+    boot_config.boot_config_invalidations.add()
+
+
+# Changes to settings used in boot configurations, by
+# `maasserver.rpc.boot.get_config`.
+for config_name in [
+    "commissioning_osystem",
+    "commissioning_distro_series",
+    "enable_third_party_drivers",
+    "default_min_hwe_kernel",
+    "default_osystem",
+    "default_distro_series",
+    "kernel_opts",
+    "use_rack_proxy",
+    "maas_internal_domain",
+    "remote_syslog",
+    "maas_syslog_port",
+]:
+    signals.watch_config(invalidate_boot_configs, config_name)
+
+
+def announce_external_config(sender, instance, created, **kwargs):
+    external_config.external_config_changes.add()
+
+
+for config_name in external_config.EXTERNAL_CONFIG_NAMES:
+    signals.watch_config(announce_external_config, config_name)
+
+
 # Enable all signals by default.
 signals.enable()
@@ -6,6 +6,7 @@
 
 from django.db.models.signals import post_delete
 
+from maasserver.largefilestore import largefile_store
 from maasserver.models.largefile import (
     delete_large_object_content_later,
     LargeFile,
@@ -21,9 +22,14 @@ def delete_large_object(sender, instance, **kwargs):
 
     This is done using the `post_delete` signal instead of overriding delete
     on `LargeFile`, so it works correctly for both the model and `QuerySet`.
+
+    This region controller's copy of the content is deleted too. Copies kept
+    by other region controllers are never served once the `LargeFile` is
+    gone.
     """
     if instance.content is not None:
         post_commit_do(delete_large_object_content_later, instance.content)
+    post_commit_do(largefile_store.delete, instance.sha256)
 
 
 signals.watch(post_delete, delete_large_object, LargeFile)
@@ -6,7 +6,8 @@
 
 from django.db.models.signals import post_init, post_save, pre_delete, pre_save
 
-from maasserver.enum import NODE_STATUS, POWER_STATE
+from maasserver.clusterrpc import boot_config, external_config
+from maasserver.enum import NODE_STATUS, NODE_TYPE, POWER_STATE
 from maasserver.models import (
     Controller,
     Device,
@@ -179,5 +180,77 @@ for klass in [Node, Machine]:
     signals.watch_fields(release_auto_ips, klass, ["power_state"])
 
 
+def invalidate_boot_config(node, old_values, deleted=False):
+    """Have rack controllers forget the boot config cached for `node`."""
+    boot_config.boot_config_invalidations.add([node.system_id])
+
+
+# The fields that the boot configurations given to rack controllers by
+# `maasserver.rpc.boot.get_config` depend on.
+BOOT_CONFIG_FIELDS = [
+    "status",
+    "netboot",
+    "ephemeral_deploy",
+    "osystem",
+    "distro_series",
+    "architecture",
+    "hwe_kernel",
+    "min_hwe_kernel",
+    "hostname",
+    "domain_id",
+    "boot_interface_id",
+    "boot_cluster_ip",
+    "bios_boot_method",
+    "current_config_id",
+]
+
+for klass in NODE_CLASSES:
+    signals.watch_fields(
+        invalidate_boot_config, klass, BOOT_CONFIG_FIELDS, delete=True
+    )
+
+
+CONTROLLER_NODE_TYPES = frozenset(
+    (
+        NODE_TYPE.RACK_CONTROLLER,
+        NODE_TYPE.REGION_CONTROLLER,
+        NODE_TYPE.REGION_AND_RACK_CONTROLLER,
+    )
+)
+
+
+def announce_external_config_on_controller_change(
+    node, old_values, deleted=False
+):
+    """Announce the external services configuration to rack controllers.
+
+    Their NTP configuration depends on which nodes are controllers.
+    """
+    [old_node_type] = old_values
+    if old_node_type in CONTROLLER_NODE_TYPES or (
+        not deleted and node.is_controller
+    ):
+        external_config.external_config_changes.add()
+
+
+def announce_external_config_on_controller_create(
+    sender, instance, created, **kwargs
+):
+    if created and instance.is_controller:
+        external_config.external_config_changes.add()
+
+
+for klass in NODE_CLASSES:
+    signals.watch_fields(
+        announce_external_config_on_controller_change,
+        klass,
+        ["node_type"],
+        delete=True,
+    )
+    signals.watch(
+        post_save, announce_external_config_on_controller_create, sender=klass
+    )
+
+
 # Enable all signals by default.
 signals.enable()
@@ -6,6 +6,7 @@
 
 from django.db.models.signals import post_save
 
+from maasserver.clusterrpc import external_config
 from maasserver.enum import IPADDRESS_TYPE
 from maasserver.models import StaticIPAddress, Subnet
 from maasserver.utils.signals import SignalsManager
@@ -44,5 +45,27 @@ def updated_cidr(instance, old_values, **kwargs):
 signals.watch(post_save, post_created, sender=Subnet)
 signals.watch_fields(updated_cidr, Subnet, ["cidr"], delete=False)
 
+
+def announce_external_config(instance, old_values, deleted=False):
+    """Announce the external services configuration to rack controllers.
+
+    Their DNS and proxy configurations include subnets allowed to use them.
+    """
+    external_config.external_config_changes.add()
+
+
+def announce_external_config_on_create(sender, instance, created, **kwargs):
+    if created:
+        external_config.external_config_changes.add()
+
+
+signals.watch(post_save, announce_external_config_on_create, sender=Subnet)
+signals.watch_fields(
+    announce_external_config,
+    Subnet,
+    ["cidr", "allow_dns", "allow_proxy"],
+    delete=True,
+)
+
 # Enable all signals by default.
 signals.enable()
@@ -4,10 +4,12 @@
 """Test the behaviour of config signals."""
 
 
+from maasserver.clusterrpc import boot_config, external_config
 from maasserver.models import domain as domain_module
 from maasserver.models.config import Config
+from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 
 
 class TestConfigSignals(MAASServerTestCase):
@@ -17,3 +19,21 @@ class TestConfigSignals(MAASServerTestCase):
         )
         Config.objects.set_config("windows_kms_host", "8.8.8.8")
         self.assertThat(dns_kms_setting_changed, MockCalledOnceWith())
+
+    def test_changing_kernel_opts_invalidates_boot_configs(self):
+        Config.objects.set_config("kernel_opts", factory.make_name("opts"))
+        self.assertThat(
+            boot_config.boot_config_invalidations.add, MockCalledOnceWith()
+        )
+
+    def test_changing_ntp_servers_announces_external_config(self):
+        Config.objects.set_config("ntp_servers", factory.make_hostname())
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_changing_other_settings_does_not_announce_external_config(self):
+        Config.objects.set_config("kernel_opts", factory.make_name("opts"))
+        self.assertThat(
+            external_config.external_config_changes.add, MockNotCalled()
+        )
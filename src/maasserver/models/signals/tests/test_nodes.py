@@ -3,9 +3,11 @@
 
 
 import random
+from unittest.mock import call
 
 from testtools.matchers import Equals, HasLength, Is, MatchesStructure, Not
 
+from maasserver.clusterrpc import boot_config, external_config
 from maasserver.enum import (
     IPADDRESS_TYPE,
     NODE_STATUS,
@@ -22,6 +24,7 @@ from maasserver.node_status import NODE_TRANSITIONS
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from metadataserver.models.nodekey import NodeKey
 
 
@@ -344,3 +347,88 @@ class TestNodeReleasesAutoIPs(MAASServerTestCase):
             interface__node_config__node=node, alloc_type=IPADDRESS_TYPE.AUTO
         ):
             self.assertIsNotNone(ip.ip)
+
+
+class TestNodeInvalidatesBootConfig(MAASServerTestCase):
+    def test_invalidates_on_create(self):
+        node = factory.make_Node()
+        self.assertIn(
+            call([node.system_id]),
+            boot_config.boot_config_invalidations.add.mock_calls,
+        )
+
+    def test_invalidates_on_boot_config_change(self):
+        node = factory.make_Node(netboot=True)
+        boot_config.boot_config_invalidations.add.reset_mock()
+        node.netboot = False
+        node.save()
+        self.assertThat(
+            boot_config.boot_config_invalidations.add,
+            MockCalledOnceWith([node.system_id]),
+        )
+
+    def test_does_not_invalidate_on_other_change(self):
+        node = factory.make_Node()
+        boot_config.boot_config_invalidations.add.reset_mock()
+        node.description = factory.make_name("description")
+        node.save()
+        self.assertThat(
+            boot_config.boot_config_invalidations.add, MockNotCalled()
+        )
+
+    def test_invalidates_on_delete(self):
+        node = factory.make_Node()
+        boot_config.boot_config_invalidations.add.reset_mock()
+        node.delete()
+        self.assertThat(
+            boot_config.boot_config_invalidations.add,
+            MockCalledOnceWith([node.system_id]),
+        )
+
+
+class TestControllerAnnouncesExternalConfig(MAASServerTestCase):
+    def test_announces_on_controller_create(self):
+        factory.make_RackController()
+        self.assertIn(
+            call(), external_config.external_config_changes.add.mock_calls
+        )
+
+    def test_does_not_announce_on_machine_create(self):
+        factory.make_Machine()
+        self.assertThat(
+            external_config.external_config_changes.add, MockNotCalled()
+        )
+
+    def test_announces_on_node_type_change_to_controller(self):
+        node = factory.make_Node()
+        node.node_type = NODE_TYPE.REGION_CONTROLLER
+        node.save()
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_announces_on_node_type_change_from_controller(self):
+        rack = factory.make_RackController()
+        external_config.external_config_changes.add.reset_mock()
+        rack.node_type = NODE_TYPE.MACHINE
+        rack.save()
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_announces_on_controller_delete(self):
+        rack = factory.make_RackController()
+        external_config.external_config_changes.add.reset_mock()
+        rack.delete()
+        self.assertIn(
+            call(), external_config.external_config_changes.add.mock_calls
+        )
+
+    def test_does_not_announce_on_other_controller_change(self):
+        rack = factory.make_RackController()
+        external_config.external_config_changes.add.reset_mock()
+        rack.description = factory.make_name("description")
+        rack.save()
+        self.assertThat(
+            external_config.external_config_changes.add, MockNotCalled()
+        )
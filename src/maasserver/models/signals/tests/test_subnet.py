@@ -4,9 +4,11 @@
 """Test the behaviour of subnet signals."""
 
 
+from maasserver.clusterrpc import external_config
 from maasserver.enum import IPADDRESS_TYPE
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 
 
 class TestSubnetSignals(MAASServerTestCase):
@@ -62,3 +64,35 @@ class TestSubnetSignals(MAASServerTestCase):
         ip_address2.refresh_from_db()
         self.assertIsNone(ip_address1.subnet)
         self.assertEqual(subnet, ip_address2.subnet)
+
+    def test_creating_subnet_announces_external_config(self):
+        factory.make_Subnet(cidr=self.network_maker().cidr)
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_changing_allow_dns_announces_external_config(self):
+        subnet = factory.make_Subnet(cidr=self.network_maker().cidr)
+        external_config.external_config_changes.add.reset_mock()
+        subnet.allow_dns = not subnet.allow_dns
+        subnet.save()
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_deleting_subnet_announces_external_config(self):
+        subnet = factory.make_Subnet(cidr=self.network_maker().cidr)
+        external_config.external_config_changes.add.reset_mock()
+        subnet.delete()
+        self.assertThat(
+            external_config.external_config_changes.add, MockCalledOnceWith()
+        )
+
+    def test_other_subnet_change_does_not_announce_external_config(self):
+        subnet = factory.make_Subnet(cidr=self.network_maker().cidr)
+        external_config.external_config_changes.add.reset_mock()
+        subnet.description = factory.make_name("description")
+        subnet.save()
+        self.assertThat(
+            external_config.external_config_changes.add, MockNotCalled()
+        )
@@ -4,7 +4,9 @@
 """Model for subnets."""
 
 
+from contextlib import contextmanager
 from operator import attrgetter
+import threading
 from typing import Iterable, Optional
 
 from django.contrib.postgres.fields import ArrayField
@@ -62,6 +64,41 @@ SUBNET_NAME_VALIDATOR = RegexValidator(r"^[.: \w/-]+$")
 IPAddressExcludeList = Optional[Iterable[MaybeIPAddress]]
 
 
+class FreeRangeCursors(threading.local):
+    """Free IP ranges of subnets, kept across consecutive allocations."""
+
+    def __init__(self):
+        super().__init__()
+        self.active = False
+        self.free_ranges = {}
+
+
+free_range_cursors = FreeRangeCursors()
+
+
+@contextmanager
+def free_range_cursor():
+    """Reuse the free IP ranges of subnets across allocations in this block.
+
+    Within the block, `Subnet.get_next_ip_for_allocation` works out the free
+    ranges of each subnet once, then takes each address it hands out off
+    them, instead of recomputing the usage of the subnet every time.
+
+    Use it only within a single transaction, around code that changes which
+    addresses are in use only by allocating them. Nested blocks share the
+    outermost block's cursor.
+    """
+    if free_range_cursors.active:
+        yield
+        return
+    free_range_cursors.active = True
+    try:
+        yield
+    finally:
+        free_range_cursors.active = False
+        free_range_cursors.free_ranges.clear()
+
+
 def create_cidr(network, subnet_mask=None):
     """Given the specified network and subnet mask, create a CIDR string.
 
@@ -149,6 +186,61 @@ class SubnetQueriesMixin(MAASQueriesMixin):
         else:
             return None
 
+    find_best_subnets_for_ips_query = """
+        SELECT
+            subnet.*,
+            masklen(subnet.cidr) "prefixlen",
+            vlan.dhcp_on "dhcp_on"
+        FROM maasserver_subnet AS subnet
+        INNER JOIN maasserver_vlan AS vlan
+            ON subnet.vlan_id = vlan.id
+        WHERE
+            subnet.cidr >> ANY(%s::inet[]) /* Contains one of the IPs */
+        """
+
+    def get_best_subnets_for_ips(self, ips):
+        """Find the most-specific managed Subnet for each IP address.
+
+        This is `get_best_subnet_for_ip` for several IP addresses with a
+        single query.
+
+        :return: A dict mapping each IP address, as given, to its `Subnet`,
+            or to `None` if no subnet contains it.
+        """
+        addresses = {}
+        for ip in ips:
+            address = IPAddress(ip)
+            if address.is_ipv4_mapped():
+                address = address.ipv4()
+            addresses[ip] = address
+        best = dict.fromkeys(addresses)
+        if len(addresses) == 0:
+            return best
+        subnets = list(
+            self.raw(
+                self.find_best_subnets_for_ips_query,
+                params=[
+                    sorted({str(address) for address in addresses.values()})
+                ],
+            )
+        )
+        for ip, address in addresses.items():
+            # Same ordering as `find_best_subnet_for_ip_query`: prefer subnets
+            # on managed VLANs, then the most specific one. Like `<<`, this
+            # does not match an address to a single-address subnet.
+            candidates = [
+                subnet
+                for subnet in subnets
+                if address in subnet.get_ipnetwork()
+                and subnet.get_ipnetwork().size > 1
+            ]
+            if len(candidates) > 0:
+                best[ip] = max(
+                    candidates,
+                    key=lambda subnet: (subnet.dhcp_on, subnet.prefixlen),
+                )
+        return best
+
     def validate_filter_specifiers(self, specifiers):
         """Validate the given filter string."""
         try:
@@ -786,9 +878,8 @@ class Subnet(CleanSave, TimestampedModel):
         """
         if exclude_addresses is None:
             exclude_addresses = []
-        free_ranges = self.get_ipranges_not_in_use(
-            exclude_addresses=exclude_addresses,
-            with_neighbours=avoid_observed_neighbours,
+        free_ranges = self._get_free_ranges_for_allocation(
+            exclude_addresses, with_neighbours=avoid_observed_neighbours
         )
         if len(free_ranges) == 0 and avoid_observed_neighbours is True:
             # Try again recursively, but this time consider neighbours to be
@@ -821,6 +912,7 @@ class Subnet(CleanSave, TimestampedModel):
                         discovery.last_seen,
                     )
                 )
+                self._take_free_address(discovery.ip)
                 return str(discovery.ip)
         # The purpose of this is to that we ensure we always get an IP address
         # from the *smallest* free contiguous range. This way, larger ranges
@@ -828,8 +920,45 @@ class Subnet(CleanSave, TimestampedModel):
         # requiring them. If two ranges have the same number of IPs, choose the
         # lowest one.
         free_range = min(free_ranges, key=attrgetter("num_addresses", "first"))
+        self._take_free_address(free_range.first)
         return str(IPAddress(free_range.first))
 
+    def _get_free_ranges_for_allocation(
+        self, exclude_addresses, with_neighbours
+    ) -> MAASIPSet:
+        """Return the free ranges to allocate the next IP address from.
+
+        Within a `free_range_cursor` block the ranges are worked out once,
+        and the exclusions of later calls taken off them.
+        """
+        if not free_range_cursors.active:
+            return self.get_ipranges_not_in_use(
+                exclude_addresses=exclude_addresses,
+                with_neighbours=with_neighbours,
+            )
+        key = self.id, with_neighbours
+        free_ranges = free_range_cursors.free_ranges.get(key)
+        if free_ranges is None:
+            free_ranges = self.get_ipranges_not_in_use(
+                exclude_addresses=exclude_addresses,
+                with_neighbours=with_neighbours,
+            )
+            free_range_cursors.free_ranges[key] = free_ranges
+        else:
+            for address in exclude_addresses:
+                free_ranges.discard_ip(address)
+        return free_ranges
+
+    def _take_free_address(self, address):
+        """Take `address` off this subnet's cached free ranges, if any."""
+        if free_range_cursors.active:
+            for with_neighbours in (True, False):
+                free_ranges = free_range_cursors.free_ranges.get(
+                    (self.id, with_neighbours)
+                )
+                if free_ranges is not None:
+                    free_ranges.discard_ip(address)
+
     def render_json_for_related_ips(
         self, with_username=True, with_summary=True
     ):
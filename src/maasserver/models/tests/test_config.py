@@ -14,9 +14,11 @@ from testtools.matchers import Is
 from maasserver.enum import ENDPOINT_CHOICES
 from maasserver.models import Config, Event, signals
 import maasserver.models.config
-from maasserver.models.config import get_default_config
+from maasserver.models.config import ConfigCache, get_default_config
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import post_commit_hooks
+from maastesting.djangotestcase import count_queries
 from provisioningserver.events import AUDIT
 
 
@@ -229,6 +231,141 @@ class TestConfig(MAASServerTestCase):
         self.assertTrue(Config.objects.is_external_auth_enabled())
 
 
+class TestConfigCache(MAASServerTestCase):
+    def make_cache(self, enabled=True, loaded=True):
+        cache = ConfigCache()
+        self.patch(Config.objects, "cache", cache)
+        if enabled:
+            cache.enable(self)
+            if loaded:
+                cache.refresh()
+        return cache
+
+    def test_get_config_reads_cache(self):
+        name = factory.make_name("name")
+        value = [factory.make_name("value")]
+        Config.objects.set_config(name, value)
+        self.make_cache()
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((0, value), (count, observed))
+
+    def test_get_config_returns_copy_of_cached_value(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, [])
+        self.make_cache()
+        Config.objects.get_config(name).append(factory.make_name("value"))
+        self.assertEqual([], Config.objects.get_config(name))
+
+    def test_get_config_returns_default_for_cached_absence(self):
+        name = factory.make_name("name")
+        default = factory.make_name("default")
+        self.make_cache()
+        count, observed = count_queries(
+            Config.objects.get_config, name, default
+        )
+        self.assertEqual((0, default), (count, observed))
+
+    def test_get_configs_reads_cache(self):
+        names = [factory.make_name("name") for _ in range(3)]
+        for name in names[:2]:
+            Config.objects.set_config(name, name)
+        self.make_cache()
+        count, observed = count_queries(
+            Config.objects.get_configs, names, ["a", "b", "c"]
+        )
+        self.assertEqual(0, count)
+        self.assertEqual(
+            {names[0]: names[0], names[1]: names[1], names[2]: "c"}, observed
+        )
+
+    def test_get_config_reads_database_when_disabled(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, name)
+        cache = self.make_cache()
+        cache.disable(self)
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((1, name), (count, observed))
+        self.assertFalse(cache.loaded)
+
+    def test_get_config_reads_database_until_loaded(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, name)
+        self.make_cache(loaded=False)
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((1, name), (count, observed))
+
+    def test_get_config_reads_database_for_invalidated_items(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, "old")
+        cache = self.make_cache()
+        Config.objects.filter(name=name).update(value="new")
+        cache.invalidate(name)
+        self.assertTrue(cache.needs_refresh())
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((1, "new"), (count, observed))
+        cache.refresh()
+        self.assertFalse(cache.needs_refresh())
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((0, "new"), (count, observed))
+
+    def test_get_config_reads_own_changes_until_reported(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, "old")
+        cache = self.make_cache()
+        Config.objects.set_config(name, "new")
+        post_commit_hooks.fire()
+        cache.refresh()
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((1, "new"), (count, observed))
+        # Once the change is reported, the item is cached again.
+        cache.invalidate(name)
+        cache.refresh()
+        count, observed = count_queries(Config.objects.get_config, name)
+        self.assertEqual((0, "new"), (count, observed))
+
+    def test_refresh_forgets_deleted_items(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, name)
+        cache = self.make_cache()
+        Config.objects.filter(name=name).delete()
+        post_commit_hooks.fire()
+        cache.invalidate(name)
+        cache.refresh()
+        self.assertEqual("default", Config.objects.get_config(name, "default"))
+
+    def test_get_config_reads_cache_again_after_rollback(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, "old")
+        cache = self.make_cache()
+        Config.objects.set_config(name, "new")
+        post_commit_hooks.reset()
+        self.assertEqual({name: "old"}, cache.get([name]))
+        self.assertFalse(cache.needs_refresh())
+
+    def test_rollback_keeps_items_invalidated_before_write(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, "old")
+        cache = self.make_cache()
+        cache.invalidate(name)
+        Config.objects.set_config(name, "new")
+        post_commit_hooks.reset()
+        self.assertEqual({}, cache.get([name]))
+        self.assertTrue(cache.needs_refresh())
+
+    def test_refresh_discards_load_when_cleared_meanwhile(self):
+        cache = self.make_cache(loaded=False)
+        values_list = Config.objects.values_list
+
+        def clear_and_load(*args):
+            cache.clear()
+            return values_list(*args)
+
+        self.patch(Config.objects, "values_list", clear_and_load)
+        cache.refresh()
+        self.assertFalse(cache.loaded)
+        self.assertTrue(cache.needs_refresh())
+
+
 class TestSettingConfig(MAASServerTestCase):
     """Testing of the :class:`Config` model and setting each option."""
 
@@ -155,6 +155,15 @@ class TestLargeFile(MAASServerTestCase):
             MockCallsMatch(call(ANY), call(ANY)),
         )
 
+    def test_deletes_stored_copy(self):
+        self.patch(signals.largefiles, "delete_large_object_content_later")
+        store = self.patch(signals.largefiles, "largefile_store")
+        largefile = factory.make_LargeFile()
+        self.addCleanup(largefile.content.unlink)
+        with post_commit_hooks:
+            largefile.delete()
+        self.assertThat(store.delete, MockCalledOnceWith(largefile.sha256))
+
 
 class TestDeleteLargeObjectContentLater(MAASTransactionServerTestCase):
 
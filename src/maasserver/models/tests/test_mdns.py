@@ -4,10 +4,14 @@
 """Tests for the mDNS model."""
 
 
+from fixtures import FakeLogger
 from testtools.matchers import Equals
 
+from maasserver.models import MDNS
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 
 
 class TestMDNSModel(MAASServerTestCase):
@@ -15,3 +19,102 @@ class TestMDNSModel(MAASServerTestCase):
         mdns = factory.make_MDNS(hostname="Living room")
         # Expect no exception.
         self.assertThat(mdns.hostname, Equals("Living room"))
+
+
+class TestMDNSManagerUpdateEntries(MAASServerTestCase):
+    def make_interface(self):
+        rack = factory.make_RackController()
+        return factory.make_Interface(node=rack)
+
+    def test_does_nothing_without_observations(self):
+        self.assertEqual((0, 0, 0), MDNS.objects.update_entries([]))
+
+    def test_creates_new_entries(self):
+        interface = self.make_interface()
+        hostname = factory.make_hostname()
+        ip = factory.make_ipv4_address()
+        with FakeLogger("maas.mDNS") as logger:
+            changes = MDNS.objects.update_entries(
+                [(interface, hostname, ip), (interface, hostname, ip)]
+            )
+        self.assertEqual((1, 0, 0), changes)
+        entry = MDNS.objects.get(interface=interface)
+        self.assertEqual(
+            (hostname, ip, 2), (entry.hostname, entry.ip, entry.count)
+        )
+        self.assertDocTestMatches(
+            "...: New mDNS entry resolved...", logger.output
+        )
+
+    def test_updates_existing_entries(self):
+        interface = self.make_interface()
+        entry = factory.make_MDNS(
+            interface=interface, ip=factory.make_ipv4_address()
+        )
+        changes = MDNS.objects.update_entries(
+            [(interface, entry.hostname, entry.ip)]
+        )
+        self.assertEqual((0, 1, 0), changes)
+        self.assertEqual(2, reload_object(entry).count)
+
+    def test_replaces_moved_hostname(self):
+        interface = self.make_interface()
+        entry = factory.make_MDNS(
+            interface=interface, ip=factory.make_ipv4_address()
+        )
+        ip = factory.make_ipv4_address()
+        with FakeLogger("maas.mDNS") as logger:
+            changes = MDNS.objects.update_entries(
+                [(interface, entry.hostname, ip)]
+            )
+        self.assertEqual((1, 0, 1), changes)
+        self.assertEqual(ip, MDNS.objects.get(interface=interface).ip)
+        self.assertDocTestMatches(
+            "...: Hostname...moved from...to...", logger.output
+        )
+        self.assertNotIn("New mDNS entry", logger.output)
+
+    def test_does_not_move_hostname_between_address_families(self):
+        interface = self.make_interface()
+        entry = factory.make_MDNS(
+            interface=interface, ip=factory.make_ipv4_address()
+        )
+        MDNS.objects.update_entries(
+            [(interface, entry.hostname, factory.make_ipv6_address())]
+        )
+        self.assertEqual(2, MDNS.objects.filter(interface=interface).count())
+
+    def test_replaces_updated_hostname(self):
+        interface = self.make_interface()
+        entry = factory.make_MDNS(
+            interface=interface, ip=factory.make_ipv4_address()
+        )
+        hostname = factory.make_hostname()
+        with FakeLogger("maas.mDNS") as logger:
+            changes = MDNS.objects.update_entries(
+                [(interface, hostname, entry.ip)]
+            )
+        self.assertEqual((1, 0, 1), changes)
+        self.assertEqual(
+            hostname, MDNS.objects.get(interface=interface).hostname
+        )
+        self.assertDocTestMatches(
+            "...: Hostname for...updated from...to...", logger.output
+        )
+
+    def test_uses_a_constant_number_of_queries(self):
+        interface = self.make_interface()
+        existing = [
+            factory.make_MDNS(
+                interface=interface, ip=factory.make_ipv4_address()
+            )
+            for _ in range(3)
+        ]
+        observations = [
+            (interface, entry.hostname, entry.ip) for entry in existing
+        ] + [
+            (interface, factory.make_hostname(), factory.make_ipv4_address())
+            for _ in range(10)
+        ]
+        count, _ = count_queries(MDNS.objects.update_entries, observations)
+        self.assertEqual(3, count)
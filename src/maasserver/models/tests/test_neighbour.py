@@ -4,8 +4,13 @@
 """Tests for the Neighbour model."""
 
 
+from fixtures import FakeLogger
+
+from maasserver.models import Neighbour
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import IsNonEmptyString
 
 
@@ -13,3 +18,142 @@ class TestNeighbourModel(MAASServerTestCase):
     def test_mac_organization(self):
         neighbour = factory.make_Neighbour(mac_address="48:51:b7:00:00:00")
         self.assertThat(neighbour.mac_organization, IsNonEmptyString)
+
+
+class TestNeighbourManagerUpdateNeighbours(MAASServerTestCase):
+    def make_interface(self):
+        rack = factory.make_RackController()
+        return factory.make_Interface(node=rack)
+
+    def test_does_nothing_without_observations(self):
+        self.assertEqual((0, 0, 0), Neighbour.objects.update_neighbours([]))
+
+    def test_creates_new_neighbours(self):
+        interface = self.make_interface()
+        ip = factory.make_ipv4_address()
+        mac = factory.make_mac_address()
+        changes = Neighbour.objects.update_neighbours(
+            [(interface, ip, mac, 100, None), (interface, ip, mac, 200, None)]
+        )
+        self.assertEqual((1, 0, 0), changes)
+        neighbour = Neighbour.objects.get(interface=interface)
+        self.assertEqual(
+            (ip, mac, 200, None, 2),
+            (
+                neighbour.ip,
+                str(neighbour.mac_address),
+                neighbour.time,
+                neighbour.vid,
+                neighbour.count,
+            ),
+        )
+
+    def test_updates_existing_neighbours(self):
+        interface = self.make_interface()
+        neighbour = factory.make_Neighbour(interface=interface, count=3)
+        changes = Neighbour.objects.update_neighbours(
+            [
+                (
+                    interface,
+                    neighbour.ip,
+                    str(neighbour.mac_address).upper(),
+                    neighbour.time + 10,
+                    neighbour.vid,
+                )
+            ]
+        )
+        self.assertEqual((0, 1, 0), changes)
+        updated = reload_object(neighbour)
+        self.assertEqual(neighbour.time + 10, updated.time)
+        self.assertEqual(4, updated.count)
+        self.assertGreater(updated.updated, neighbour.updated)
+
+    def test_replaces_obsolete_neighbours(self):
+        interface = self.make_interface()
+        neighbour = factory.make_Neighbour(interface=interface)
+        mac = factory.make_mac_address()
+        with FakeLogger("maas.neighbour") as logger:
+            changes = Neighbour.objects.update_neighbours(
+                [(interface, neighbour.ip, mac, 100, neighbour.vid)]
+            )
+        self.assertEqual((1, 0, 1), changes)
+        replacement = Neighbour.objects.get(interface=interface)
+        self.assertEqual(mac, str(replacement.mac_address))
+        self.assertEqual(1, replacement.count)
+        self.assertDocTestMatches(
+            "...: IP address...moved from...to...", logger.output
+        )
+        self.assertNotIn("New MAC, IP binding", logger.output)
+
+    def test_keeps_last_binding_observed_in_report(self):
+        interface = self.make_interface()
+        ip = factory.make_ipv4_address()
+        mac1 = factory.make_mac_address()
+        mac2 = factory.make_mac_address()
+        changes = Neighbour.objects.update_neighbours(
+            [(interface, ip, mac1, 100, 5), (interface, ip, mac2, 200, 5)]
+        )
+        self.assertEqual((1, 0, 0), changes)
+        neighbour = Neighbour.objects.get(interface=interface)
+        self.assertEqual(mac2, str(neighbour.mac_address))
+
+    def test_keeps_vids_apart(self):
+        interface = self.make_interface()
+        ip = factory.make_ipv4_address()
+        mac = factory.make_mac_address()
+        Neighbour.objects.update_neighbours(
+            [(interface, ip, mac, 100, None), (interface, ip, mac, 100, 7)]
+        )
+        self.assertCountEqual(
+            [None, 7],
+            Neighbour.objects.filter(interface=interface).values_list(
+                "vid", flat=True
+            ),
+        )
+
+    def test_logs_new_bindings(self):
+        interface = self.make_interface()
+        with FakeLogger("maas.neighbour") as logger:
+            Neighbour.objects.update_neighbours(
+                [
+                    (
+                        interface,
+                        factory.make_ipv4_address(),
+                        factory.make_mac_address(),
+                        100,
+                        None,
+                    )
+                ]
+            )
+        self.assertDocTestMatches(
+            "...: New MAC, IP binding observed...", logger.output
+        )
+
+    def test_uses_a_constant_number_of_queries(self):
+        interface = self.make_interface()
+        existing = [
+            factory.make_Neighbour(interface=interface) for _ in range(3)
+        ]
+        observations = [
+            (
+                interface,
+                neighbour.ip,
+                str(neighbour.mac_address),
+                neighbour.time,
+                neighbour.vid,
+            )
+            for neighbour in existing
+        ] + [
+            (
+                interface,
+                factory.make_ipv4_address(),
+                factory.make_mac_address(),
+                100,
+                None,
+            )
+            for _ in range(10)
+        ]
+        count, _ = count_queries(
+            Neighbour.objects.update_neighbours, observations
+        )
+        self.assertEqual(3, count)
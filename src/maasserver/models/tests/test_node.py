@@ -9,6 +9,7 @@ import logging
 import random
 import re
 from textwrap import dedent
+import time
 from unittest.mock import ANY, call, MagicMock, Mock, sentinel
 
 import crochet
@@ -86,6 +87,7 @@ from maasserver.models import (
     Interface,
     LicenseKey,
     Machine,
+    MDNS,
     Neighbour,
     Node,
 )
@@ -10897,24 +10899,21 @@ class TestControllerUpdateDiscoveryState(MAASServerTestCase):
 
 
 class TestReportNeighbours(MAASServerTestCase):
-    def test_no_update_neighbours_calls_if_discovery_disabled(self):
+    def test_no_neighbours_recorded_if_discovery_disabled(self):
         rack = factory.make_RackController()
         factory.make_Interface(name="eth0", node=rack)
-        update_neighbour = self.patch(
-            interface_module.Interface, "update_neighbour"
-        )
         neighbours = [
             {
                 "interface": "eth0",
                 "mac": factory.make_mac_address(),
                 "ip": factory.make_ipv4_address(),
-                "time": datetime.now(),
+                "time": int(time.time()),
             },
         ]
         rack.report_neighbours(neighbours)
-        update_neighbour.assert_not_called()
+        self.assertFalse(Neighbour.objects.exists())
 
-    def test_calls_update_neighbour_for_each_neighbour(self):
+    def test_records_each_neighbour(self):
         rack = factory.make_RackController()
         if1 = factory.make_Interface(name="eth0", node=rack)
         if1.neighbour_discovery_state = True
@@ -10922,47 +10921,77 @@ class TestReportNeighbours(MAASServerTestCase):
         if2 = factory.make_Interface(name="eth1", node=rack)
         if2.neighbour_discovery_state = True
         if2.save()
-        update_neighbour = self.patch(
-            interface_module.Interface, "update_neighbour"
-        )
         neighbours = [
             {
                 "interface": "eth0",
                 "mac": factory.make_mac_address(),
                 "ip": factory.make_ipv4_address(),
-                "time": datetime.now(),
+                "time": int(time.time()),
             },
             {
                 "interface": "eth1",
                 "mac": factory.make_mac_address(),
                 "ip": factory.make_ipv4_address(),
-                "time": datetime.now(),
+                "time": int(time.time()),
             },
         ]
         rack.report_neighbours(neighbours)
-        update_neighbour.assert_has_calls(
-            [call(n["ip"], n["mac"], n["time"], vid=None) for n in neighbours]
+        self.assertCountEqual(
+            [
+                ("eth0", neighbours[0]["ip"], neighbours[0]["mac"], None),
+                ("eth1", neighbours[1]["ip"], neighbours[1]["mac"], None),
+            ],
+            [
+                (n.interface.name, n.ip, n.mac_address, n.vid)
+                for n in Neighbour.objects.all()
+            ],
+        )
+
+    def test_records_metrics(self):
+        rack = factory.make_RackController()
+        interface = factory.make_Interface(name="eth0", node=rack)
+        interface.neighbour_discovery_state = True
+        interface.save()
+        update = self.patch(node_module.PROMETHEUS_METRICS, "update")
+        neighbours = [
+            {
+                "interface": "eth0",
+                "mac": factory.make_mac_address(),
+                "ip": factory.make_ipv4_address(),
+                "time": int(time.time()),
+            },
+        ]
+        rack.report_neighbours(neighbours)
+        update.assert_any_call(
+            "maas_discovery_report_rows",
+            "inc",
+            value=1,
+            labels={"kind": "neighbour", "action": "created"},
+        )
+        update.assert_any_call(
+            "maas_discovery_report_latency",
+            "observe",
+            value=ANY,
+            labels={"kind": "neighbour"},
         )
 
     def test_calls_report_vid_for_each_vid(self):
         rack = factory.make_RackController()
         factory.make_Interface(name="eth0", node=rack)
         factory.make_Interface(name="eth1", node=rack)
-        # Just make this a no-op for simplicity.
-        self.patch(interface_module.Interface, "update_neighbour")
         report_vid = self.patch(interface_module.Interface, "report_vid")
         neighbours = [
             {
                 "interface": "eth0",
                 "ip": factory.make_ipv4_address(),
-                "time": datetime.now(),
+                "time": int(time.time()),
                 "mac": factory.make_mac_address(),
                 "vid": 3,
             },
             {
                 "interface": "eth1",
                 "ip": factory.make_ipv4_address(),
-                "time": datetime.now(),
+                "time": int(time.time()),
                 "mac": factory.make_mac_address(),
                 "vid": 7,
             },
@@ -10972,6 +11001,20 @@ class TestReportNeighbours(MAASServerTestCase):
             [call(3, ip=neighbours[0]["ip"]), call(7, ip=neighbours[1]["ip"])]
         )
 
+    def test_calls_report_vid_once_per_vid_and_ip(self):
+        rack = factory.make_RackController()
+        factory.make_Interface(name="eth0", node=rack)
+        report_vid = self.patch(interface_module.Interface, "report_vid")
+        neighbour = {
+            "interface": "eth0",
+            "ip": factory.make_ipv4_address(),
+            "time": int(time.time()),
+            "mac": factory.make_mac_address(),
+            "vid": 3,
+        }
+        rack.report_neighbours([neighbour, neighbour])
+        report_vid.assert_called_once_with(3, ip=neighbour["ip"])
+
     def test_does_not_updates_fabric_of_existing_vlan(self):
         rack = factory.make_RackController()
         observing_fabric = factory.make_Fabric()
@@ -11003,23 +11046,45 @@ class TestReportNeighbours(MAASServerTestCase):
 
 
 class TestReportMDNSEntries(MAASServerTestCase):
-    def test_calls_update_mdns_entry_for_each_entry(self):
+    def test_records_each_entry(self):
         rack = factory.make_RackController()
-        factory.make_Interface(name="eth0", node=rack)
-        factory.make_Interface(name="eth1", node=rack)
-        update_mdns_entry = self.patch(
-            interface_module.Interface, "update_mdns_entry"
-        )
+        for name in ("eth0", "eth1"):
+            interface = factory.make_Interface(name=name, node=rack)
+            interface.mdns_discovery_state = True
+            interface.save()
         entries = [
-            {"interface": "eth0", "hostname": factory.make_name("eth0")},
-            {"interface": "eth1", "hostname": factory.make_name("eth1")},
+            {
+                "interface": name,
+                "hostname": factory.make_name(name),
+                "address": factory.make_ipv4_address(),
+            }
+            for name in ("eth0", "eth1")
         ]
         rack.report_mdns_entries(entries)
-        self.assertThat(
-            update_mdns_entry,
-            MockCallsMatch(*[call(entry) for entry in entries]),
+        self.assertCountEqual(
+            [
+                (entry["interface"], entry["hostname"], entry["address"])
+                for entry in entries
+            ],
+            [
+                (mdns.interface.name, mdns.hostname, mdns.ip)
+                for mdns in MDNS.objects.all()
+            ],
         )
 
+    def test_no_entries_recorded_if_discovery_disabled(self):
+        rack = factory.make_RackController()
+        factory.make_Interface(name="eth0", node=rack)
+        entries = [
+            {
+                "interface": "eth0",
+                "hostname": factory.make_name("eth0"),
+                "address": factory.make_ipv4_address(),
+            }
+        ]
+        rack.report_mdns_entries(entries)
+        self.assertFalse(MDNS.objects.exists())
+
 
 class TestRackControllerRefresh(MAASTransactionServerTestCase):
     def setUp(self):
@@ -6,12 +6,14 @@
 
 from maasserver.models.nodeprobeddetails import (
     get_probed_details,
+    get_probed_details_versions,
     get_single_probed_details,
     script_output_nsmap,
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from metadataserver.enum import RESULT_TYPE, SCRIPT_STATUS
+from metadataserver.fields import Bin
 from provisioningserver.refresh.node_info_scripts import (
     LLDP_OUTPUT_NAME,
     LSHW_OUTPUT_NAME,
@@ -101,3 +103,30 @@ class TestNodeDetail(MAASServerTestCase):
             # returned by get_probed_details.
             self.make_script_set_and_results(node, "new")
         self.assertDictEqual(expected, get_probed_details(nodes))
+
+    def test_get_probed_details_versions(self):
+        nodes = [factory.make_Node() for _ in range(2)]
+        expected = {nodes[1].system_id: ()}
+        self.make_script_set_and_results(nodes[0], "old")
+        script_set, script_results = self.make_script_set_and_results(nodes[0])
+        nodes[0].current_commissioning_script_set = script_set
+        nodes[0].save()
+        expected[nodes[0].system_id] = tuple(
+            (result.id, result.updated)
+            for result in sorted(script_results, key=lambda r: r.id)
+        )
+        self.assertEqual(expected, get_probed_details_versions(nodes))
+
+    def test_get_probed_details_versions_change_with_output(self):
+        node = factory.make_Node()
+        script_set, script_results = self.make_script_set_and_results(node)
+        node.current_commissioning_script_set = script_set
+        node.save()
+        [version] = get_probed_details_versions([node]).values()
+        script_results[0].stdout = Bin(b"<lshw-changed/>")
+        script_results[0].save()
+        [new_version] = get_probed_details_versions([node]).values()
+        self.assertNotEqual(version, new_version)
+
+    def test_get_probed_details_versions_for_no_nodes(self):
+        self.assertEqual({}, get_probed_details_versions([]))
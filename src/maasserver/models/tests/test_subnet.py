@@ -2,6 +2,7 @@
 # GNU Affero General Public License version 3 (see the file LICENSE).
 
 from datetime import datetime, timedelta
+from functools import partial
 import random
 
 from django.core.exceptions import PermissionDenied, ValidationError
@@ -28,7 +29,13 @@ from maasserver.enum import (
 )
 from maasserver.exceptions import StaticIPAddressExhaustion
 from maasserver.models import Config, Notification, Space
-from maasserver.models.subnet import create_cidr, get_allocated_ips, Subnet
+from maasserver.models.subnet import (
+    create_cidr,
+    free_range_cursor,
+    free_range_cursors,
+    get_allocated_ips,
+    Subnet,
+)
 from maasserver.models.timestampedmodel import now
 from maasserver.permissions import NodePermission
 from maasserver.testing.factory import factory, RANDOM, RANDOM_OR_NONE
@@ -820,6 +827,58 @@ class TestGetBestSubnetForIP(MAASServerTestCase):
         self.expectThat(subnet, Is(None))
 
 
+class TestGetBestSubnetsForIPs(MAASServerTestCase):
+    def test_returns_most_specific_subnet_for_each_ip(self):
+        factory.make_Subnet(cidr="10.0.0.0/8")
+        subnet_24 = factory.make_Subnet(cidr="10.1.1.0/24")
+        subnet_16 = factory.make_Subnet(cidr="10.1.0.0/16")
+        subnet_64 = factory.make_Subnet(cidr="2001:db8:1:2::/64")
+        subnets = Subnet.objects.get_best_subnets_for_ips(
+            ["10.1.1.1", "10.1.2.1", "::ffff:10.1.1.2", "2001:db8:1:2::1"]
+        )
+        self.assertEqual(
+            {
+                "10.1.1.1": subnet_24,
+                "10.1.2.1": subnet_16,
+                "::ffff:10.1.1.2": subnet_24,
+                "2001:db8:1:2::1": subnet_64,
+            },
+            subnets,
+        )
+
+    def test_prefers_subnet_on_managed_vlan(self):
+        vlan = factory.make_VLAN(dhcp_on=True)
+        expected_subnet = factory.make_Subnet(cidr="10.0.0.0/8", vlan=vlan)
+        factory.make_Subnet(cidr="10.1.1.0/24")
+        subnets = Subnet.objects.get_best_subnets_for_ips(["10.1.1.1"])
+        self.assertEqual({"10.1.1.1": expected_subnet}, subnets)
+
+    def test_agrees_with_get_best_subnet_for_ip(self):
+        for cidr in [
+            "10.0.0.0/8",
+            "10.1.0.0/16",
+            "10.1.1.0/24",
+            "10.1.1.1/32",
+        ]:
+            factory.make_Subnet(cidr=cidr)
+        ips = ["10.1.1.1", "10.1.1.0", "10.1.0.1", "10.2.0.1", "11.0.0.1"]
+        self.assertEqual(
+            {ip: Subnet.objects.get_best_subnet_for_ip(ip) for ip in ips},
+            Subnet.objects.get_best_subnets_for_ips(ips),
+        )
+
+    def test_returns_none_if_no_subnet_found(self):
+        factory.make_Subnet(cidr="10.0.0.0/8")
+        subnets = Subnet.objects.get_best_subnets_for_ips(["::"])
+        self.assertEqual({"::": None}, subnets)
+
+    def test_returns_empty_dict_without_querying_for_no_ips(self):
+        count, subnets = count_queries(
+            Subnet.objects.get_best_subnets_for_ips, []
+        )
+        self.assertEqual((0, {}), (count, subnets))
+
+
 class TestSubnetLabel(MAASServerTestCase):
     def test_returns_cidr_for_null_name(self):
         network = factory.make_ip4_or_6_network()
@@ -1434,6 +1493,49 @@ class TestSubnetGetNextIPForAllocation(MAASServerTestCase):
         ip = subnet.get_next_ip_for_allocation()
         self.assertThat(ip, Equals("10.0.0.5"))
 
+    def patch_get_ipranges_not_in_use(self, subnet):
+        get_ipranges_not_in_use = self.patch(subnet, "get_ipranges_not_in_use")
+        get_ipranges_not_in_use.side_effect = partial(
+            Subnet.get_ipranges_not_in_use, subnet
+        )
+        return get_ipranges_not_in_use
+
+    def test_cursor_works_out_free_ranges_once(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None
+        )
+        get_ipranges_not_in_use = self.patch_get_ipranges_not_in_use(subnet)
+        with free_range_cursor():
+            ips = [subnet.get_next_ip_for_allocation() for _ in range(3)]
+        self.assertEqual(["10.0.0.1", "10.0.0.2", "10.0.0.3"], ips)
+        self.assertEqual(1, get_ipranges_not_in_use.call_count)
+
+    def test_cursor_avoids_later_excluded_addresses(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None
+        )
+        with free_range_cursor():
+            first = subnet.get_next_ip_for_allocation()
+            second = subnet.get_next_ip_for_allocation(
+                exclude_addresses=["10.0.0.2", "10.0.0.3"]
+            )
+        self.assertEqual("10.0.0.1", first)
+        self.assertEqual("10.0.0.4", second)
+
+    def test_cursor_is_discarded_after_block(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None
+        )
+        get_ipranges_not_in_use = self.patch_get_ipranges_not_in_use(subnet)
+        with free_range_cursor():
+            subnet.get_next_ip_for_allocation()
+        self.assertEqual({}, free_range_cursors.free_ranges)
+        self.assertEqual("10.0.0.1", subnet.get_next_ip_for_allocation())
+        self.assertEqual(2, get_ipranges_not_in_use.call_count)
+
 
 class TestUnmanagedSubnets(MAASServerTestCase):
     def test_allocation_uses_reserved_range(self):
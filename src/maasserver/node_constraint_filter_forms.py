@@ -146,6 +146,8 @@ IGNORED_FIELDS = {
     "verbose",
     "op",
     "agent_name",
+    "count",
+    "spread",
 }
 
 
@@ -1347,6 +1349,84 @@ class AcquireNodeForm(FilterNodeForm):
         )
         return filtered_nodes.order_by("cost")
 
+    def lock_first_node(self, filtered_nodes):
+        """Lock and return the cheapest of `filtered_nodes`, or `None`.
+
+        Rows locked by a concurrent transaction are skipped, so concurrent
+        allocations with compatible constraints pick different nodes without
+        having to serialize on a global lock. The lock is held until the
+        current transaction ends.
+
+        :param filtered_nodes: The nodes returned by `filter_nodes`.
+        """
+        # PostgreSQL refuses FOR UPDATE with DISTINCT, which the filters
+        # need, so lock the matching rows by id from an outer query.
+        nodes = filtered_nodes.model.objects.filter(
+            id__in=filtered_nodes.order_by().values("id")
+        )
+        nodes = self.reorder_nodes_by_cost(nodes).select_for_update(
+            skip_locked=True, of=("self",)
+        )
+        return nodes.first()
+
+    def lock_nodes(self, filtered_nodes, count, spread_by=None, lock=True):
+        """Lock and return `count` of `filtered_nodes`, cheapest first.
+
+        As with `lock_first_node`, rows locked by a concurrent transaction are
+        skipped. Only the rows of the returned nodes are locked, until the
+        current transaction ends. If fewer than `count` nodes are available,
+        the ones found are returned so that the caller can report them; an
+        all-or-nothing allocation then fails, and rolling back releases the
+        locks.
+
+        :param filtered_nodes: The nodes returned by `filter_nodes`.
+        :param count: The number of nodes to lock.
+        :param spread_by: Optionally, the name of a foreign key of the node
+            (e.g. "zone" or "pool") across whose values the nodes should be
+            spread, picking the cheapest of each in turn.
+        :param lock: Whether to lock the rows. Dry runs pick the same nodes
+            without locking them.
+        :return: A list of nodes, shorter than `count` if not enough of them
+            are available.
+        """
+        model = filtered_nodes.model
+        nodes = model.objects.filter(
+            id__in=filtered_nodes.order_by().values("id")
+        )
+        nodes = self.reorder_nodes_by_cost(nodes)
+        if spread_by is None:
+            candidates = list(nodes.values_list("id", flat=True))
+        else:
+            groups = defaultdict(list)
+            for node_id, group in nodes.values_list("id", spread_by + "_id"):
+                groups[group].append(node_id)
+            # Groups keep the order of their cheapest node; take one node from
+            # each in turn.
+            candidates = [
+                node_id
+                for round_ids in itertools.zip_longest(*groups.values())
+                for node_id in round_ids
+                if node_id is not None
+            ]
+
+        order = {node_id: index for index, node_id in enumerate(candidates)}
+        if not lock:
+            nodes_by_id = model.objects.in_bulk(candidates[:count])
+            return sorted(
+                nodes_by_id.values(), key=lambda node: order[node.id]
+            )
+        locked_ids = set()
+        while candidates and len(locked_ids) < count:
+            wanted = count - len(locked_ids)
+            batch, candidates = candidates[:wanted], candidates[wanted:]
+            locked_ids.update(
+                model.objects.filter(id__in=batch)
+                .select_for_update(skip_locked=True, of=("self",))
+                .values_list("id", flat=True)
+            )
+        nodes_by_id = model.objects.in_bulk(locked_ids)
+        return sorted(nodes_by_id.values(), key=lambda node: order[node.id])
+
 
 class ReadNodesForm(FilterNodeForm):
 
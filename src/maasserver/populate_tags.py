@@ -4,13 +4,16 @@
 """Populate what nodes are associated with a tag."""
 
 __all__ = [
+    "ProbedDetailsCache",
     "populate_tag_for_multiple_nodes",
     "populate_tags",
     "populate_tags_for_single_node",
 ]
 
+from collections import OrderedDict
 from functools import partial
 from math import ceil
+import threading
 
 from django.db.transaction import TransactionManagementError
 from lxml import etree
@@ -21,7 +24,7 @@ from maasserver import logger
 from maasserver.models.node import Node, RackController
 from maasserver.models.nodeprobeddetails import (
     get_probed_details,
-    get_single_probed_details,
+    get_probed_details_versions,
     script_output_nsmap,
 )
 from maasserver.models.user import (
@@ -37,6 +40,7 @@ from provisioningserver.tags import (
     DEFAULT_BATCH_SIZE,
     gen_batches,
     merge_details,
+    tag_expressions,
 )
 from provisioningserver.utils import classify
 from provisioningserver.utils.twisted import asynchronous, FOREVER, synchronous
@@ -53,6 +57,84 @@ tag_nsmap = {
 }
 
 
+class ProbedDetailsCache:
+    """A bounded LRU cache of nodes' merged probed details documents.
+
+    Building a node's details document means fetching and parsing its
+    commissioning output, which is far more work than evaluating a tag
+    expression against it. Documents are keyed by node and by the version of
+    the commissioning output they were built from (see
+    `get_probed_details_versions`), so a document is rebuilt once the node
+    has been recommissioned.
+
+    Documents are stored when a single node is evaluated, as
+    `populate_tags_for_single_node` does when a node finishes commissioning,
+    so the cache helps with the most recently commissioned nodes: tags that
+    are defined or changed for them soon after reuse their documents. A sweep
+    of all nodes by `populate_tag_for_multiple_nodes` uses the documents that
+    are cached but doesn't store any more: with thousands of nodes, each batch
+    would only evict the one before it, and the documents that are reused
+    along with it.
+
+    The cache is bounded by the number of documents it holds. A parsed
+    document takes several times the memory of the output it was built from,
+    so that size isn't a useful bound.
+
+    :ivar hits: The number of documents that were found in the cache.
+    :ivar misses: The number of documents that had to be built.
+    """
+
+    def __init__(self, max_documents=100):
+        self.max_documents = max_documents
+        self.hits = 0
+        self.misses = 0
+        # Maps node IDs to (version, document) tuples.
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_documents(self, nodes, store=True):
+        """Return the merged details documents for `nodes`.
+
+        :param store: Whether to cache the documents that had to be built.
+        :return: A ``{node: document}`` map.
+        """
+        versions = get_probed_details_versions(nodes)
+        documents, missing = {}, []
+        with self._lock:
+            for node in nodes:
+                entry = self._documents.get(node.id)
+                if entry is not None and entry[0] == versions[node.system_id]:
+                    self._documents.move_to_end(node.id)
+                    documents[node] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(node)
+                    self.misses += 1
+        if len(missing) != 0:
+            probed_details = get_probed_details(missing)
+            for node in missing:
+                document = merge_details(probed_details[node.system_id])
+                documents[node] = document
+                if store:
+                    self._add(node.id, versions[node.system_id], document)
+        return documents
+
+    def _add(self, node_id, version, document):
+        with self._lock:
+            self._documents.pop(node_id, None)
+            self._documents[node_id] = version, document
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        """Forget all the documents."""
+        with self._lock:
+            self._documents.clear()
+
+
+probed_details_cache = ProbedDetailsCache()
+
+
 def chunk_list(items, num_chunks):
     """Split `items` into (at most) `num_chunks` lists.
 
@@ -194,6 +276,20 @@ def _do_populate_tags(clients):
     return [d]
 
 
+def _try_match_tag(definition, doc):
+    """See if the tag expression `definition` matches `doc`.
+
+    Invalid expressions are logged, and are returned as a non-match.
+    """
+    try:
+        xpath = tag_expressions.get(definition, tag_nsmap)
+    except etree.XPathSyntaxError as error:
+        logger.warning("Invalid expression '%s': %s", definition, str(error))
+        return False
+    else:
+        return try_match_xpath(xpath, doc, logger=logger)
+
+
 @synchronous
 def populate_tags_for_single_node(tags, node):
     """Reevaluate all tags for a single node.
@@ -204,11 +300,8 @@ def populate_tags_for_single_node(tags, node):
     nodes need reevaluating locally, i.e. when there are no rack controllers
     connected.
     """
-    probed_details = get_single_probed_details(node)
-    probed_details_doc = merge_details(probed_details)
-    # Same document, many queries: use XPathEvaluator.
-    evaluator = etree.XPathEvaluator(probed_details_doc, namespaces=tag_nsmap)
-    evaluator = partial(try_match_xpath, doc=evaluator, logger=logger)
+    probed_details_doc = probed_details_cache.get_documents([node])[node]
+    evaluator = partial(_try_match_tag, doc=probed_details_doc)
     tags_defined = ((tag, tag.definition) for tag in tags if tag.is_defined)
     tags_matching, tags_nonmatching = classify(evaluator, tags_defined)
     node.tags.remove(*tags_nonmatching)
@@ -225,14 +318,12 @@ def populate_tag_for_multiple_nodes(tag, nodes, batch_size=DEFAULT_BATCH_SIZE):
     locally, i.e. when there are no rack controllers connected.
     """
     # Same expression, multuple documents: compile expression with XPath.
-    xpath = etree.XPath(tag.definition, namespaces=tag_nsmap)
+    xpath = tag_expressions.get(tag.definition, tag_nsmap)
     # The XML details documents can be large so work in batches.
     for batch in gen_batches(nodes, batch_size):
-        probed_details = get_probed_details(batch)
-        probed_details_docs_by_node = {
-            node: merge_details(probed_details[node.system_id])
-            for node in batch
-        }
+        probed_details_docs_by_node = probed_details_cache.get_documents(
+            batch, store=False
+        )
         nodes_matching, nodes_nonmatching = classify(
             partial(try_match_xpath, xpath, logger=maaslog),
             probed_details_docs_by_node.items(),
@@ -4,6 +4,7 @@
 """Preseed generation."""
 
 from collections import namedtuple
+import copy
 import json
 import os.path
 from pipes import quote
@@ -52,7 +53,9 @@ from metadataserver.models import NodeKey
 from metadataserver.user_data.snippets import get_snippet_context
 from provisioningserver.drivers.osystem.ubuntu import UbuntuOS
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+from provisioningserver.utils.fs import get_file_stamp
 from provisioningserver.utils.url import compose_URL
 
 maaslog = get_maas_logger("preseed")
@@ -540,7 +543,9 @@ def get_curtin_config(request, node, base_osystem=None, base_series=None):
         if var not in context:
             deprecated_context_variables.remove(var)
     context.update(get_node_deprecated_preseed_context())
-    config = yaml.safe_load(template.substitute(**context))
+    config = yaml.safe_load(
+        render_template(template, context, "curtin_userdata")
+    )
     # Remove deprecated config from the curtin preseed.
     if "power_state" in config:
         del config["power_state"]
@@ -794,27 +799,6 @@ def compose_filename(elements):
     return "_".join(elements)
 
 
-def get_preseed_template(filenames):
-    """Get the path and content for the first template found.
-
-    :param filenames: An iterable of relative filenames.
-    """
-    assert not isinstance(filenames, (bytes, str))
-    assert all(isinstance(filename, str) for filename in filenames)
-    for location in settings.PRESEED_TEMPLATE_LOCATIONS:
-        for filename in filenames:
-            filepath = os.path.join(location, filename)
-            try:
-                with open(filepath, encoding="utf-8") as stream:
-                    content = stream.read()
-            except OSError:
-                pass  # Ignore.
-            else:
-                return filepath, content
-    else:
-        return None, None
-
-
 def get_escape_singleton():
     """Return a singleton containing methods to escape various formats used in
     the preseed templates.
@@ -837,6 +821,78 @@ class PreseedTemplate(tempita.Template):
     )
 
 
+class PreseedTemplateCache:
+    """Process-wide cache of compiled preseed templates.
+
+    Compiled templates are cached by path, and are reloaded when their file
+    changes. Which path a list of candidate filenames resolves to is cached
+    too, until anything is added to or removed from a template location.
+    Templates can therefore still be changed on the fly.
+    """
+
+    def __init__(self, max_paths=10000):
+        # Node-specific candidates include the hostname, so this is bounded.
+        self.max_paths = max_paths
+        # Maps (locations, filenames) to (location stamps, path or None).
+        self._paths = {}
+        # Maps a path to (file stamp, template).
+        self._templates = {}
+
+    def get(self, filenames):
+        """Return the template for the first of `filenames` found.
+
+        Templates are shared, so must not be changed.
+
+        :param filenames: An iterable of relative filenames.
+        :return: A `PreseedTemplate`, or `None` if none of `filenames` is
+            found in any of `settings.PRESEED_TEMPLATE_LOCATIONS`.
+        """
+        locations = tuple(settings.PRESEED_TEMPLATE_LOCATIONS)
+        filenames = tuple(filenames)
+        key = locations, filenames
+        # The locations are stamped before looking for templates, so
+        # anything added while looking is found next time.
+        location_stamps = [get_file_stamp(location) for location in locations]
+        cached = self._paths.get(key)
+        if cached is not None and cached[0] == location_stamps:
+            if cached[1] is None:
+                return None
+            template = self._load(cached[1])
+            if template is not None:
+                return template
+        if len(self._paths) >= self.max_paths:
+            self._paths.clear()
+        for location in locations:
+            for filename in filenames:
+                filepath = os.path.join(location, filename)
+                template = self._load(filepath)
+                if template is not None:
+                    self._paths[key] = location_stamps, filepath
+                    return template
+        self._paths[key] = location_stamps, None
+        return None
+
+    def _load(self, filepath):
+        stamp = get_file_stamp(filepath)
+        if stamp is None:
+            self._templates.pop(filepath, None)
+            return None
+        cached = self._templates.get(filepath)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            with open(filepath, encoding="utf-8") as stream:
+                content = stream.read()
+        except OSError:
+            return None  # Ignore.
+        template = PreseedTemplate(content, name=filepath)
+        self._templates[filepath] = stamp, template
+        return template
+
+
+preseed_template_cache = PreseedTemplateCache()
+
+
 class TemplateNotFoundError(Exception):
     """The template has not been found."""
 
@@ -860,21 +916,35 @@ def load_preseed_template(node, prefix, osystem="", release=""):
         It is defined to preserve the context (node, name, release, default)
         since this will be called (by Tempita) called out of scope.
         """
-        filenames = list(
-            get_preseed_filenames(node, name, osystem, release, default)
+        filenames = get_preseed_filenames(
+            node, name, osystem, release, default
         )
-        filepath, content = get_preseed_template(filenames)
-        if filepath is None:
+        template = preseed_template_cache.get(filenames)
+        if template is None:
             raise TemplateNotFoundError(name)
-        # This is where the closure happens: pass `get_template` when
-        # instanciating PreseedTemplate.
-        return PreseedTemplate(
-            content, name=filepath, get_template=get_template
-        )
+        # This is where the closure happens: the cached template is shared,
+        # so a copy of it, which shares the compiled template, gets
+        # `get_template`.
+        template = copy.copy(template)
+        template.get_template = get_template
+        return template
 
     return get_template(prefix, None, default=True)
 
 
+@PROMETHEUS_METRICS.record_call_latency(
+    "maas_preseed_render_latency",
+    get_labels=lambda template, context, prefix: {"template": prefix},
+)
+def render_template(template, context, prefix):
+    """Render a preseed `template` with `context`.
+
+    The time taken is recorded by `prefix`, the kind of preseed that
+    `template` was loaded for; its name can include the node's hostname.
+    """
+    return template.substitute(**context)
+
+
 def get_netloc_and_path(url):
     """Return a tuple of the netloc and the hierarchical path from a url.
 
@@ -998,7 +1068,7 @@ def render_enlistment_preseed(
     # Render the snippets in the main template.
     snippets = get_snippet_context()
     snippets.update(context)
-    return template.substitute(**snippets).encode("utf-8")
+    return render_template(template, snippets, prefix).encode("utf-8")
 
 
 def render_preseed(request, node, prefix, osystem="", release=""):
@@ -1017,7 +1087,7 @@ def render_preseed(request, node, prefix, osystem="", release=""):
         request, osystem, release, rack_controller=rack_controller
     )
     context.update(get_node_preseed_context(request, node, osystem, release))
-    return template.substitute(**context).encode("utf-8")
+    return render_template(template, context, prefix).encode("utf-8")
 
 
 def compose_enlistment_preseed_url(
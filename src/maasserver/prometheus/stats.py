@@ -16,7 +16,7 @@ from maasserver.stats import (
     get_custom_images_uploaded_stats,
     get_maas_stats,
     get_machines_by_architecture,
-    get_subnets_utilisation_stats,
+    get_subnets_utilisation_snapshot,
     get_vm_hosts_stats,
     get_vmcluster_stats,
 )
@@ -233,7 +233,7 @@ def update_prometheus_stats(metrics: PrometheusMetrics):
             )
 
     # Update metrics for subnets
-    for cidr, stats in get_subnets_utilisation_stats().items():
+    for cidr, stats in get_subnets_utilisation_snapshot().items():
         for status in ("available", "unavailable"):
             metrics.update(
                 "maas_net_subnet_ip_count",
@@ -149,7 +149,9 @@ class TestPrometheus(MAASServerTestCase):
                 "unavailable": 0,
             },
         }
-        mock_subnet_stats = self.patch(stats, "get_subnets_utilisation_stats")
+        mock_subnet_stats = self.patch(
+            stats, "get_subnets_utilisation_snapshot"
+        )
         mock_subnet_stats.return_value = subnet_stats
         metrics = create_metrics(
             STATS_DEFINITIONS, registry=prometheus_client.CollectorRegistry()
@@ -96,6 +96,9 @@ class RegionControllerService(Service):
             reactor=clock,
         )
         self.previousSerial = None
+        # Fingerprints of the zone files as last written, so that only zones
+        # that change need to be rewritten and reloaded.
+        self.dnsZoneState = {}
         self.rbacClient = None
         self.rbacInit = False
 
@@ -177,9 +180,13 @@ class RegionControllerService(Service):
         defers = []
         if self.needsDNSUpdate:
             self.needsDNSUpdate = False
-            d = deferToDatabase(transactional(dns_update_all_zones))
+            d = deferToDatabase(
+                transactional(dns_update_all_zones),
+                zone_state=self.dnsZoneState,
+            )
             d.addCallback(self._checkSerial)
             d.addCallback(self._logDNSReload)
+            d.addErrback(self._resetDNSZoneState)
             # Order here matters, first needsDNSUpdate is set then pass the
             # failure onto `_onDNSReloadFailure` to do the correct thing
             # with the DNS server.
@@ -283,6 +290,15 @@ class RegionControllerService(Service):
             self.previousSerial = serial
             return d
 
+    def _resetDNSZoneState(self, failure):
+        """Rewrite and reload every zone next time after a failure.
+
+        It's not known which zones BIND failed to load, so none of them can
+        be skipped as unchanged.
+        """
+        self.dnsZoneState.clear()
+        return failure
+
     def _onDNSReloadFailure(self, failure):
         """Force kill and restart bind9."""
         failure.trap(DNSReloadError)
@@ -0,0 +1,94 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Config cache service for the region controller."""
+
+
+from twisted.application.service import Service
+from twisted.internet.defer import inlineCallbacks
+
+from maasserver.listener import PostgresListenerService
+from maasserver.models.config import Config
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils.twisted import callOut
+
+log = LegacyLogger()
+
+
+class ConfigCacheService(Service):
+    """Service to keep this process's cache of config values up to date.
+
+    The cache is used only while the database listener is connected to tell
+    it which config items change; see `ConfigCache`.
+    """
+
+    def __init__(self, postgresListener: PostgresListenerService = None):
+        super().__init__()
+        self.listener = postgresListener
+        self.cache = Config.objects.cache
+        self.refreshing = None
+
+    def startService(self):
+        super().startService()
+        if self.listener is not None:
+            self.listener.register("sys_config", self.configChanged)
+            self.listener.events.connected.registerHandler(self.startCaching)
+            self.listener.events.disconnected.registerHandler(self.stopCaching)
+            if self.listener.connected():
+                # Start caching once the listener is listening for changes.
+                d = self.listener.channelRegistrarDone
+                if d is None:
+                    self.startCaching()
+                else:
+                    d.addCallback(callOut, self.startCaching)
+
+    def stopService(self):
+        if self.listener is not None:
+            self.listener.events.connected.unregisterHandler(self.startCaching)
+            self.listener.events.disconnected.unregisterHandler(
+                self.stopCaching
+            )
+            self.listener.unregister("sys_config", self.configChanged)
+        self.stopCaching()
+        return super().stopService()
+
+    def startCaching(self):
+        """Called when the listener connects."""
+        if self.running:
+            self.cache.enable(self)
+            self.refresh()
+
+    def stopCaching(self, reason=None):
+        """Called when the listener disconnects."""
+        self.cache.disable(self)
+
+    def configChanged(self, channel, name):
+        """Called when the `sys_config` message is received."""
+        self.cache.invalidate(name)
+        self.refresh()
+
+    def refresh(self):
+        """Refresh the cache, unless that's already in progress.
+
+        Config items that change while the cache is being refreshed are
+        refreshed in turn.
+        """
+        if self.refreshing is None:
+            d = self._refresh()
+            if not d.called:
+                self.refreshing = d
+        return self.refreshing
+
+    @inlineCallbacks
+    def _refresh(self):
+        try:
+            while self.cache.needs_refresh():
+                yield deferToDatabase(transactional(self.cache.refresh))
+        except Exception:
+            # Config values are read from the database until the next
+            # change is reported.
+            log.err(None, "Failed to refresh the config cache.")
+        finally:
+            self.refreshing = None
@@ -11,6 +11,7 @@ from typing import Optional
 from twisted.application.service import Service
 from twisted.internet.defer import inlineCallbacks
 
+from maasserver.largefilestore import largefile_store
 from maasserver.listener import PostgresListenerService
 from maasserver.models.config import Config
 from maasserver.regiondservices import certificate_expiration_check
@@ -79,6 +80,7 @@ class RegionHTTPService(Service):
             "tls_cert_path": cert_path,
             "socket_path": socket_path,
             "static_dir": str(get_root_path() / "usr/share/maas"),
+            "image_store_dir": largefile_store.path,
         }
         rendered = template.substitute(environ).encode()
         target_path = Path(compose_http_config_path("regiond.nginx.conf"))
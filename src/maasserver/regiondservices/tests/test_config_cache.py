@@ -0,0 +1,108 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+from twisted.internet.defer import inlineCallbacks
+
+from maasserver.models.config import Config, ConfigCache
+from maasserver.regiondservices.config_cache import ConfigCacheService
+from maasserver.testing.factory import factory
+from maasserver.testing.listener import FakePostgresListenerService
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.triggers.system import register_system_triggers
+from maasserver.triggers.testing import TransactionalHelpersMixin
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from maastesting.crochet import wait_for
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from provisioningserver.utils.twisted import pause, retries
+
+wait_for_reactor = wait_for()
+
+
+class TestConfigCacheService(MAASServerTestCase):
+    """Tests for `ConfigCacheService`."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ConfigCache()
+        self.patch(Config.objects, "cache", self.cache)
+        self.listener = FakePostgresListenerService()
+        self.service = ConfigCacheService(self.listener)
+        self.refresh = self.patch(self.service, "refresh")
+
+    def test_registers_and_unregisters_with_listener(self):
+        self.service.startService()
+        self.assertEqual(
+            [self.service.configChanged], self.listener.listeners["sys_config"]
+        )
+        self.service.stopService()
+        self.assertNotIn("sys_config", self.listener.listeners)
+
+    def test_caches_while_listener_connected(self):
+        self.service.startService()
+        self.addCleanup(self.service.stopService)
+        self.assertFalse(self.cache.enabled)
+        self.listener.events.connected.fire()
+        self.assertTrue(self.cache.enabled)
+        self.assertThat(self.refresh, MockCalledOnceWith())
+        self.listener.events.disconnected.fire(None)
+        self.assertFalse(self.cache.enabled)
+
+    def test_stops_caching_when_stopped(self):
+        self.service.startService()
+        self.listener.events.connected.fire()
+        self.service.stopService()
+        self.assertFalse(self.cache.enabled)
+        # It no longer responds to the listener.
+        self.listener.events.connected.fire()
+        self.assertFalse(self.cache.enabled)
+
+    def test_configChanged_invalidates_and_refreshes(self):
+        name = factory.make_name("name")
+        Config.objects.set_config(name, name)
+        self.cache.enable(self)
+        self.cache.refresh()
+        self.assertThat(self.refresh, MockNotCalled())
+        self.service.configChanged("sys_config", name)
+        self.assertEqual({}, self.cache.get([name]))
+        self.assertThat(self.refresh, MockCalledOnceWith())
+
+
+class TestConfigCacheServiceListening(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end tests for `ConfigCacheService`."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_refreshes_changed_config(self):
+        name = factory.make_name("name")
+        cache = ConfigCache()
+        self.patch(Config.objects, "cache", cache)
+        yield deferToDatabase(register_system_triggers)
+        yield deferToDatabase(Config.objects.set_config, name, "old")
+        listener = self.make_listener_without_delay()
+        service = ConfigCacheService(listener)
+        service.startService()
+        yield listener.startService()
+        try:
+            for _, _, wait in retries(5, 0.1):
+                if cache.loaded and service.refreshing is None:
+                    break
+                yield pause(wait)
+            self.assertEqual({name: "old"}, cache.get([name]))
+            yield deferToDatabase(
+                transactional(Config.objects.set_config), name, "new"
+            )
+            for _, _, wait in retries(5, 0.1):
+                if cache.get([name]).get(name) == "new":
+                    break
+                yield pause(wait)
+            self.assertEqual({name: "new"}, cache.get([name]))
+        finally:
+            yield service.stopService()
+            yield listener.stopService()
+        self.assertFalse(cache.enabled)
@@ -121,6 +121,7 @@ class TestRegionHTTPService(
         self.assertIn("listen 5443 ssl http2;", nginx_config)
         self.assertIn("ssl_certificate cert_path;", nginx_config)
         self.assertIn("ssl_certificate_key key_path;", nginx_config)
+        self.assertIn(f"alias {data_path}/image-store/;", nginx_config)
 
     def test_configure_in_snap(self):
         self.patch(
@@ -4,20 +4,22 @@
 """RPC helpers relating to DHCP leases."""
 
 
+from collections import defaultdict
 from datetime import datetime
 
-from netaddr import IPAddress
+from netaddr import AddrFormatError, EUI, IPAddress, mac_unix_expanded
 
-from maasserver.enum import IPADDRESS_FAMILY, IPADDRESS_TYPE
+from maasserver.enum import IPADDRESS_FAMILY, IPADDRESS_TYPE, IPRANGE_TYPE
 from maasserver.models import (
     DNSResource,
     Interface,
+    IPRange,
     Node,
     StaticIPAddress,
     Subnet,
     UnknownInterface,
 )
-from maasserver.utils.orm import transactional
+from maasserver.utils.orm import savepoint, transactional
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import coerce_to_valid_hostname
 from provisioningserver.utils.twisted import synchronous
@@ -38,6 +40,51 @@ def _is_valid_hostname(hostname):
     )
 
 
+def _check_action(action):
+    if action not in ["commit", "expiry", "release"]:
+        raise LeaseUpdateError("Unknown lease action: %s" % action)
+
+
+def _check_subnet(subnet, ip_family, ip):
+    # If no subnet exists then something is wrong as we should not be
+    # recieving message about unknown subnets.
+    if subnet is None:
+        raise LeaseUpdateError("No subnet exists for: %s" % ip)
+
+    # Check that the subnet family is the same.
+    subnet_family = subnet.get_ipnetwork().version
+    if ip_family == "ipv4" and subnet_family != IPADDRESS_FAMILY.IPv4:
+        raise LeaseUpdateError(
+            "Family for the subnet does not match. Expected: %s" % ip_family
+        )
+    elif ip_family == "ipv6" and subnet_family != IPADDRESS_FAMILY.IPv6:
+        raise LeaseUpdateError(
+            "Family for the subnet does not match. Expected: %s" % ip_family
+        )
+
+
+def _log_lease(action, mac, ip, created, lease_time, hostname):
+    log.msg(
+        "Lease update: %s for %s on %s at %s%s%s"
+        % (
+            action,
+            ip,
+            mac,
+            created,
+            " (lease time: %ss)" % lease_time
+            if lease_time is not None
+            else "",
+            " (hostname: %s)" % hostname
+            if _is_valid_hostname(hostname)
+            else "",
+        )
+    )
+
+
+def _is_node_hostname(hostname):
+    return Node.objects.filter(hostname=hostname).exists()
+
+
 @synchronous
 @transactional
 def update_lease(
@@ -74,42 +121,14 @@ def update_lease(
         exist.
     """
     # Check for a valid action.
-    if action not in ["commit", "expiry", "release"]:
-        raise LeaseUpdateError("Unknown lease action: %s" % action)
+    _check_action(action)
 
-    # Get the subnet for this IP address. If no subnet exists then something
-    # is wrong as we should not be recieving message about unknown subnets.
+    # Get the subnet for this IP address.
     subnet = Subnet.objects.get_best_subnet_for_ip(ip)
-    if subnet is None:
-        raise LeaseUpdateError("No subnet exists for: %s" % ip)
-
-    # Check that the subnet family is the same.
-    subnet_family = subnet.get_ipnetwork().version
-    if ip_family == "ipv4" and subnet_family != IPADDRESS_FAMILY.IPv4:
-        raise LeaseUpdateError(
-            "Family for the subnet does not match. Expected: %s" % ip_family
-        )
-    elif ip_family == "ipv6" and subnet_family != IPADDRESS_FAMILY.IPv6:
-        raise LeaseUpdateError(
-            "Family for the subnet does not match. Expected: %s" % ip_family
-        )
+    _check_subnet(subnet, ip_family, ip)
 
     created = datetime.fromtimestamp(timestamp)
-    log.msg(
-        "Lease update: %s for %s on %s at %s%s%s"
-        % (
-            action,
-            ip,
-            mac,
-            created,
-            " (lease time: %ss)" % lease_time
-            if lease_time is not None
-            else "",
-            " (hostname: %s)" % hostname
-            if _is_valid_hostname(hostname)
-            else "",
-        )
-    )
+    _log_lease(action, mac, ip, created, lease_time, hostname)
 
     # We will recieve actions on all addresses in the subnet. We only want
     # to update the addresses in the dynamic range.
@@ -119,6 +138,128 @@ def update_lease(
         return {}
 
     interfaces = list(Interface.objects.filter(mac_address=mac))
+    _update_lease_addresses(
+        action,
+        mac,
+        ip,
+        created,
+        lease_time,
+        hostname,
+        subnet,
+        interfaces,
+        _is_node_hostname,
+    )
+    return {}
+
+
+@synchronous
+@transactional
+def update_leases(leases):
+    """Update several DHCP leases from a cluster, in order.
+
+    The subnets, dynamic ranges, interfaces and node hostnames that the
+    leases need are found for the whole batch with a few queries. Each lease
+    is then updated as `update_lease` would, within its own savepoint, so that
+    a lease that cannot be updated is logged and does not affect the others.
+
+    :param leases: A list of dicts, each with the arguments for
+        `update_lease`, as found in
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+    """
+    leases = [lease for lease in leases if _is_known_action(lease)]
+    subnets = Subnet.objects.get_best_subnets_for_ips(
+        lease["ip"] for lease in leases
+    )
+    dynamic_ranges = defaultdict(list)
+    iprange_query = IPRange.objects.filter(
+        subnet__in={subnet for subnet in subnets.values() if subnet},
+        type=IPRANGE_TYPE.DYNAMIC,
+    )
+    for iprange in iprange_query:
+        dynamic_ranges[iprange.subnet_id].append(iprange.netaddr_iprange)
+    macs = {_normalise_mac(lease["mac"]) for lease in leases}
+    interfaces = defaultdict(list)
+    for interface in Interface.objects.filter(mac_address__in=macs):
+        interfaces[_normalise_mac(interface.mac_address)].append(interface)
+    hostnames = {
+        coerce_to_valid_hostname(lease["hostname"])
+        for lease in leases
+        if _is_valid_hostname(lease.get("hostname"))
+    }
+    node_hostnames = set(
+        Node.objects.filter(hostname__in=hostnames).values_list(
+            "hostname", flat=True
+        )
+    )
+
+    for lease in leases:
+        action, mac, ip = lease["action"], lease["mac"], lease["ip"]
+        lease_time = lease.get("lease_time")
+        hostname = lease.get("hostname")
+        try:
+            subnet = subnets[ip]
+            _check_subnet(subnet, lease["ip_family"], ip)
+            created = datetime.fromtimestamp(lease["timestamp"])
+            _log_lease(action, mac, ip, created, lease_time, hostname)
+            address = IPAddress(ip)
+            if not any(
+                address in iprange for iprange in dynamic_ranges[subnet.id]
+            ):
+                continue
+            key = _normalise_mac(mac)
+            with savepoint():
+                mac_interfaces = _update_lease_addresses(
+                    action,
+                    mac,
+                    ip,
+                    created,
+                    lease_time,
+                    hostname,
+                    subnet,
+                    list(interfaces[key]),
+                    node_hostnames.__contains__,
+                )
+            # Later leases for this MAC need any interface created for it.
+            interfaces[key] = mac_interfaces
+        except Exception:
+            log.err(None, "Failed to update lease for %s on %s." % (ip, mac))
+
+
+def _is_known_action(lease):
+    try:
+        _check_action(lease["action"])
+    except LeaseUpdateError:
+        log.err(None, "Failed to update lease.")
+        return False
+    else:
+        return True
+
+
+def _normalise_mac(mac):
+    try:
+        return str(EUI(str(mac), dialect=mac_unix_expanded))
+    except AddrFormatError:
+        return str(mac)
+
+
+def _update_lease_addresses(
+    action,
+    mac,
+    ip,
+    created,
+    lease_time,
+    hostname,
+    subnet,
+    interfaces,
+    is_node_hostname,
+):
+    """Update the DISCOVERED addresses of `interfaces` for a lease on `ip`.
+
+    :param is_node_hostname: A callable that returns whether a node already
+        has the given hostname.
+    :return: The interfaces with the lease's MAC address, including any
+        unknown interface that was created for it.
+    """
     if len(interfaces) == 0 and action == "commit":
         # A MAC address that is unknown to MAAS was given an IP address. Create
         # an unknown interface for this lease.
@@ -129,11 +270,12 @@ def update_lease(
         interfaces = [unknown_interface]
     elif len(interfaces) == 0:
         # No interfaces and not commit action so nothing needs to be done.
-        return {}
+        return interfaces
 
     sip = None
     # Delete all discovered IP addresses attached to all interfaces of the same
     # IP address family.
+    subnet_family = subnet.get_ipnetwork().version
     old_family_addresses = StaticIPAddress.objects.filter_by_ip_family(
         subnet_family
     )
@@ -179,9 +321,9 @@ def update_lease(
         if sip_hostname is not None:
             # MAAS automatically manages DNS for node hostnames, so we cannot
             # allow a DHCP client to override that.
-            hostname_belongs_to_a_node = Node.objects.filter(
-                hostname=coerce_to_valid_hostname(sip_hostname)
-            ).exists()
+            hostname_belongs_to_a_node = is_node_hostname(
+                coerce_to_valid_hostname(sip_hostname)
+            )
             if hostname_belongs_to_a_node:
                 # Ensure we don't allow a DHCP hostname to override a node
                 # hostname.
@@ -211,4 +353,4 @@ def update_lease(
             sip.save()
         for interface in interfaces:
             interface.ip_addresses.add(sip)
-    return {}
+    return interfaces
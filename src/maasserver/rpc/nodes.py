@@ -6,6 +6,7 @@
 __all__ = [
     "mark_node_failed",
     "update_node_power_state",
+    "update_node_power_states",
     "commission_node",
     "create_node",
 ]
@@ -166,6 +167,43 @@ def update_node_power_state(system_id, power_state):
     node.update_power_state(power_state)
 
 
+@synchronous
+@transactional
+def update_node_power_states(power_states):
+    """Update the power state of several nodes.
+
+    for :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+
+    All the nodes are fetched in a single query. Nodes whose power state has
+    not changed and that are not waiting on it to transition to another status
+    only have `power_state_updated` bumped, together in a single query; the
+    others go through `Node.update_power_state`.
+
+    :param power_states: An iterable of dicts with `system_id` and
+        `power_state` keys.
+    :return: The system_ids of the nodes that do not exist.
+    """
+    states = {
+        power_state["system_id"]: power_state["power_state"]
+        for power_state in power_states
+    }
+    found = set()
+    unchanged = []
+    for node in Node.objects.filter(system_id__in=states.keys()):
+        found.add(node.system_id)
+        power_state = states[node.system_id]
+        if node.power_state == power_state and node.status not in (
+            NODE_STATUS.RELEASING,
+            NODE_STATUS.EXITING_RESCUE_MODE,
+        ):
+            unchanged.append(node.id)
+        else:
+            node.update_power_state(power_state)
+    if len(unchanged) > 0:
+        Node.objects.filter(id__in=unchanged).update(power_state_updated=now())
+    return [system_id for system_id in states if system_id not in found]
+
+
 @synchronous
 @transactional
 def create_node(
@@ -7,6 +7,7 @@
 from collections import defaultdict
 import copy
 from datetime import datetime
+from functools import partial
 from os import urandom
 import random
 from socket import AF_INET, AF_INET6
@@ -32,6 +33,7 @@ from zope.interface import implementer
 
 from maasserver import eventloop
 from maasserver.bootresources import get_simplestream_endpoint
+from maasserver.clusterrpc.external_config import get_external_config_version
 from maasserver.dns.config import get_trusted_networks
 from maasserver.models.config import Config
 from maasserver.models.node import RackController
@@ -45,6 +47,7 @@ from maasserver.rpc import (
     packagerepository,
     rackcontrollers,
 )
+from maasserver.rpc.leases import update_leases
 from maasserver.rpc.nodes import (
     commission_node,
     create_node,
@@ -60,7 +63,7 @@ from provisioningserver.prometheus.metrics import (
     PROMETHEUS_METRICS,
 )
 from provisioningserver.rpc import cluster, common, exceptions, region
-from provisioningserver.rpc.common import RPCProtocol
+from provisioningserver.rpc.common import choose_connection, RPCProtocol
 from provisioningserver.rpc.exceptions import NoSuchCluster
 from provisioningserver.rpc.interfaces import IConnection
 from provisioningserver.security import calculate_digest
@@ -160,6 +163,32 @@ class Region(RPCProtocol):
         # region recieves the message.
         return d
 
+    @region.UpdateLeases.responder
+    def update_leases(self, cluster_uuid, leases):
+        """update_leases(cluster_uuid, leases)
+
+        Implementation of
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+        """
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        d = dbtasks.deferTask(update_leases, leases)
+
+        # Catch all errors except the NoSuchCluster failure. We want that to
+        # be sent back to the cluster.
+        def err_NoSuchCluster_passThrough(failure):
+            if failure.check(NoSuchCluster):
+                return failure
+            else:
+                log.err(failure, "Unhandled failure in updating leases.")
+                return {}
+
+        d.addErrback(err_NoSuchCluster_passThrough)
+
+        # As with `update_lease`, wait for the batch to be handled so that
+        # the cluster sends the next batch only after this one is processed.
+        d.addCallback(lambda _: {})
+        return d
+
     @amp.StartTLS.responder
     def get_tls_parameters(self):
         """get_tls_parameters()
@@ -284,6 +313,17 @@ class Region(RPCProtocol):
         d.addCallback(lambda args: {})
         return d
 
+    @region.UpdateNodePowerStates.responder
+    def update_node_power_states(self, power_states):
+        """update_node_power_states()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+        """
+        d = deferToDatabase(nodes.update_node_power_states, power_states)
+        d.addCallback(lambda missing: {"missing": missing})
+        return d
+
     @region.RegisterEventType.responder
     def register_event_type(self, name, description, level):
         """register_event_type()
@@ -608,6 +648,20 @@ def isLoopbackURL(url):
 
 
 @implementer(IConnection)
+def record_dhcp_config_size(sync, size):
+    """Record the size of a DHCP configuration sent to a rack controller.
+
+    :param sync: "full" for a full configuration, "delta" for changes.
+    :param size: The size in bytes of the command on the wire.
+    """
+    PROMETHEUS_METRICS.update(
+        "maas_dhcp_config_payload_size",
+        "observe",
+        value=size,
+        labels={"sync": sync},
+    )
+
+
 class RegionServer(Region):
     """The RPC protocol supported by a region controller, server version.
 
@@ -627,6 +681,44 @@ class RegionServer(Region):
     host = None
     hostIsRemote = False
 
+    # DHCP configurations are measured as sent, rather than encoded again to
+    # measure them.
+    box_size_observers = {
+        cluster.ConfigureDHCPv4.commandName: partial(
+            record_dhcp_config_size, "full"
+        ),
+        cluster.ConfigureDHCPv6.commandName: partial(
+            record_dhcp_config_size, "full"
+        ),
+        cluster.UpdateDHCPv4.commandName: partial(
+            record_dhcp_config_size, "delta"
+        ),
+        cluster.UpdateDHCPv6.commandName: partial(
+            record_dhcp_config_size, "delta"
+        ),
+    }
+
+    @region.UpdateLastImageSync.responder
+    def update_last_image_sync(self, system_id):
+        """update_last_image_sync()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.UpdateLastImageSync`.
+
+        The rack controller has synced its boot images, so cached results of
+        calls that depend on them are forgotten: here straight away, and in
+        every region process once the change is reported on
+        `sys_image_sync`.
+        """
+        d = super().update_last_image_sync(system_id)
+        d.addCallback(
+            callOut,
+            self.factory.service._invalidateCallCachesFor,
+            system_id,
+            RackClient.boot_image_calls,
+        )
+        return d
+
     @asynchronous
     def initResponder(self, rack_controller):
         """Set up local connection identifiers for this RPC connection.
@@ -702,6 +794,11 @@ class RegionServer(Region):
         if version:
             # The remote supports version checking, so reply to that.
             result["version"] = str(get_running_version())
+        # The rack fetches its external services configuration again when
+        # this changes; see `maasserver.clusterrpc.external_config`.
+        result["external_config_version"] = yield deferToDatabase(
+            get_external_config_version
+        )
         return result
 
     @inlineCallbacks
@@ -819,10 +916,20 @@ def _get_call_latency_metric_labels(client, cmd, *args, **kwargs):
 class RackClient(common.Client):
     """A `common.Client` for communication from region to rack."""
 
-    # Currently the only calls that can be cached are the ones that take
-    # no arguments. More work needs to be done to this class to handle
-    # argument matching.
-    cache_calls = [cluster.DescribePowerTypes]
+    # Calls that don't change the rack controller, and so whose results can
+    # be cached for each connection, mapped to how long in seconds to cache
+    # them for. Results are cached for each distinct set of arguments, and
+    # `None` caches them for as long as the connection lasts.
+    cache_calls = {
+        cluster.DescribePowerTypes: None,
+        cluster.ListOperatingSystems: 60,
+    }
+
+    # Cached calls whose results change when the rack controller syncs its
+    # boot images.
+    boot_image_calls = [cluster.ListOperatingSystems]
+
+    clock = reactor
 
     def __init__(self, connection, cache):
         super().__init__(connection)
@@ -837,36 +944,74 @@ class RackClient(common.Client):
         else:
             return self.cache["call_cache"]
 
-    @PROMETHEUS_METRICS.record_call_latency(
-        "maas_region_rack_rpc_call_latency",
-        get_labels=_get_call_latency_metric_labels,
-    )
+    def _getCallKey(self, cmd, kwargs):
+        """Return the key in the call cache for a call to `cmd`."""
+        arguments = {
+            name: value for name, value in kwargs.items() if name != "_timeout"
+        }
+        return cmd, cmd.makeArguments(arguments, None).serialize()
+
+    def invalidateCallCache(self, cmds):
+        """Forget the cached results of calls to `cmds`.
+
+        The call cache is replaced, so results of calls already in progress
+        are not cached either.
+        """
+        self.cache["call_cache"] = {
+            key: entry
+            for key, entry in self._getCallCache().items()
+            if key[0] not in cmds
+        }
+
     @asynchronous
     def __call__(self, cmd, *args, **kwargs):
         """Call a remote RPC method.
 
         This caches calls to the rack controller that do not change value,
-        unless the rack controller disconnects and reconnects to the region.
+        until they expire or the rack controller disconnects and reconnects
+        to the region.
         """
-        call_cache = self._getCallCache()
         if cmd not in self.cache_calls:
-            return super().__call__(cmd, *args, **kwargs)
-        if cmd in call_cache:
-            # Call has already been made over this connection, just return
-            # the original result.
-            return succeed(copy.deepcopy(call_cache[cmd]))
-        else:
-            # First time this call has been made so cache the result so
-            # so the next call over this connection will just be returned
-            # from the cache.
+            return self._call(cmd, *args, **kwargs)
+        call_cache = self._getCallCache()
+        key = self._getCallKey(cmd, kwargs)
+        entry = call_cache.get(key)
+        if entry is not None:
+            expires, result = entry
+            if expires is None or expires > self.clock.seconds():
+                # Call has already been made over this connection, just
+                # return the original result.
+                self._recordCacheRequest(cmd, "hit")
+                return succeed(copy.deepcopy(result))
+        # First time this call has been made, or its result expired, so
+        # cache the result so the next call over this connection will just
+        # be returned from the cache.
+        self._recordCacheRequest(cmd, "miss")
+        ttl = self.cache_calls[cmd]
+
+        def cb_cache(result):
+            expires = None if ttl is None else self.clock.seconds() + ttl
+            call_cache[key] = expires, result
+            return result
+
+        d = self._call(cmd, *args, **kwargs)
+        d.addCallback(cb_cache)
+        return d
 
-            def cb_cache(result):
-                call_cache[cmd] = result
-                return result
+    def _recordCacheRequest(self, cmd, result):
+        PROMETHEUS_METRICS.update(
+            "maas_region_rack_rpc_call_cache_requests",
+            "inc",
+            labels={"call": cmd.__name__, "result": result},
+        )
 
-            d = super().__call__(cmd, *args, **kwargs)
-            d.addCallback(cb_cache)
-            return d
+    @PROMETHEUS_METRICS.record_call_latency(
+        "maas_region_rack_rpc_call_latency",
+        get_labels=_get_call_latency_metric_labels,
+    )
+    def _call(self, cmd, *args, **kwargs):
+        """Make a call to the rack controller, bypassing the call cache."""
+        return super().__call__(cmd, *args, **kwargs)
 
 
 class RegionService(service.Service):
@@ -885,14 +1030,18 @@ class RegionService(service.Service):
     :ivar starting: Either `None`, or a :class:`Deferred` that fires when
         attempts have been made to open all endpoints. Some or all of them may
         not have been opened successfully.
+    :ivar postgresListener: Optional `PostgresListenerService`, which reports
+        rack controllers that have synced their boot images to every region
+        process, so that each forgets its cached calls that depend on them.
     """
 
     connections = None
     starting = None
 
-    def __init__(self, ipcWorker):
+    def __init__(self, ipcWorker, postgresListener=None):
         super().__init__()
         self.ipcWorker = ipcWorker
+        self.postgresListener = postgresListener
         self.endpoints = [
             [TCP6ServerEndpoint(reactor, port) for port in range(5250, 5260)]
         ]
@@ -920,15 +1069,16 @@ class RegionService(service.Service):
             waiters.add(d)
             return d
         else:
-            connection = random.choice(conns)
+            connection = choose_connection(conns)
             return defer.succeed(connection)
 
     def _getConnectionFromIdentifiers(self, identifiers, timeout):
         """Wait up to `timeout` seconds for at least one connection from
         `identifiers`.
 
-        Returns a `Deferred` which will fire with a list of random connections
-        to each client. Only one connection per client will be returned.
+        Returns a `Deferred` which will fire with a list of connections to
+        each client, chosen by `choose_connection`. Only one connection per
+        client will be returned.
 
         The public interface to this method is `getClientFromIdentifiers`.
         """
@@ -936,7 +1086,7 @@ class RegionService(service.Service):
         for ident in identifiers:
             conns = list(self.connections[ident])
             if len(conns) > 0:
-                matched_connections.append(random.choice(conns))
+                matched_connections.append(choose_connection(conns))
         if len(matched_connections) > 0:
             return defer.succeed(matched_connections)
         else:
@@ -976,6 +1126,17 @@ class RegionService(service.Service):
         self.connectionsCache.pop(connection, None)
         self.events.disconnected.fire(ident)
 
+    def _invalidateCallCachesFor(self, ident, cmds):
+        """Forget the cached results of `cmds` on connections for `ident`."""
+        for connection in self.connections.get(ident, ()):
+            cache = self.connectionsCache.get(connection)
+            if cache is not None:
+                RackClient(connection, cache).invalidateCallCache(cmds)
+
+    def _imageSyncUpdated(self, channel, system_id):
+        """Called when the `sys_image_sync` message is received."""
+        self._invalidateCallCachesFor(system_id, RackClient.boot_image_calls)
+
     def _savePorts(self, results):
         """Save the opened ports to ``self.ports``.
 
@@ -1016,6 +1177,10 @@ class RegionService(service.Service):
     def startService(self):
         """Start listening on an ephemeral port."""
         super().startService()
+        if self.postgresListener is not None:
+            self.postgresListener.register(
+                "sys_image_sync", self._imageSyncUpdated
+            )
         self.starting = defer.DeferredList(
             (
                 self._bindFirst(endpoint_options, self.factory)
@@ -1047,6 +1212,10 @@ class RegionService(service.Service):
     @inlineCallbacks
     def stopService(self):
         """Stop listening."""
+        if self.postgresListener is not None:
+            self.postgresListener.unregister(
+                "sys_image_sync", self._imageSyncUpdated
+            )
         self.starting.cancel()
         for port in list(self.ports):
             self.ports.remove(port)
@@ -1100,7 +1269,8 @@ class RegionService(service.Service):
 
         If more than one connection exists to that rack controller - implying
         that there are multiple rack controllers for the particular
-        cluster, for HA - one of them will be returned at random.
+        cluster, for HA - the least loaded of them is preferred; see
+        `choose_connection`.
 
         :param system_id: The system_id - as a string - of the rack controller
             that a connection is wanted for.
@@ -1130,7 +1300,7 @@ class RegionService(service.Service):
         identifiers.
 
         If more than one connection exists to that given `identifiers`, then
-        one of them will be returned at random.
+        the least loaded of them is preferred; see `choose_connection`.
 
         :param identifiers: List of system_id's of the rack controller
             that a connection is wanted for.
@@ -1149,7 +1319,7 @@ class RegionService(service.Service):
             )
 
         def cb_client(conns):
-            connection = random.choice(conns)
+            connection = choose_connection(conns)
             return RackClient(connection, self.connectionsCache[connection])
 
         return d.addCallbacks(cb_client, cancelled)
@@ -1162,7 +1332,7 @@ class RegionService(service.Service):
             return RackClient(connection, self.connectionsCache[connection])
 
         return [
-            _client(random.choice(list(connections)))
+            _client(choose_connection(connections))
             for connections in self.connections.values()
             if len(connections) > 0
         ]
@@ -1181,5 +1351,5 @@ class RegionService(service.Service):
             # The connection object is a set of RegionServer objects.
             # Make sure a sane set was returned.
             assert len(connection) > 0, "Connection set empty."
-            connection = random.choice(list(connection))
+            connection = choose_connection(connection)
             return RackClient(connection, self.connectionsCache[connection])
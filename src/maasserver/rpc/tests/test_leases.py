@@ -16,13 +16,19 @@ from maasserver.enum import INTERFACE_TYPE, IPADDRESS_FAMILY, IPADDRESS_TYPE
 from maasserver.models import DNSResource
 from maasserver.models.interface import UnknownInterface
 from maasserver.models.staticipaddress import StaticIPAddress
-from maasserver.rpc.leases import LeaseUpdateError, update_lease
+from maasserver.rpc.leases import (
+    LeaseUpdateError,
+    update_lease,
+    update_leases,
+)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import get_one, reload_object
+from maastesting.djangotestcase import count_queries
+from maastesting.twisted import TwistedLoggerFixture
 
 
-class TestUpdateLease(MAASServerTestCase):
+class UpdateLeaseTestMixin:
     def make_kwargs(
         self,
         action=None,
@@ -67,6 +73,8 @@ class TestUpdateLease(MAASServerTestCase):
             with_static_range=False, dhcp_on=True
         )
 
+
+class TestUpdateLease(UpdateLeaseTestMixin, MAASServerTestCase):
     def test_raises_LeaseUpdateError_for_unknown_action(self):
         action = factory.make_name("action")
         kwargs = self.make_kwargs(action=action)
@@ -505,3 +513,130 @@ class TestUpdateLease(MAASServerTestCase):
         self.assertEqual(1, ip_address2.interface_set.count())
         self.assertEqual(1, boot_interface1.ip_addresses.count())
         self.assertEqual(1, boot_interface2.ip_addresses.count())
+
+
+class TestUpdateLeases(UpdateLeaseTestMixin, MAASServerTestCase):
+    def make_dynamic_ip(self, subnet, but_not=()):
+        dynamic_range = subnet.get_dynamic_ranges()[0]
+        return factory.pick_ip_in_IPRange(dynamic_range, but_not=but_not)
+
+    def make_lease_outside_dynamic_range(self):
+        # Addresses in the subnet's ranges, including the dynamic range, are
+        # never picked.
+        subnet = self.make_managed_subnet()
+        ip = factory.pick_ip_in_Subnet(subnet)
+        return self.make_kwargs(action="commit", ip=ip)
+
+    def test_creates_leases_for_unknown_and_known_interfaces(self):
+        subnet = self.make_managed_subnet()
+        node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        boot_interface = node.get_boot_interface()
+        ip1 = self.make_dynamic_ip(subnet)
+        ip2 = self.make_dynamic_ip(subnet, but_not=[ip1])
+        unknown = self.make_kwargs(action="commit", ip=ip1)
+        known = self.make_kwargs(
+            action="commit", ip=ip2, mac=str(boot_interface.mac_address)
+        )
+        update_leases([unknown, known])
+        unknown_interface = UnknownInterface.objects.get(
+            mac_address=unknown["mac"]
+        )
+        self.assertThat(
+            unknown_interface.ip_addresses.get(),
+            MatchesStructure.byEquality(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED,
+                ip=ip1,
+                subnet=subnet,
+                lease_time=unknown["lease_time"],
+            ),
+        )
+        sip = StaticIPAddress.objects.get(
+            alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=ip2
+        )
+        self.assertCountEqual(
+            [boot_interface.id], sip.interface_set.values_list("id", flat=True)
+        )
+
+    def test_matches_interfaces_regardless_of_mac_format(self):
+        subnet = self.make_managed_subnet()
+        node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        boot_interface = node.get_boot_interface()
+        ip = self.make_dynamic_ip(subnet)
+        mac = str(boot_interface.mac_address).upper().replace(":", "-")
+        update_leases([self.make_kwargs(action="commit", ip=ip, mac=mac)])
+        sip = StaticIPAddress.objects.get(
+            alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=ip
+        )
+        self.assertCountEqual(
+            [boot_interface.id], sip.interface_set.values_list("id", flat=True)
+        )
+        self.assertFalse(UnknownInterface.objects.exists())
+
+    def test_processes_leases_in_order(self):
+        subnet = self.make_managed_subnet()
+        ip = self.make_dynamic_ip(subnet)
+        commit = self.make_kwargs(action="commit", ip=ip)
+        release = self.make_kwargs(action="release", ip=ip, mac=commit["mac"])
+        update_leases([commit, release])
+        unknown_interface = UnknownInterface.objects.get(
+            mac_address=commit["mac"]
+        )
+        self.assertThat(
+            unknown_interface.ip_addresses.get(),
+            MatchesStructure.byEquality(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=None, subnet=subnet
+            ),
+        )
+        self.assertFalse(StaticIPAddress.objects.filter(ip=ip).exists())
+
+    def test_ignores_ips_outside_dynamic_range(self):
+        kwargs = self.make_lease_outside_dynamic_range()
+        update_leases([kwargs])
+        self.assertFalse(
+            UnknownInterface.objects.filter(mac_address=kwargs["mac"]).exists()
+        )
+
+    def test_skips_dns_record_for_hostname_from_existing_node(self):
+        subnet = self.make_managed_subnet()
+        ip = self.make_dynamic_ip(subnet)
+        hostname = factory.make_name().lower()
+        factory.make_Node(hostname=hostname)
+        kwargs = self.make_kwargs(action="commit", ip=ip, hostname=hostname)
+        update_leases([kwargs])
+        self.assertFalse(DNSResource.objects.filter(name=hostname).exists())
+
+    def test_creates_dns_record_for_hostname(self):
+        subnet = self.make_managed_subnet()
+        ip = self.make_dynamic_ip(subnet)
+        hostname = factory.make_name().lower()
+        kwargs = self.make_kwargs(action="commit", ip=ip, hostname=hostname)
+        update_leases([kwargs])
+        sip = StaticIPAddress.objects.get(ip=ip)
+        dnsrr = get_one(DNSResource.objects.filter(name=hostname))
+        self.assertThat(sip.dnsresource_set.all(), Contains(dnsrr))
+
+    def test_logs_failed_leases_and_continues(self):
+        subnet = self.make_managed_subnet()
+        ip = self.make_dynamic_ip(subnet)
+        unknown_action = self.make_kwargs(action=factory.make_name("action"))
+        no_subnet = self.make_kwargs(action="commit")
+        good = self.make_kwargs(action="commit", ip=ip)
+        with TwistedLoggerFixture() as logger:
+            update_leases([unknown_action, no_subnet, good])
+        self.assertIn("Unknown lease action", logger.output)
+        self.assertIn(
+            "No subnet exists for: %s" % no_subnet["ip"], logger.output
+        )
+        self.assertTrue(
+            UnknownInterface.objects.filter(mac_address=good["mac"]).exists()
+        )
+
+    def test_looks_up_subnets_and_ranges_in_bulk(self):
+        count_one, _ = count_queries(
+            update_leases, [self.make_lease_outside_dynamic_range()]
+        )
+        count_many, _ = count_queries(
+            update_leases,
+            [self.make_lease_outside_dynamic_range() for _ in range(5)],
+        )
+        self.assertEqual(count_one, count_many)
@@ -28,6 +28,7 @@ from maasserver.rpc.nodes import (
     mark_node_failed,
     request_node_info_by_mac_address,
     update_node_power_state,
+    update_node_power_states,
 )
 from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
 from maasserver.testing.architecture import make_usable_architecture
@@ -552,6 +553,63 @@ class TestUpdateNodePowerState(MAASServerTestCase):
         self.assertEqual(reload_object(node).power_state, POWER_STATE.ON)
 
 
+class TestUpdateNodePowerStates(MAASServerTestCase):
+    def test_returns_missing_system_ids(self):
+        node = factory.make_Node(power_state=POWER_STATE.OFF)
+        system_id = factory.make_name("system_id")
+        missing = update_node_power_states(
+            [
+                {"system_id": node.system_id, "power_state": POWER_STATE.ON},
+                {"system_id": system_id, "power_state": POWER_STATE.ON},
+            ]
+        )
+        self.assertEqual([system_id], missing)
+
+    def test_updates_changed_power_states(self):
+        nodes = [
+            factory.make_Node(power_state=POWER_STATE.OFF) for _ in range(3)
+        ]
+        update_node_power_states(
+            [
+                {"system_id": node.system_id, "power_state": POWER_STATE.ON}
+                for node in nodes
+            ]
+        )
+        for node in nodes:
+            self.assertEqual(POWER_STATE.ON, reload_object(node).power_state)
+
+    def test_bulk_updates_unchanged_power_states(self):
+        updated = now() - timedelta(minutes=5)
+        nodes = [
+            factory.make_Node(
+                power_state=POWER_STATE.ON, power_state_updated=updated
+            )
+            for _ in range(3)
+        ]
+        update_power_state = self.patch(Node, "update_power_state")
+        update_node_power_states(
+            [
+                {"system_id": node.system_id, "power_state": POWER_STATE.ON}
+                for node in nodes
+            ]
+        )
+        update_power_state.assert_not_called()
+        for node in nodes:
+            self.assertGreater(
+                reload_object(node).power_state_updated, updated
+            )
+
+    def test_releases_releasing_node_powered_off(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.RELEASING, power_state=POWER_STATE.OFF
+        )
+        update_power_state = self.patch(Node, "update_power_state")
+        update_node_power_states(
+            [{"system_id": node.system_id, "power_state": POWER_STATE.OFF}]
+        )
+        update_power_state.assert_called_once_with(POWER_STATE.OFF)
+
+
 class TestGetControllerType(MAASServerTestCase):
     """Tests for `get_controller_type`."""
 
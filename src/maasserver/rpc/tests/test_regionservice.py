@@ -41,6 +41,7 @@ from twisted.internet.endpoints import TCP4ServerEndpoint
 from twisted.internet.error import ConnectionClosed
 from twisted.internet.interfaces import IStreamServerEndpoint
 from twisted.internet.protocol import Factory
+from twisted.internet.task import Clock
 from twisted.protocols import amp
 from twisted.python.failure import Failure
 from twisted.python.reflect import fullyQualifiedName
@@ -56,6 +57,7 @@ from maasserver.rpc.regionservice import (
 )
 from maasserver.rpc.testing.doubles import HandshakingRegionServer
 from maasserver.testing.factory import factory
+from maasserver.testing.listener import FakePostgresListenerService
 from maasserver.testing.testcase import MAASTransactionServerTestCase
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
@@ -71,12 +73,16 @@ from maastesting.twisted import (
 from metadataserver.builtin_scripts import load_builtin_scripts
 from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc import cluster, exceptions
+from provisioningserver.rpc.common import get_connection_load
 from provisioningserver.rpc.exceptions import (
     CannotRegisterRackController,
     NoConnectionsAvailable,
 )
 from provisioningserver.rpc.interfaces import IConnection
-from provisioningserver.rpc.region import RegisterRackController
+from provisioningserver.rpc.region import (
+    RegisterRackController,
+    UpdateLastImageSync,
+)
 from provisioningserver.rpc.testing import call_responder
 from provisioningserver.rpc.testing.doubles import DummyConnection
 from provisioningserver.utils import events
@@ -97,6 +103,26 @@ class TestRegionServer(MAASTransactionServerTestCase):
         self.patch(protocol, "transport")
         verifyObject(IConnection, protocol)
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_update_last_image_sync_invalidates_boot_image_calls(self):
+        service = RegionService(sentinel.ipcWorker)
+        protocol = service.factory.buildProtocol(addr=None)  # addr is unused.
+        update_last_image_sync = self.patch(
+            regionservice.rackcontrollers, "update_last_image_sync"
+        )
+        invalidate = self.patch(service, "_invalidateCallCachesFor")
+        system_id = factory.make_name("system_id")
+        response = yield call_responder(
+            protocol, UpdateLastImageSync, {"system_id": system_id}
+        )
+        self.assertEqual({}, response)
+        self.assertThat(update_last_image_sync, MockCalledOnceWith(system_id))
+        self.assertThat(
+            invalidate,
+            MockCalledOnceWith(system_id, [cluster.ListOperatingSystems]),
+        )
+
     def test_connectionMade_does_not_update_services_connection_set(self):
         service = RegionService(sentinel.ipcWorker)
         service.running = True  # Pretend it's running.
@@ -355,6 +381,28 @@ class TestRegionServer(MAASTransactionServerTestCase):
         )
         self.assertEqual(response["version"], str(get_running_version()))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_register_returns_external_config_version(self):
+        yield self.installFakeRegion()
+        rack_controller = yield deferToDatabase(factory.make_RackController)
+        version = factory.make_name("version")
+        self.patch(
+            regionservice, "get_external_config_version"
+        ).return_value = version
+        protocol = self.make_Region()
+        protocol.transport = MagicMock()
+        response = yield call_responder(
+            protocol,
+            RegisterRackController,
+            {
+                "system_id": rack_controller.system_id,
+                "hostname": rack_controller.hostname,
+                "interfaces": {},
+            },
+        )
+        self.assertEqual(version, response["external_config_version"])
+
     @wait_for_reactor
     @inlineCallbacks
     def test_register_calls_handle_upgrade(self):
@@ -456,7 +504,10 @@ class TestRegionServer(MAASTransactionServerTestCase):
         )
         protocol.transport.getHost.return_value = host
         mock_deferToDatabase = self.patch(regionservice, "deferToDatabase")
-        mock_deferToDatabase.side_effect = [succeed(rack_controller)]
+        mock_deferToDatabase.side_effect = [
+            succeed(rack_controller),
+            succeed(""),
+        ]
         yield call_responder(
             protocol,
             RegisterRackController,
@@ -515,9 +566,15 @@ class TestRegionServer(MAASTransactionServerTestCase):
 class TestRackClient(MAASTestCase):
     def test_defined_cache_calls(self):
         self.assertEqual(
-            [cluster.DescribePowerTypes],
+            {
+                cluster.DescribePowerTypes: None,
+                cluster.ListOperatingSystems: 60,
+            },
             RackClient.cache_calls,
         )
+        self.assertEqual(
+            [cluster.ListOperatingSystems], RackClient.boot_image_calls
+        )
 
     def test_getCallCache_adds_new_call_cache(self):
         conn = DummyConnection()
@@ -544,7 +601,8 @@ class TestRackClient(MAASTestCase):
         client = RackClient(conn, {})
         call_cache = client._getCallCache()
         power_types = {"power_types": [{"name": "ipmi"}, {"name": "wedge"}]}
-        call_cache[cluster.DescribePowerTypes] = power_types
+        key = client._getCallKey(cluster.DescribePowerTypes, {})
+        call_cache[key] = None, power_types
         result = yield client(cluster.DescribePowerTypes)
         # The result is a copy. It should equal the result but not be
         # the same object.
@@ -563,9 +621,8 @@ class TestRackClient(MAASTestCase):
         call_cache = client._getCallCache()
         result = yield client(cluster.DescribePowerTypes)
         self.assertIs(sentinel.power_types, result)
-        self.assertIs(
-            sentinel.power_types, call_cache[cluster.DescribePowerTypes]
-        )
+        key = client._getCallKey(cluster.DescribePowerTypes, {})
+        self.assertEqual((None, sentinel.power_types), call_cache[key])
 
     @wait_for_reactor
     @inlineCallbacks
@@ -579,7 +636,7 @@ class TestRackClient(MAASTestCase):
         call_cache = client._getCallCache()
         result = yield client(cluster.ListBootImages)
         self.assertIs(sentinel.boot_images, result)
-        self.assertNotIn(cluster.ListBootImages, call_cache)
+        self.assertEqual({}, call_cache)
 
     @wait_for_reactor
     @inlineCallbacks
@@ -599,6 +656,113 @@ class TestRackClient(MAASTestCase):
             value=ANY,
         )
 
+    def test_getCallKey_depends_on_arguments(self):
+        client = RackClient(DummyConnection(), {})
+        osystem = factory.make_name("osystem")
+        key = client._getCallKey(
+            cluster.GetOSReleaseTitle, {"osystem": osystem, "release": "a"}
+        )
+        self.assertEqual(
+            key,
+            client._getCallKey(
+                cluster.GetOSReleaseTitle,
+                {"release": "a", "osystem": osystem, "_timeout": 10},
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            client._getCallKey(
+                cluster.GetOSReleaseTitle,
+                {"osystem": osystem, "release": "b"},
+            ),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_call__expires_result_after_ttl(self):
+        conn = DummyConnection()
+        conn.ident = factory.make_name("ident")
+        callRemote = self.patch(conn, "callRemote")
+        callRemote.side_effect = [
+            succeed(sentinel.osystems),
+            succeed(sentinel.new_osystems),
+        ]
+        client = RackClient(conn, {})
+        client.clock = Clock()
+        result = yield client(cluster.ListOperatingSystems)
+        self.assertIs(sentinel.osystems, result)
+        client.clock.advance(59)
+        result = yield client(cluster.ListOperatingSystems)
+        self.assertEqual(sentinel.osystems, result)
+        client.clock.advance(1)
+        result = yield client(cluster.ListOperatingSystems)
+        self.assertIs(sentinel.new_osystems, result)
+        self.assertEqual(2, callRemote.call_count)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_call__records_cache_metric(self):
+        mock_metrics = self.patch(PROMETHEUS_METRICS, "update")
+        conn = DummyConnection()
+        conn.ident = factory.make_name("ident")
+        self.patch(conn, "callRemote").return_value = succeed({})
+        client = RackClient(conn, {})
+        yield client(cluster.DescribePowerTypes)
+        yield client(cluster.DescribePowerTypes)
+        cache_metric_calls = [
+            metric_call
+            for metric_call in mock_metrics.mock_calls
+            if metric_call[1][0] == "maas_region_rack_rpc_call_cache_requests"
+        ]
+        self.assertEqual(
+            [
+                call(
+                    "maas_region_rack_rpc_call_cache_requests",
+                    "inc",
+                    labels={"call": "DescribePowerTypes", "result": "miss"},
+                ),
+                call(
+                    "maas_region_rack_rpc_call_cache_requests",
+                    "inc",
+                    labels={"call": "DescribePowerTypes", "result": "hit"},
+                ),
+            ],
+            cache_metric_calls,
+        )
+
+    def test_invalidateCallCache_forgets_given_calls(self):
+        cache = {}
+        client = RackClient(DummyConnection(), cache)
+        power_types_key = client._getCallKey(cluster.DescribePowerTypes, {})
+        osystems_key = client._getCallKey(cluster.ListOperatingSystems, {})
+        client._getCallCache().update(
+            {
+                power_types_key: (None, sentinel.power_types),
+                osystems_key: (None, sentinel.osystems),
+            }
+        )
+        client.invalidateCallCache([cluster.ListOperatingSystems])
+        self.assertEqual(
+            {power_types_key: (None, sentinel.power_types)},
+            cache["call_cache"],
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_invalidateCallCache_forgets_calls_in_progress(self):
+        conn = DummyConnection()
+        conn.ident = factory.make_name("ident")
+        d = Deferred()
+        self.patch(conn, "callRemote").return_value = d
+        cache = {}
+        client = RackClient(conn, cache)
+        call_d = client(cluster.ListOperatingSystems)
+        client.invalidateCallCache([cluster.ListOperatingSystems])
+        d.callback(sentinel.osystems)
+        result = yield call_d
+        self.assertIs(sentinel.osystems, result)
+        self.assertEqual({}, cache["call_cache"])
+
 
 class TestRegionService(MAASTestCase):
     def test_init_sets_appropriate_instance_attributes(self):
@@ -901,7 +1065,7 @@ class TestRegionService(MAASTestCase):
         )
 
     @wait_for_reactor
-    def test_getClientFor_returns_random_connection(self):
+    def test_getClientFor_returns_chosen_connection(self):
         c1 = DummyConnection()
         c2 = DummyConnection()
         chosen = DummyConnection()
@@ -915,7 +1079,7 @@ class TestRegionService(MAASTestCase):
             self.assertCountEqual(choices, conns_for_uuid)
             return chosen
 
-        self.patch(random, "choice", check_choice)
+        self.patch(regionservice, "choose_connection", check_choice)
 
         def check(client):
             self.assertThat(client, Equals(RackClient(chosen, {})))
@@ -923,6 +1087,21 @@ class TestRegionService(MAASTestCase):
 
         return service.getClientFor(uuid).addCallback(check)
 
+    @wait_for_reactor
+    def test_getClientFor_prefers_least_loaded_connection(self):
+        busy = DummyConnection()
+        idle = DummyConnection()
+        get_connection_load(busy).in_flight = 1
+
+        service = RegionService(sentinel.ipcWorker)
+        uuid = factory.make_UUID()
+        service.connections[uuid].update({busy, idle})
+
+        def check(client):
+            self.assertThat(client, Equals(RackClient(idle, {})))
+
+        return service.getClientFor(uuid).addCallback(check)
+
     @wait_for_reactor
     def test_getAllClients_empty(self):
         service = RegionService(sentinel.ipcWorker)
@@ -1035,6 +1214,49 @@ class TestRegionService(MAASTestCase):
 
         self.assertEqual({uuid: set()}, service.connections)
 
+    def test_invalidateCallCachesFor_invalidates_connections(self):
+        service = RegionService(sentinel.ipcWorker)
+        uuid = factory.make_UUID()
+        c1 = DummyConnection()
+        c2 = DummyConnection()
+        service._addConnectionFor(uuid, c1)
+        service._addConnectionFor(uuid, c2)
+        key = RackClient(c1, {})._getCallKey(cluster.ListOperatingSystems, {})
+        service.connectionsCache[c1]["call_cache"] = {key: (None, {})}
+        service._invalidateCallCachesFor(uuid, [cluster.ListOperatingSystems])
+        self.assertEqual({}, service.connectionsCache[c1]["call_cache"])
+        self.assertNotIn(c2, service.connectionsCache)
+
+    def test_invalidateCallCachesFor_is_okay_without_connections(self):
+        service = RegionService(sentinel.ipcWorker)
+        service._invalidateCallCachesFor(
+            factory.make_UUID(), [cluster.ListOperatingSystems]
+        )
+        self.assertEqual({}, service.connections)
+
+    def test_imageSyncUpdated_invalidates_boot_image_calls(self):
+        service = RegionService(sentinel.ipcWorker)
+        invalidate = self.patch(service, "_invalidateCallCachesFor")
+        system_id = factory.make_name("system_id")
+        service._imageSyncUpdated("sys_image_sync", system_id)
+        self.assertThat(
+            invalidate,
+            MockCalledOnceWith(system_id, RackClient.boot_image_calls),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_listens_for_image_syncs_while_running(self):
+        listener = FakePostgresListenerService()
+        service = RegionService(sentinel.ipcWorker, listener)
+        self.patch(service, "endpoints", [])
+        yield service.startService()
+        self.assertEqual(
+            [service._imageSyncUpdated], listener.listeners["sys_image_sync"]
+        )
+        yield service.stopService()
+        self.assertEqual([], listener.listeners["sys_image_sync"])
+
     def test_removeConnectionFor_fires_disconnected_event(self):
         service = RegionService(sentinel.ipcWorker)
         uuid = factory.make_UUID()
@@ -71,7 +71,9 @@ from provisioningserver.rpc.region import (
     SendEvent,
     SendEventMACAddress,
     UpdateLease,
+    UpdateLeases,
     UpdateNodePowerState,
+    UpdateNodePowerStates,
     UpdateServices,
 )
 from provisioningserver.rpc.testing import (
@@ -269,6 +271,71 @@ class TestRegionProtocol_UpdateLease(MAASTransactionServerTestCase):
         # works as expected.
 
 
+class TestRegionProtocol_UpdateLeases(MAASTransactionServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def make_lease(self):
+        return {
+            "action": "expiry",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+        }
+
+    def test_update_leases_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateLeases.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_update_leases(self):
+        update_leases = self.patch(regionservice, "update_leases")
+        leases = [self.make_lease(), self.make_lease()]
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(),
+                UpdateLeases,
+                {"cluster_uuid": factory.make_name("uuid"), "leases": leases},
+            )
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        # Optional arguments that were not given are passed as None.
+        for lease in leases:
+            lease.update(lease_time=None, hostname=None)
+        self.assertThat(update_leases, MockCalledOnceWith(leases))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_doesnt_raises_other_errors(self):
+        self.patch(
+            regionservice, "update_leases"
+        ).side_effect = factory.make_exception()
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(),
+                UpdateLeases,
+                {
+                    "cluster_uuid": factory.make_name("uuid"),
+                    "leases": [self.make_lease()],
+                },
+            )
+        finally:
+            yield eventloop.reset()
+
+        # Test is that no exceptions are raised. If this test passes then all
+        # works as expected.
+
+
 class TestRegionProtocol_GetBootConfig(MAASTransactionServerTestCase):
     def test_get_boot_config_is_registered(self):
         protocol = Region()
@@ -625,6 +692,48 @@ class TestRegionProtocol_UpdateNodePowerState(MAASTransactionServerTestCase):
         return d.addErrback(check)
 
 
+class TestRegionProtocol_UpdateNodePowerStates(MAASTransactionServerTestCase):
+    @transactional
+    def create_node(self, power_state):
+        node = factory.make_Node(power_state=power_state)
+        return node
+
+    @transactional
+    def get_node_power_state(self, system_id):
+        node = Node.objects.get(system_id=system_id)
+        return node.power_state
+
+    def test_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateNodePowerStates.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_changes_power_states_and_returns_missing(self):
+        power_state = factory.pick_enum(POWER_STATE)
+        node = yield deferToDatabase(self.create_node, power_state)
+        system_id = factory.make_name("unknown-system-id")
+
+        new_state = factory.pick_enum(POWER_STATE, but_not=[power_state])
+        response = yield call_responder(
+            Region(),
+            UpdateNodePowerStates,
+            {
+                "power_states": [
+                    {"system_id": node.system_id, "power_state": new_state},
+                    {"system_id": system_id, "power_state": new_state},
+                ]
+            },
+        )
+
+        self.assertEqual({"missing": [system_id]}, response)
+        db_state = yield deferToDatabase(
+            self.get_node_power_state, node.system_id
+        )
+        self.assertEqual(new_state, db_state)
+
+
 class TestRegionProtocol_RegisterEventType(MAASTransactionServerTestCase):
     def test_register_event_type_is_registered(self):
         protocol = Region()
@@ -4,6 +4,7 @@
 """Boot Resources."""
 
 __all__ = [
+    "get_subnets_utilisation_snapshot",
     "get_subnets_utilisation_stats",
     "StatsService",
     "STATS_SERVICE_PERIOD",
@@ -11,10 +12,13 @@ __all__ = [
 
 import base64
 from collections import Counter, defaultdict
+from copy import deepcopy
 from datetime import timedelta
 import json
+import time
 
 from django.db.models import Case, Count, F, Max, When
+from netaddr import IPAddress, IPNetwork
 import requests
 from twisted.application.internet import TimerService
 
@@ -29,12 +33,14 @@ from maasserver.models import (
     BootResourceFile,
     Config,
     Fabric,
+    IPRange,
     Machine,
     Node,
     OwnerData,
     Pod,
     Space,
     StaticIPAddress,
+    StaticRoute,
     Subnet,
     VLAN,
     VMCluster,
@@ -50,7 +56,6 @@ from provisioningserver.logger import LegacyLogger
 from provisioningserver.refresh.node_info_scripts import (
     COMMISSIONING_OUTPUT_NAME,
 )
-from provisioningserver.utils.network import IPRangeStatistics
 
 log = LegacyLogger()
 
@@ -214,58 +219,190 @@ def get_subnets_stats():
     }
 
 
+def _get_iprange_usage_stats(network, used):
+    """Return utilisation figures for `network`, given the ranges in use.
+
+    This gives the same figures as `IPRangeStatistics` does for the result of
+    `Subnet.get_iprange_usage()`, but works on plain integers rather than
+    building `MAASIPSet`s.
+
+    :param network: the `IPNetwork` of the subnet.
+    :param used: a list of `(first, last, purpose)` tuples for the addresses
+        in use, as `Subnet.get_ipranges_in_use()` would return.
+    """
+    # Combine overlapping ranges, keeping all of their purposes.
+    combined = []
+    for first, last, purpose in sorted(used):
+        if len(combined) > 0 and first <= combined[-1][1]:
+            combined[-1][1] = max(combined[-1][1], last)
+            combined[-1][2].add(purpose)
+        else:
+            combined.append([first, last, {purpose}])
+    # Count the unused addresses between the combined ranges, leaving out the
+    # network and broadcast addresses like `MAASIPSet.get_unused_ranges()`.
+    if network.version == 4:
+        single_host = network.prefixlen in (31, 32)
+        start = network.first if single_host else network.first + 1
+        end = network.last if single_host else network.last - 1
+    else:
+        single_host = network.prefixlen in (127, 128)
+        start = network.first if single_host else network.first + 1
+        end = network.last
+    usage = {
+        "available": 0,
+        "unavailable": 0,
+        "dynamic": 0,
+        "reserved": 0,
+        "static": 0,
+    }
+    candidate = start
+    for first, last, purposes in combined:
+        size = last - first + 1
+        usage["unavailable"] += size
+        if IPRANGE_TYPE.DYNAMIC in purposes:
+            usage["dynamic"] += size
+        elif IPRANGE_TYPE.RESERVED in purposes:
+            usage["reserved"] += size
+        elif "assigned-ip" in purposes:
+            usage["static"] += size
+        if first > candidate:
+            usage["available"] += first - candidate
+        candidate = last + 1
+    if end >= candidate:
+        usage["available"] += end - candidate + 1
+    return usage
+
+
+def _get_subnets_ipranges_in_use():
+    """Return the ranges in use on every subnet.
+
+    The ranges match those `Subnet.get_ipranges_in_use()` returns, as lists
+    of `(first, last, purpose)` tuples, but are found for all subnets with a
+    few queries.
+
+    :return: a `(subnets, ranges, ips_count)` tuple, where `subnets` maps
+        subnet IDs to `(cidr, IPNetwork)`, `ranges` maps subnet IDs to the
+        ranges in use, and `ips_count` maps subnet IDs to the number of
+        allocated IP addresses of each type.
+    """
+    subnets = {}
+    ranges = defaultdict(list)
+    ips_count = defaultdict(lambda: defaultdict(int))
+    rows = Subnet.objects.values_list(
+        "id", "cidr", "gateway_ip", "dns_servers"
+    )
+    for subnet_id, cidr, gateway_ip, dns_servers in rows:
+        network = IPNetwork(cidr)
+        subnets[subnet_id] = (cidr, network)
+        in_use = ranges[subnet_id]
+        if network.version == 6:
+            if network.prefixlen == 64:
+                in_use.append(
+                    (network.first + 1, network.first + 0xFFFFFFFF, "reserved")
+                )
+            if network.prefixlen < 127:
+                in_use.append((network.first, network.first, "rfc-4291-2.6.1"))
+        if gateway_ip and gateway_ip in network:
+            value = IPAddress(gateway_ip).value
+            in_use.append((value, value, "gateway-ip"))
+        for server in dns_servers or ():
+            if server in network:
+                value = IPAddress(server).value
+                in_use.append((value, value, "dns-server"))
+    rows = StaticRoute.objects.values_list("source_id", "gateway_ip")
+    for subnet_id, gateway_ip in rows:
+        value = IPAddress(gateway_ip).value
+        ranges[subnet_id].append((value, value, "gateway-ip"))
+    rows = StaticIPAddress.objects.filter(ip__isnull=False).values_list(
+        "subnet_id", "ip", "alloc_type"
+    )
+    for subnet_id, ip, alloc_type in rows:
+        ips_count[subnet_id][alloc_type] += 1
+        if subnet_id in subnets and ip:
+            address = IPAddress(ip)
+            if address in subnets[subnet_id][1]:
+                ranges[subnet_id].append(
+                    (address.value, address.value, "assigned-ip")
+                )
+    rows = IPRange.objects.filter(
+        type__in=(IPRANGE_TYPE.DYNAMIC, IPRANGE_TYPE.RESERVED)
+    ).values_list("subnet_id", "start_ip", "end_ip", "type")
+    for subnet_id, start_ip, end_ip, iprange_type in rows:
+        ranges[subnet_id].append(
+            (IPAddress(start_ip).value, IPAddress(end_ip).value, iprange_type)
+        )
+    return subnets, ranges, ips_count
+
+
 def get_subnets_utilisation_stats():
     """Return a dict mapping subnet CIDRs to their utilisation details."""
-    ips_count = _get_subnets_ipaddress_count()
-
+    subnets, ranges, ips_count = _get_subnets_ipranges_in_use()
     stats = {}
-    for subnet in Subnet.objects.all():
-        full_range = subnet.get_iprange_usage()
-        range_stats = IPRangeStatistics(subnet.get_iprange_usage())
-        static = 0
-        reserved_available = 0
-        reserved_used = 0
-        dynamic_available = 0
-        dynamic_used = 0
-        for rng in full_range.ranges:
-            if IPRANGE_TYPE.DYNAMIC in rng.purpose:
-                dynamic_available += rng.num_addresses
-            elif IPRANGE_TYPE.RESERVED in rng.purpose:
-                reserved_available += rng.num_addresses
-            elif "assigned-ip" in rng.purpose:
-                static += rng.num_addresses
+    for subnet_id, (cidr, network) in subnets.items():
+        usage = _get_iprange_usage_stats(network, ranges[subnet_id])
         # allocated IPs
-        subnet_ips = ips_count[subnet.id]
-        reserved_used += subnet_ips[IPADDRESS_TYPE.USER_RESERVED]
-        reserved_available -= reserved_used
-        dynamic_used += (
+        subnet_ips = ips_count[subnet_id]
+        reserved_used = subnet_ips[IPADDRESS_TYPE.USER_RESERVED]
+        dynamic_used = (
             subnet_ips[IPADDRESS_TYPE.AUTO]
             + subnet_ips[IPADDRESS_TYPE.DHCP]
             + subnet_ips[IPADDRESS_TYPE.DISCOVERED]
         )
-        dynamic_available -= dynamic_used
-        stats[subnet.cidr] = {
-            "available": range_stats.num_available,
-            "unavailable": range_stats.num_unavailable,
-            "dynamic_available": dynamic_available,
+        stats[cidr] = {
+            "available": usage["available"],
+            "unavailable": usage["unavailable"],
+            "dynamic_available": usage["dynamic"] - dynamic_used,
             "dynamic_used": dynamic_used,
-            "static": static,
-            "reserved_available": reserved_available,
+            "static": usage["static"],
+            "reserved_available": usage["reserved"] - reserved_used,
             "reserved_used": reserved_used,
         }
     return stats
 
 
-def _get_subnets_ipaddress_count():
-    counts = defaultdict(lambda: defaultdict(int))
-    rows = (
-        StaticIPAddress.objects.values("subnet_id", "alloc_type")
-        .filter(ip__isnull=False)
-        .annotate(count=Count("ip"))
+# Subnet utilisation stats are computed again after this long, even when the
+# subnets appear to be unchanged. (Updates made with `QuerySet.update()` do
+# not change the `updated` timestamps.)
+SUBNETS_UTILISATION_MAX_AGE = timedelta(minutes=5)
+
+# The last result of `get_subnets_utilisation_stats()` in this process, as a
+# `(time, fingerprint, stats)` tuple.
+_subnets_utilisation_snapshot = None
+
+
+def _get_subnets_utilisation_fingerprint():
+    """Return a value that changes when subnet utilisation may have changed."""
+    return tuple(
+        tuple(
+            model.objects.aggregate(
+                count=Count("id"), updated=Max("updated")
+            ).values()
+        )
+        for model in (Subnet, IPRange, StaticRoute, StaticIPAddress)
     )
-    for row in rows:
-        counts[row["subnet_id"]][row["alloc_type"]] = row["count"]
-    return counts
+
+
+def get_subnets_utilisation_snapshot():
+    """Return `get_subnets_utilisation_stats()`, reusing a recent result.
+
+    The result is shared by everything in this process that reports subnet
+    utilisation. It is reused for up to `SUBNETS_UTILISATION_MAX_AGE`, unless
+    a subnet, IP range, static route, or IP address is changed.
+    """
+    global _subnets_utilisation_snapshot
+    fingerprint = _get_subnets_utilisation_fingerprint()
+    snapshot = _subnets_utilisation_snapshot
+    if snapshot is not None:
+        when, snapshot_fingerprint, stats = snapshot
+        age = time.monotonic() - when
+        if (
+            snapshot_fingerprint == fingerprint
+            and age < SUBNETS_UTILISATION_MAX_AGE.total_seconds()
+        ):
+            return deepcopy(stats)
+    stats = get_subnets_utilisation_stats()
+    _subnets_utilisation_snapshot = (time.monotonic(), fingerprint, stats)
+    return deepcopy(stats)
 
 
 def get_workload_annotations_stats():
@@ -25,6 +25,7 @@ from django.db import (
 )
 from django.db.utils import IntegrityError, OperationalError
 
+from maasserver.clusterrpc import boot_config, external_config
 from maasserver.fields import register_mac_type
 from maasserver.models import signals
 from maasserver.testing.fixtures import (
@@ -59,6 +60,16 @@ class MAASRegionTestCaseBase(PostCommitHooksTestMixin):
     mock_cache_boot_source = True
     mock_delete_large_object_content_later = True
 
+    # Boot configuration invalidations are sent to rack controllers after the
+    # commit, and are triggered by saving nodes and settings. Tests that want
+    # them must set this to False.
+    mock_invalidate_boot_configs = True
+
+    # New versions of the external services configuration are recorded and
+    # announced to rack controllers when controllers, subnets and settings
+    # change. Tests that want them must set this to False.
+    mock_announce_external_config = True
+
     @property
     def client(self):
         """Create a client on demand, and cache it.
@@ -91,6 +102,10 @@ class MAASRegionTestCaseBase(PostCommitHooksTestMixin):
             self.patch(signals.bootsources, "post_commit_do")
         if self.mock_delete_large_object_content_later:
             self.patch(signals.largefiles, "post_commit_do")
+        if self.mock_invalidate_boot_configs:
+            self.patch(boot_config, "boot_config_invalidations")
+        if self.mock_announce_external_config:
+            self.patch(external_config, "external_config_changes")
 
     def setUpFixtures(self):
         """This should be called by a subclass once other set-up is done."""
@@ -4,6 +4,7 @@
 
 from datetime import datetime
 from email.utils import format_datetime
+import hashlib
 import http.client
 from io import BytesIO
 import json
@@ -19,7 +20,7 @@ from urllib.parse import urljoin
 
 from django.conf import settings
 from django.db import connections, transaction
-from django.http import StreamingHttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.urls import reverse
 from fixtures import FakeLogger, Fixture
 from testtools.matchers import Contains, ContainsAll, Equals, HasLength, Not
@@ -32,9 +33,12 @@ from maasserver.bootresources import (
     BootResourceStore,
     download_all_boot_resources,
     download_boot_resources,
+    FileRangeWrapper,
+    get_byte_range,
     get_simplestream_endpoint,
     set_global_default_releases,
     SimpleStreamsHandler,
+    StoreMigrationWrapper,
 )
 from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
 from maasserver.components import (
@@ -47,6 +51,7 @@ from maasserver.enum import (
     BOOT_RESOURCE_TYPE,
     COMPONENT,
 )
+from maasserver.largefilestore import LargeFileStore
 from maasserver.listener import PostgresListenerService
 from maasserver.models import (
     BootResource,
@@ -486,6 +491,52 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         self.assertIsInstance(response, StreamingHttpResponse)
 
 
+def make_file_for_client():
+    """Make a committed boot resource file; return its content and URL."""
+    # Set up the database information inside of a transaction. This is
+    # done so the information is committed. As the new connection needs
+    # to be able to access the data.
+    with transaction.atomic():
+        os = factory.make_name("os")
+        series = factory.make_name("series")
+        arch = factory.make_name("arch")
+        subarch = factory.make_name("subarch")
+        name = f"{os}/{series}"
+        architecture = f"{arch}/{subarch}"
+        version = factory.make_name("version")
+        filetype = factory.pick_enum(BOOT_RESOURCE_FILE_TYPE)
+        # We set the filename to the same value as filetype, as in most
+        # cases this will always be true. The simplestreams content from
+        # maas.io, is formatted this way.
+        filename = filetype
+        size = randint(1024, 2048)
+        content = factory.make_bytes(size=size)
+        resource = factory.make_BootResource(
+            rtype=BOOT_RESOURCE_TYPE.SYNCED,
+            name=name,
+            architecture=architecture,
+        )
+        resource_set = factory.make_BootResourceSet(resource, version=version)
+        largefile = factory.make_LargeFile(content=content, size=size)
+        factory.make_BootResourceFile(
+            resource_set, largefile, filename=filename, filetype=filetype
+        )
+    return (
+        content,
+        reverse(
+            "simplestreams_file_handler",
+            kwargs={
+                "os": os,
+                "arch": arch,
+                "subarch": subarch,
+                "series": series,
+                "version": version,
+                "filename": filename,
+            },
+        ),
+    )
+
+
 class TestConnectionWrapper(MAASTransactionServerTestCase):
     """Tests the use of StreamingHttpResponse(ConnectionWrapper(stream)).
 
@@ -494,52 +545,6 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
     the actual content, the transaction to create the data needs be committed.
     """
 
-    def make_file_for_client(self):
-        # Set up the database information inside of a transaction. This is
-        # done so the information is committed. As the new connection needs
-        # to be able to access the data.
-        with transaction.atomic():
-            os = factory.make_name("os")
-            series = factory.make_name("series")
-            arch = factory.make_name("arch")
-            subarch = factory.make_name("subarch")
-            name = f"{os}/{series}"
-            architecture = f"{arch}/{subarch}"
-            version = factory.make_name("version")
-            filetype = factory.pick_enum(BOOT_RESOURCE_FILE_TYPE)
-            # We set the filename to the same value as filetype, as in most
-            # cases this will always be true. The simplestreams content from
-            # maas.io, is formatted this way.
-            filename = filetype
-            size = randint(1024, 2048)
-            content = factory.make_bytes(size=size)
-            resource = factory.make_BootResource(
-                rtype=BOOT_RESOURCE_TYPE.SYNCED,
-                name=name,
-                architecture=architecture,
-            )
-            resource_set = factory.make_BootResourceSet(
-                resource, version=version
-            )
-            largefile = factory.make_LargeFile(content=content, size=size)
-            factory.make_BootResourceFile(
-                resource_set, largefile, filename=filename, filetype=filetype
-            )
-        return (
-            content,
-            reverse(
-                "simplestreams_file_handler",
-                kwargs={
-                    "os": os,
-                    "arch": arch,
-                    "subarch": subarch,
-                    "series": series,
-                    "version": version,
-                    "filename": filename,
-                },
-            ),
-        )
-
     def read_response(self, response):
         """Read the streaming_content from the response.
 
@@ -548,7 +553,7 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
         return b"".join(response.streaming_content)
 
     def test_download_calls__get_new_connection(self):
-        content, url = self.make_file_for_client()
+        content, url = make_file_for_client()
         mock_get_new_connection = self.patch(
             bootresources.ConnectionWrapper, "_get_new_connection"
         )
@@ -559,7 +564,7 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
         self.assertThat(mock_get_new_connection, MockCalledOnceWith())
 
     def test_download_connection_is_not_same_as_django_connections(self):
-        content, url = self.make_file_for_client()
+        content, url = make_file_for_client()
 
         class AssertConnectionWrapper(bootresources.ConnectionWrapper):
             def _set_up(self):
@@ -609,6 +614,187 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
         )
 
 
+class TestFilesHandlerWithStore(MAASTransactionServerTestCase):
+    """Tests for serving boot resource files from the `LargeFileStore`."""
+
+    def setUp(self):
+        super().setUp()
+        self.store = LargeFileStore(self.make_dir())
+        self.patch(bootresources, "largefile_store", self.store)
+
+    def make_file_for_client(self, in_store=False):
+        content, url = make_file_for_client()
+        sha256 = hashlib.sha256(content).hexdigest()
+        with transaction.atomic():
+            Config.objects.set_config("boot_resources_storage", "filesystem")
+        if in_store:
+            writer = self.store.writer(sha256)
+            writer.write(content)
+            writer.commit()
+        return content, sha256, url
+
+    def test_database_storage_does_not_use_store(self):
+        content, sha256, url = self.make_file_for_client()
+        with transaction.atomic():
+            Config.objects.set_config("boot_resources_storage", "database")
+        response = MAASSensibleClient().get(url)
+        self.assertEqual(content, b"".join(response.streaming_content))
+        response.close()
+        self.assertFalse(self.store.has_file(sha256))
+
+    def test_copies_content_into_store(self):
+        content, sha256, url = self.make_file_for_client()
+        response = MAASSensibleClient().get(url)
+        self.assertEqual(content, b"".join(response.streaming_content))
+        response.close()
+        with self.store.open(sha256) as stream:
+            self.assertEqual(content, stream.read())
+
+    def test_discards_copy_of_incomplete_download(self):
+        content, sha256, url = self.make_file_for_client()
+        response = MAASSensibleClient().get(url)
+        next(iter(response.streaming_content))
+        response.close()
+        self.assertFalse(self.store.has_file(sha256))
+        self.assertEqual(
+            [], os.listdir(os.path.join(self.store.path, sha256[:2]))
+        )
+
+    def test_serves_content_from_store(self):
+        content, sha256, url = self.make_file_for_client(in_store=True)
+        mock_wrapper = self.patch(bootresources, "ConnectionWrapper")
+        response = MAASSensibleClient().get(url)
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual("bytes", response["Accept-Ranges"])
+        self.assertEqual(content, b"".join(response.streaming_content))
+        response.close()
+        self.assertThat(mock_wrapper, MockNotCalled())
+
+    def test_serves_range_from_store(self):
+        content, sha256, url = self.make_file_for_client(in_store=True)
+        response = MAASSensibleClient().get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(http.client.PARTIAL_CONTENT, response.status_code)
+        self.assertEqual(
+            "bytes 10-19/%d" % len(content), response["Content-Range"]
+        )
+        self.assertEqual(content[10:20], b"".join(response.streaming_content))
+        response.close()
+
+    def test_rejects_unsatisfiable_range(self):
+        content, sha256, url = self.make_file_for_client(in_store=True)
+        response = MAASSensibleClient().get(
+            url, HTTP_RANGE="bytes=%d-" % len(content)
+        )
+        self.assertEqual(
+            http.client.REQUESTED_RANGE_NOT_SATISFIABLE, response.status_code
+        )
+        self.assertEqual(
+            "bytes */%d" % len(content), response["Content-Range"]
+        )
+
+    def test_redirects_reverse_proxy_to_store(self):
+        content, sha256, url = self.make_file_for_client(in_store=True)
+        response = MAASSensibleClient().get(
+            url, HTTP_X_SENDFILE_TYPE="X-Accel-Redirect"
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(
+            "/image-store/%s/%s" % (sha256[:2], sha256),
+            response["X-Accel-Redirect"],
+        )
+        self.assertEqual(b"", response.content)
+
+    def test_does_not_redirect_reverse_proxy_when_not_in_store(self):
+        content, sha256, url = self.make_file_for_client()
+        response = MAASSensibleClient().get(
+            url, HTTP_X_SENDFILE_TYPE="X-Accel-Redirect"
+        )
+        self.assertFalse(response.has_header("X-Accel-Redirect"))
+        self.assertEqual(content, b"".join(response.streaming_content))
+        response.close()
+        self.assertTrue(self.store.has_file(sha256))
+
+
+class TestStoreMigrationWrapper(MAASTestCase):
+    def make_wrapper(self, *chunks):
+        content = b"".join(chunks)
+        sha256 = hashlib.sha256(content).hexdigest()
+        store = LargeFileStore(self.make_dir())
+        stream = MagicMock()
+        stream.__next__.side_effect = [*chunks, StopIteration()]
+        wrapper = StoreMigrationWrapper(stream, store.writer(sha256))
+        return wrapper, store, sha256
+
+    def test_copies_content_into_store(self):
+        chunks = [factory.make_bytes() for _ in range(3)]
+        wrapper, store, sha256 = self.make_wrapper(*chunks)
+        self.assertEqual(chunks, list(wrapper))
+        wrapper.close()
+        self.assertTrue(store.has_file(sha256))
+        self.assertThat(wrapper.stream.close, MockCalledOnceWith())
+
+    def test_discards_incomplete_copy_on_close(self):
+        wrapper, store, sha256 = self.make_wrapper(
+            factory.make_bytes(), factory.make_bytes()
+        )
+        next(wrapper)
+        wrapper.close()
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.join(store.path, sha256[:2])))
+
+    def test_keeps_streaming_when_copy_fails(self):
+        chunks = [factory.make_bytes() for _ in range(3)]
+        wrapper, store, sha256 = self.make_wrapper(*chunks)
+        self.patch(wrapper.writer, "write").side_effect = OSError()
+        with FakeLogger("maas") as logger:
+            self.assertEqual(chunks, list(wrapper))
+        self.assertFalse(store.has_file(sha256))
+        self.assertIn(
+            "Unable to store boot resource file %s" % sha256, logger.output
+        )
+
+
+class TestFileRangeWrapper(MAASTestCase):
+    def test_iterates_over_range(self):
+        content = factory.make_bytes(size=100)
+        wrapper = FileRangeWrapper(BytesIO(content), 10, 90)
+        wrapper.block_size = 7
+        self.assertEqual(content[10:90], b"".join(wrapper))
+
+    def test_close_closes_stream(self):
+        stream = BytesIO(factory.make_bytes())
+        FileRangeWrapper(stream, 0, 1).close()
+        self.assertTrue(stream.closed)
+
+
+class TestGetByteRange(MAASTestCase):
+
+    scenarios = (
+        ("empty", {"header": "", "expected": None}),
+        ("malformed", {"header": "bytes=a-b", "expected": None}),
+        ("multiple", {"header": "bytes=0-1,5-6", "expected": None}),
+        ("other-unit", {"header": "items=0-1", "expected": None}),
+        ("no-bounds", {"header": "bytes=-", "expected": None}),
+        ("reversed", {"header": "bytes=5-1", "expected": None}),
+        ("bounded", {"header": "bytes=10-19", "expected": (10, 20)}),
+        ("clipped", {"header": "bytes=90-199", "expected": (90, 100)}),
+        ("open", {"header": "bytes=10-", "expected": (10, 100)}),
+        ("suffix", {"header": "bytes=-10", "expected": (90, 100)}),
+        ("long-suffix", {"header": "bytes=-200", "expected": (0, 100)}),
+    )
+
+    def test_get_byte_range(self):
+        self.assertEqual(self.expected, get_byte_range(self.header, 100))
+
+
+class TestGetByteRangeUnsatisfiable(MAASTestCase):
+    def test_raises_for_start_beyond_size(self):
+        self.assertRaises(ValueError, get_byte_range, "bytes=100-", 100)
+
+    def test_raises_for_empty_suffix(self):
+        self.assertRaises(ValueError, get_byte_range, "bytes=-0", 100)
+
+
 def make_product(ftype=None, kflavor=None, subarch=None):
     """Make product dictionary that is just like the one provided
     from simplsetreams."""
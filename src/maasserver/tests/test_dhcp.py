@@ -49,15 +49,25 @@ from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from maastesting.crochet import wait_for
 from maastesting.djangotestcase import count_queries
-from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.matchers import (
+    MockCalledOnce,
+    MockCalledOnceWith,
+    MockNotCalled,
+)
+from maastesting.testcase import MAASTestCase
 from maastesting.twisted import always_fail_with, always_succeed_with
 from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4,
     ConfigureDHCPv6,
+    UpdateDHCPv4,
+    UpdateDHCPv6,
     ValidateDHCPv4Config,
     ValidateDHCPv6Config,
 )
-from provisioningserver.rpc.exceptions import CannotConfigureDHCP
+from provisioningserver.rpc.exceptions import (
+    CannotConfigureDHCP,
+    DHCPConfigVersionMismatch,
+)
 from provisioningserver.utils.twisted import synchronous
 
 wait_for_reactor = wait_for()
@@ -2559,14 +2569,18 @@ class TestGetDHCPConfiguration(MAASServerTestCase):
 class TestConfigureDHCP(MAASTransactionServerTestCase):
     """Tests for `configure_dhcp`."""
 
+    def setUp(self):
+        super().setUp()
+        self.patch(dhcp, "_acknowledged_dhcp_configs", {})
+
     @synchronous
-    def prepare_rpc(self, rack_controller):
+    def prepare_rpc(self, rack_controller, *commands):
         """Set up test case for speaking RPC to `rack_controller`."""
         self.useFixture(RegionEventLoopFixture("rpc"))
         self.useFixture(RunningEventLoopFixture())
         fixture = self.useFixture(MockLiveRegionToClusterRPCFixture())
         cluster = fixture.makeCluster(
-            rack_controller, ConfigureDHCPv4, ConfigureDHCPv6
+            rack_controller, ConfigureDHCPv4, ConfigureDHCPv6, *commands
         )
         return (
             cluster,
@@ -2677,6 +2691,7 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
                 hosts=config.hosts_v4,
                 interfaces=interfaces_v4,
                 global_dhcp_snippets=config.global_dhcp_snippets,
+                version=ANY,
             ),
         )
         self.assertThat(
@@ -2689,6 +2704,7 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
                 hosts=config.hosts_v6,
                 interfaces=interfaces_v6,
                 global_dhcp_snippets=config.global_dhcp_snippets,
+                version=ANY,
             ),
         )
 
@@ -2872,6 +2888,176 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
 
         yield deferToDatabase(service_status_updated)
 
+    def prepare_update_rpc(self, rack_controller):
+        """Set up test case for speaking RPC to `rack_controller`, which
+        also supports `UpdateDHCPv4` and `UpdateDHCPv6`."""
+        protocol, ipv4_stub, ipv6_stub = self.prepare_rpc(
+            rack_controller, UpdateDHCPv4, UpdateDHCPv6
+        )
+        stubs = [
+            ipv4_stub,
+            ipv6_stub,
+            getattr(protocol, UpdateDHCPv4.commandName.decode("ascii")),
+            getattr(protocol, UpdateDHCPv6.commandName.decode("ascii")),
+        ]
+        for stub in stubs:
+            stub.side_effect = always_succeed_with({})
+        return stubs
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_changes_after_acknowledged_configuration(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        stubs = yield deferToThread(self.prepare_update_rpc, rack_controller)
+        ipv4_stub, ipv6_stub, update_v4_stub, update_v6_stub = stubs
+
+        yield dhcp.configure_dhcp(rack_controller)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertThat(ipv4_stub, MockCalledOnce())
+        self.assertThat(ipv6_stub, MockCalledOnce())
+        version_v4 = ipv4_stub.call_args[1]["version"]
+        self.assertThat(
+            update_v4_stub,
+            MockCalledOnceWith(
+                ANY,
+                omapi_key=config.omapi_key,
+                base_version=version_v4,
+                version=version_v4,
+                removed_hosts=[],
+                changed_hosts=[],
+            ),
+        )
+        self.assertThat(update_v6_stub, MockCalledOnce())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_full_configuration_on_version_mismatch(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        stubs = yield deferToThread(self.prepare_update_rpc, rack_controller)
+        ipv4_stub, ipv6_stub, update_v4_stub, update_v6_stub = stubs
+        update_v4_stub.side_effect = always_fail_with(
+            DHCPConfigVersionMismatch()
+        )
+
+        yield dhcp.configure_dhcp(rack_controller)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertEqual(2, ipv4_stub.call_count)
+        self.assertThat(update_v4_stub, MockCalledOnce())
+        self.assertThat(ipv6_stub, MockCalledOnce())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_full_configuration_to_racks_without_updates(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc, rack_controller
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+
+        yield dhcp.configure_dhcp(rack_controller)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertEqual(2, ipv4_stub.call_count)
+        self.assertEqual(2, ipv6_stub.call_count)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_full_configuration_after_failure(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        stubs = yield deferToThread(self.prepare_update_rpc, rack_controller)
+        ipv4_stub, ipv6_stub, update_v4_stub, update_v6_stub = stubs
+        ipv4_stub.side_effect = always_fail_with(CannotConfigureDHCP())
+
+        with ExpectedException(CannotConfigureDHCP):
+            yield dhcp.configure_dhcp(rack_controller)
+        ipv4_stub.side_effect = always_succeed_with({})
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertEqual(2, ipv4_stub.call_count)
+        self.assertThat(update_v4_stub, MockNotCalled())
+
+
+class TestGetDHCPConfigChanges(MAASTestCase):
+    """Tests for `get_dhcp_config_changes` and `get_dhcp_config_version`."""
+
+    def make_host(self, **host):
+        host.setdefault("host", factory.make_name("host"))
+        host.setdefault("mac", factory.make_mac_address())
+        host.setdefault("ip", factory.make_ipv4_address())
+        host.setdefault("dhcp_snippets", [])
+        return host
+
+    def make_arguments(self, **arguments):
+        arguments.setdefault("omapi_key", factory.make_name("omapi_key"))
+        arguments.setdefault("failover_peers", [])
+        arguments.setdefault(
+            "shared_networks", [{"name": "vlan-1", "subnets": []}]
+        )
+        arguments.setdefault("hosts", [self.make_host() for _ in range(3)])
+        arguments.setdefault("interfaces", [{"name": "eth0"}])
+        arguments.setdefault("global_dhcp_snippets", [])
+        return arguments
+
+    def test_version_ignores_argument_order(self):
+        arguments = self.make_arguments()
+        self.assertEqual(
+            dhcp.get_dhcp_config_version(arguments),
+            dhcp.get_dhcp_config_version(dict(reversed(arguments.items()))),
+        )
+
+    def test_version_changes_with_configuration(self):
+        arguments = self.make_arguments()
+        other_arguments = dict(arguments, hosts=arguments["hosts"][1:])
+        self.assertNotEqual(
+            dhcp.get_dhcp_config_version(arguments),
+            dhcp.get_dhcp_config_version(other_arguments),
+        )
+
+    def test_no_changes(self):
+        arguments = self.make_arguments()
+        self.assertEqual(
+            {
+                "omapi_key": arguments["omapi_key"],
+                "removed_hosts": [],
+                "changed_hosts": [],
+            },
+            dhcp.get_dhcp_config_changes(arguments, arguments),
+        )
+
+    def test_host_changes(self):
+        old = self.make_arguments()
+        kept, removed, modified = old["hosts"]
+        modified = dict(modified, ip=factory.make_ipv4_address())
+        added = self.make_host()
+        new = dict(old, hosts=[kept, modified, added])
+        changes = dhcp.get_dhcp_config_changes(old, new)
+        self.assertEqual([removed["mac"]], changes["removed_hosts"])
+        self.assertEqual([modified, added], changes["changed_hosts"])
+
+    def test_other_changes(self):
+        old = self.make_arguments()
+        new = dict(old, shared_networks=[], interfaces=[{"name": "eth1"}])
+        changes = dhcp.get_dhcp_config_changes(old, new)
+        self.assertEqual([], changes["shared_networks"])
+        self.assertEqual([{"name": "eth1"}], changes["interfaces"])
+        self.assertNotIn("failover_peers", changes)
+        self.assertNotIn("global_dhcp_snippets", changes)
+
 
 class TestValidateDHCPConfig(MAASTransactionServerTestCase):
     """Tests for `validate_dhcp_config`."""
@@ -28,7 +28,12 @@ from maasserver import (
 from maasserver.eventloop import MAASServices
 from maasserver.prometheus.service import REGION_PROMETHEUS_PORT
 from maasserver.prometheus.stats import PrometheusService
-from maasserver.regiondservices import ntp, service_monitor_service, syslog
+from maasserver.regiondservices import (
+    config_cache,
+    ntp,
+    service_monitor_service,
+    syslog,
+)
 from maasserver.regiondservices.certificate_expiration_check import (
     CertificateExpirationCheckService,
 )
@@ -357,8 +362,11 @@ class TestFactories(MAASServerTestCase):
         )
 
     def test_make_RegionService(self):
-        service = eventloop.make_RegionService(sentinel.ipcWorker)
+        service = eventloop.make_RegionService(
+            sentinel.ipcWorker, sentinel.listener
+        )
         self.assertThat(service, IsInstance(regionservice.RegionService))
+        self.assertIs(service.postgresListener, sentinel.listener)
         # It is registered as a factory in RegionEventLoop.
         self.assertIs(
             eventloop.make_RegionService,
@@ -366,7 +374,8 @@ class TestFactories(MAASServerTestCase):
         )
         self.assertFalse(eventloop.loop.factories["rpc"]["only_on_master"])
         self.assertEqual(
-            ["ipc-worker"], eventloop.loop.factories["rpc"]["requires"]
+            ["ipc-worker", "postgres-listener-worker"],
+            eventloop.loop.factories["rpc"]["requires"],
         )
 
     def test_make_NonceCleanupService(self):
@@ -479,6 +488,33 @@ class TestFactories(MAASServerTestCase):
             eventloop.make_VersionUpdateCheckService,
         )
 
+    def test_make_ConfigCacheService(self):
+        service = eventloop.make_ConfigCacheService(
+            FakePostgresListenerService()
+        )
+        self.assertIsInstance(service, config_cache.ConfigCacheService)
+        # It is registered as a factory in RegionEventLoop for both the
+        # master and the worker processes, with their own listener.
+        factories = eventloop.loop.factories
+        self.assertIs(
+            eventloop.make_ConfigCacheService,
+            factories["config-cache-master"]["factory"],
+        )
+        self.assertEqual(
+            ["postgres-listener-master"],
+            factories["config-cache-master"]["requires"],
+        )
+        self.assertTrue(factories["config-cache-master"]["only_on_master"])
+        self.assertIs(
+            eventloop.make_ConfigCacheService,
+            factories["config-cache-worker"]["factory"],
+        )
+        self.assertEqual(
+            ["postgres-listener-worker"],
+            factories["config-cache-worker"]["requires"],
+        )
+        self.assertFalse(factories["config-cache-worker"]["only_on_master"])
+
     def test_make_RackControllerService(self):
         service = eventloop.make_RackControllerService(
             FakePostgresListenerService(), sentinel.rpc_advertise
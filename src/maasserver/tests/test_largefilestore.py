@@ -0,0 +1,98 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.largefilestore`."""
+
+
+import hashlib
+import os
+import stat
+
+from maasserver.largefilestore import LargeFileStore
+from maastesting.factory import factory
+from maastesting.fixtures import MAASDataFixture
+from maastesting.testcase import MAASTestCase
+
+
+def make_content():
+    content = factory.make_bytes()
+    return content, hashlib.sha256(content).hexdigest()
+
+
+class TestLargeFileStore(MAASTestCase):
+    def test_path_defaults_to_maas_data_path(self):
+        data = self.useFixture(MAASDataFixture())
+        store = LargeFileStore()
+        self.assertEqual(os.path.join(data.path, "image-store"), store.path)
+
+    def test_get_path_uses_sha256_prefix_directory(self):
+        path = self.make_dir()
+        _, sha256 = make_content()
+        self.assertEqual(
+            os.path.join(path, sha256[:2], sha256),
+            LargeFileStore(path).get_path(sha256),
+        )
+
+    def test_get_path_rejects_invalid_sha256(self):
+        store = LargeFileStore(self.make_dir())
+        self.assertRaises(ValueError, store.get_path, "../../etc/passwd")
+        self.assertRaises(ValueError, store.get_path, "ab" * 31)
+
+    def test_open_returns_none_when_missing(self):
+        store = LargeFileStore(self.make_dir())
+        _, sha256 = make_content()
+        self.assertFalse(store.has_file(sha256))
+        self.assertIsNone(store.open(sha256))
+
+    def test_writer_commits_verified_content(self):
+        store = LargeFileStore(self.make_dir())
+        content, sha256 = make_content()
+        writer = store.writer(sha256)
+        writer.write(content[:10])
+        self.assertFalse(store.has_file(sha256))
+        writer.write(content[10:])
+        self.assertTrue(writer.commit())
+        self.assertTrue(store.has_file(sha256))
+        with store.open(sha256) as stream:
+            self.assertEqual(content, stream.read())
+        mode = os.stat(store.get_path(sha256)).st_mode
+        self.assertEqual(0o644, stat.S_IMODE(mode))
+
+    def test_writer_commits_empty_content(self):
+        store = LargeFileStore(self.make_dir())
+        sha256 = hashlib.sha256(b"").hexdigest()
+        self.assertTrue(store.writer(sha256).commit())
+        self.assertTrue(store.has_file(sha256))
+
+    def test_writer_discards_unverified_content(self):
+        store = LargeFileStore(self.make_dir())
+        content, sha256 = make_content()
+        writer = store.writer(sha256)
+        writer.write(content[1:])
+        self.assertFalse(writer.commit())
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.join(store.path, sha256[:2])))
+
+    def test_writer_abort_discards_content(self):
+        store = LargeFileStore(self.make_dir())
+        content, sha256 = make_content()
+        writer = store.writer(sha256)
+        writer.write(content)
+        writer.abort()
+        self.assertFalse(store.has_file(sha256))
+        self.assertEqual([], os.listdir(os.path.join(store.path, sha256[:2])))
+
+    def test_delete_removes_file(self):
+        store = LargeFileStore(self.make_dir())
+        content, sha256 = make_content()
+        writer = store.writer(sha256)
+        writer.write(content)
+        writer.commit()
+        store.delete(sha256)
+        self.assertFalse(store.has_file(sha256))
+
+    def test_delete_ignores_missing_file(self):
+        store = LargeFileStore(self.make_dir())
+        _, sha256 = make_content()
+        store.delete(sha256)
+        self.assertFalse(store.has_file(sha256))
@@ -27,11 +27,13 @@ from twisted.internet.defer import (
     inlineCallbacks,
     returnValue,
 )
+from twisted.internet.task import Clock
 from twisted.logger import LogLevel
 from twisted.python.failure import Failure
 
 from maasserver import listener as listener_module
 from maasserver.listener import (
+    NotificationQueue,
     PostgresListenerNotifyError,
     PostgresListenerRegistrationError,
     PostgresListenerService,
@@ -49,7 +51,9 @@ from maastesting.matchers import (
     MockCallsMatch,
     MockNotCalled,
 )
+from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import DeferredValue
 
 wait_for_reactor = wait_for()
@@ -86,6 +90,55 @@ class PostgresListenerServiceSpy(PostgresListenerService):
                 returnValue(notice)
 
 
+class TestNotificationQueue(MAASTestCase):
+    def make_notification(self, channel=None):
+        if channel is None:
+            channel = factory.make_name("channel")
+        return (channel, factory.make_name("payload"))
+
+    def test_add_coalesces_pending_notifications(self):
+        queue = NotificationQueue()
+        notification = self.make_notification()
+        self.assertTrue(queue.add(notification))
+        self.assertFalse(queue.add(notification))
+        self.assertEqual(1, len(queue))
+        self.assertIn(notification, queue)
+
+    def test_popleft_returns_notifications_in_order(self):
+        queue = NotificationQueue()
+        notifications = [self.make_notification() for _ in range(3)]
+        for notification in notifications + notifications:
+            queue.add(notification)
+        self.assertEqual(
+            notifications, [queue.popleft() for _ in range(len(queue))]
+        )
+        self.assertRaises(IndexError, queue.popleft)
+
+    def test_popleft_readds_notification_once_handled(self):
+        queue = NotificationQueue()
+        notification = self.make_notification()
+        queue.add(notification)
+        queue.popleft()
+        self.assertTrue(queue.add(notification))
+
+    def test_debounced_notifications_wait_for_window(self):
+        clock = Clock()
+        channel = factory.make_name("channel")
+        queue = NotificationQueue(debounce={channel: 0.25}, clock=clock)
+        debounced = self.make_notification(channel)
+        other = self.make_notification()
+        queue.add(debounced)
+        queue.add(other)
+        clock.advance(0.1)
+        self.assertFalse(queue.add(debounced))
+        self.assertEqual(other, queue.popleft())
+        self.assertRaises(IndexError, queue.popleft)
+        self.assertEqual(1, len(queue))
+        clock.advance(0.15)
+        self.assertEqual(debounced, queue.popleft())
+        self.assertEqual(0, len(queue))
+
+
 class TestPostgresListenerService(MAASServerTestCase):
     @transactional
     def send_notification(self, event, obj_id):
@@ -524,6 +577,39 @@ class TestPostgresListenerService(MAASServerTestCase):
         listener.doRead()
         self.assertCountEqual(listener.notifications, set(notifications))
 
+    def test_doRead_holds_back_debounced_notifications(self):
+        clock = Clock()
+        listener = PostgresListenerService(debounce={"machine_update": 0.25})
+        listener.notifications.clock = clock
+        notification = FakeNotify(channel="machine_update", payload="abc")
+        connection = self.patch(listener, "connection")
+        connection.connection.poll.return_value = None
+        connection.connection.notifies = [notification, notification]
+
+        listener.doRead()
+        self.assertEqual([notification], list(listener.notifications))
+        self.assertRaises(IndexError, listener.notifications.popleft)
+        clock.advance(0.25)
+        self.assertEqual(notification, listener.notifications.popleft())
+
+    def test_handleNotify_latency_includes_synchronous_handler_work(self):
+        clock = Clock()
+        listener = PostgresListenerService()
+        listener.listeners["machine"] = [
+            lambda action, payload: clock.advance(2)
+        ]
+        update = self.patch(PROMETHEUS_METRICS, "update")
+        listener.handleNotify(("machine_update", "abc"), clock=clock)
+        self.assertThat(
+            update,
+            MockCalledOnceWith(
+                "maas_listener_handler_latency",
+                "observe",
+                value=2,
+                labels={"channel": "machine"},
+            ),
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_listener_ignores_ENOENT_when_removing_itself_from_reactor(self):
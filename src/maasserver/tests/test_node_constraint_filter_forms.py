@@ -3,9 +3,11 @@
 
 from functools import partial
 import random
+import threading
 
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db.models.query import QuerySet
 from testtools.matchers import (
     Contains,
     ContainsAll,
@@ -47,8 +49,13 @@ from maasserver.node_constraint_filter_forms import (
 )
 from maasserver.testing.architecture import patch_usable_architectures
 from maasserver.testing.factory import factory, RANDOM
-from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
 from maasserver.utils import ignore_unused
+from maasserver.utils.orm import transactional
+from maastesting.matchers import MockNotCalled
 from provisioningserver.utils.constraints import LabeledConstraintMap
 
 
@@ -2159,6 +2166,126 @@ class TestAcquireNodeFormOrdersResults(MAASServerTestCase):
         self.assertEqual(sorted_nodes, list(filtered_nodes))
 
 
+class TestAcquireNodeFormLockFirstNode(MAASServerTestCase):
+    def test_returns_cheapest_node(self):
+        nodes = [
+            factory.make_Node(
+                status=NODE_STATUS.READY,
+                cpu_count=random.randint(5, 32),
+                memory=random.randint(1024, 256 * 1024),
+            )
+            for _ in range(4)
+        ]
+        cheapest = min(nodes, key=lambda n: n.cpu_count + n.memory / 1024)
+        form = AcquireNodeForm(data={"cpu_count": 4})
+        self.assertTrue(form.is_valid(), form.errors)
+        filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+        self.assertEqual(cheapest, form.lock_first_node(filtered_nodes))
+
+    def test_returns_None_when_no_nodes_match(self):
+        factory.make_Node(status=NODE_STATUS.READY, cpu_count=1)
+        form = AcquireNodeForm(data={"cpu_count": 4})
+        self.assertTrue(form.is_valid(), form.errors)
+        filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+        self.assertIsNone(form.lock_first_node(filtered_nodes))
+
+
+class TestAcquireNodeFormLockNodes(MAASServerTestCase):
+    def filter_nodes(self, data=None):
+        form = AcquireNodeForm(data={} if data is None else data)
+        self.assertTrue(form.is_valid(), form.errors)
+        filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+        return form, filtered_nodes
+
+    def test_returns_cheapest_nodes_in_order(self):
+        nodes = [
+            factory.make_Node(
+                status=NODE_STATUS.READY,
+                cpu_count=random.randint(5, 32),
+                memory=random.randint(1024, 256 * 1024),
+            )
+            for _ in range(5)
+        ]
+        sorted_nodes = sorted(
+            nodes, key=lambda n: n.cpu_count + n.memory / 1024
+        )
+        form, filtered_nodes = self.filter_nodes({"cpu_count": 4})
+        self.assertEqual(sorted_nodes[:3], form.lock_nodes(filtered_nodes, 3))
+
+    def test_returns_fewer_nodes_when_not_enough_match(self):
+        node = factory.make_Node(status=NODE_STATUS.READY, cpu_count=8)
+        factory.make_Node(status=NODE_STATUS.READY, cpu_count=1)
+        form, filtered_nodes = self.filter_nodes({"cpu_count": 4})
+        self.assertEqual([node], form.lock_nodes(filtered_nodes, 3))
+
+    def test_does_not_lock_nodes_when_asked_not_to(self):
+        node = factory.make_Node(status=NODE_STATUS.READY, cpu_count=8)
+        form, filtered_nodes = self.filter_nodes({"cpu_count": 4})
+        select_for_update = self.patch(QuerySet, "select_for_update")
+        self.assertEqual(
+            [node], form.lock_nodes(filtered_nodes, 3, lock=False)
+        )
+        self.assertThat(select_for_update, MockNotCalled())
+
+    def test_spreads_nodes_across_zones(self):
+        zones = [factory.make_Zone() for _ in range(3)]
+        for zone in zones:
+            for memory in (1024, 2048):
+                factory.make_Node(
+                    status=NODE_STATUS.READY,
+                    cpu_count=1,
+                    memory=memory,
+                    zone=zone,
+                )
+        form, filtered_nodes = self.filter_nodes()
+        nodes = form.lock_nodes(filtered_nodes, 3, spread_by="zone")
+        self.assertCountEqual(zones, [node.zone for node in nodes])
+        self.assertEqual([1024] * 3, [node.memory for node in nodes])
+
+
+class TestAcquireNodeFormLockFirstNodeConcurrency(
+    MAASTransactionServerTestCase
+):
+    def test_skips_nodes_locked_by_other_transactions(self):
+        cheap = factory.make_Node(
+            status=NODE_STATUS.READY, cpu_count=1, memory=1024
+        )
+        expensive = factory.make_Node(
+            status=NODE_STATUS.READY, cpu_count=8, memory=8192
+        )
+        locked = threading.Event()
+        release = threading.Event()
+        picked = []
+
+        @transactional
+        def lock_first_node():
+            form = AcquireNodeForm(data={})
+            self.assertTrue(form.is_valid(), form.errors)
+            filtered_nodes, _, _ = form.filter_nodes(Machine.objects.all())
+            return form.lock_first_node(filtered_nodes)
+
+        # Hold the lock on the cheapest node in another thread while the
+        # second allocation runs.
+        def lock_in_thread():
+            @transactional
+            def hold_lock():
+                picked.append(lock_first_node())
+                locked.set()
+                release.wait(10)
+
+            hold_lock()
+
+        thread = threading.Thread(target=lock_in_thread)
+        thread.start()
+        try:
+            self.assertTrue(locked.wait(10))
+            self.assertEqual(cheap, picked[0])
+            self.assertEqual(expensive, lock_first_node())
+        finally:
+            release.set()
+            thread.join()
+
+
 class TestReadNodesForm(MAASServerTestCase, FilterConstraintsMixin):
 
     form_class = ReadNodesForm
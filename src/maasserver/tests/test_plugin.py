@@ -120,6 +120,7 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         expected_services = {
             "database-tasks",
             "postgres-listener-worker",
+            "config-cache-worker",
             "rack-controller",
             "rpc",
             "status-worker",
@@ -157,6 +158,7 @@ class TestRegionWorkerServiceMaker(TestServiceMaker):
         expected_services = {
             "database-tasks",
             "postgres-listener-worker",
+            "config-cache-worker",
             "rack-controller",
             "rpc",
             "status-worker",
@@ -251,6 +253,7 @@ class TestRegionMasterServiceMaker(TestServiceMaker):
             "prometheus",
             "prometheus-exporter",
             "postgres-listener-master",
+            "config-cache-master",
             "networks-monitor",
             "active-discovery",
             "reverse-dns",
@@ -361,6 +364,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             # Worker services.
             "database-tasks",
             "postgres-listener-worker",
+            "config-cache-worker",
             "rack-controller",
             "rpc",
             "service-monitor",
@@ -379,6 +383,7 @@ class TestRegionAllInOneServiceMaker(TestServiceMaker):
             "import-resources",
             "import-resources-progress",
             "postgres-listener-master",
+            "config-cache-master",
             "networks-monitor",
             "active-discovery",
             "reverse-dns",
@@ -32,6 +32,7 @@ from maasserver.populate_tags import (
     populate_tag_for_multiple_nodes,
     populate_tags,
     populate_tags_for_single_node,
+    ProbedDetailsCache,
 )
 from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
 from maasserver.testing.eventloop import (
@@ -53,6 +54,7 @@ from maastesting.twisted import (
     extract_result,
 )
 from metadataserver.enum import RESULT_TYPE, SCRIPT_STATUS
+from metadataserver.fields import Bin
 from provisioningserver.refresh.node_info_scripts import (
     LLDP_OUTPUT_NAME,
     LSHW_OUTPUT_NAME,
@@ -408,3 +410,94 @@ class TestPopulateTagForMultipleNodes(MAASServerTestCase):
             [node.hostname for node in nodes[0:2]],
             [node.hostname for node in Node.objects.filter(tags__name="bar")],
         )
+
+    def test_compiles_definition_once(self):
+        nodes = [factory.make_Node() for _ in range(2)]
+        make_lldp_result(nodes[0], b"<bar/>")
+        tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+        tag_expressions = populate_tags_module.tag_expressions
+        populate_tag_for_multiple_nodes(tag, nodes, batch_size=1)
+        misses = tag_expressions.misses
+        populate_tag_for_multiple_nodes(tag, nodes, batch_size=1)
+        self.assertEqual(misses, tag_expressions.misses)
+
+    def test_does_not_fill_probed_details_cache(self):
+        nodes = [factory.make_Node() for _ in range(2)]
+        make_lldp_result(nodes[0], b"<bar/>")
+        tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+        cache = ProbedDetailsCache()
+        self.patch(populate_tags_module, "probed_details_cache", cache)
+        cache.get_documents(nodes[:1])
+        populate_tag_for_multiple_nodes(tag, nodes, batch_size=1)
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        cache.get_documents(nodes[1:])
+        self.assertEqual((1, 3), (cache.hits, cache.misses))
+
+
+class TestProbedDetailsCache(MAASServerTestCase):
+    def test_returns_merged_details(self):
+        nodes = [factory.make_Node() for _ in range(2)]
+        make_lshw_result(nodes[0], b"<foo/>")
+        make_lldp_result(nodes[1], b"<bar/>")
+        cache = ProbedDetailsCache()
+        documents = cache.get_documents(nodes)
+        self.assertEqual(
+            {node: 1 for node in nodes},
+            {
+                node: len(
+                    documents[node].xpath(
+                        "//foo|//lldp:bar", namespaces={"lldp": "lldp"}
+                    )
+                )
+                for node in nodes
+            },
+        )
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_reuses_documents(self):
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        cache = ProbedDetailsCache()
+        document = cache.get_documents([node])[node]
+        self.assertIs(document, cache.get_documents([node])[node])
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_rebuilds_documents_when_details_change(self):
+        node = factory.make_Node()
+        script_result = make_lshw_result(node, b"<foo/>")
+        cache = ProbedDetailsCache()
+        cache.get_documents([node])
+        script_result.stdout = Bin(b"<bar/>")
+        script_result.save()
+        document = cache.get_documents([node])[node]
+        self.assertEqual(
+            ["bar"], [element.tag for element in document.xpath("/*")]
+        )
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_evicts_least_recently_used_documents(self):
+        nodes = [factory.make_Node() for _ in range(3)]
+        for node in nodes:
+            make_lshw_result(node, b"<foo/>")
+        cache = ProbedDetailsCache(max_documents=2)
+        cache.get_documents(nodes)
+        cache.get_documents(nodes[1:])
+        self.assertEqual((2, 3), (cache.hits, cache.misses))
+        cache.get_documents(nodes[:1])
+        self.assertEqual((2, 4), (cache.hits, cache.misses))
+
+    def test_does_not_store_documents_when_asked_not_to(self):
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        cache = ProbedDetailsCache()
+        cache.get_documents([node], store=False)
+        cache.get_documents([node])
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_does_not_cache_documents_when_max_documents_is_zero(self):
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        cache = ProbedDetailsCache(max_documents=0)
+        cache.get_documents([node])
+        cache.get_documents([node])
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
@@ -11,7 +11,7 @@ import os
 from pipes import quote
 import random
 from textwrap import dedent
-from unittest.mock import ANY, sentinel
+from unittest.mock import ANY, call, sentinel
 from urllib.parse import urlparse
 
 from django.conf import settings
@@ -66,12 +66,13 @@ from maasserver.preseed import (
     get_preseed,
     get_preseed_context,
     get_preseed_filenames,
-    get_preseed_template,
     get_preseed_type_for,
     load_preseed_template,
     PreseedTemplate,
+    PreseedTemplateCache,
     render_enlistment_preseed,
     render_preseed,
+    render_template,
     TemplateNotFoundError,
 )
 from maasserver.rpc.testing.mixins import PreseedRPCMixin
@@ -86,10 +87,15 @@ from maasserver.testing.testcase import (
 from maasserver.third_party_drivers import DriversConfig
 from maasserver.utils.curtin import curtin_supports_webhook_events
 from maastesting.http import make_HttpRequest
-from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
 from maastesting.testcase import MAASTestCase
 from metadataserver.models import NodeKey
 from provisioningserver.drivers.osystem.ubuntu import UbuntuOS
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from provisioningserver.utils.enum import map_enum
 
@@ -279,48 +285,6 @@ class TestConfiguration(MAASServerTestCase):
         )
 
 
-class TestGetPreseedTemplate(MAASServerTestCase):
-    """Tests for `get_preseed_template`."""
-
-    def test_get_preseed_template_returns_None_if_no_template_locations(self):
-        # get_preseed_template() returns None when no template locations are
-        # defined.
-        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [])
-        self.assertEqual(
-            (None, None),
-            get_preseed_template(
-                (factory.make_string(), factory.make_string())
-            ),
-        )
-
-    def test_get_preseed_template_returns_None_when_no_filenames(self):
-        # get_preseed_template() returns None when no filenames are passed in.
-        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.make_dir()])
-        self.assertEqual((None, None), get_preseed_template(()))
-
-    def test_get_preseed_template_find_template_in_first_location(self):
-        template_content = factory.make_string()
-        template_path = self.make_file(contents=template_content)
-        template_filename = os.path.basename(template_path)
-        locations = [os.path.dirname(template_path), self.make_dir()]
-        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", locations)
-        self.assertEqual(
-            (template_path, template_content),
-            get_preseed_template([template_filename]),
-        )
-
-    def test_get_preseed_template_find_template_in_last_location(self):
-        template_content = factory.make_string()
-        template_path = self.make_file(contents=template_content)
-        template_filename = os.path.basename(template_path)
-        locations = [self.make_dir(), os.path.dirname(template_path)]
-        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", locations)
-        self.assertEqual(
-            (template_path, template_content),
-            get_preseed_template([template_filename]),
-        )
-
-
 class TestGetCustomImageDependencyValidation(MAASServerTestCase):
     """Tests for 'get_custom_image_dependency_validation"""
 
@@ -444,6 +408,94 @@ class TestGetCustomImageDependencyValidation(MAASServerTestCase):
             )
 
 
+class TestPreseedTemplateCache(MAASServerTestCase):
+    """Tests for `PreseedTemplateCache`."""
+
+    def setUp(self):
+        super().setUp()
+        self.location = self.make_dir()
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.location])
+
+    def test_returns_None_if_no_template(self):
+        cache = PreseedTemplateCache()
+        self.assertIsNone(cache.get([factory.make_name("name")]))
+
+    def test_returns_template_for_first_filename_found(self):
+        names = [factory.make_name("name") for _ in range(3)]
+        factory.make_file(self.location, names[1], contents=b"first")
+        factory.make_file(self.location, names[2], contents=b"second")
+        template = PreseedTemplateCache().get(names)
+        self.assertIsInstance(template, PreseedTemplate)
+        self.assertEqual("first", template.substitute())
+
+    def test_returns_template_from_first_location(self):
+        other_location = self.make_dir()
+        self.patch(
+            settings,
+            "PRESEED_TEMPLATE_LOCATIONS",
+            [other_location, self.location],
+        )
+        name = factory.make_name("name")
+        factory.make_file(self.location, name, contents=b"last")
+        factory.make_file(other_location, name, contents=b"first")
+        template = PreseedTemplateCache().get([name])
+        self.assertEqual("first", template.substitute())
+
+    def test_caches_template(self):
+        name = factory.make_name("name")
+        factory.make_file(self.location, name)
+        cache = PreseedTemplateCache()
+        self.assertIs(cache.get([name]), cache.get([name]))
+
+    def test_reloads_changed_template(self):
+        name = factory.make_name("name")
+        path = factory.make_file(self.location, name, contents=b"old")
+        cache = PreseedTemplateCache()
+        self.assertEqual("old", cache.get([name]).substitute())
+        with open(path, "wb") as stream:
+            stream.write(b"new content")
+        self.assertEqual("new content", cache.get([name]).substitute())
+
+    def test_finds_new_better_template(self):
+        names = [factory.make_name("name") for _ in range(2)]
+        factory.make_file(self.location, names[1], contents=b"worse")
+        cache = PreseedTemplateCache()
+        self.assertEqual("worse", cache.get(names).substitute())
+        factory.make_file(self.location, names[0], contents=b"better")
+        self.assertEqual("better", cache.get(names).substitute())
+
+    def test_finds_template_added_after_not_found(self):
+        name = factory.make_name("name")
+        cache = PreseedTemplateCache()
+        self.assertIsNone(cache.get([name]))
+        factory.make_file(self.location, name, contents=b"added")
+        self.assertEqual("added", cache.get([name]).substitute())
+
+    def test_forgets_removed_template(self):
+        name = factory.make_name("name")
+        path = factory.make_file(self.location, name)
+        cache = PreseedTemplateCache()
+        self.assertIsNotNone(cache.get([name]))
+        os.remove(path)
+        self.assertIsNone(cache.get([name]))
+
+    def test_does_not_read_unchanged_locations_again(self):
+        name = factory.make_name("name")
+        get_file_stamp = self.patch(preseed_module, "get_file_stamp")
+        get_file_stamp.side_effect = lambda path: (
+            sentinel.stamp if path == self.location else None
+        )
+        cache = PreseedTemplateCache()
+        cache.get([name])
+        get_file_stamp.reset_mock()
+        cache.get([name])
+        cache.get([name])
+        self.assertThat(
+            get_file_stamp,
+            MockCallsMatch(call(self.location), call(self.location)),
+        )
+
+
 class TestLoadPreseedTemplate(MAASServerTestCase):
     """Tests for `load_preseed_template`."""
 
@@ -451,6 +503,9 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         super().setUp()
         self.location = self.make_dir()
         self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.location])
+        self.patch(
+            preseed_module, "preseed_template_cache", PreseedTemplateCache()
+        )
 
     def create_template(self, location, name, content=None):
         # Create a tempita template in the given `self.location` with the
@@ -540,6 +595,29 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         template = load_preseed_template(node, prefix)
         self.assertEqual(master_content, template.substitute())
 
+    def test_load_preseed_template_with_inherits_for_each_node(self):
+        # Templates are shared, but parent templates are still looked up
+        # for the node the template was loaded for.
+        prefix = factory.make_string()
+        master_template_name = factory.make_string()
+        preseed_content = '{{inherit "%s"}}' % master_template_name
+        self.create_template(self.location, prefix, preseed_content)
+        master_content = self.create_template(
+            self.location, master_template_name
+        )
+        node = factory.make_Node()
+        other_node = factory.make_Node()
+        node_master_template_name = next(
+            get_preseed_filenames(node, master_template_name)
+        )
+        node_master_content = self.create_template(
+            self.location, node_master_template_name
+        )
+        template = load_preseed_template(node, prefix)
+        other_template = load_preseed_template(other_node, prefix)
+        self.assertEqual(node_master_content, template.substitute())
+        self.assertEqual(master_content, other_template.substitute())
+
     def test_load_preseed_template_parent_lookup_doesnt_include_default(self):
         # The lookup for parent templates does not include the default
         # 'generic' file.
@@ -689,6 +767,33 @@ class TestPreseedTemplate(MAASTestCase):
         self.assertEqual(self.json, observed)
 
 
+class TestRenderTemplate(MAASTestCase):
+    """Tests for `render_template`."""
+
+    def test_renders_template(self):
+        template = PreseedTemplate("{{var}}")
+        self.assertEqual(
+            "value", render_template(template, {"var": "value"}, "")
+        )
+
+    def test_records_latency(self):
+        mock_metrics = self.patch(PROMETHEUS_METRICS, "update")
+        prefix = factory.make_name("prefix")
+        template = PreseedTemplate(
+            "", name=os.path.join("/path", prefix + "_" + factory.make_name())
+        )
+        render_template(template, {}, prefix)
+        self.assertThat(
+            mock_metrics,
+            MockCalledOnceWith(
+                "maas_preseed_render_latency",
+                "observe",
+                value=ANY,
+                labels={"template": prefix},
+            ),
+        )
+
+
 class TestRenderPreseed(
     PreseedRPCMixin, BootImageHelperMixin, MAASServerTestCase
 ):
@@ -1463,10 +1568,9 @@ class TestCurtinUtilities(
           mode: reboot
         """
         )
-        self.patch(preseed_module, "get_preseed_template").return_value = (
-            factory.make_name("filename"),
-            power_state_template,
-        )
+        self.patch(
+            preseed_module.preseed_template_cache, "get"
+        ).return_value = PreseedTemplate(power_state_template)
         config = get_curtin_config(make_HttpRequest(), node)
         self.assertThat(config, Not(Contains("mode: reboot")))
 
@@ -1482,10 +1586,9 @@ class TestCurtinUtilities(
           ubuntu_security:
         """
         )
-        self.patch(preseed_module, "get_preseed_template").return_value = (
-            factory.make_name("filename"),
-            apt_mirrors_template,
-        )
+        self.patch(
+            preseed_module.preseed_template_cache, "get"
+        ).return_value = PreseedTemplate(apt_mirrors_template)
         config = get_curtin_config(make_HttpRequest(), node)
         self.assertThat(config, Not(Contains("ubuntu_archive")))
         self.assertThat(config, Not(Contains("ubuntu_security")))
@@ -1500,10 +1603,9 @@ class TestCurtinUtilities(
         apt_proxy: http://127.0.0.1:8000/
         """
         )
-        self.patch(preseed_module, "get_preseed_template").return_value = (
-            factory.make_name("filename"),
-            apt_proxy_template,
-        )
+        self.patch(
+            preseed_module.preseed_template_cache, "get"
+        ).return_value = PreseedTemplate(apt_proxy_template)
         config = get_curtin_config(make_HttpRequest(), node)
         self.assertThat(config, Not(Contains("127.0.0.1")))
 
@@ -208,7 +208,10 @@ class TestRegionControllerService(MAASServerTestCase):
         mock_msg = self.patch(region_controller.log, "msg")
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(zone_state=service.dnsZoneState),
+        )
         self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
         self.assertThat(
             mock_msg,
@@ -250,7 +253,11 @@ class TestRegionControllerService(MAASServerTestCase):
         service.startProcessing()
         yield service.processingDefer
         self.assertThat(
-            mock_dns_update_all_zones, MockCallsMatch(call(), call())
+            mock_dns_update_all_zones,
+            MockCallsMatch(
+                call(zone_state=service.dnsZoneState),
+                call(zone_state=service.dnsZoneState),
+            ),
         )
         self.assertThat(
             mock_check_serial,
@@ -258,6 +265,28 @@ class TestRegionControllerService(MAASServerTestCase):
         )
         self.assertThat(mock_killService, MockCalledOnceWith("bind9"))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_process_zones_forgets_zone_state_on_failure(self):
+        service = self.make_service(sentinel.listener)
+        service.needsDNSUpdate = True
+        service.dnsZoneState[factory.make_name("zone")] = sentinel.fingerprint
+        dns_result = (
+            random.randint(1, 1000),
+            False,
+            [factory.make_name("domain") for _ in range(3)],
+        )
+        self.patch(
+            region_controller, "dns_update_all_zones"
+        ).return_value = dns_result
+        self.patch(service, "_checkSerial").return_value = fail(
+            DNSReloadError()
+        )
+        self.patch(region_controller.log, "err")
+        service.startProcessing()
+        yield service.processingDefer
+        self.assertEqual({}, service.dnsZoneState)
+
     @wait_for_reactor
     @inlineCallbacks
     def test_process_updates_proxy(self):
@@ -305,7 +334,10 @@ class TestRegionControllerService(MAASServerTestCase):
         mock_err = self.patch(region_controller.log, "err")
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(zone_state=service.dnsZoneState),
+        )
         self.assertThat(
             mock_err, MockCalledOnceWith(ANY, "Failed configuring DNS.")
         )
@@ -392,7 +424,10 @@ class TestRegionControllerService(MAASServerTestCase):
         mock_rbacSync.return_value = None
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(zone_state=service.dnsZoneState),
+        )
         self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
         self.assertThat(
             mock_proxy_update_config, MockCalledOnceWith(reload_proxy=True)
@@ -610,7 +645,10 @@ class TestRegionControllerServiceTransactional(MAASTransactionServerTestCase):
         mock_msg = self.patch(region_controller.log, "msg")
         service.startProcessing()
         yield service.processingDefer
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(zone_state=service.dnsZoneState),
+        )
         self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
         self.assertThat(
             mock_msg,
@@ -654,7 +692,10 @@ class TestRegionControllerServiceTransactional(MAASTransactionServerTestCase):
             " * %s" % publication.source
             for publication in reversed(publications[1:])
         )
-        self.assertThat(mock_dns_update_all_zones, MockCalledOnceWith())
+        self.assertThat(
+            mock_dns_update_all_zones,
+            MockCalledOnceWith(zone_state=service.dnsZoneState),
+        )
         self.assertThat(mock_check_serial, MockCalledOnceWith(dns_result))
         self.assertThat(mock_msg, MockCalledOnceWith(expected_msg))
 
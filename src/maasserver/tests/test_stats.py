@@ -3,6 +3,7 @@
 
 
 import base64
+from datetime import timedelta
 import json
 from random import randrange
 
@@ -55,6 +56,7 @@ from maasserver.testing.testcase import (
     MAASTransactionServerTestCase,
 )
 from maastesting import get_testing_timeout
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnce, MockNotCalled
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import extract_result
@@ -67,6 +69,7 @@ from provisioningserver.refresh.node_info_scripts import (
     COMMISSIONING_OUTPUT_NAME,
 )
 from provisioningserver.testing.certificates import get_sample_cert
+from provisioningserver.utils.network import IPRangeStatistics
 from provisioningserver.utils.twisted import asynchronous
 
 TIMEOUT = get_testing_timeout()
@@ -1061,6 +1064,95 @@ class TestGetSubnetsUtilisationStats(MAASServerTestCase):
             },
         )
 
+    def test_stats_match_iprange_usage(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/24",
+            gateway_ip="10.0.0.1",
+            dns_servers=["10.0.0.2", "8.8.8.8"],
+        )
+        factory.make_IPRange(
+            subnet=subnet,
+            start_ip="10.0.0.100",
+            end_ip="10.0.0.150",
+            alloc_type=IPRANGE_TYPE.DYNAMIC,
+        )
+        factory.make_IPRange(
+            subnet=subnet,
+            start_ip="10.0.0.200",
+            end_ip="10.0.0.210",
+            alloc_type=IPRANGE_TYPE.RESERVED,
+        )
+        factory.make_StaticRoute(source=subnet, gateway_ip="10.0.0.3")
+        for n in (4, 5, 6, 120, 205):
+            factory.make_StaticIPAddress(
+                ip=f"10.0.0.{n}",
+                alloc_type=IPADDRESS_TYPE.STICKY,
+                subnet=subnet,
+            )
+        ipv6_subnet = factory.make_Subnet(
+            cidr="2001:db8::/64", gateway_ip="2001:db8::1"
+        )
+        for subnet in (subnet, ipv6_subnet):
+            full_range = subnet.get_iprange_usage()
+            range_stats = IPRangeStatistics(full_range)
+            subnet_stats = stats.get_subnets_utilisation_stats()[subnet.cidr]
+            self.assertEqual(
+                range_stats.num_available, subnet_stats["available"]
+            )
+            self.assertEqual(
+                range_stats.num_unavailable, subnet_stats["unavailable"]
+            )
+
+    def test_stats_query_count_does_not_depend_on_subnets(self):
+        def make_subnet():
+            subnet = factory.make_Subnet()
+            factory.make_IPRange(subnet=subnet)
+            factory.make_StaticIPAddress(subnet=subnet)
+            factory.make_StaticRoute(source=subnet)
+
+        make_subnet()
+        queries_one, _ = count_queries(stats.get_subnets_utilisation_stats)
+        for _ in range(3):
+            make_subnet()
+        queries_many, _ = count_queries(stats.get_subnets_utilisation_stats)
+        self.assertEqual(queries_one, queries_many)
+
+
+class TestGetSubnetsUtilisationSnapshot(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(stats, "_subnets_utilisation_snapshot", None)
+        self.subnet = factory.make_Subnet(
+            cidr="1.2.0.0/16", gateway_ip="1.2.0.254"
+        )
+
+    def test_reuses_stats_while_unchanged(self):
+        first = stats.get_subnets_utilisation_snapshot()
+        get_stats = self.patch(stats, "get_subnets_utilisation_stats")
+        self.assertEqual(first, stats.get_subnets_utilisation_snapshot())
+        self.assertThat(get_stats, MockNotCalled())
+
+    def test_computes_stats_after_change(self):
+        stats.get_subnets_utilisation_snapshot()
+        factory.make_StaticIPAddress(
+            ip="1.2.0.10", alloc_type=IPADDRESS_TYPE.STICKY, subnet=self.subnet
+        )
+        snapshot = stats.get_subnets_utilisation_snapshot()
+        self.assertEqual(1, snapshot["1.2.0.0/16"]["static"])
+
+    def test_computes_stats_after_max_age(self):
+        stats.get_subnets_utilisation_snapshot()
+        self.patch(stats, "SUBNETS_UTILISATION_MAX_AGE", timedelta(seconds=0))
+        get_stats = self.patch(stats, "get_subnets_utilisation_stats")
+        get_stats.return_value = {}
+        self.assertEqual({}, stats.get_subnets_utilisation_snapshot())
+        self.assertThat(get_stats, MockCalledOnce())
+
+    def test_returns_copy(self):
+        stats.get_subnets_utilisation_snapshot()["1.2.0.0/16"]["static"] = 99
+        snapshot = stats.get_subnets_utilisation_snapshot()
+        self.assertEqual(0, snapshot["1.2.0.0/16"]["static"])
+
 
 class TestGetBMCStats(MAASServerTestCase):
     def test_get_bmc_stats_no_bmcs(self):
@@ -1471,7 +1471,7 @@ DNS_INTERFACE_UPDATE = dedent(
 # Triggered when a config is inserted. Increments the zone serial and notifies
 # that DNS needs to be updated. Only watches for inserts on config
 # upstream_dns, dnssec_validation, default_dns_ttl, windows_kms_host,
-# dns_trusted_acls and maas_internal_domain.
+# dns_trusted_acls, dns_dynamic_updates and maas_internal_domain.
 DNS_CONFIG_INSERT = dedent(
     """\
     CREATE OR REPLACE FUNCTION sys_dns_config_insert()
@@ -1481,6 +1481,7 @@ DNS_CONFIG_INSERT = dedent(
       IF (NEW.name = 'upstream_dns' OR
           NEW.name = 'dnssec_validation' OR
           NEW.name = 'dns_trusted_acl' OR
+          NEW.name = 'dns_dynamic_updates' OR
           NEW.name = 'default_dns_ttl' OR
           NEW.name = 'windows_kms_host' OR
           NEW.name = 'maas_internal_domain')
@@ -1497,8 +1498,8 @@ DNS_CONFIG_INSERT = dedent(
 
 # Triggered when a config is updated. Increments the zone serial and notifies
 # that DNS needs to be updated. Only watches for updates on config
-# upstream_dns, dnssec_validation, dns_trusted_acl, default_dns_ttl,
-# and windows_kms_host.
+# upstream_dns, dnssec_validation, dns_trusted_acl, dns_dynamic_updates,
+# default_dns_ttl, and windows_kms_host.
 DNS_CONFIG_UPDATE = dedent(
     """\
     CREATE OR REPLACE FUNCTION sys_dns_config_update()
@@ -1510,6 +1511,7 @@ DNS_CONFIG_UPDATE = dedent(
           NEW.name = 'upstream_dns' OR
           NEW.name = 'dnssec_validation' OR
           NEW.name = 'dns_trusted_acl' OR
+          NEW.name = 'dns_dynamic_updates' OR
           NEW.name = 'default_dns_ttl' OR
           NEW.name = 'windows_kms_host' OR
           NEW.name = 'maas_internal_domain'))
@@ -1986,6 +1988,43 @@ def render_sys_proxy_procedure(proc_name, on_delete=False):
     )
 
 
+# Triggered when a rack controller has synced its boot images. Notifies every
+# region process, so that cached calls that depend on them are forgotten.
+SYS_IMAGE_SYNC_NODE_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_image_sync_node_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.last_image_sync IS DISTINCT FROM NEW.last_image_sync THEN
+        PERFORM pg_notify('sys_image_sync', NEW.system_id);
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+def render_sys_config_procedure(proc_name, on_delete=False):
+    """Render a database procedure with name `proc_name` that notifies that a
+    config item has changed, so that cached copies of it are invalidated.
+
+    :param proc_name: Name of the procedure.
+    :param on_delete: True when procedure will be used as a delete trigger.
+    """
+    entry = "OLD" if on_delete else "NEW"
+    return dedent(
+        f"""\
+        CREATE OR REPLACE FUNCTION {proc_name}() RETURNS trigger AS $$
+        BEGIN
+          PERFORM pg_notify('sys_config', {entry}.name);
+          RETURN {entry};
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+
 @transactional
 def register_system_triggers():
     """Register all system triggers into the database."""
@@ -2253,3 +2292,17 @@ def register_system_triggers():
     register_trigger(
         "maasserver_config", "sys_reverse_proxy_config_update", "update"
     )
+
+    # Config (cached by each region process)
+    register_procedure(render_sys_config_procedure("sys_config_insert"))
+    register_trigger("maasserver_config", "sys_config_insert", "insert")
+    register_procedure(render_sys_config_procedure("sys_config_update"))
+    register_trigger("maasserver_config", "sys_config_update", "update")
+    register_procedure(
+        render_sys_config_procedure("sys_config_delete", on_delete=True)
+    )
+    register_trigger("maasserver_config", "sys_config_delete", "delete")
+
+    # Boot image syncs (invalidate calls cached by each region process)
+    register_procedure(SYS_IMAGE_SYNC_NODE_UPDATE)
+    register_trigger("maasserver_node", "sys_image_sync_node_update", "update")
@@ -59,6 +59,9 @@ class TestTriggersUsed(MAASServerTestCase):
     """Tests relating to those triggers the MAAS application uses."""
 
     triggers_system = {
+        "config_sys_config_delete",
+        "config_sys_config_insert",
+        "config_sys_config_update",
         "config_sys_dhcp_config_ntp_servers_delete",
         "config_sys_dhcp_config_ntp_servers_insert",
         "config_sys_dhcp_config_ntp_servers_update",
@@ -93,6 +96,7 @@ class TestTriggersUsed(MAASServerTestCase):
         "node_sys_dhcp_node_update",
         "node_sys_dns_node_delete",
         "node_sys_dns_node_update",
+        "node_sys_image_sync_node_update",
         "rbacsync_sys_rbac_sync",
         "regionrackrpcconnection_sys_core_rpc_delete",
         "regionrackrpcconnection_sys_core_rpc_insert",
@@ -65,6 +65,10 @@ class TestTriggers(MAASServerTestCase):
             "config_sys_rbac_config_update",
             "config_sys_reverse_proxy_config_insert",
             "config_sys_reverse_proxy_config_update",
+            "config_sys_config_insert",
+            "config_sys_config_update",
+            "config_sys_config_delete",
+            "node_sys_image_sync_node_update",
         ]
         sql, args = psql_array(triggers, sql_type="text")
         with closing(connection.cursor()) as cursor:
@@ -33,6 +33,7 @@ from maasserver.models.interface import (
     UnknownInterface,
 )
 from maasserver.models.signals.testing import SignalsDisabled
+from maasserver.rpc.rackcontrollers import update_last_image_sync
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASLegacyTransactionServerTestCase,
@@ -5182,6 +5183,31 @@ class TestDNSConfigListener(
             ),
         )
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_config_dns_dynamic_updates_update(self):
+        yield deferToDatabase(register_system_triggers)
+        yield deferToDatabase(
+            Config.objects.set_config, "dns_dynamic_updates", False
+        )
+        yield self.capturePublication()
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_dns", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                Config.objects.set_config, "dns_dynamic_updates", True
+            )
+            yield dv.get(timeout=2)
+            yield self.assertPublicationUpdated()
+        finally:
+            yield listener.stopService()
+        self.assertThat(
+            self.getCapturedPublication().source,
+            Equals("configuration dns_dynamic_updates changed to true"),
+        )
+
 
 class TestDNSConfigListenerLegacy(
     MAASLegacyTransactionServerTestCase,
@@ -5653,3 +5679,105 @@ class TestRBACConfigListener(
             ),
         )
         self.assertThat(change.action, Equals("full"))
+
+
+class TestConfigListener(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end test for the config cache triggers code."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_config_insert(self):
+        name = factory.make_name("name")
+        yield deferToDatabase(register_system_triggers)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_config", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(Config.objects.set_config, name, "value")
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+        self.assertEqual(("sys_config", name), dv.value)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_config_update(self):
+        name = factory.make_name("name")
+        yield deferToDatabase(register_system_triggers)
+        yield deferToDatabase(Config.objects.set_config, name, "old")
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_config", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(Config.objects.set_config, name, "new")
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+        self.assertEqual(("sys_config", name), dv.value)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_config_delete(self):
+        name = factory.make_name("name")
+        yield deferToDatabase(register_system_triggers)
+        yield deferToDatabase(Config.objects.set_config, name, "value")
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_config", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                transactional(
+                    lambda: Config.objects.filter(name=name).delete()
+                )
+            )
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+        self.assertEqual(("sys_config", name), dv.value)
+
+
+class TestImageSyncListener(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end test for the boot image sync triggers code."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_last_image_sync_update(self):
+        yield deferToDatabase(register_system_triggers)
+        rack = yield deferToDatabase(self.create_rack_controller)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_image_sync", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(update_last_image_sync, rack.system_id)
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+        self.assertEqual(("sys_image_sync", rack.system_id), dv.value)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_no_message_for_other_node_updates(self):
+        yield deferToDatabase(register_system_triggers)
+        rack = yield deferToDatabase(self.create_rack_controller)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_image_sync", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_node,
+                rack.system_id,
+                {"hostname": factory.make_name("host")},
+            )
+            with ExpectedException(CancelledError):
+                yield dv.get(timeout=0.2)
+        finally:
+            yield listener.stopService()
@@ -111,6 +111,7 @@ class HandlerOptions:
     form = None
     form_requires_request = True
     listen_channels = []
+    listen_user_independent = False
     batch_key = "id"
     create_permission = None
     view_permission = None
@@ -189,6 +190,10 @@ class Handler(metaclass=HandlerMetaclass):
         # correct notifications based on what items the client has.
         if "loaded_pks" not in self.cache:
             self.cache["loaded_pks"] = set()
+        # Set by the protocol while a notification is fanned out to every
+        # connected client, so that fetched and dehydrated objects are shared
+        # between the handlers of all clients instead of being recomputed.
+        self.notify_cache = None
 
     def full_dehydrate(self, obj, for_list=False):
         """Convert the given object into a dictionary.
@@ -332,10 +337,7 @@ class Handler(metaclass=HandlerMetaclass):
                 {self._meta.pk: ["This field is required"]}
             )
         pk = params[self._meta.pk]
-        try:
-            obj = self.get_queryset(for_list=False).get(**{self._meta.pk: pk})
-        except self._meta.object_class.DoesNotExist:
-            raise HandlerDoesNotExistError(pk)
+        obj = self._fetch_object(pk)
         if permission is not None or self._meta.view_permission is not None:
             if permission is None:
                 permission = self._meta.view_permission
@@ -343,6 +345,43 @@ class Handler(metaclass=HandlerMetaclass):
                 raise HandlerPermissionError()
         return obj
 
+    def _fetch_object(self, pk):
+        """Return the object for `pk` from the handler queryset.
+
+        While a notification is being processed the object is fetched once
+        and shared through `notify_cache` with the handlers of the other
+        clients; permissions are still checked per user by `get_object`.
+        """
+        if self.notify_cache is None:
+            return self._fetch_object_from_db(pk)
+        key = ("object", self._get_notify_user_key(), pk)
+        if key not in self.notify_cache:
+            try:
+                self.notify_cache[key] = self._fetch_object_from_db(pk)
+            except HandlerDoesNotExistError as error:
+                self.notify_cache[key] = error
+        obj = self.notify_cache[key]
+        if isinstance(obj, HandlerDoesNotExistError):
+            raise obj
+        return obj
+
+    def _fetch_object_from_db(self, pk):
+        try:
+            return self.get_queryset(for_list=False).get(**{self._meta.pk: pk})
+        except self._meta.object_class.DoesNotExist:
+            raise HandlerDoesNotExistError(pk)
+
+    def _get_notify_user_key(self):
+        """Return the user part of the keys used in `notify_cache`.
+
+        Handlers whose queryset and dehydrated data depend on the user only
+        share work between clients of the same user, unless
+        `Meta.listen_user_independent` says otherwise.
+        """
+        if self._meta.listen_user_independent:
+            return None
+        return self.user.id
+
     def get_queryset(self, for_list=False):
         """Return `QuerySet` used by this handler.
 
@@ -828,7 +867,7 @@ class Handler(metaclass=HandlerMetaclass):
             return (
                 self._meta.handler_name,
                 action,
-                self.full_dehydrate(obj, for_list=False),
+                self._notify_dehydrate(obj, pk, for_list=False),
             )
         else:
             # Not active so only send the data like it was comming from
@@ -836,8 +875,20 @@ class Handler(metaclass=HandlerMetaclass):
             return (
                 self._meta.handler_name,
                 action,
-                self.full_dehydrate(obj, for_list=True),
+                self._notify_dehydrate(obj, pk, for_list=True),
+            )
+
+    def _notify_dehydrate(self, obj, pk, for_list=False):
+        """Dehydrate `obj` for a notification, sharing the result through
+        `notify_cache` with the handlers of the other clients."""
+        if self.notify_cache is None:
+            return self.full_dehydrate(obj, for_list=for_list)
+        key = ("data", self._get_notify_user_key(), pk, for_list)
+        if key not in self.notify_cache:
+            self.notify_cache[key] = self.full_dehydrate(
+                obj, for_list=for_list
             )
+        return self.notify_cache[key]
 
     def listen(self, channel, action, pk):
         """Called when the handler listens for events on channels with
@@ -27,6 +27,7 @@ class FabricHandler(TimestampedModelHandler):
             "set_active",
         ]
         listen_channels = ["fabric"]
+        listen_user_independent = True
 
     def dehydrate(self, obj, data, for_list=False):
         data["name"] = obj.get_name()
@@ -21,6 +21,7 @@ class IPRangeHandler(TimestampedModelHandler):
         form = IPRangeForm
         allowed_methods = ["list", "get", "create", "update", "delete"]
         listen_channels = ["iprange"]
+        listen_user_independent = True
 
     def dehydrate(self, obj, data, for_list=False):
         """Add extra fields to `data`."""
@@ -17,3 +17,4 @@ class ServiceHandler(TimestampedModelHandler):
         allowed_methods = ["list", "get", "set_active"]
         list_fields = ["id", "name", "status", "status_info"]
         listen_channels = ["service"]
+        listen_user_independent = True
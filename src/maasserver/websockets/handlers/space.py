@@ -29,6 +29,7 @@ class SpaceHandler(TimestampedModelHandler):
             "set_active",
         ]
         listen_channels = ["space"]
+        listen_user_independent = True
 
     def dehydrate(self, obj, data, for_list=False):
         data["name"] = obj.get_name()
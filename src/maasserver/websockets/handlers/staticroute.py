@@ -21,6 +21,7 @@ class StaticRouteHandler(TimestampedModelHandler):
         form_requires_request = False
         allowed_methods = ["list", "get", "create", "update", "delete"]
         listen_channels = ["staticroute"]
+        listen_user_independent = True
 
     def create(self, params):
         """Create a static route."""
@@ -39,6 +39,7 @@ class SubnetHandler(TimestampedModelHandler):
             "scan",
         ]
         listen_channels = ["subnet"]
+        listen_user_independent = True
 
     def dehydrate_dns_servers(self, dns_servers):
         if dns_servers is None:
@@ -46,6 +46,7 @@ class TagHandler(TimestampedModelHandler, AdminOnlyMixin):
             "delete",
         ]
         listen_channels = ["tag"]
+        listen_user_independent = True
 
     def _create(self, params):
         obj = super()._create(params)
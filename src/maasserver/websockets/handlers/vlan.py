@@ -45,6 +45,7 @@ class VLANHandler(TimestampedModelHandler):
             "delete",
         ]
         listen_channels = ["vlan"]
+        listen_user_independent = True
 
     def dehydrate_primary_rack(self, rack):
         if rack is None:
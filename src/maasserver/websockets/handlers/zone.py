@@ -31,6 +31,7 @@ class ZoneHandler(TimestampedModelHandler):
             "set_active",
         ]
         listen_channels = ["zone"]
+        listen_user_independent = True
 
     def delete(self, parameters):
         """Delete this Zone."""
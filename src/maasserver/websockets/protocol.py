@@ -447,18 +447,36 @@ class WebSocketFactory(Factory):
 
     @inlineCallbacks
     def onNotify(self, handler_class, channel, action, obj_id):
-        for client in self.clients:
-            handler = client.buildHandler(handler_class)
-            data = yield deferToDatabase(
-                self.processNotify, handler, channel, action, obj_id
-            )
+        clients = list(self.clients)
+        if len(clients) == 0:
+            return
+        handlers = [client.buildHandler(handler_class) for client in clients]
+        results = yield deferToDatabase(
+            self.processNotify, handlers, channel, action, obj_id
+        )
+        for client, data in zip(clients, results):
             if data is not None:
                 (name, client_action, data) = data
                 client.sendNotify(name, client_action, data)
 
     @transactional
-    def processNotify(self, handler, channel, action, obj_id):
-        return handler.on_listen(channel, action, obj_id)
+    def processNotify(self, handlers, channel, action, obj_id):
+        """Process the notification for the handlers of every client.
+
+        All the handlers are processed in a single transaction and share a
+        notify cache, so the object is fetched and dehydrated once per
+        variant; permission checks and `loaded_pks` bookkeeping are still
+        done per client by `Handler.on_listen`.
+        """
+        notify_cache = {}
+        results = []
+        for handler in handlers:
+            handler.notify_cache = notify_cache
+            try:
+                results.append(handler.on_listen(channel, action, obj_id))
+            finally:
+                handler.notify_cache = None
+        return results
 
     def registerRPCEvents(self):
         """Register for connected and disconnected events from the RPC
@@ -982,6 +982,82 @@ class TestHandler(MAASServerTestCase, FakeNodesHandlerMixin):
             mock_dehydrate, MockCalledOnceWith(node, for_list=False)
         )
 
+    def test_on_listen_shares_dehydrated_data_through_notify_cache(self):
+        node = factory.make_Node()
+        handler = self.make_nodes_handler(fields=["hostname"])
+        other_handler = type(handler)(handler.user, {}, handler.request)
+        notify_cache = {}
+        handler.notify_cache = notify_cache
+        other_handler.notify_cache = notify_cache
+        mock_dehydrate = self.patch(handler, "full_dehydrate")
+        mock_dehydrate.return_value = sentinel.data
+        self.assertEqual(
+            (handler._meta.handler_name, "create", sentinel.data),
+            handler.on_listen(sentinel.channel, "update", node.system_id),
+        )
+        self.assertEqual(
+            (handler._meta.handler_name, "create", sentinel.data),
+            other_handler.on_listen(
+                sentinel.channel, "update", node.system_id
+            ),
+        )
+        self.assertThat(
+            mock_dehydrate, MockCalledOnceWith(node, for_list=True)
+        )
+        self.assertIn(node.system_id, other_handler.cache["loaded_pks"])
+
+    def test_on_listen_does_not_share_notify_cache_between_users(self):
+        node = factory.make_Node()
+        handler = self.make_nodes_handler(fields=["hostname"])
+        other_handler = self.make_nodes_handler(fields=["hostname"])
+        notify_cache = {}
+        handler.notify_cache = notify_cache
+        other_handler.notify_cache = notify_cache
+        handler.on_listen(sentinel.channel, "update", node.system_id)
+        mock_dehydrate = self.patch(other_handler, "full_dehydrate")
+        mock_dehydrate.return_value = sentinel.data
+        other_handler.on_listen(sentinel.channel, "update", node.system_id)
+        self.assertThat(
+            mock_dehydrate, MockCalledOnceWith(node, for_list=True)
+        )
+
+    def test_on_listen_shares_notify_cache_if_user_independent(self):
+        node = factory.make_Node()
+        handler = self.make_nodes_handler(
+            fields=["hostname"], listen_user_independent=True
+        )
+        other_handler = type(handler)(factory.make_User(), {}, handler.request)
+        notify_cache = {}
+        handler.notify_cache = notify_cache
+        other_handler.notify_cache = notify_cache
+        handler.on_listen(sentinel.channel, "update", node.system_id)
+        mock_dehydrate = self.patch(other_handler, "full_dehydrate")
+        self.assertEqual(
+            (
+                handler._meta.handler_name,
+                "create",
+                {"hostname": node.hostname},
+            ),
+            other_handler.on_listen(
+                sentinel.channel, "update", node.system_id
+            ),
+        )
+        self.assertThat(mock_dehydrate, MockNotCalled())
+
+    def test_get_object_caches_missing_object_in_notify_cache(self):
+        handler = self.make_nodes_handler()
+        handler.notify_cache = {}
+        system_id = factory.make_name("system_id")
+        mock_queryset = self.patch(handler, "get_queryset")
+        mock_queryset.return_value = Node.objects.all()
+        for _ in range(2):
+            self.assertRaises(
+                HandlerDoesNotExistError,
+                handler.get_object,
+                {"system_id": system_id},
+            )
+        self.assertThat(mock_queryset, MockCalledOnceWith(for_list=False))
+
     def test_listen_calls_get_object_with_pk_on_other_actions(self):
         handler = self.make_nodes_handler()
         mock_get_object = self.patch(handler, "get_object")
@@ -979,6 +979,61 @@ class TestWebSocketFactoryTransactional(
         )
         self.assertThat(mock_sendNotify, MockCalledWith(name, action, data))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_processes_all_clients_in_one_call(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        other_protocol = factory.buildProtocol(None)
+        other_protocol.transport = MagicMock()
+        other_protocol.user = user
+        factory.clients.append(other_protocol)
+        mock_class = MagicMock()
+        mock_class.return_value.on_listen.return_value = None
+        mock_processNotify = self.patch(factory, "processNotify")
+        mock_processNotify.return_value = [None, None]
+        yield factory.onNotify(
+            mock_class, sentinel.channel, sentinel.action, sentinel.obj_id
+        )
+        self.assertThat(
+            mock_processNotify,
+            MockCalledOnceWith(
+                [mock_class.return_value, mock_class.return_value],
+                sentinel.channel,
+                sentinel.action,
+                sentinel.obj_id,
+            ),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processNotify_shares_notify_cache_between_handlers(self):
+        handlers = [MagicMock(), MagicMock()]
+        notify_caches = []
+
+        def on_listen(handler):
+            def _on_listen(channel, action, obj_id):
+                notify_caches.append(handler.notify_cache)
+                return sentinel.data
+
+            return _on_listen
+
+        for handler in handlers:
+            handler.on_listen.side_effect = on_listen(handler)
+        factory = self.make_factory()
+        results = yield deferToDatabase(
+            factory.processNotify,
+            handlers,
+            sentinel.channel,
+            sentinel.action,
+            sentinel.obj_id,
+        )
+        self.assertEqual([sentinel.data, sentinel.data], results)
+        self.assertEqual({}, notify_caches[0])
+        self.assertIs(notify_caches[0], notify_caches[1])
+        for handler in handlers:
+            self.assertIsNone(handler.notify_cache)
+
     @wait_for_reactor
     @inlineCallbacks
     def test_updateRackController_calls_onNotify_for_controller_update(self):
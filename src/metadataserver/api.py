@@ -203,6 +203,34 @@ def add_event_to_node_event_log(
     node, origin, action, description, event_type, result=None, created=None
 ):
     """Add an entry to the node's event log."""
+    type_name = get_node_event_type_name(node, result)
+
+    # Create an extra event for the machine status messages.
+    if action in EVENT_STATUS_MESSAGES and event_type == "start":
+        Event.objects.register_event_and_event_type(
+            EVENT_STATUS_MESSAGES[action],
+            type_level=EVENT_DETAILS[EVENT_STATUS_MESSAGES[action]].level,
+            type_description=EVENT_DETAILS[
+                EVENT_STATUS_MESSAGES[action]
+            ].description,
+            event_action=action,
+            system_id=node.system_id,
+            created=created,
+        )
+
+    return Event.objects.register_event_and_event_type(
+        type_name,
+        type_level=EVENT_DETAILS[type_name].level,
+        type_description=EVENT_DETAILS[type_name].description,
+        event_action=action,
+        event_description=f"'{origin}' {description}",
+        system_id=node.system_id,
+        created=created,
+    )
+
+
+def get_node_event_type_name(node, result=None):
+    """Return the type of event to log for a status message from `node`."""
     if node.status == NODE_STATUS.COMMISSIONING:
         if result in ["SUCCESS", None]:
             type_name = EVENT_TYPES.NODE_COMMISSIONING_EVENT
@@ -227,29 +255,7 @@ def add_event_to_node_event_log(
         type_name = EVENT_TYPES.REQUEST_CONTROLLER_REFRESH
     else:
         type_name = EVENT_TYPES.NODE_STATUS_EVENT
-
-    # Create an extra event for the machine status messages.
-    if action in EVENT_STATUS_MESSAGES and event_type == "start":
-        Event.objects.register_event_and_event_type(
-            EVENT_STATUS_MESSAGES[action],
-            type_level=EVENT_DETAILS[EVENT_STATUS_MESSAGES[action]].level,
-            type_description=EVENT_DETAILS[
-                EVENT_STATUS_MESSAGES[action]
-            ].description,
-            event_action=action,
-            system_id=node.system_id,
-            created=created,
-        )
-
-    return Event.objects.register_event_and_event_type(
-        type_name,
-        type_level=EVENT_DETAILS[type_name].level,
-        type_description=EVENT_DETAILS[type_name].description,
-        event_action=action,
-        event_description=f"'{origin}' {description}",
-        system_id=node.system_id,
-        created=created,
-    )
+    return type_name
 
 
 _EXT_TO_KEY = {".out": "stdout", ".err": "stderr", ".yaml": "result"}
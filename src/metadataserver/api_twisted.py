@@ -8,6 +8,7 @@ import bz2
 from collections import defaultdict
 from datetime import datetime
 import json
+import time
 
 from django.db.utils import DatabaseError
 from twisted.application.internet import TimerService
@@ -18,7 +19,7 @@ from twisted.web.server import NOT_DONE_YET
 from maasserver.api.utils import extract_oauth_key_from_auth_header
 from maasserver.enum import NODE_STATUS, NODE_TYPE
 from maasserver.forms.pods import PodForm
-from maasserver.models import Node, NodeMetadata
+from maasserver.models import Event, EventType, Node, NodeMetadata
 from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.utils.orm import (
     in_transaction,
@@ -28,7 +29,11 @@ from maasserver.utils.orm import (
 from maasserver.utils.threads import deferToDatabase
 from maasserver.vmhost import discover_and_sync_vmhost
 from metadataserver import logger
-from metadataserver.api import add_event_to_node_event_log, process_file
+from metadataserver.api import (
+    add_event_to_node_event_log,
+    get_node_event_type_name,
+    process_file,
+)
 from metadataserver.enum import SCRIPT_STATUS
 from metadataserver.models import NodeKey
 from metadataserver.vendor_data import (
@@ -36,8 +41,9 @@ from metadataserver.vendor_data import (
     VIRSH_PASSWORD_METADATA_KEY,
 )
 from provisioningserver.certificates import Certificate
-from provisioningserver.events import EVENT_STATUS_MESSAGES
+from provisioningserver.events import EVENT_DETAILS, EVENT_STATUS_MESSAGES
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import deferred
 
 log = LegacyLogger()
@@ -310,8 +316,113 @@ class StatusWorkerService(TimerService):
         # We're not going to wait for them to be processed because we can't /
         # don't apply back-pressure to those systems that are producing these
         # messages anyway.
+        if len(tasks) != 0:
+            self.dbtasks.addTask(self._processMessageBatch, tasks)
+
+    def _processMessageBatch(self, tasks):
+        # Push all the queued messages into the database in one transaction.
+        # This should be called in a non-reactor thread with a pre-existing
+        # connection (e.g. via deferToDatabase).
+        if in_transaction():
+            raise TransactionManagementError(
+                "_processMessageBatch must be called from "
+                "outside of a transaction."
+            )
+        started = time.monotonic()
+        try:
+            self._processBatch(tasks)
+        except Exception:
+            log.err(
+                None,
+                "Failed to process node status messages in a batch; "
+                "processing them one at a time.",
+            )
+            for node, messages in tasks:
+                self._processMessages(node, messages)
+        PROMETHEUS_METRICS.update(
+            "maas_status_message_batch_size",
+            "observe",
+            value=sum(len(messages) for _, messages in tasks),
+        )
+        PROMETHEUS_METRICS.update(
+            "maas_status_message_batch_latency",
+            "observe",
+            value=time.monotonic() - started,
+        )
+
+    @transactional
+    def _processBatch(self, tasks):
+        """Process queued messages for several nodes at once.
+
+        Queued messages are those that `queueMessage` did not process
+        immediately: they carry no files and don't finish a top-level event,
+        so they only add to the node's event log and may reset its
+        `status_expires`. The nodes are loaded with a single query, all the
+        events are inserted with a single query, and each node is saved at
+        most once.
+        """
+        nodes = Node.objects.in_bulk([node.id for node, _ in tasks])
+        event_types = {}
+        events = []
         for node, messages in tasks:
-            self.dbtasks.addTask(self._processMessages, node, messages)
+            node = nodes.get(node.id)
+            if node is None:
+                # Node has been deleted no reason to save its events.
+                continue
+            reset_status_expires = False
+            for message in messages:
+                for type_name, action, description in self._getEvents(
+                    node, message
+                ):
+                    if type_name not in event_types:
+                        event_types[type_name] = EventType.objects.register(
+                            type_name,
+                            EVENT_DETAILS[type_name].description,
+                            EVENT_DETAILS[type_name].level,
+                        )
+                    events.append(
+                        Event(
+                            type=event_types[type_name],
+                            node=node,
+                            node_system_id=node.system_id,
+                            node_hostname=node.hostname,
+                            action=action,
+                            description=description,
+                            created=message["timestamp"],
+                            updated=message["timestamp"],
+                        )
+                    )
+                if self._resetsStatusExpires(message):
+                    reset_status_expires = True
+            if reset_status_expires:
+                node.reset_status_expires()
+                node.save(update_fields=["status_expires"])
+        Event.objects.bulk_create(events)
+
+    def _getEvents(self, node, message):
+        """Return the events to log for `message`.
+
+        Returns a list of (type name, action, description) tuples, matching
+        what `add_event_to_node_event_log` would log for the message.
+        """
+        event_type = message["event_type"]
+        activity_name = message["name"]
+        result = message.get("result", None)
+        if not (event_type == "start" or result in ["FAIL", "FAILURE"]):
+            return []
+        events = []
+        if activity_name in EVENT_STATUS_MESSAGES and event_type == "start":
+            events.append(
+                (EVENT_STATUS_MESSAGES[activity_name], activity_name, "")
+            )
+        events.append(
+            (
+                get_node_event_type_name(node, result),
+                activity_name,
+                "'%s' %s" % (message["origin"], message["description"]),
+            )
+        )
+        return events
 
     def _processMessages(self, node, messages):
         # Push the messages into the database, recording them for this node.
@@ -498,19 +609,7 @@ class StatusWorkerService(TimerService):
                 script_result.status = SCRIPT_STATUS.RUNNING
                 script_result.save(update_fields=["status"])
 
-        # Reset status_expires when Curtin signals its starting or finishing
-        # early commands. This allows users to define early or late commands
-        # which take up to 40 minutes to run.
-        if (
-            origin == "curtin"
-            and event_type in ["start", "finish"]
-            and activity_name
-            in [
-                "cmd-install/stage-early",
-                "cmd-install",
-                "cmd-install/stage-late",
-            ]
-        ):
+        if self._resetsStatusExpires(message):
             node.reset_status_expires()
             save_node = True
 
@@ -539,6 +638,21 @@ class StatusWorkerService(TimerService):
 
         return decompress(decode(content.encode("ascii")))
 
+    def _resetsStatusExpires(self, message):
+        """Reset status_expires when Curtin signals its starting or finishing
+        early commands. This allows users to define early or late commands
+        which take up to 40 minutes to run."""
+        return (
+            message["origin"] == "curtin"
+            and message["event_type"] in ["start", "finish"]
+            and message["name"]
+            in [
+                "cmd-install/stage-early",
+                "cmd-install",
+                "cmd-install/stage-late",
+            ]
+        )
+
     def _is_top_level(self, activity_name):
         """Top-level events do not have slashes in their names."""
         return "/" not in activity_name
@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from io import BytesIO
 import json
 import random
-from unittest.mock import call, Mock, sentinel
+from unittest.mock import ANY, call, Mock, sentinel
 
 from django.db.utils import DatabaseError
 from netaddr import IPAddress
@@ -37,6 +37,7 @@ from maasserver.utils.orm import (
 )
 from maasserver.utils.threads import deferToDatabase
 from maastesting.crochet import wait_for
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
     MockCalledOnceWith,
     MockCallsMatch,
@@ -204,12 +205,13 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
             for message in node_messages[node]:
                 worker.queueMessage(token.key, message)
         yield worker._tryUpdateNodes()
-        call_args = [
-            (call_arg[0][1], call_arg[0][2])
-            for call_arg in dbtasks.addTask.call_args_list
-        ]
         self.assertThat(
-            call_args,
+            dbtasks.addTask,
+            MockCalledOnceWith(worker._processMessageBatch, ANY),
+        )
+        [tasks] = dbtasks.addTask.call_args[0][1:]
+        self.assertThat(
+            tasks,
             MatchesSetwise(
                 *[
                     MatchesListwise([Equals(node), Equals(messages)])
@@ -218,6 +220,71 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
             ),
         )
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processMessageBatch_fails_when_in_transaction(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        with ExpectedException(TransactionManagementError):
+            yield deferToDatabase(
+                transactional(worker._processMessageBatch),
+                [(sentinel.node, [sentinel.message])],
+            )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processMessageBatch_calls_processBatch(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        mock_processBatch = self.patch(worker, "_processBatch")
+        mock_processMessages = self.patch(worker, "_processMessages")
+        tasks = [(sentinel.node, [sentinel.message1, sentinel.message2])]
+        yield deferToDatabase(worker._processMessageBatch, tasks)
+        self.assertThat(mock_processBatch, MockCalledOnceWith(tasks))
+        self.assertThat(mock_processMessages, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processMessageBatch_falls_back_to_processMessages(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        self.patch(
+            worker, "_processBatch"
+        ).side_effect = factory.make_exception()
+        mock_processMessages = self.patch(worker, "_processMessages")
+        tasks = [
+            (sentinel.node1, [sentinel.message1]),
+            (sentinel.node2, [sentinel.message2]),
+        ]
+        yield deferToDatabase(worker._processMessageBatch, tasks)
+        self.assertThat(
+            mock_processMessages,
+            MockCallsMatch(
+                call(sentinel.node1, [sentinel.message1]),
+                call(sentinel.node2, [sentinel.message2]),
+            ),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processMessageBatch_records_metrics(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        self.patch(worker, "_processBatch")
+        mock_metrics = self.patch(
+            api_twisted_module.PROMETHEUS_METRICS, "update"
+        )
+        tasks = [
+            (sentinel.node1, [sentinel.message1, sentinel.message2]),
+            (sentinel.node2, [sentinel.message3]),
+        ]
+        yield deferToDatabase(worker._processMessageBatch, tasks)
+        self.assertThat(
+            mock_metrics,
+            MockCallsMatch(
+                call("maas_status_message_batch_size", "observe", value=3),
+                call(
+                    "maas_status_message_batch_latency", "observe", value=ANY
+                ),
+            ),
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_processMessages_fails_when_in_transaction(self):
@@ -1082,6 +1149,116 @@ class TestStatusWorkerService(MAASServerTestCase):
         )
 
 
+class TestStatusWorkerServiceBatch(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(SignalsDisabled("power"))
+
+    def processBatch(self, tasks):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        return worker._processBatch(tasks)
+
+    def make_message(self, **kwargs):
+        message = {
+            "event_type": random.choice(["start", "progress", "finish"]),
+            "origin": factory.make_name("origin"),
+            "name": "%s/%s"
+            % (factory.make_name("name"), factory.make_name("step")),
+            "description": factory.make_name("description"),
+            "timestamp": datetime.utcnow(),
+        }
+        message.update(kwargs)
+        return message
+
+    def get_events(self, node):
+        return [
+            (event.type.name, event.action, event.description, event.created)
+            for event in Event.objects.filter(node=node).order_by("id")
+        ]
+
+    def test_logs_same_events_as_processMessage(self):
+        messages = [
+            self.make_message(event_type="start"),
+            self.make_message(event_type="progress"),
+            self.make_message(event_type="finish", result="SUCCESS"),
+            self.make_message(event_type="finish", result="FAILURE"),
+            self.make_message(
+                event_type="start",
+                name=random.choice(list(EVENT_STATUS_MESSAGES)),
+            ),
+        ]
+        node1, node2 = (
+            factory.make_Node(
+                status=NODE_STATUS.DEPLOYING, with_empty_script_sets=True
+            )
+            for _ in range(2)
+        )
+        worker = StatusWorkerService(sentinel.dbtasks)
+        for message in messages:
+            worker._processMessage(node1, message)
+        self.processBatch([(node2, messages)])
+        self.assertEqual(self.get_events(node1), self.get_events(node2))
+
+    def test_inserts_events_with_constant_queries(self):
+        def make_tasks(count):
+            return [
+                (
+                    factory.make_Node(status=NODE_STATUS.DEPLOYING),
+                    [self.make_message(event_type="start") for _ in range(3)],
+                )
+                for _ in range(count)
+            ]
+
+        # Register the event type first.
+        self.processBatch(make_tasks(1))
+        count_one, _ = count_queries(self.processBatch, make_tasks(1))
+        count_many, _ = count_queries(self.processBatch, make_tasks(5))
+        self.assertEqual(count_one, count_many)
+
+    def test_resets_status_expires(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.DEPLOYING,
+            status_expires=factory.make_date(),
+            with_empty_script_sets=True,
+        )
+        messages = [
+            self.make_message(
+                event_type=event_type, origin="curtin", name=name
+            )
+            for event_type, name in [
+                ("start", "cmd-install/stage-early"),
+                ("finish", "cmd-install/stage-early"),
+                ("start", "cmd-install/stage-late"),
+            ]
+        ]
+        self.processBatch([(node, messages)])
+        node = reload_object(node)
+        # See TestStatusWorkerService.test_resets_status_expires.
+        expected_time = now() + timedelta(
+            minutes=get_node_timeout(NODE_STATUS.DEPLOYING)
+        )
+        self.assertGreaterEqual(
+            node.status_expires, expected_time - timedelta(minutes=1)
+        )
+        self.assertLessEqual(
+            node.status_expires, expected_time + timedelta(minutes=1)
+        )
+
+    def test_skips_deleted_nodes(self):
+        node1 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        node2 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        node1.delete()
+        message1 = self.make_message(event_type="start")
+        message2 = self.make_message(event_type="start")
+        self.processBatch([(node1, [message1]), (node2, [message2])])
+        self.assertFalse(
+            Event.objects.filter(
+                description__contains=message1["description"]
+            ).exists()
+        )
+        self.assertEqual(1, Event.objects.filter(node=node2).count())
+
+
 class TestCreateVMHostForDeployment(MAASServerTestCase):
     def setUp(self):
         super().setUp()
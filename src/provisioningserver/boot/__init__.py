@@ -24,7 +24,11 @@ from provisioningserver.logger import get_maas_logger
 from provisioningserver.rpc import getRegionClient
 from provisioningserver.rpc.region import GetArchiveMirrors
 from provisioningserver.utils import locate_template, tftp
-from provisioningserver.utils.fs import atomic_copy, atomic_symlink
+from provisioningserver.utils.fs import (
+    atomic_copy,
+    atomic_symlink,
+    get_file_stamp,
+)
 from provisioningserver.utils.network import (
     convert_host_to_uri_str,
     find_mac_via_arp,
@@ -305,17 +309,21 @@ class BootMethod(metaclass=ABCMeta):
         )
         assert isinstance(self.user_class, str) or self.user_class is None
         self.get_template_dir = lru_cache(maxsize=1)(self._get_template_dir)
-        self.get_template = lru_cache(maxsize=512)(self._get_template)
+        # Maps (purpose, arch, subarch) to (directory stamp, template
+        # filename, template stamp, template); the last three are None if
+        # there's no template.
+        self._templates = {}
 
     def _get_template_dir(self):
         """Gets the template directory for the boot method."""
         return locate_template("%s" % self.template_subdir)
 
-    def _get_template(self, purpose, arch, subarch):
+    def get_template(self, purpose, arch, subarch):
         """Gets the best avaliable template for the boot method.
 
-        Templates are loaded each time here so that they can be changed on
-        the fly without restarting the provisioning server.
+        Templates are cached, but the template directory and the chosen
+        template are checked for changes each time, so that they can be
+        changed on the fly without restarting the provisioning server.
 
         :param purpose: The boot purpose, e.g. "local".
         :param arch: Main machine architecture.
@@ -323,16 +331,23 @@ class BootMethod(metaclass=ABCMeta):
         :return: `tempita.Template`
         """
         pxe_templates_dir = self.get_template_dir()
-        for filename in gen_template_filenames(purpose, arch, subarch):
-            template_name = os.path.join(pxe_templates_dir, filename)
-            try:
-                return tempita.Template.from_filename(
-                    template_name, encoding="UTF-8"
-                )
-            except OSError as error:
-                if error.errno != ENOENT:
-                    raise
-        else:
+        dir_stamp = get_file_stamp(pxe_templates_dir)
+        key = purpose, arch, subarch
+        cached = self._templates.get(key)
+        if (
+            cached is None
+            or cached[0] != dir_stamp
+            or (
+                cached[1] is not None
+                and cached[2] != get_file_stamp(cached[1])
+            )
+        ):
+            # The directory is stamped before looking for templates, so
+            # anything that changes while looking is found next time.
+            cached = (dir_stamp, *self._get_template(*key))
+            self._templates[key] = cached
+        template = cached[3]
+        if template is None:
             error = (
                 "No PXE template found in %r for:\n"
                 "  Purpose: %r, Arch: %r, Subarch: %r\n"
@@ -344,6 +359,32 @@ class BootMethod(metaclass=ABCMeta):
             )
             try_send_rack_event(EVENT_TYPES.RACK_IMPORT_ERROR, error)
             raise AssertionError(error)
+        return template
+
+    def _get_template(self, purpose, arch, subarch):
+        """Loads the best avaliable template for the boot method.
+
+        :return: A ``(filename, stamp, template)`` tuple, or ``(None, None,
+            None)`` if there's no template.
+        """
+        pxe_templates_dir = self.get_template_dir()
+        for filename in gen_template_filenames(purpose, arch, subarch):
+            template_name = os.path.join(pxe_templates_dir, filename)
+            # The template is stamped before it's loaded, so that changes
+            # made while loading it are found next time.
+            stamp = get_file_stamp(template_name)
+            if stamp is None:
+                continue
+            try:
+                template = tempita.Template.from_filename(
+                    template_name, encoding="UTF-8"
+                )
+            except OSError as error:
+                if error.errno != ENOENT:
+                    raise
+            else:
+                return template_name, stamp, template
+        return None, None, None
 
     def compose_template_namespace(self, kernel_params):
         """Composes the namespace variables that are used by a boot
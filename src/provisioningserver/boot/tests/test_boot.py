@@ -87,10 +87,13 @@ class TestBootMethod(MAASTestCase):
         self.assertSequenceEqual(expected, list(observed))
 
     def test_get_pxe_template(self):
+        templates_dir = self.make_dir()
         method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
         purpose = factory.make_name("purpose")
         arch, subarch = factory.make_names("arch", "subarch")
         filename = factory.make_name("filename")
+        factory.make_file(templates_dir, filename)
         # Set up the mocks that we've patched in.
         gen_filenames = self.patch(boot, "gen_template_filenames")
         gen_filenames.return_value = [filename]
@@ -138,7 +141,10 @@ class TestBootMethod(MAASTestCase):
     def test_get_templates_only_suppresses_ENOENT(self):
         # The IOError arising from trying to load a template that doesn't
         # exist is suppressed, but other errors are not.
+        templates_dir = self.make_dir()
         method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
+        factory.make_file(templates_dir, "config.template")
         from_filename = self.patch(tempita.Template, "from_filename")
         from_filename.side_effect = IOError()
         from_filename.side_effect.errno = errno.EACCES
@@ -148,6 +154,64 @@ class TestBootMethod(MAASTestCase):
             *factory.make_names("purpose", "arch", "subarch"),
         )
 
+    def test_get_template_caches_template(self):
+        templates_dir = self.make_dir()
+        method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
+        factory.make_file(templates_dir, "config.template")
+        from_filename = self.patch(tempita.Template, "from_filename")
+        from_filename.return_value = mock.sentinel.template
+        names = list(factory.make_names("purpose", "arch", "subarch"))
+        self.assertEqual(mock.sentinel.template, method.get_template(*names))
+        self.assertEqual(mock.sentinel.template, method.get_template(*names))
+        self.assertThat(from_filename, MockCalledOnce())
+
+    def test_get_template_reloads_changed_template(self):
+        templates_dir = self.make_dir()
+        method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
+        filename = factory.make_file(
+            templates_dir, "config.template", contents=b"old"
+        )
+        names = list(factory.make_names("purpose", "arch", "subarch"))
+        self.assertEqual("old", method.get_template(*names).substitute())
+        with open(filename, "wb") as stream:
+            stream.write(b"new content")
+        self.assertEqual(
+            "new content", method.get_template(*names).substitute()
+        )
+
+    def test_get_template_finds_new_better_template(self):
+        templates_dir = self.make_dir()
+        method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
+        factory.make_file(templates_dir, "config.template")
+        purpose, arch, subarch = factory.make_names(
+            "purpose", "arch", "subarch"
+        )
+        method.get_template(purpose, arch, subarch)
+        better_template = factory.make_file(
+            templates_dir, f"config.{purpose}.template"
+        )
+        self.assertEqual(
+            better_template, method.get_template(purpose, arch, subarch).name
+        )
+
+    def test_get_template_caches_template_not_found(self):
+        self.patch(boot, "try_send_rack_event")
+        templates_dir = self.make_dir()
+        method = FakeBootMethod()
+        method.get_template_dir = lambda: templates_dir
+        gen_filenames = self.patch(boot, "gen_template_filenames")
+        gen_filenames.return_value = ["config.template"]
+        names = list(factory.make_names("purpose", "arch", "subarch"))
+        self.assertRaises(AssertionError, method.get_template, *names)
+        self.assertRaises(AssertionError, method.get_template, *names)
+        self.assertThat(gen_filenames, MockCalledOnce())
+        # The template is found once it has been added.
+        template = factory.make_file(templates_dir, "config.template")
+        self.assertEqual(template, method.get_template(*names).name)
+
     def test_link_bootloader_links_simplestream_bootloader_files(self):
         method = FakeBootMethod()
         with tempdir() as tmp:
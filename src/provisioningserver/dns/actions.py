@@ -10,6 +10,7 @@ from time import sleep
 from provisioningserver.dns.config import (
     DNSConfig,
     execute_rndc_command,
+    get_named_rndc_key,
     set_up_options_conf,
 )
 from provisioningserver.logger import get_maas_logger
@@ -92,7 +93,9 @@ def bind_reload_zones(zone_list):
     return ret
 
 
-def bind_write_configuration(zones, trusted_networks, forwarded_zones=None):
+def bind_write_configuration(
+    zones, trusted_networks, forwarded_zones=None, dynamic_update_key=None
+):
     """Write BIND's configuration.
 
     :param zones: Those zones to include in main config.
@@ -100,6 +103,9 @@ def bind_write_configuration(zones, trusted_networks, forwarded_zones=None):
 
     :param trusted_networks: A sequence of CIDR network specifications that
         are permitted to use the DNS server as a forwarder.
+    :param dynamic_update_key: The name of the key allowed to dynamically
+        update the zones, if they are to be published that way.
+    :return: Whether the configuration changed.
     """
     # trusted_networks was formerly specified as a single IP address with
     # netmask. These assertions are here to prevent code that assumes that
@@ -108,7 +114,10 @@ def bind_write_configuration(zones, trusted_networks, forwarded_zones=None):
     assert isinstance(trusted_networks, Sequence)
 
     dns_config = DNSConfig(zones=zones, forwarded_zones=forwarded_zones)
-    dns_config.write_config(trusted_networks=trusted_networks)
+    return dns_config.write_config(
+        trusted_networks=trusted_networks,
+        dynamic_update_key=dynamic_update_key,
+    )
 
 
 def bind_write_options(upstream_dns, dnssec_validation):
@@ -116,22 +125,160 @@ def bind_write_options(upstream_dns, dnssec_validation):
 
     :param upstream_dns: A sequence of upstream DNS servers.
     :param dnssec_validation: Whether to enable DNSSec.
+    :return: Whether the options changed.
     """
     # upstream_dns was formerly specified as a single IP address. These
     # assertions are here to prevent code that assumes that slipping through.
     assert not isinstance(upstream_dns, (bytes, str))
     assert isinstance(upstream_dns, Sequence)
 
-    set_up_options_conf(
+    return set_up_options_conf(
         upstream_dns=upstream_dns, dnssec_validation=dnssec_validation
     )
 
 
-def bind_write_zones(zones):
+def bind_write_zones(zones, zone_state=None, updater=None):
     """Write out DNS zones.
 
     :param zones: Those zones to write.
     :type zones: Sequence of :py:class:`DomainData`.
+    :param zone_state: Optional dict of the state of the zones as last
+        published, used to skip rewriting unchanged zone files. See
+        `DomainConfigBase.write_config`.
+    :param updater: Optional `DynamicZoneUpdater` with which to publish
+        changes to the records of existing zones.
+    :return: The names of the zones whose files were written.
     """
+    written = []
     for zone in zones:
-        zone.write_config()
+        written.extend(
+            zone.write_config(zone_state=zone_state, updater=updater)
+        )
+    if zone_state is not None:
+        # Forget about zones that are no longer published.
+        current = {zi.target_path for zone in zones for zi in zone.zone_info}
+        for target_path in set(zone_state) - current:
+            del zone_state[target_path]
+    return written
+
+
+class DynamicZoneUpdater:
+    """Publish changes to zones as dynamic updates to BIND (RFC 2136).
+
+    Updates are signed with MAAS's rndc key, which BIND must allow to update
+    the zones; see `bind_write_configuration`. BIND keeps dynamically updated
+    zones in a journal, so zone files must be frozen before they're rewritten
+    and thawed afterwards, which also reloads them.
+    """
+
+    def __init__(self, server="127.0.0.1", port=53, timeout=2):
+        self.server = server
+        self.port = port
+        self.timeout = timeout
+        # Zones that were dynamically updated.
+        self.updated = []
+        # Zones that were frozen so that their files can be rewritten.
+        self.frozen = []
+
+    def update(self, zone_name, soa, removed, added):
+        """Send a dynamic update for `zone_name`.
+
+        :param soa: A `(ttl, rdata)` tuple for the zone's new SOA record,
+            which carries its new serial.
+        :param removed: `(name, ttl, rrtype, rdata)` records to delete.
+        :param added: `(name, ttl, rrtype, rdata)` records to add. A `None`
+            TTL means the SOA's TTL.
+        :return: True if BIND applied the update, False otherwise.
+        """
+        # dnspython is only needed by the region, which manages BIND.
+        import dns.exception
+        import dns.name
+        import dns.query
+        import dns.rcode
+        import dns.rdata
+        import dns.rdataclass
+        import dns.rdatatype
+        import dns.tsig
+        import dns.tsigkeyring
+        import dns.update
+
+        key_name, algorithm, secret = get_named_rndc_key()
+        if algorithm.lower() == "hmac-md5":
+            # BIND's short name for the algorithm, as older rndc-confgen use.
+            algorithm = dns.tsig.HMAC_MD5
+        origin = dns.name.from_text(zone_name)
+        message = dns.update.UpdateMessage(
+            origin,
+            keyring=dns.tsigkeyring.from_text({key_name: secret}),
+            keyname=key_name,
+            keyalgorithm=algorithm,
+        )
+
+        def make_rdata(rrtype, rdata):
+            return dns.rdata.from_text(
+                dns.rdataclass.IN,
+                dns.rdatatype.from_text(rrtype),
+                str(rdata),
+                origin=origin,
+                relativize=False,
+            )
+
+        soa_ttl, soa_rdata = soa
+        for name, _, rrtype, rdata in removed:
+            message.delete(
+                dns.name.from_text(name, origin), make_rdata(rrtype, rdata)
+            )
+        for name, ttl, rrtype, rdata in added:
+            message.add(
+                dns.name.from_text(name, origin),
+                soa_ttl if ttl is None else ttl,
+                make_rdata(rrtype, rdata),
+            )
+        message.replace(origin, soa_ttl, make_rdata("SOA", soa_rdata))
+        try:
+            response = dns.query.tcp(
+                message, self.server, port=self.port, timeout=self.timeout
+            )
+        except (OSError, dns.exception.DNSException) as exc:
+            maaslog.error(
+                "Dynamic update of BIND zone %r failed: %s", zone_name, exc
+            )
+            return False
+        if response.rcode() != dns.rcode.NOERROR:
+            maaslog.error(
+                "Dynamic update of BIND zone %r refused: %s",
+                zone_name,
+                dns.rcode.to_text(response.rcode()),
+            )
+            return False
+        self.updated.append(zone_name)
+        return True
+
+    def freeze(self, zone_name):
+        """Freeze `zone_name` so that its file can be rewritten.
+
+        This fails harmlessly for zones that BIND hasn't loaded yet.
+        """
+        try:
+            execute_rndc_command(("freeze", zone_name), timeout=self.timeout)
+        except (CalledProcessError, TimeoutExpired) as exc:
+            maaslog.debug("Freezing BIND zone %r failed: %s", zone_name, exc)
+        else:
+            self.frozen.append(zone_name)
+
+    def thaw(self):
+        """Thaw, and so reload, all the zones frozen by `freeze`.
+
+        :return: True if success, False otherwise.
+        """
+        ret = True
+        frozen, self.frozen = self.frozen, []
+        for zone_name in frozen:
+            try:
+                execute_rndc_command(("thaw", zone_name), timeout=self.timeout)
+            except (CalledProcessError, TimeoutExpired) as exc:
+                maaslog.error(
+                    "Thawing BIND zone %r failed: %s", zone_name, exc
+                )
+                ret = False
+        return ret
@@ -155,6 +155,26 @@ def get_rndc_conf_path():
     return compose_config_path(MAAS_RNDC_CONF_NAME)
 
 
+def get_named_rndc_key():
+    """Return MAAS's key for controlling BIND.
+
+    This is the key generated by `set_up_rndc`. BIND also accepts it for
+    dynamic updates to MAAS's zones when they are published that way.
+
+    :return: A tuple of the key's name, algorithm and (base64) secret.
+    :raises DNSConfigFail: If there is no key in the configuration.
+    """
+    named_rndc_conf_path = get_named_rndc_conf_path()
+    for name, value in read_isc_file(named_rndc_conf_path).items():
+        if name.startswith("key "):
+            return (
+                name[len("key ") :].strip('"'),
+                value["algorithm"],
+                value["secret"].strip('"'),
+            )
+    raise DNSConfigFail("No key found in %s." % named_rndc_conf_path)
+
+
 def set_up_rndc():
     """Writes out the two files needed to enable MAAS to use rndc commands:
     MAAS_RNDC_CONF_NAME and MAAS_NAMED_RNDC_CONF_NAME.
@@ -188,6 +208,9 @@ def set_up_options_conf(overwrite=True, **kwargs):
     inside its 'options' block.  MAAS cannot write the options file itself,
     so relies on either the DNSFixture in the test suite, or the packaging.
     Both should set that file up appropriately to include our file.
+
+    :return: Whether the file was written; it is left alone when it already
+        has the wanted content.
     """
     template = load_template("dns", "named.conf.options.inside.maas.template")
 
@@ -228,7 +251,22 @@ def set_up_options_conf(overwrite=True, **kwargs):
         rendered = rendered.encode("ascii")
 
     target_path = compose_config_path(MAAS_NAMED_CONF_OPTIONS_INSIDE_NAME)
+    if content_unchanged(rendered, target_path):
+        return False
     atomic_write(rendered, target_path, overwrite=overwrite, mode=0o644)
+    return True
+
+
+def content_unchanged(content, target_path):
+    """Does the file at `target_path` hold exactly `content` already?
+
+    :type content: `bytes`
+    """
+    try:
+        with open(target_path, "rb") as fd:
+            return fd.read() == content
+    except OSError:
+        return False
 
 
 def compose_config_path(filename):
@@ -300,16 +338,22 @@ class DNSConfig:
     def write_config(self, overwrite=True, **kwargs):
         """Write out this DNS config file.
 
+        :param dynamic_update_key: The name of a key that is allowed to
+            dynamically update the zones, if any.
         :raises DNSConfigDirectoryMissing: if the DNS configuration directory
             does not exist.
+        :return: Whether the file was written; it is left alone when it
+            already has the wanted content.
         """
         trusted_networks = kwargs.pop("trusted_networks", "")
+        dynamic_update_key = kwargs.pop("dynamic_update_key", None)
         context = {
             "zones": self.zones,
             "forwarded_zones": self.forwarded_zones,
             "DNS_CONFIG_DIR": get_dns_config_dir(),
             "named_rndc_conf_path": get_named_rndc_conf_path(),
             "trusted_networks": trusted_networks,
+            "dynamic_update_key": dynamic_update_key,
             "modified": str(datetime.today()),
         }
         content = render_dns_template(self.template_file_name, kwargs, context)
@@ -318,8 +362,11 @@ class DNSConfig:
         # the rules for IDNA (Internationalized Domain Names in Applications).
         content = content.encode("ascii")
         target_path = compose_config_path(self.target_file_name)
+        if content_unchanged(content, target_path):
+            return False
         with report_missing_config_dir():
             atomic_write(content, target_path, overwrite=overwrite, mode=0o644)
+        return True
 
     @classmethod
     def get_include_snippet(cls):
@@ -234,6 +234,15 @@ class TestConfiguration(MAASTestCase):
         ]
         self.assertThat(expected_files, AllMatch(FileExists()))
 
+    def test_bind_write_zones_forgets_unpublished_zones(self):
+        stale_path = join(self.dns_conf_dir, "zone.%s" % factory.make_name())
+        zone_state = {stale_path: factory.make_name("fingerprint")}
+        domain = factory.make_name("domain")
+        zone = DNSForwardZoneConfig(domain, serial=random.randint(1, 100))
+        written = actions.bind_write_zones([zone], zone_state=zone_state)
+        self.assertEqual([domain], written)
+        self.assertEqual([zone.zone_info[0].target_path], list(zone_state))
+
     def test_bind_write_options_sets_up_config(self):
         # bind_write_configuration_and_zones writes the config file, writes
         # the zone files, and reloads the dns service.
@@ -270,3 +279,125 @@ class TestConfiguration(MAASTestCase):
         self.assertThat(
             expected_options_file, FileContains(expected_options_content)
         )
+
+
+class TestDynamicZoneUpdater(MAASTestCase):
+    """Tests for :py:class:`actions.DynamicZoneUpdater`."""
+
+    def setUp(self):
+        super().setUp()
+        self.patch(actions, "get_named_rndc_key").return_value = (
+            "rndc-maas-key",
+            "hmac-md5",
+            "bWFhcy1zZWNyZXQ=",
+        )
+        import dns.query
+        import dns.rcode
+
+        self.tcp = self.patch(dns.query, "tcp")
+        self.tcp.return_value.rcode.return_value = dns.rcode.NOERROR
+
+    def test_update_sends_signed_update(self):
+        import dns.rdatatype
+
+        updater = actions.DynamicZoneUpdater(timeout=5)
+        old_ip = factory.make_ipv4_address()
+        new_ip = factory.make_ipv4_address()
+        self.assertTrue(
+            updater.update(
+                "example.com",
+                (30, "example.com. nobody.example.com. 2 600 1800 604800 30"),
+                {("foo", 30, "A", old_ip)},
+                {("bar", None, "A", new_ip)},
+            )
+        )
+        self.assertEqual(["example.com"], updater.updated)
+        [message, server], kwargs = self.tcp.call_args
+        self.assertEqual(
+            ("127.0.0.1", {"port": 53, "timeout": 5}), (server, kwargs)
+        )
+        self.assertEqual("rndc-maas-key.", message.keyname.to_text())
+        updates = {
+            (
+                rrset.name.to_text(),
+                rrset.ttl,
+                rrset.rdtype,
+                rdata.to_text(),
+            )
+            for rrset in message.update
+            for rdata in rrset
+        }
+        self.assertEqual(
+            {
+                ("foo.example.com.", 0, dns.rdatatype.A, old_ip),
+                ("bar.example.com.", 30, dns.rdatatype.A, new_ip),
+                (
+                    "example.com.",
+                    30,
+                    dns.rdatatype.SOA,
+                    "example.com. nobody.example.com. 2 600 1800 604800 30",
+                ),
+            },
+            updates,
+        )
+
+    def test_update_returns_false_when_refused(self):
+        import dns.rcode
+
+        self.tcp.return_value.rcode.return_value = dns.rcode.REFUSED
+        updater = actions.DynamicZoneUpdater()
+        with FakeLogger("maas") as logger:
+            self.assertFalse(
+                updater.update(
+                    "example.com",
+                    (30, "example.com. nobody.example.com. 2 600 1800 1 30"),
+                    set(),
+                    set(),
+                )
+            )
+        self.assertEqual([], updater.updated)
+        self.assertIn("REFUSED", logger.output)
+
+    def test_update_returns_false_when_unreachable(self):
+        self.tcp.side_effect = ConnectionRefusedError()
+        updater = actions.DynamicZoneUpdater()
+        with FakeLogger("maas"):
+            self.assertFalse(
+                updater.update(
+                    "example.com",
+                    (30, "example.com. nobody.example.com. 2 600 1800 1 30"),
+                    set(),
+                    set(),
+                )
+            )
+
+    def test_freeze_and_thaw(self):
+        erc = self.patch_autospec(actions, "execute_rndc_command")
+        updater = actions.DynamicZoneUpdater()
+        updater.freeze("example.com")
+        self.assertEqual(["example.com"], updater.frozen)
+        self.assertTrue(updater.thaw())
+        self.assertEqual([], updater.frozen)
+        self.assertThat(
+            erc,
+            MockCallsMatch(
+                call(("freeze", "example.com"), timeout=2),
+                call(("thaw", "example.com"), timeout=2),
+            ),
+        )
+
+    def test_freeze_ignores_unknown_zones(self):
+        erc = self.patch_autospec(actions, "execute_rndc_command")
+        erc.side_effect = factory.make_CalledProcessError()
+        updater = actions.DynamicZoneUpdater()
+        updater.freeze("example.com")
+        self.assertEqual([], updater.frozen)
+        self.assertTrue(updater.thaw())
+
+    def test_thaw_returns_false_on_failure(self):
+        erc = self.patch_autospec(actions, "execute_rndc_command")
+        updater = actions.DynamicZoneUpdater()
+        updater.freeze("example.com")
+        erc.side_effect = factory.make_CalledProcessError()
+        with FakeLogger("maas"):
+            self.assertFalse(updater.thaw())
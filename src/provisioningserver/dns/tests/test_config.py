@@ -32,6 +32,7 @@ from twisted.python.filepath import FilePath
 
 from maastesting.factory import factory
 from maastesting.fakemethod import FakeMethod
+from maastesting.matchers import MockNotCalled
 from maastesting.testcase import MAASTestCase
 from provisioningserver.dns import config
 from provisioningserver.dns.config import (
@@ -43,6 +44,7 @@ from provisioningserver.dns.config import (
     execute_rndc_command,
     extract_suggested_named_conf,
     generate_rndc,
+    get_named_rndc_key,
     MAAS_NAMED_CONF_NAME,
     MAAS_NAMED_CONF_OPTIONS_INSIDE_NAME,
     MAAS_NAMED_RNDC_CONF_NAME,
@@ -192,6 +194,36 @@ class TestRNDCUtilities(MAASTestCase):
                 conf_content = stream.read()
                 self.assertIn(content, conf_content)
 
+    def test_get_named_rndc_key_returns_key(self):
+        dns_conf_dir = patch_dns_config_path(self)
+        secret = factory.make_string()
+        factory.make_file(
+            dns_conf_dir,
+            MAAS_NAMED_RNDC_CONF_NAME,
+            contents=dedent(
+                """\
+                key "rndc-maas-key" {
+                    algorithm hmac-md5;
+                    secret "%s";
+                };
+                controls {
+                    inet 127.0.0.1 port 954 allow { localhost; } keys {
+                        "rndc-maas-key";
+                    };
+                };
+                """
+                % secret
+            ),
+        )
+        self.assertEqual(
+            ("rndc-maas-key", "hmac-md5", secret), get_named_rndc_key()
+        )
+
+    def test_get_named_rndc_key_fails_without_key(self):
+        dns_conf_dir = patch_dns_config_path(self)
+        factory.make_file(dns_conf_dir, MAAS_NAMED_RNDC_CONF_NAME, "")
+        self.assertRaises(DNSConfigFail, get_named_rndc_key)
+
     def test_set_up_options_conf_writes_configuration(self):
         dns_conf_dir = patch_dns_config_path(self)
         fake_dns = [factory.make_ipv4_address(), factory.make_ipv4_address()]
@@ -516,6 +548,15 @@ class TestDNSConfig(MAASTestCase):
             FileContains(random_content),
         )
 
+    def test_write_config_skips_writing_unchanged_config(self):
+        target_dir = patch_dns_config_path(self)
+        self.assertTrue(DNSConfig().write_config())
+        target_path = os.path.join(target_dir, MAAS_NAMED_CONF_NAME)
+        atomic_write = self.patch(config, "atomic_write")
+        self.assertFalse(DNSConfig().write_config())
+        self.assertThat(atomic_write, MockNotCalled())
+        self.assertThat(target_path, FileExists())
+
     def test_write_config_writes_config_if_no_existing_file(self):
         # If DNSConfig is created with overwrite=False, the config file
         # will be written if no config file exists.
@@ -550,6 +591,33 @@ class TestDNSConfig(MAASTestCase):
             ),
         )
 
+    def test_write_config_allows_dynamic_updates_with_key(self):
+        target_dir = patch_dns_config_path(self)
+        domain = factory.make_string()
+        forward_zone = DNSForwardZoneConfig(
+            domain, mapping={factory.make_string(): factory.make_ip_address()}
+        )
+        dnsconfig = DNSConfig((forward_zone,))
+        dnsconfig.write_config(dynamic_update_key="rndc-maas-key")
+        self.assertThat(
+            os.path.join(target_dir, MAAS_NAMED_CONF_NAME),
+            FileContains(
+                matcher=Contains('allow-update { key "rndc-maas-key"; };')
+            ),
+        )
+
+    def test_write_config_disallows_dynamic_updates_by_default(self):
+        target_dir = patch_dns_config_path(self)
+        domain = factory.make_string()
+        forward_zone = DNSForwardZoneConfig(
+            domain, mapping={factory.make_string(): factory.make_ip_address()}
+        )
+        DNSConfig((forward_zone,)).write_config()
+        self.assertThat(
+            os.path.join(target_dir, MAAS_NAMED_CONF_NAME),
+            FileContains(matcher=Not(Contains("allow-update"))),
+        )
+
     def test_write_config_with_forwarded_zones(self):
         name = factory.make_name("domain")
         ip = factory.make_ip_address()
@@ -7,6 +7,7 @@
 from itertools import chain
 import os.path
 import random
+from unittest.mock import Mock
 
 from netaddr import IPAddress, IPNetwork, IPRange
 from testtools.matchers import (
@@ -20,7 +21,7 @@ from testtools.matchers import (
 from twisted.python.filepath import FilePath
 
 from maastesting.factory import factory
-from maastesting.matchers import MockNotCalled
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from maastesting.testcase import MAASTestCase
 from provisioningserver.dns.config import get_dns_config_dir
 from provisioningserver.dns.testing import patch_dns_config_path
@@ -322,6 +323,139 @@ class TestDNSForwardZoneConfig(MAASTestCase):
         filepath = FilePath(dns_zone_config.zone_info[0].target_path)
         self.assertTrue(filepath.getPermissions().other.read)
 
+    def make_zone_config(self, mapping, serial):
+        return DNSForwardZoneConfig(
+            "example.com",
+            serial=serial,
+            mapping={
+                hostname: HostnameIPMapping(None, 30, {ip})
+                for hostname, ip in mapping.items()
+            },
+        )
+
+    def test_write_config_skips_unchanged_zones_with_zone_state(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": ip}, serial=1)
+        self.assertEqual(["example.com"], zone_config.write_config(zone_state))
+        target_path = zone_config.zone_info[0].target_path
+        self.assertIn(target_path, zone_state)
+        zone_config = self.make_zone_config({"foo": ip}, serial=2)
+        self.assertEqual([], zone_config.write_config(zone_state))
+        # The zone file keeps its old serial.
+        self.assertThat(target_path, FileContains(matcher=Contains("1 ;")))
+
+    def test_write_config_rewrites_changed_zones_with_zone_state(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        zone_config = self.make_zone_config(
+            {"foo": factory.make_ipv4_address()}, serial=1
+        )
+        zone_config.write_config(zone_state)
+        ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": ip}, serial=2)
+        self.assertEqual(["example.com"], zone_config.write_config(zone_state))
+        self.assertThat(
+            zone_config.zone_info[0].target_path,
+            FileContains(matcher=ContainsAll(["2 ;", ip])),
+        )
+
+    def test_write_config_rewrites_missing_zones_with_zone_state(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": ip}, serial=1)
+        zone_config.write_config(zone_state)
+        os.remove(zone_config.zone_info[0].target_path)
+        self.assertEqual(["example.com"], zone_config.write_config(zone_state))
+
+    def test_write_config_sends_changed_records_to_updater(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        updater = Mock()
+        updater.update.return_value = True
+        old_ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": old_ip}, serial=1)
+        zone_config.write_config(zone_state, updater=updater)
+        self.assertThat(updater.update, MockNotCalled())
+        new_ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": new_ip}, serial=2)
+        self.assertEqual(
+            [], zone_config.write_config(zone_state, updater=updater)
+        )
+        self.assertThat(
+            updater.update,
+            MockCalledOnceWith(
+                "example.com",
+                (zone_config.default_ttl, zone_config.get_SOA_rdata()),
+                {("foo", 30, "A", old_ip)},
+                {("foo", 30, "A", new_ip)},
+            ),
+        )
+        self.assertThat(updater.freeze, MockNotCalled())
+        # The zone file is left alone, but the new state is remembered.
+        target_path = zone_config.zone_info[0].target_path
+        self.assertThat(target_path, FileContains(matcher=Contains(old_ip)))
+        self.assertEqual(
+            zone_config.get_zone_state(zone_config.get_zone_records(None))[1],
+            zone_state[target_path][1],
+        )
+
+    def test_write_config_rewrites_zone_when_update_fails(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        updater = Mock()
+        updater.update.return_value = False
+        zone_config = self.make_zone_config(
+            {"foo": factory.make_ipv4_address()}, serial=1
+        )
+        zone_config.write_config(zone_state, updater=updater)
+        ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": ip}, serial=2)
+        self.assertEqual(
+            ["example.com"],
+            zone_config.write_config(zone_state, updater=updater),
+        )
+        self.assertThat(updater.freeze, MockCalledOnceWith("example.com"))
+        self.assertThat(
+            zone_config.zone_info[0].target_path,
+            FileContains(matcher=ContainsAll(["2 ;", ip])),
+        )
+
+    def test_write_config_rewrites_zone_when_more_than_records_change(self):
+        patch_dns_config_path(self)
+        zone_state = {}
+        updater = Mock()
+        ip = factory.make_ipv4_address()
+        zone_config = self.make_zone_config({"foo": ip}, serial=1)
+        zone_config.write_config(zone_state, updater=updater)
+        zone_config = self.make_zone_config({"foo": ip}, serial=2)
+        zone_config.default_ttl += 1
+        self.assertEqual(
+            ["example.com"],
+            zone_config.write_config(zone_state, updater=updater),
+        )
+        self.assertThat(updater.update, MockNotCalled())
+        self.assertThat(updater.freeze, MockCalledOnceWith("example.com"))
+
+    def test_get_SOA_rdata_matches_zone_file(self):
+        patch_dns_config_path(self)
+        zone_config = self.make_zone_config(
+            {"foo": factory.make_ipv4_address()}, serial=random.randint(1, 100)
+        )
+        zone_config.write_config()
+        soa = zone_config.get_SOA_rdata().split()
+        self.assertThat(
+            zone_config.zone_info[0].target_path,
+            FileContains(
+                matcher=ContainsAll(
+                    ["%s %s (" % tuple(soa[:2])]
+                    + ["%s ;" % value for value in soa[2:]]
+                )
+            ),
+        )
+
 
 class TestDNSReverseZoneConfig(MAASTestCase):
     """Tests for DNSReverseZoneConfig."""
@@ -556,7 +690,7 @@ class TestDNSReverseZoneConfig(MAASTestCase):
             nets = t_case[0]
             expected = t_case[1]
             domain = factory.make_name("zone")
-            for (idx, net) in enumerate(nets):
+            for idx, net in enumerate(nets):
                 network = net[0]
                 other_subnets = net[1]
                 dns_zone_config = DNSReverseZoneConfig(
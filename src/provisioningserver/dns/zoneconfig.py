@@ -5,7 +5,9 @@
 
 
 from datetime import datetime
+from hashlib import sha256
 from itertools import chain
+import os
 
 from netaddr import IPAddress, IPNetwork, spanning_cidr
 from netaddr.core import AddrFormatError
@@ -155,6 +157,102 @@ class DomainConfigBase:
             "ns_host_name": self.ns_host_name,
         }
 
+    def get_zone_records(self, zone_info):
+        """Return the records for the zone file of `zone_info`.
+
+        :return: A dict of template parameters.
+        """
+        raise NotImplementedError()
+
+    def write_config(self, zone_state=None, updater=None):
+        """Write the zone files.
+
+        :param zone_state: Optional dict mapping zone file paths to the state
+            of the zone as last published; see `get_zone_state`. When given,
+            zone files whose records have not changed are left alone, keeping
+            their old serial, and `zone_state` is updated for the rest.
+        :param updater: Optional `DynamicZoneUpdater`. When given with
+            `zone_state`, changes to the records of published zones are sent
+            to BIND as dynamic updates rather than rewriting the zone file.
+            Zone files are only rewritten if that fails, or if more than the
+            records changed.
+        :return: The names of the zones whose files were written.
+        """
+        written = []
+        for zi in self.zone_info:
+            records = self.get_zone_records(zi)
+            if zone_state is not None:
+                records = {
+                    "mappings": {
+                        rrtype: list(mapping)
+                        for rrtype, mapping in records["mappings"].items()
+                    },
+                    "other_mapping": list(records["other_mapping"]),
+                    "generate_directives": records["generate_directives"],
+                }
+                state = self.get_zone_state(records)
+                previous = zone_state.get(zi.target_path)
+                exists = os.path.exists(zi.target_path)
+                if previous is not None and exists:
+                    if previous == state:
+                        continue
+                    if (
+                        updater is not None
+                        and previous[0] == state[0]
+                        and updater.update(
+                            zi.zone_name,
+                            (self.default_ttl, self.get_SOA_rdata()),
+                            previous[1] - state[1],
+                            state[1] - previous[1],
+                        )
+                    ):
+                        zone_state[zi.target_path] = state
+                        continue
+                if updater is not None and exists:
+                    # BIND may hold updates to this zone in its journal.
+                    updater.freeze(zi.zone_name)
+                zone_state[zi.target_path] = state
+            self.write_zone_file(
+                zi.target_path, self.make_parameters(), records
+            )
+            written.append(zi.zone_name)
+        return written
+
+    def get_zone_state(self, records):
+        """Return the state of a zone with the given `records`.
+
+        :return: A tuple of a fingerprint of everything in the zone except
+            its serial and resource records, and the set of its resource
+            records as `(name, ttl, rrtype, rdata)` tuples.
+        """
+        parameters = self.make_parameters()
+        del parameters["serial"], parameters["modified"]
+        content = repr(
+            (sorted(parameters.items()), records["generate_directives"])
+        )
+        resource_records = frozenset(
+            chain(
+                (
+                    (name, ttl, rrtype, str(rdata))
+                    for rrtype, mapping in records["mappings"].items()
+                    for name, ttl, rdata in mapping
+                ),
+                (
+                    (name, ttl, rrtype, str(rdata))
+                    for name, ttl, rrtype, rdata in records["other_mapping"]
+                ),
+            )
+        )
+        return sha256(content.encode("utf-8")).hexdigest(), resource_records
+
+    def get_SOA_rdata(self):
+        """Return the data of the zone's SOA record, as in the zone file."""
+        return "%s. nobody.example.com. %s 600 1800 604800 %s" % (
+            self.domain,
+            self.serial,
+            self.default_ttl,
+        )
+
     @classmethod
     def write_zone_file(cls, output_file, *parameters):
         """Write a zone file based on the zone file template.
@@ -281,33 +379,24 @@ class DNSForwardZoneConfig(DomainConfigBase):
 
         return sorted(generate_directives, key=lambda directive: directive[2])
 
-    def write_config(self):
-        """Write the zone file."""
+    def get_zone_records(self, zone_info):
+        """Return the records for the zone file of `zone_info`."""
         # Create GENERATE directives for IPv4 ranges.
-        for zi in self.zone_info:
-            generate_directives = list(
-                chain.from_iterable(
-                    self.get_GENERATE_directives(dynamic_range)
-                    for dynamic_range in self._dynamic_ranges
-                    if dynamic_range.version == 4
-                )
-            )
-            self.write_zone_file(
-                zi.target_path,
-                self.make_parameters(),
-                {
-                    "mappings": {
-                        "A": self.get_A_mapping(self._mapping, self._ipv4_ttl),
-                        "AAAA": self.get_AAAA_mapping(
-                            self._mapping, self._ipv6_ttl
-                        ),
-                    },
-                    "other_mapping": enumerate_rrset_mapping(
-                        self._other_mapping
-                    ),
-                    "generate_directives": {"A": generate_directives},
-                },
+        generate_directives = list(
+            chain.from_iterable(
+                self.get_GENERATE_directives(dynamic_range)
+                for dynamic_range in self._dynamic_ranges
+                if dynamic_range.version == 4
             )
+        )
+        return {
+            "mappings": {
+                "A": self.get_A_mapping(self._mapping, self._ipv4_ttl),
+                "AAAA": self.get_AAAA_mapping(self._mapping, self._ipv6_ttl),
+            },
+            "other_mapping": enumerate_rrset_mapping(self._other_mapping),
+            "generate_directives": {"A": generate_directives},
+        }
 
 
 class DNSReverseZoneConfig(DomainConfigBase):
@@ -562,34 +651,29 @@ class DNSReverseZoneConfig(DomainConfigBase):
                 generate_directives.add((iterator, "${0,1,x}", hostname))
         return sorted(generate_directives)
 
-    def write_config(self):
-        """Write the zone file."""
+    def get_zone_records(self, zone_info):
+        """Return the records for the zone file of `zone_info`."""
         # Create GENERATE directives for IPv4 ranges.
-        for zi in self.zone_info:
-            generate_directives = list(
-                chain.from_iterable(
-                    self.get_GENERATE_directives(
-                        dynamic_range, self.domain, zi
-                    )
-                    for dynamic_range in self._dynamic_ranges
-                    if dynamic_range.version == 4
+        generate_directives = list(
+            chain.from_iterable(
+                self.get_GENERATE_directives(
+                    dynamic_range, self.domain, zone_info
                 )
+                for dynamic_range in self._dynamic_ranges
+                if dynamic_range.version == 4
             )
-            self.write_zone_file(
-                zi.target_path,
-                self.make_parameters(),
-                {
-                    "mappings": {
-                        "PTR": self.get_PTR_mapping(
-                            self._mapping, zi.subnetwork
-                        )
-                    },
-                    "other_mapping": [],
-                    "generate_directives": {
-                        "PTR": generate_directives,
-                        "CNAME": self.get_rfc2317_GENERATE_directives(
-                            zi.subnetwork, self._rfc2317_ranges, self.domain
-                        ),
-                    },
-                },
-            )
+        )
+        return {
+            "mappings": {
+                "PTR": self.get_PTR_mapping(
+                    self._mapping, zone_info.subnetwork
+                )
+            },
+            "other_mapping": [],
+            "generate_directives": {
+                "PTR": generate_directives,
+                "CNAME": self.get_rfc2317_GENERATE_directives(
+                    zone_info.subnetwork, self._rfc2317_ranges, self.domain
+                ),
+            },
+        }
@@ -18,6 +18,25 @@ _HTTP_REQUEST_LABELS = ["method", "path", "status", "op"]
 _WEBSOCKET_CALL_LABELS = ["call"]
 
 METRICS_DEFINITIONS = [
+    # rackd and regiond metrics
+    MetricDefinition(
+        "Gauge",
+        "maas_rpc_connection_calls_in_flight",
+        "Number of RPC calls in flight over connections to a peer",
+        ["peer"],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_rpc_connection_latency",
+        "Moving average of the latency of RPC calls to a peer",
+        ["peer"],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_rpc_connection_ejections",
+        "RPC connections to a peer ejected for timing out",
+        ["peer"],
+    ),
     # rackd metrics
     MetricDefinition(
         "Histogram",
@@ -31,6 +50,38 @@ METRICS_DEFINITIONS = [
         "Latency of TFTP file downloads",
         ["filename"],
     ),
+    MetricDefinition(
+        "Histogram",
+        "maas_power_query_sweep_duration",
+        "Time taken to query the power state of all due nodes",
+        buckets=[1, 5, 15, 30, 60, 120, 300, 600],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_power_query_queue_depth",
+        "Number of power queries waiting for their driver's budget",
+        ["power_type"],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_rack_boot_config_cache_requests",
+        "Boot configuration lookups in the rack cache, by hit or miss",
+        ["result"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_rack_dhcp_config_payload_size",
+        "Size in bytes of DHCP configurations received from the region",
+        ["sync"],
+        buckets=[1000, 10000, 100000, 1000000, 10000000],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_rack_dhcp_config_hosts_changed",
+        "Number of DHCP hosts in configurations received from the region",
+        ["sync"],
+        buckets=[0, 1, 10, 100, 1000, 10000],
+    ),
     # regiond metrics
     MetricDefinition(
         "Histogram",
@@ -64,6 +115,12 @@ METRICS_DEFINITIONS = [
         "Latency of Region-Rack RPC call",
         ["call"],
     ),
+    MetricDefinition(
+        "Counter",
+        "maas_region_rack_rpc_call_cache_requests",
+        "Region-Rack RPC calls looked up in the call cache, by hit or miss",
+        ["call", "result"],
+    ),
     MetricDefinition(
         "Histogram",
         "maas_websocket_call_latency",
@@ -83,6 +140,66 @@ METRICS_DEFINITIONS = [
         "HTTP request query latency",
         _WEBSOCKET_CALL_LABELS,
     ),
+    MetricDefinition(
+        "Gauge",
+        "maas_listener_queue_depth",
+        "Number of database notifications waiting to be handled",
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_listener_notifications_coalesced",
+        "Database notifications coalesced with a pending one",
+        ["channel"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_listener_handler_latency",
+        "Latency of handling a database notification",
+        ["channel"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_status_message_batch_size",
+        "Number of queued node status messages processed in a batch",
+        buckets=[1, 10, 50, 100, 500, 1000, 5000],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_status_message_batch_latency",
+        "Time taken to process a batch of queued node status messages",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_dhcp_config_payload_size",
+        "Size in bytes of DHCP configurations sent to rack controllers",
+        ["sync"],
+        buckets=[1000, 10000, 100000, 1000000, 10000000],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_dhcp_config_hosts_changed",
+        "Number of DHCP hosts in configurations sent to rack controllers",
+        ["sync"],
+        buckets=[0, 1, 10, 100, 1000, 10000],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_discovery_report_rows",
+        "Neighbour and mDNS rows created, updated or deleted by reports",
+        ["kind", "action"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_discovery_report_latency",
+        "Time taken to record a neighbour or mDNS report from a controller",
+        ["kind"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_preseed_render_latency",
+        "Time taken to render a preseed template",
+        ["template"],
+    ),
     MetricDefinition(
         "Counter",
         "maas_virsh_fetch_description_failure",
@@ -14,7 +14,12 @@ from datetime import timedelta
 import attr
 from netaddr import IPAddress
 from twisted.application.internet import TimerService
-from twisted.internet.defer import DeferredList, inlineCallbacks, maybeDeferred
+from twisted.internet.defer import (
+    DeferredList,
+    DeferredLock,
+    inlineCallbacks,
+    maybeDeferred,
+)
 from twisted.internet.threads import deferToThread
 
 from provisioningserver.dns.actions import (
@@ -26,6 +31,7 @@ from provisioningserver.logger import LegacyLogger
 from provisioningserver.ntp.config import configure_rack
 from provisioningserver.proxy import config as proxy_config
 from provisioningserver.rpc import exceptions
+from provisioningserver.rpc.external_config import external_config_version
 from provisioningserver.rpc.region import (
     GetControllerType,
     GetDNSConfiguration,
@@ -392,6 +398,15 @@ class RackSyslog(RackOnlyExternalService):
 
 
 class RackExternalService(TimerService):
+    """Configure the external services from the region's configuration.
+
+    The configuration is fetched from the region when the region announces
+    a new version of it, and at least every `INTERVAL_REFRESH` in case an
+    announcement was missed. In between, the services are updated on every
+    tick with the last configuration fetched, as the connections to the
+    region controllers may have changed. Regions that do not announce
+    versions are polled for the configuration on every tick.
+    """
 
     # Initial start the interval is low so that forwarders of bind9 gets
     # at least one region controller. When no region controllers are set
@@ -403,14 +418,27 @@ class RackExternalService(TimerService):
     # DNS requests.
     INTERVAL_HIGH = timedelta(seconds=30).total_seconds()
 
+    # The configuration is fetched again after this long even when the
+    # region has not announced a new version of it.
+    INTERVAL_REFRESH = timedelta(minutes=5).total_seconds()
+
     _rpc_service = None
     _services = None
 
-    def __init__(self, rpc_service, reactor, services=None):
+    def __init__(self, rpc_service, reactor, services=None, version=None):
         super().__init__(self.INTERVAL_LOW, self._tryUpdate)
         self._rpc_service = rpc_service
         self.clock = reactor
         self._services = services
+        self._version = version
+        if self._version is None:
+            self._version = external_config_version
+        self._lock = DeferredLock()
+        # The last configuration fetched, the version it was fetched for,
+        # and when.
+        self._fetched = None
+        self._fetched_version = None
+        self._fetched_at = None
         if self._services is None:
             self._services = [
                 ("NTP", RackNTP()),
@@ -419,6 +447,18 @@ class RackExternalService(TimerService):
                 ("syslog", RackSyslog()),
             ]
 
+    def startService(self):
+        self._version.changed.registerHandler(self._versionChanged)
+        super().startService()
+
+    def stopService(self):
+        self._version.changed.unregisterHandler(self._versionChanged)
+        return super().stopService()
+
+    def _versionChanged(self, version):
+        """Update now rather than on the next tick."""
+        self._tryUpdate()
+
     def _update_interval(self, config):
         """Change the update interval."""
         if config is None or len(config.connections) == 0:
@@ -426,8 +466,24 @@ class RackExternalService(TimerService):
         else:
             self._loop.interval = self.step = self.INTERVAL_HIGH
 
+    def _isFetchedCurrent(self, version):
+        """Whether the last configuration fetched is still current."""
+        return (
+            version is not None
+            and self._fetched is not None
+            and self._fetched_version == version
+            and self.clock.seconds() - self._fetched_at < self.INTERVAL_REFRESH
+        )
+
     @inlineCallbacks
     def _getConfiguration(self):
+        # The version is taken before fetching, so that a change announced
+        # during the fetch causes another one.
+        version = self._version.value
+        if self._isFetchedCurrent(version):
+            return attr.evolve(
+                self._fetched, connections=self._rpc_service.connections
+            )
         client = yield self._rpc_service.getClientNow()
         controller_type = yield client(
             GetControllerType, system_id=client.localIdent
@@ -444,7 +500,7 @@ class RackExternalService(TimerService):
         syslog_configuration = yield client(
             GetSyslogConfiguration, system_id=client.localIdent
         )
-        return _Configuration(
+        config = _Configuration(
             controller_type=controller_type,
             time_configuration=time_configuration,
             dns_configuration=dns_configuration,
@@ -452,10 +508,21 @@ class RackExternalService(TimerService):
             syslog_configuration=syslog_configuration,
             connections=self._rpc_service.connections,
         )
+        self._fetched = config
+        self._fetched_version = version
+        self._fetched_at = self.clock.seconds()
+        return config
 
-    @inlineCallbacks
     def _tryUpdate(self):
-        """Update the NTP server running on this host."""
+        """Update the external services running on this host.
+
+        Updates triggered by the timer and by new versions of the
+        configuration are run one at a time.
+        """
+        return self._lock.run(self._update)
+
+    @inlineCallbacks
+    def _update(self):
         try:
             config = yield self._getConfiguration()
         except exceptions.NoSuchNode:
@@ -12,14 +12,16 @@ from twisted.application.service import Service
 from twisted.internet import reactor, task
 from twisted.internet.defer import inlineCallbacks
 from twisted.internet.protocol import DatagramProtocol
+from twisted.protocols.amp import UnhandledCommand
 
-from provisioningserver.logger import get_maas_logger
+from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.path import get_maas_data_path
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import UpdateLease, UpdateLeases
 from provisioningserver.utils.twisted import pause, retries
 
 maaslog = get_maas_logger("lease_socket_service")
+log = LegacyLogger()
 
 
 def get_socket_path():
@@ -33,6 +35,9 @@ class LeaseSocketService(Service, DatagramProtocol):
     # None, or a Deferred that will fire when the processor exits.
     done = None
 
+    # The most notifications to send to the region in one `UpdateLeases` call.
+    max_batch = 100
+
     def __init__(self, client_service, reactor):
         self.client_service = client_service
         self.reactor = reactor
@@ -84,32 +89,63 @@ class LeaseSocketService(Service, DatagramProtocol):
         self.notifications.append(notification)
 
     def processNotifications(self, clock=reactor):
-        """Process all notifications."""
+        """Process all notifications, in batches of up to `max_batch`."""
 
-        def gen_notifications(notifications):
+        def gen_batches(notifications):
             while len(notifications) != 0:
-                yield notifications.popleft()
+                batch = []
+                while len(notifications) != 0 and len(batch) < self.max_batch:
+                    batch.append(notifications.popleft())
+                yield batch
 
         return task.coiterate(
-            self.processNotification(notification, clock=clock)
-            for notification in gen_notifications(self.notifications)
+            self.processBatch(batch, clock=clock)
+            for batch in gen_batches(self.notifications)
         )
 
     @inlineCallbacks
-    def processNotification(self, notification, clock=reactor):
-        """Send a notification to the region."""
-        client = None
+    def getClient(self, clock=reactor):
+        """Get a client for the region, or `None` if there are none."""
         for elapsed, remaining, wait in retries(30, 10, clock):
             try:
                 client = yield self.client_service.getClientNow()
-                break
             except NoConnectionsAvailable:
-                yield pause(wait, self.clock)
-        else:
-            maaslog.error(
-                "Can't send DHCP lease information, no RPC "
-                "connection to region."
+                yield pause(wait, clock)
+            else:
+                return client
+        maaslog.error(
+            "Can't send DHCP lease information, no RPC connection to region."
+        )
+        return None
+
+    @inlineCallbacks
+    def processBatch(self, notifications, clock=reactor):
+        """Send a batch of notifications to the region in one call."""
+        client = yield self.getClient(clock)
+        if client is None:
+            return
+
+        try:
+            yield client(
+                UpdateLeases,
+                cluster_uuid=client.localIdent,
+                leases=notifications,
             )
+        except UnhandledCommand:
+            # The region hasn't been upgraded to support this method yet, so
+            # send the notifications one by one.
+            for notification in notifications:
+                yield self.processNotification(notification, clock=clock)
+        except Exception:
+            # Log and carry on, so that the looping call keeps processing
+            # the notifications that follow.
+            log.err(None, "Failed to send DHCP lease information to region.")
+
+    @inlineCallbacks
+    def processNotification(self, notification, clock=reactor):
+        """Send a notification to the region."""
+        client = yield self.getClient(clock)
+        if client is None:
             return
 
         # Notification contains all the required data except for the cluster
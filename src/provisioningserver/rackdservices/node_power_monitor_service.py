@@ -5,18 +5,24 @@
 
 
 from datetime import timedelta
+from math import ceil
 
 from twisted.application.internet import TimerService
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredList, inlineCallbacks
 from twisted.internet.error import ConnectionDone
 
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc import getRegionClient
 from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
     NoSuchCluster,
 )
-from provisioningserver.rpc.power import query_all_nodes
+from provisioningserver.rpc.power import (
+    PowerQueryScheduler,
+    query_all_nodes,
+)
 from provisioningserver.rpc.region import ListNodePowerParameters
 
 maaslog = get_maas_logger("power_monitor_service")
@@ -27,12 +33,29 @@ class NodePowerMonitorService(TimerService):
     """Service to monitor the power status of all nodes in this cluster."""
 
     check_interval = timedelta(seconds=15).total_seconds()
-    max_nodes_at_once = 5
 
-    def __init__(self, clock=None):
+    # How often each node's power state should be queried. Each sweep only
+    # fetches its share of the nodes this rack has seen recently, so that
+    # queries are spread over this period rather than happening in bursts.
+    # The region does not hand out nodes that were queried in the last five
+    # minutes, so shorter periods than that have no effect.
+    target_period = timedelta(minutes=5).total_seconds()
+
+    # Stop fetching nodes from the region while this many queries are
+    # waiting for their power driver's budget.
+    max_queued = 200
+
+    def __init__(self, clock=None, target_period=None):
         # Call self.query_nodes() every self.check_interval.
         super().__init__(self.check_interval, self.try_query_nodes)
         self.clock = clock
+        if target_period is not None:
+            self.target_period = target_period
+        self.scheduler = PowerQueryScheduler(
+            clock=reactor if clock is None else clock
+        )
+        # Map of system_id to when it was last handed out by the region.
+        self._seen = {}
 
     def try_query_nodes(self):
         """Attempt to query nodes' power states.
@@ -51,23 +74,63 @@ class NodePowerMonitorService(TimerService):
             d.addErrback(self.query_nodes_failed, client.localIdent)
             return d
 
+    def get_sweep_quota(self, now):
+        """Return how many nodes a sweep starting at `now` should query.
+
+        This is the share of the nodes seen over the last two target periods
+        that falls due in one `check_interval`, or `None` when no nodes have
+        been seen yet, in which case the sweep queries every node due.
+        """
+        horizon = now - (2 * self.target_period)
+        self._seen = {
+            system_id: seen
+            for system_id, seen in self._seen.items()
+            if seen > horizon
+        }
+        if len(self._seen) == 0:
+            return None
+        else:
+            return ceil(
+                len(self._seen) * self.check_interval / self.target_period
+            )
+
     @inlineCallbacks
     def query_nodes(self, client):
+        clock = reactor if self.clock is None else self.clock
+        started = clock.seconds()
+        quota = self.get_sweep_quota(started)
+        queries = []
         # Get the nodes' power parameters from the region. Keep getting more
-        # power parameters until the region returns an empty list.
-        while True:
+        # power parameters until the region returns an empty list or this
+        # sweep has fetched its quota. Nodes are queried as they arrive, so
+        # one slow BMC does not hold back fetching the next batch.
+        while quota is None or quota > 0:
+            if len(queries) > 0 and self.scheduler.queued() >= self.max_queued:
+                yield queries.pop(0)
+                continue
             response = yield client(
                 ListNodePowerParameters, uuid=client.localIdent
             )
             power_parameters = response["nodes"]
-            if len(power_parameters) > 0:
-                yield query_all_nodes(
+            if len(power_parameters) == 0:
+                break
+            for node in power_parameters:
+                self._seen[node["system_id"]] = started
+            if quota is not None:
+                quota -= len(power_parameters)
+            queries.append(
+                query_all_nodes(
                     power_parameters,
-                    max_concurrency=self.max_nodes_at_once,
                     clock=self.clock,
+                    scheduler=self.scheduler,
                 )
-            else:
-                break
+            )
+        yield DeferredList(queries)
+        PROMETHEUS_METRICS.update(
+            "maas_power_query_sweep_duration",
+            "observe",
+            value=clock.seconds() - started,
+        )
 
     def query_nodes_failed(self, failure, localIdent):
         if failure.check(NoSuchCluster):
@@ -11,6 +11,7 @@ import attr
 from testtools.matchers import Equals, Is, IsInstance, MatchesStructure
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import Clock
 
 from maastesting import get_testing_timeout
 from maastesting.factory import factory
@@ -25,6 +26,7 @@ from maastesting.twisted import always_succeed_with, TwistedLoggerFixture
 from provisioningserver import services
 from provisioningserver.rackdservices import external
 from provisioningserver.rpc import clusterservice, common, exceptions, region
+from provisioningserver.rpc.external_config import ExternalConfigVersion
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.service_monitor import service_monitor
 from provisioningserver.utils.service_monitor import SERVICE_STATE
@@ -203,6 +205,89 @@ class TestRackExternalService(MAASTestCase):
         self.assertThat(logger.output, Equals(""))
         self.assertThat(ntp._tryUpdate, MockNotCalled())
 
+    @inlineCallbacks
+    def test_getConfiguration_reuses_configuration_for_same_version(self):
+        version = ExternalConfigVersion()
+        version.set(factory.make_name("version"))
+        rpc_service, protocol = yield prepareRegion(self)
+        service = external.RackExternalService(
+            rpc_service, reactor, [], version=version
+        )
+
+        config = yield service._getConfiguration()
+        config_again = yield service._getConfiguration()
+
+        self.assertThat(
+            protocol.GetTimeConfiguration,
+            MockCalledOnceWith(
+                protocol, system_id=rpc_service.getClient().localIdent
+            ),
+        )
+        self.assertEqual(config, config_again)
+        self.assertEqual(rpc_service.connections, config_again.connections)
+
+    @inlineCallbacks
+    def test_getConfiguration_fetches_when_version_changes(self):
+        version = ExternalConfigVersion()
+        version.set(factory.make_name("version"))
+        rpc_service, protocol = yield prepareRegion(self)
+        service = external.RackExternalService(
+            rpc_service, reactor, [], version=version
+        )
+
+        yield service._getConfiguration()
+        version.set(factory.make_name("version"))
+        yield service._getConfiguration()
+
+        self.assertEqual(2, protocol.GetTimeConfiguration.call_count)
+
+    @inlineCallbacks
+    def test_getConfiguration_fetches_after_refresh_interval(self):
+        version = ExternalConfigVersion()
+        version.set(factory.make_name("version"))
+        rpc_service, protocol = yield prepareRegion(self)
+        clock = Clock()
+        service = external.RackExternalService(
+            rpc_service, clock, [], version=version
+        )
+
+        yield service._getConfiguration()
+        clock.advance(service.INTERVAL_REFRESH - 1)
+        yield service._getConfiguration()
+        self.assertEqual(1, protocol.GetTimeConfiguration.call_count)
+        clock.advance(1)
+        yield service._getConfiguration()
+        self.assertEqual(2, protocol.GetTimeConfiguration.call_count)
+
+    @inlineCallbacks
+    def test_getConfiguration_fetches_every_time_without_version(self):
+        rpc_service, protocol = yield prepareRegion(self)
+        service = external.RackExternalService(
+            rpc_service, reactor, [], version=ExternalConfigVersion()
+        )
+
+        yield service._getConfiguration()
+        yield service._getConfiguration()
+
+        self.assertEqual(2, protocol.GetTimeConfiguration.call_count)
+
+    @inlineCallbacks
+    def test_updates_when_version_changes(self):
+        version = ExternalConfigVersion()
+        service = make_startable_RackExternalService(
+            self, StubClusterClientService(), reactor, [], version=version
+        )
+
+        yield service.startService()
+        service._tryUpdate.reset_mock()
+        version.set(factory.make_name("version"))
+        self.assertThat(service._tryUpdate, MockCalledOnceWith())
+
+        yield service.stopService()
+        service._tryUpdate.reset_mock()
+        version.set(factory.make_name("version"))
+        self.assertThat(service._tryUpdate, MockNotCalled())
+
 
 class TestRackNTP(MAASTestCase):
     """Tests for `RackNTP` in `RackExternalService`."""
@@ -15,17 +15,19 @@ from twisted.application.service import Service
 from twisted.internet import defer, reactor
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet.threads import deferToThread
+from twisted.protocols.amp import UnhandledCommand
 
 from maastesting import get_testing_timeout
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
+from maastesting.twisted import TwistedLoggerFixture
 from provisioningserver.rackdservices import lease_socket_service
 from provisioningserver.rackdservices.lease_socket_service import (
     LeaseSocketService,
 )
 from provisioningserver.rpc import clusterservice, getRegionClient
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import UpdateLease, UpdateLeases
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils.twisted import DeferredValue, pause, retries
 
@@ -55,6 +57,22 @@ class TestLeaseSocketService(MAASTestCase):
         protocol, connecting = fixture.makeEventLoop(UpdateLease)
         return protocol, connecting
 
+    def patch_rpc_UpdateLeases(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(UpdateLeases)
+        return protocol, connecting
+
+    def make_packet(self):
+        return {
+            "action": "commit",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+            "lease_time": 30,
+            "hostname": factory.make_name("host"),
+        }
+
     def send_notification(self, socket_path, payload):
         conn = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
         conn.connect(socket_path)
@@ -116,16 +134,16 @@ class TestLeaseSocketService(MAASTestCase):
         self.assertEqual([packet], list(service.notifications))
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_with_notification(self):
+    def test_processBatch_gets_called_with_notification(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(sentinel.service, reactor)
         dv = DeferredValue()
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
+        # Mock processBatch to catch the call.
+        def mock_processBatch(*args, **kwargs):
             dv.set(args)
 
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(service, "processBatch", mock_processBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -138,23 +156,24 @@ class TestLeaseSocketService(MAASTestCase):
         yield deferToThread(self.send_notification, socket_path, packet)
         yield dv.get(timeout=10)
 
-        # Packet should be the argument passed to processNotifcation
-        self.assertEqual((packet,), dv.value)
+        # Packet should be the batch passed to processBatch.
+        self.assertEqual(([packet],), dv.value)
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_multiple_times(self):
+    def test_processBatch_gets_called_multiple_times(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(sentinel.service, reactor)
+        service.max_batch = 1
         dvs = [DeferredValue(), DeferredValue()]
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
+        # Mock processBatch to catch the call.
+        def mock_processBatch(*args, **kwargs):
             for dv in dvs:
                 if not dv.isSet:
                     dv.set(args)
                     break
 
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(service, "processBatch", mock_processBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -170,10 +189,24 @@ class TestLeaseSocketService(MAASTestCase):
         yield dvs[0].get(timeout=10)
         yield dvs[1].get(timeout=10)
 
-        # Packet should be the argument passed to processNotification in
-        # order.
-        self.assertEqual((packet1,), dvs[0].value)
-        self.assertEqual((packet2,), dvs[1].value)
+        # Packets should be the batches passed to processBatch in order.
+        self.assertEqual(([packet1],), dvs[0].value)
+        self.assertEqual(([packet2],), dvs[1].value)
+
+    @defer.inlineCallbacks
+    def test_processNotifications_batches_up_to_max_batch(self):
+        service = LeaseSocketService(sentinel.service, reactor)
+        service.max_batch = 2
+        processBatch = self.patch(service, "processBatch")
+        processBatch.return_value = None
+        packets = [{"test": factory.make_name("test")} for _ in range(5)]
+        service.notifications.extend(packets)
+        yield service.processNotifications(clock=reactor)
+        self.assertEqual(
+            [[packets[0], packets[1]], [packets[2], packets[3]], [packets[4]]],
+            [call[0][0] for call in processBatch.call_args_list],
+        )
+        self.assertEqual(0, len(service.notifications))
 
     @defer.inlineCallbacks
     def test_processNotification_send_to_region(self):
@@ -210,3 +243,60 @@ class TestLeaseSocketService(MAASTestCase):
                 hostname=packet["hostname"],
             ),
         )
+
+    @defer.inlineCallbacks
+    def test_processBatch_send_to_region(self):
+        protocol, connecting = self.patch_rpc_UpdateLeases()
+        self.addCleanup((yield connecting))
+
+        client = getRegionClient()
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+
+        packets = [self.make_packet(), self.make_packet()]
+        packets[1]["action"] = "expiry"
+        del packets[1]["hostname"]
+        yield service.processBatch(packets, clock=reactor)
+        # Optional fields that are not sent arrive as None, as they do with
+        # UpdateLease.
+        leases = [packets[0], dict(packets[1], hostname=None)]
+        self.assertThat(
+            protocol.UpdateLeases,
+            MockCalledOnceWith(
+                protocol, cluster_uuid=client.localIdent, leases=leases
+            ),
+        )
+
+    @defer.inlineCallbacks
+    def test_processBatch_falls_back_to_processNotification(self):
+        client = MagicMock()
+        client.return_value = defer.fail(UnhandledCommand())
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+        processNotification = self.patch(service, "processNotification")
+        processNotification.return_value = defer.succeed(None)
+
+        packets = [self.make_packet(), self.make_packet()]
+        yield service.processBatch(packets, clock=reactor)
+        self.assertEqual(
+            [packets[0], packets[1]],
+            [call[0][0] for call in processNotification.call_args_list],
+        )
+
+    @defer.inlineCallbacks
+    def test_processBatch_logs_failures(self):
+        client = MagicMock()
+        client.return_value = defer.fail(ZeroDivisionError())
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+        processNotification = self.patch(service, "processNotification")
+
+        with TwistedLoggerFixture() as logger:
+            yield service.processBatch([self.make_packet()], clock=reactor)
+        self.assertIn(
+            "Failed to send DHCP lease information to region.", logger.output
+        )
+        self.assertThat(processNotification, MockNotCalled())
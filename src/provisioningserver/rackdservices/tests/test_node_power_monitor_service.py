@@ -9,7 +9,7 @@ from unittest.mock import ANY, Mock, sentinel
 
 from fixtures import FakeLogger
 from testtools.matchers import MatchesStructure
-from twisted.internet.defer import fail, succeed
+from twisted.internet.defer import Deferred, fail, succeed
 from twisted.internet.error import ConnectionDone
 from twisted.internet.task import Clock
 
@@ -78,7 +78,6 @@ class TestNodePowerMonitorService(MAASTestCase):
 
     def test_query_nodes_calls_query_all_nodes(self):
         service = self.make_monitor_service()
-        service.max_nodes_at_once = sentinel.max_nodes_at_once
 
         example_power_parameters = {
             "system_id": factory.make_UUID(),
@@ -98,6 +97,7 @@ class TestNodePowerMonitorService(MAASTestCase):
         ]
 
         query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.return_value = succeed(None)
 
         d = service.query_nodes(getRegionClient())
         io.flush()
@@ -107,11 +107,78 @@ class TestNodePowerMonitorService(MAASTestCase):
             query_all_nodes,
             MockCalledOnceWith(
                 [example_power_parameters],
-                max_concurrency=sentinel.max_nodes_at_once,
                 clock=service.clock,
+                scheduler=service.scheduler,
             ),
         )
 
+    def make_power_parameters(self):
+        return {
+            "system_id": factory.make_name("system_id"),
+            "hostname": factory.make_hostname(),
+            "power_state": factory.make_name("power_state"),
+            "power_type": factory.make_name("power_type"),
+            "context": {},
+        }
+
+    def test_query_nodes_fetches_next_batch_while_querying(self):
+        service = self.make_monitor_service()
+        batches = [[self.make_power_parameters()] for _ in range(2)]
+        client = Mock(
+            side_effect=[succeed({"nodes": batch}) for batch in batches]
+            + [succeed({"nodes": []})]
+        )
+        client.localIdent = factory.make_name("uuid")
+        queries = [Deferred(), Deferred()]
+        query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.side_effect = queries
+
+        d = service.query_nodes(client)
+
+        # Both batches were handed out before either finished querying.
+        self.assertEqual(3, client.call_count)
+        self.assertEqual(
+            batches, [call[0][0] for call in query_all_nodes.call_args_list]
+        )
+        self.assertFalse(d.called)
+        for query in queries:
+            query.callback(None)
+        self.assertIsNone(extract_result(d))
+
+    def test_query_nodes_spreads_nodes_over_target_period(self):
+        service = self.make_monitor_service()
+        service.target_period = service.check_interval * 4
+        batch = [self.make_power_parameters() for _ in range(8)]
+        client = Mock(return_value=succeed({"nodes": []}))
+        client.localIdent = factory.make_name("uuid")
+        self.patch(npms, "query_all_nodes").return_value = succeed(None)
+
+        # Nothing has been seen yet, so the first sweep takes everything.
+        client.side_effect = [
+            succeed({"nodes": batch}),
+            succeed({"nodes": []}),
+        ]
+        extract_result(service.query_nodes(client))
+        self.assertEqual(2, client.call_count)
+
+        # From then on each sweep only takes a quarter of the nodes seen.
+        self.assertEqual(2, service.get_sweep_quota(service.clock.seconds()))
+        client.reset_mock()
+        client.side_effect = [succeed({"nodes": batch[:2]})]
+        extract_result(service.query_nodes(client))
+        self.assertEqual(1, client.call_count)
+
+    def test_get_sweep_quota_forgets_nodes_not_seen_recently(self):
+        service = self.make_monitor_service()
+        service._seen = {
+            factory.make_name("system_id"): 0,
+            factory.make_name("system_id"): service.target_period * 2,
+        }
+        now = service.target_period * 2 + 1
+        self.assertEqual(1, service.get_sweep_quota(now))
+        self.assertEqual(1, len(service._seen))
+        self.assertIsNone(service.get_sweep_quota(now * 3))
+
     def test_query_nodes_copes_with_NoSuchCluster(self):
         service = self.make_monitor_service()
 
@@ -43,7 +43,11 @@ from zope.interface.verify import verifyObject
 
 from maastesting import get_testing_timeout
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.matchers import (
+    MockCalledOnce,
+    MockCalledOnceWith,
+    MockNotCalled,
+)
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
 from maastesting.twisted import TwistedLoggerFixture
 from provisioningserver import boot
@@ -64,6 +68,7 @@ from provisioningserver.rackdservices.tftp import (
     TransferTimeTrackingTFTP,
     UDPServer,
 )
+from provisioningserver.rpc.boot_config import BootConfigCache
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import GetBootConfig
 from provisioningserver.testing.boot_images import (
@@ -206,6 +211,7 @@ class TestTFTPBackend(MAASTestCase):
         self.useFixture(ClusterConfigurationFixture())
         self.patch(boot, "find_mac_via_arp")
         self.patch(tftp_module, "log_request")
+        self.patch(tftp_module, "boot_config_cache", BootConfigCache())
 
     def test_init(self):
         temp_dir = self.make_dir()
@@ -406,6 +412,10 @@ class TestTFTPBackend(MAASTestCase):
         reader = yield backend.get_boot_method_reader(method, params_with_ip)
         self.addCleanup(reader.finish)
 
+        # Forget the cached boot configuration, so that the region is asked
+        # again.
+        backend.boot_config_cache.invalidate()
+
         # Get the reader twice.
         params_with_ip = dict(fake_params)
         params_with_ip["remote_ip"] = remote_ip
@@ -421,6 +431,71 @@ class TestTFTPBackend(MAASTestCase):
         for idx in range(1, 10):
             self.assertThat(clients[idx], MockNotCalled())
 
+    @inlineCallbacks
+    def test_get_boot_method_reader_uses_cached_boot_config(self):
+        # Fake kernel configuration parameters, as returned from the RPC call.
+        fake_kernel_params = make_kernel_parameters()
+        fake_params = fake_kernel_params._asdict()
+
+        # Stub the output of list_boot_images so the label is set in the
+        # kernel parameters.
+        boot_image = {
+            "osystem": fake_params["osystem"],
+            "release": fake_params["release"],
+            "architecture": fake_params["arch"],
+            "subarchitecture": fake_params["subarch"],
+            "purpose": fake_params["purpose"],
+            "supported_subarches": "",
+            "label": fake_params["label"],
+        }
+        self.patch(tftp_module, "list_boot_images").return_value = [boot_image]
+        del fake_params["label"]
+
+        # Stub RPC call to return the fake configuration parameters.
+        clients = []
+        for _ in range(10):
+            client = Mock()
+            client.localIdent = factory.make_name("system_id")
+            client.side_effect = lambda *args, **kwargs: (
+                succeed(dict(fake_params))
+            )
+            clients.append(client)
+        client_service = Mock()
+        client_service.getClientNow.side_effect = [
+            succeed(client) for client in clients
+        ]
+        client_service.getAllClients.return_value = clients
+
+        # get_boot_method_reader() takes a dict() of parameters and returns an
+        # `IReader` of a PXE configuration, rendered by
+        # `PXEBootMethod.get_reader`.
+        backend = TFTPBackend(self.make_dir(), client_service)
+
+        # Stub get_reader to return the render parameters.
+        method = PXEBootMethod()
+        fake_render_result = factory.make_name("render").encode("utf-8")
+        render_patch = self.patch(method, "get_reader")
+        render_patch.return_value = BytesReader(fake_render_result)
+
+        # Get the reader once.
+        remote_ip = factory.make_ipv4_address()
+        params_with_ip = dict(fake_params)
+        params_with_ip["remote_ip"] = remote_ip
+        reader = yield backend.get_boot_method_reader(method, params_with_ip)
+        self.addCleanup(reader.finish)
+
+        # Get the reader twice.
+        params_with_ip = dict(fake_params)
+        params_with_ip["remote_ip"] = remote_ip
+        reader = yield backend.get_boot_method_reader(method, params_with_ip)
+        self.addCleanup(reader.finish)
+
+        # The region was only asked once; the second reader was rendered
+        # from the cached boot configuration.
+        self.assertEqual(1, clients[0].call_count)
+        self.assertEqual(1, backend.boot_config_cache.hits)
+        self.assertEqual(2, render_patch.call_count)
+
     @inlineCallbacks
     def test_get_boot_method_reader_uses_different_clients(self):
         # Fake kernel configuration parameters, as returned from the RPC call.
@@ -548,6 +623,10 @@ class TestTFTPBackend(MAASTestCase):
         # The first client is now saved.
         self.assertEqual(clients[0], backend.client_to_remote[remote_ip])
 
+        # Forget the cached boot configuration, so that the region is asked
+        # again.
+        backend.boot_config_cache.invalidate()
+
         # Get the reader twice.
         params_with_ip = dict(fake_params)
         params_with_ip["remote_ip"] = remote_ip
@@ -866,6 +945,68 @@ class TestTFTPBackend(MAASTestCase):
             MockCalledOnceWith(client, GetBootConfig, **params_okay),
         )
 
+    def make_backend_for_boot_config(self, boot_config):
+        client = Mock()
+        client.localIdent = factory.make_name("system_id")
+        client_service = Mock()
+        client_service.getClientNow.return_value = succeed(client)
+        client_service.getAllClients.return_value = [client]
+        backend = TFTPBackend(self.make_dir(), client_service)
+        backend.fetcher = Mock()
+        backend.fetcher.side_effect = lambda *args, **kwargs: succeed(
+            dict(boot_config)
+        )
+
+        # Like the real thing, this changes the configuration it's given.
+        def get_boot_image(data, client, remote_ip):
+            del data["system_id"]
+            data["label"] = factory.make_name("label")
+            return data
+
+        self.patch(backend, "get_boot_image").side_effect = get_boot_image
+        return backend
+
+    def make_boot_config(self):
+        boot_config = make_kernel_parameters()._asdict()
+        del boot_config["label"]
+        boot_config["system_id"] = factory.make_name("system_id")
+        return boot_config
+
+    @inlineCallbacks
+    def test_get_kernel_params_caches_boot_config(self):
+        boot_config = self.make_boot_config()
+        backend = self.make_backend_for_boot_config(boot_config)
+        params = {
+            "mac": factory.make_mac_address(),
+            "remote_ip": factory.make_ipv4_address(),
+        }
+
+        yield backend.get_kernel_params(params)
+        kernel_params = yield backend.get_kernel_params(params)
+
+        self.assertThat(backend.fetcher, MockCalledOnce())
+        self.assertEqual(1, backend.boot_config_cache.hits)
+        self.assertEqual(boot_config["hostname"], kernel_params.hostname)
+        # The cached configuration was not changed by get_boot_image.
+        self.assertEqual(
+            boot_config, backend.boot_config_cache.get(dict(params))
+        )
+
+    @inlineCallbacks
+    def test_get_kernel_params_fetches_boot_config_after_invalidation(self):
+        boot_config = self.make_boot_config()
+        backend = self.make_backend_for_boot_config(boot_config)
+        params = {
+            "mac": factory.make_mac_address(),
+            "remote_ip": factory.make_ipv4_address(),
+        }
+
+        yield backend.get_kernel_params(params)
+        backend.boot_config_cache.invalidate([boot_config["system_id"]])
+        yield backend.get_kernel_params(params)
+
+        self.assertEqual(2, backend.fetcher.call_count)
+
 
 class TestTFTPService(MAASTestCase):
     def test_tftp_service(self):
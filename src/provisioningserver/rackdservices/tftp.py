@@ -33,7 +33,11 @@ from provisioningserver.events import EVENT_TYPES, send_node_event_ip_address
 from provisioningserver.kernel_opts import KernelParameters
 from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
-from provisioningserver.rpc.boot_images import list_boot_images
+from provisioningserver.rpc.boot_config import boot_config_cache
+from provisioningserver.rpc.boot_images import (
+    get_boot_images_index,
+    list_boot_images,
+)
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import GetBootConfig, MarkNodeFailed
 from provisioningserver.utils import network, tftp
@@ -52,34 +56,13 @@ def get_boot_image(params):
     if purpose == "enlist":
         purpose = "commissioning"
 
-    # Get the matching boot images, minus subarchitecture.
-    boot_images = list_boot_images()
-    boot_images = [
-        image
-        for image in boot_images
-        if (
-            image["osystem"] == params["osystem"]
-            and image["release"] == params["release"]
-            and image["architecture"] == params["arch"]
-            and image["purpose"] == purpose
-        )
-    ]
-
-    # See if exact subarchitecture match.
-    for image in boot_images:
-        if image["subarchitecture"] == params["subarch"]:
-            return image
-
-    # Not exact match check if subarchitecture is in the supported
-    # subarchitectures list.
-    for image in boot_images:
-        subarches = image.get("supported_subarches", "")
-        subarches = subarches.split(",")
-        if params["subarch"] in subarches:
-            return image
-
-    # No matching boot image was found.
-    return None
+    return get_boot_images_index(list_boot_images()).find(
+        params["osystem"],
+        params["release"],
+        params["arch"],
+        params["subarch"],
+        purpose,
+    )
 
 
 def log_request(file_name, clock=reactor):
@@ -144,6 +127,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
         self.client_to_remote = {}
         self.client_service = client_service
         self.fetcher = RPCFetcher()
+        self.boot_config_cache = boot_config_cache
 
     def _get_new_client_for_remote(self, remote_ip):
         """Return a new client for the `remote_ip`.
@@ -288,9 +272,21 @@ class TFTPBackend(FilesystemSynchronousBackend):
         )
         params = {name: params[name] for name in arguments if name in params}
 
+        def cache(data, params, generation):
+            self.boot_config_cache.set(params, data, generation)
+            return data
+
         def fetch(client, params):
             params["system_id"] = client.localIdent
-            d = self.fetcher(client, GetBootConfig, **params)
+            # The cache stores and hands out copies, as get_boot_image
+            # changes the configuration it's given.
+            data = self.boot_config_cache.get(params)
+            if data is None:
+                generation = self.boot_config_cache.generation
+                d = self.fetcher(client, GetBootConfig, **params)
+                d.addCallback(cache, params, generation)
+            else:
+                d = succeed(data)
             d.addCallback(self.get_boot_image, client, params["remote_ip"])
             d.addCallback(lambda data: KernelParameters(**data))
             return d
@@ -0,0 +1,131 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Cache of boot configurations obtained from the region."""
+
+
+from collections import defaultdict, OrderedDict
+
+from twisted.internet import reactor
+
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
+
+
+class BootConfigCache:
+    """Short-lived cache of `GetBootConfig` responses.
+
+    PXE, iPXE and GRUB clients fetch several configuration files per boot,
+    and retry, each needing the same boot configuration from the region.
+    Responses are cached for `ttl` seconds, keyed by the arguments sent to
+    the region except for the rack controller's own system_id.
+
+    The region invalidates the responses for a machine when anything that
+    would change its boot configuration changes. Responses being fetched
+    while an invalidation arrives are not cached.
+    """
+
+    def __init__(self, ttl=30, max_size=10000, clock=reactor):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        # The number of invalidations so far, used to detect responses
+        # fetched across an invalidation.
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._keys_by_system_id = defaultdict(set)
+
+    @staticmethod
+    def _get_key(params):
+        return tuple(
+            sorted(
+                (name, value)
+                for name, value in params.items()
+                if name != "system_id"
+            )
+        )
+
+    def get(self, params):
+        """Return a copy of the cached response for `params`, or `None`."""
+        key = self._get_key(params)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock.seconds():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            PROMETHEUS_METRICS.update(
+                "maas_rack_boot_config_cache_requests",
+                "inc",
+                labels={"result": "miss"},
+            )
+            return None
+        self.hits += 1
+        PROMETHEUS_METRICS.update(
+            "maas_rack_boot_config_cache_requests",
+            "inc",
+            labels={"result": "hit"},
+        )
+        return dict(entry[1])
+
+    def set(self, params, response, generation):
+        """Cache `response` for `params`.
+
+        :param generation: The value of `generation` when the response was
+            requested. If there has been an invalidation since, the response
+            may be out of date and is not cached.
+        """
+        if generation != self.generation:
+            return
+        key = self._get_key(params)
+        self._remove(key)
+        system_id = response.get("system_id")
+        self._entries[key] = (
+            self.clock.seconds() + self.ttl,
+            dict(response),
+            system_id,
+        )
+        self._keys_by_system_id[system_id].add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, system_ids=None):
+        """Forget the responses for `system_ids`, or all responses.
+
+        Responses for machines the region does not know are not tied to a
+        system_id, and are forgotten by every invalidation; the machine may
+        be the one that has just been enlisted.
+        """
+        self.generation += 1
+        if system_ids is None:
+            self._entries.clear()
+            self._keys_by_system_id.clear()
+        else:
+            for system_id in [None, *system_ids]:
+                for key in self._keys_by_system_id.pop(system_id, ()):
+                    self._entries.pop(key, None)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_system_id.get(entry[2])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_system_id[entry[2]]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+boot_config_cache = BootConfigCache()
+
+
+def invalidate_boot_config_cache(system_ids=None):
+    """Forget cached boot configurations.
+
+    :param system_ids: The system_ids of the machines whose boot
+        configurations should be forgotten. All are forgotten if not given.
+    """
+    boot_config_cache.invalidate(system_ids)
@@ -23,6 +23,44 @@ log = LegacyLogger()
 
 
 CACHED_BOOT_IMAGES = None
+CACHED_BOOT_IMAGES_INDEX = None
+
+
+class BootImageIndex:
+    """Index of boot images for looking up the image to boot.
+
+    Images are keyed by osystem, release, architecture and purpose, and then
+    by their exact subarchitecture or by each of their supported
+    subarchitectures. Where several images match, the first in the list
+    wins, as it would when scanning the list.
+    """
+
+    def __init__(self, images):
+        self.exact = {}
+        self.supported = {}
+        for image in images:
+            key = (
+                image["osystem"],
+                image["release"],
+                image["architecture"],
+                image["purpose"],
+            )
+            self.exact.setdefault(key + (image["subarchitecture"],), image)
+            subarches = image.get("supported_subarches", "")
+            for subarch in subarches.split(","):
+                self.supported.setdefault(key + (subarch,), image)
+
+    def find(self, osystem, release, arch, subarch, purpose):
+        """Return the image to boot, or `None` if there's no such image.
+
+        An image for exactly `subarch` is preferred over one which only
+        lists it in its supported subarchitectures.
+        """
+        key = (osystem, release, arch, purpose, subarch)
+        image = self.exact.get(key)
+        if image is None:
+            image = self.supported.get(key)
+        return image
 
 
 def list_boot_images():
@@ -41,6 +79,20 @@ def list_boot_images():
     return CACHED_BOOT_IMAGES
 
 
+def get_boot_images_index(images):
+    """Return a `BootImageIndex` of `images`.
+
+    The index of the last list given is cached, so that the index of the
+    cached boot images is only built again when they are reloaded.
+    """
+    global CACHED_BOOT_IMAGES_INDEX
+    if CACHED_BOOT_IMAGES_INDEX is None or (
+        CACHED_BOOT_IMAGES_INDEX[0] is not images
+    ):
+        CACHED_BOOT_IMAGES_INDEX = images, BootImageIndex(images)
+    return CACHED_BOOT_IMAGES_INDEX[1]
+
+
 def reload_boot_images():
     """Update the cached boot images so `list_boot_images` returns the
     most up-to-date boot images list."""
@@ -48,6 +100,8 @@ def reload_boot_images():
     with ClusterConfiguration.open() as config:
         tftp_root = config.tftp_root
     CACHED_BOOT_IMAGES = tftppath.list_boot_images(tftp_root)
+    # Index the new images now, rather than on the next boot request.
+    get_boot_images_index(CACHED_BOOT_IMAGES)
 
 
 def get_hosts_from_sources(sources):
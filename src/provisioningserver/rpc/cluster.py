@@ -15,6 +15,7 @@ __all__ = [
     "DescribePowerTypes",
     "GetPreseedData",
     "Identify",
+    "InvalidateBootConfigCache",
     "ListBootImages",
     "ListOperatingSystems",
     "ListSupportedArchitectures",
@@ -25,11 +26,16 @@ __all__ = [
     "PowerQuery",
     "SetBootOrder",
     "ScanNetworks",
+    "UpdateDHCPv4",
+    "UpdateDHCPv6",
+    "UpdateExternalConfigVersion",
     "ValidateDHCPv4Config",
     "ValidateDHCPv6Config",
     "ValidateLicenseKey",
 ]
 
+import copy
+
 from twisted.protocols import amp
 
 from provisioningserver.rpc import exceptions
@@ -431,6 +437,9 @@ class _ConfigureDHCP(amp.Command):
                 optional=True,
             ),
         ),
+        # The version of this configuration, given back by _UpdateDHCP to
+        # send only the changes to it.
+        (b"version", amp.Unicode(optional=True)),
     ]
     response = []
     errors = {exceptions.CannotConfigureDHCP: b"CannotConfigureDHCP"}
@@ -442,6 +451,13 @@ class _ValidateDHCPConfig(_ConfigureDHCP):
     :since: 2.1
     """
 
+    # Validating a configuration doesn't make it current, so it has no use
+    # for a version.
+    arguments = [
+        (name, argument)
+        for name, argument in _ConfigureDHCP.arguments
+        if name != b"version"
+    ]
     response = [
         (
             b"errors",
@@ -486,6 +502,65 @@ class ValidateDHCPv6Config(_ValidateDHCPConfig):
     """
 
 
+def _optional(argument):
+    """Return a copy of `argument` that is optional."""
+    argument = copy.copy(argument)
+    argument.optional = True
+    return argument
+
+
+class _UpdateDHCP(amp.Command):
+    """Update a DHCP server with the changes to its configuration.
+
+    The changes are relative to the configuration at `base_version`, and the
+    DHCP server refuses them with `DHCPConfigVersionMismatch` if that's not
+    its current configuration; the full configuration must be sent with
+    _ConfigureDHCP instead.
+
+    Hosts are replaced by MAC address. Each other part of the configuration
+    is only given when it has changed.
+
+    :since: 3.3
+    """
+
+    arguments = [
+        (b"base_version", amp.Unicode()),
+        (b"version", amp.Unicode()),
+        (b"omapi_key", amp.Unicode()),
+        (b"removed_hosts", amp.ListOf(amp.Unicode())),
+        (b"changed_hosts", dict(_ConfigureDHCP.arguments)[b"hosts"]),
+    ] + [
+        (name, _optional(argument))
+        for name, argument in _ConfigureDHCP.arguments
+        if name
+        in (
+            b"failover_peers",
+            b"shared_networks",
+            b"interfaces",
+            b"global_dhcp_snippets",
+        )
+    ]
+    response = []
+    errors = {
+        exceptions.CannotConfigureDHCP: b"CannotConfigureDHCP",
+        exceptions.DHCPConfigVersionMismatch: b"DHCPConfigVersionMismatch",
+    }
+
+
+class UpdateDHCPv4(_UpdateDHCP):
+    """Update the DHCPv4 server.
+
+    :since: 3.3
+    """
+
+
+class UpdateDHCPv6(_UpdateDHCP):
+    """Update the DHCPv6 server.
+
+    :since: 3.3
+    """
+
+
 class ImportBootImages(amp.Command):
     """Import boot images and report the final
     boot images that exist on the cluster.
@@ -751,6 +826,9 @@ class ScanNetworks(amp.Command):
     If the `force_ping` parameter is True, forces the use of `ping` even if
     `nmap` is installed.
 
+    If the `force_icmp` parameter is True, scans by sending ICMP echo requests
+    from the scanning process, rather than using `nmap` or `ping`.
+
     If the `threads` parameter is supplied, overrides the number of concurrent
     threads the rack controller is allowed to spawn while scanning the network.
 
@@ -773,6 +851,7 @@ class ScanNetworks(amp.Command):
     arguments = [
         (b"scan_all", amp.Boolean(optional=True)),
         (b"force_ping", amp.Boolean(optional=True)),
+        (b"force_icmp", amp.Boolean(optional=True)),
         (b"slow", amp.Boolean(optional=True)),
         (b"threads", amp.Integer(optional=True)),
         (b"cidrs", amp.ListOf(IPNetwork(), optional=True)),
@@ -830,3 +909,34 @@ class CheckIPs(amp.Command):
         )
     ]
     errors = {}
+
+
+class InvalidateBootConfigCache(amp.Command):
+    """Forget cached boot configurations obtained with `GetBootConfig`.
+
+    :since: 3.3
+    """
+
+    arguments = [
+        # The system_ids of the machines whose boot configurations have
+        # changed. All cached boot configurations are forgotten if not given.
+        (b"system_ids", amp.ListOf(amp.Unicode(), optional=True)),
+    ]
+    response = []
+    errors = {}
+
+
+class UpdateExternalConfigVersion(amp.Command):
+    """Tell the rack the version of the external services configuration.
+
+    The version changes whenever the region changes the configuration that
+    the rack obtains with `GetTimeConfiguration`, `GetDNSConfiguration`,
+    `GetProxyConfiguration` and `GetSyslogConfiguration`, or the types of
+    the controllers.
+
+    :since: 3.3
+    """
+
+    arguments = [(b"version", amp.Unicode())]
+    response = []
+    errors = {}
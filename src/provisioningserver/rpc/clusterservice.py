@@ -9,7 +9,6 @@ import json
 from operator import itemgetter
 import os
 from os import urandom
-import random
 from socket import AF_INET, AF_INET6, gethostname
 import sys
 from urllib.parse import urlparse
@@ -52,7 +51,10 @@ from provisioningserver.drivers.power.recs import probe_and_enlist_recs
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.path import get_maas_data_path
-from provisioningserver.prometheus.metrics import set_global_labels
+from provisioningserver.prometheus.metrics import (
+    PROMETHEUS_METRICS,
+    set_global_labels,
+)
 from provisioningserver.rpc import (
     cluster,
     common,
@@ -61,6 +63,7 @@ from provisioningserver.rpc import (
     pods,
     region,
 )
+from provisioningserver.rpc.boot_config import invalidate_boot_config_cache
 from provisioningserver.rpc.boot_images import (
     import_boot_images,
     is_import_boot_images_running,
@@ -68,6 +71,7 @@ from provisioningserver.rpc.boot_images import (
 )
 from provisioningserver.rpc.common import Ping, RPCProtocol
 from provisioningserver.rpc.exceptions import CannotConfigureDHCP
+from provisioningserver.rpc.external_config import external_config_version
 from provisioningserver.rpc.interfaces import IConnectionToRegion
 from provisioningserver.rpc.osystems import (
     gen_operating_systems,
@@ -120,6 +124,34 @@ log = LegacyLogger()
 DHCP_TIMEOUT = 30  # 30 seconds.
 
 
+def record_dhcp_config_size(sync, size):
+    """Record the size of a DHCP configuration received from the region.
+
+    :param sync: "full" for a full configuration, "delta" for changes.
+    :param size: The size in bytes of the command on the wire.
+    """
+    PROMETHEUS_METRICS.update(
+        "maas_rack_dhcp_config_payload_size",
+        "observe",
+        value=size,
+        labels={"sync": sync},
+    )
+
+
+def record_dhcp_config(sync, hosts_changed):
+    """Record the number of hosts in a DHCP configuration from the region.
+
+    :param sync: "full" for a full configuration, "delta" for changes.
+    :param hosts_changed: The number of hosts in the configuration.
+    """
+    PROMETHEUS_METRICS.update(
+        "maas_rack_dhcp_config_hosts_changed",
+        "observe",
+        value=hosts_changed,
+        labels={"sync": sync},
+    )
+
+
 def catch_probe_and_enlist_error(name, failure):
     """Logs any errors when trying to probe and enlist a chassis."""
     maaslog.error(
@@ -137,6 +169,7 @@ def get_scan_all_networks_args(
     cidrs=None,
     slow=False,
     interface=None,
+    force_icmp=False,
 ):
     """Return the arguments needed to perform a scan of all networks.
 
@@ -152,6 +185,8 @@ def get_scan_all_networks_args(
         args.extend(["--threads", str(threads)])
     if force_ping:
         args.append("--ping")
+    if force_icmp:
+        args.append("--icmp")
     if slow:
         args.append("--slow")
     # None of these parameters are relevant if we are scanning everything...
@@ -200,6 +235,7 @@ def executeScanNetworksSubprocess(
     threads=None,
     cidrs=None,
     interface=None,
+    force_icmp=False,
 ):
     """Runs the network scanning subprocess.
 
@@ -226,6 +262,7 @@ def executeScanNetworksSubprocess(
         threads=threads,
         cidrs=cidrs,
         interface=interface,
+        force_icmp=force_icmp,
     )
     spawnProcessAndNullifyStdout(protocol, args)
     return done
@@ -485,8 +522,10 @@ class Cluster(RPCProtocol):
         hosts,
         interfaces,
         global_dhcp_snippets=[],
+        version=None,
     ):
         server = dhcp.DHCPv4Server(omapi_key)
+        record_dhcp_config("full", len(hosts))
         if concurrency.dhcpv4.locked:
             log.debug(
                 "DHCPv4 configure triggered; another is already processing, "
@@ -508,6 +547,7 @@ class Cluster(RPCProtocol):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version,
         )
         d.addCallback(lambda _: {})
 
@@ -521,6 +561,32 @@ class Cluster(RPCProtocol):
 
         return d
 
+    @cluster.UpdateDHCPv4.responder
+    def update_dhcpv4(
+        self,
+        omapi_key,
+        base_version,
+        version,
+        removed_hosts,
+        changed_hosts,
+        failover_peers=None,
+        shared_networks=None,
+        interfaces=None,
+        global_dhcp_snippets=None,
+    ):
+        return self._update_dhcp(
+            concurrency.dhcpv4,
+            dhcp.DHCPv4Server(omapi_key),
+            base_version=base_version,
+            version=version,
+            removed_hosts=removed_hosts,
+            changed_hosts=changed_hosts,
+            failover_peers=failover_peers,
+            shared_networks=shared_networks,
+            interfaces=interfaces,
+            global_dhcp_snippets=global_dhcp_snippets,
+        )
+
     @cluster.ValidateDHCPv4Config.responder
     def validate_dhcpv4_config(
         self,
@@ -553,8 +619,10 @@ class Cluster(RPCProtocol):
         hosts,
         interfaces,
         global_dhcp_snippets=[],
+        version=None,
     ):
         server = dhcp.DHCPv6Server(omapi_key)
+        record_dhcp_config("full", len(hosts))
         if concurrency.dhcpv6.locked:
             log.debug(
                 "DHCPv6 configure triggered; another is already processing, "
@@ -576,6 +644,7 @@ class Cluster(RPCProtocol):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version,
         )
         d.addCallback(lambda _: {})
 
@@ -589,6 +658,53 @@ class Cluster(RPCProtocol):
 
         return d
 
+    @cluster.UpdateDHCPv6.responder
+    def update_dhcpv6(
+        self,
+        omapi_key,
+        base_version,
+        version,
+        removed_hosts,
+        changed_hosts,
+        failover_peers=None,
+        shared_networks=None,
+        interfaces=None,
+        global_dhcp_snippets=None,
+    ):
+        return self._update_dhcp(
+            concurrency.dhcpv6,
+            dhcp.DHCPv6Server(omapi_key),
+            base_version=base_version,
+            version=version,
+            removed_hosts=removed_hosts,
+            changed_hosts=changed_hosts,
+            failover_peers=failover_peers,
+            shared_networks=shared_networks,
+            interfaces=interfaces,
+            global_dhcp_snippets=global_dhcp_snippets,
+        )
+
+    def _update_dhcp(self, lock, server, **arguments):
+        """Update `server` with the changes in `arguments`, holding `lock`."""
+        record_dhcp_config(
+            "delta",
+            len(arguments["removed_hosts"]) + len(arguments["changed_hosts"]),
+        )
+        d = lock.run(
+            deferWithTimeout, DHCP_TIMEOUT, dhcp.update, server, **arguments
+        )
+        d.addCallback(lambda _: {})
+
+        # Catch the cancelled error, which means the work timed out.
+        def _timeoutEb(failure):
+            failure.trap(CancelledError)
+            log.err(failure, "%s update timed out" % server.descriptive_name)
+            raise CannotConfigureDHCP("timed out") from failure.value
+
+        d.addErrback(_timeoutEb)
+
+        return d
+
     @cluster.ValidateDHCPv6Config.responder
     def validate_dhcpv6_config(
         self,
@@ -874,6 +990,7 @@ class Cluster(RPCProtocol):
         threads=None,
         cidrs=None,
         interface=None,
+        force_icmp=False,
     ):
         """ScanNetworks()
 
@@ -900,6 +1017,7 @@ class Cluster(RPCProtocol):
                 cidrs=cidrs,
                 threads=threads,
                 interface=interface,
+                force_icmp=force_icmp,
             )
             d.addErrback(suppress, ProcessDone)  # Exited normally.
             d.addErrback(log.err, "Failed to scan all networks.")
@@ -957,6 +1075,26 @@ class Cluster(RPCProtocol):
         d.addErrback(log.err, "Failed to perform IP address checking.")
         return d
 
+    @cluster.InvalidateBootConfigCache.responder
+    def invalidate_boot_config_cache(self, system_ids=None):
+        """InvalidateBootConfigCache()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.cluster.InvalidateBootConfigCache`.
+        """
+        invalidate_boot_config_cache(system_ids)
+        return {}
+
+    @cluster.UpdateExternalConfigVersion.responder
+    def update_external_config_version(self, version):
+        """UpdateExternalConfigVersion()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.cluster.UpdateExternalConfigVersion`.
+        """
+        external_config_version.set(version)
+        return {}
+
 
 @implementer(IConnectionToRegion)
 class ClusterClient(Cluster):
@@ -991,6 +1129,23 @@ class ClusterClient(Cluster):
     eventloop = None
     service = None
 
+    # DHCP configurations are measured as received, rather than encoded
+    # again to measure them.
+    box_size_observers = {
+        cluster.ConfigureDHCPv4.commandName: partial(
+            record_dhcp_config_size, "full"
+        ),
+        cluster.ConfigureDHCPv6.commandName: partial(
+            record_dhcp_config_size, "full"
+        ),
+        cluster.UpdateDHCPv4.commandName: partial(
+            record_dhcp_config_size, "delta"
+        ),
+        cluster.UpdateDHCPv6.commandName: partial(
+            record_dhcp_config_size, "delta"
+        ),
+    }
+
     def __init__(self, address, eventloop, service):
         super().__init__()
         self.address = address
@@ -1051,6 +1206,9 @@ class ClusterClient(Cluster):
             self.localIdent = data["system_id"]
             set_global_labels(maas_uuid=data.get("uuid"), service_type="rack")
             set_maas_id(self.localIdent)
+            # Regions older than 3.3 do not send this, and the external
+            # services configuration must then be polled for.
+            external_config_version.set(data.get("external_config_version"))
             version = data.get("version", None)
             if version is None:
                 version_log = "MAAS version 2.2 or below"
@@ -1231,7 +1389,8 @@ class ClusterClientService(TimerService):
     def getClient(self):
         """Returns a :class:`common.Client` connected to a region.
 
-        The client is chosen at random.
+        The client is chosen by `common.choose_connection`, preferring the
+        least loaded connections.
 
         :raises: :py:class:`~.exceptions.NoConnectionsAvailable` when
             there are no open connections to a region controller.
@@ -1240,7 +1399,7 @@ class ClusterClientService(TimerService):
         if len(conns) == 0:
             raise exceptions.NoConnectionsAvailable()
         else:
-            return common.Client(random.choice(conns))
+            return common.Client(common.choose_connection(conns))
 
     @deferred
     def getClientNow(self):
@@ -5,9 +5,13 @@
 
 
 from os import getpid
+import random
 from socket import gethostname
+from weakref import WeakKeyDictionary
 
-from twisted.internet.defer import Deferred
+from twisted.internet import reactor
+from twisted.internet.defer import CancelledError, Deferred
+from twisted.internet.error import ConnectionClosed
 from twisted.protocols import amp
 from twisted.python.failure import Failure
 
@@ -77,6 +81,153 @@ class Ping(amp.Command):
     errors = []
 
 
+class ConnectionLoad:
+    """The load on an RPC connection, as seen from this end of it.
+
+    This tracks the calls in flight over the connection and a moving average
+    of their latency. A connection whose calls keep timing out is ejected for
+    a while: `choose_connection` then only picks it if there's no other.
+    """
+
+    # How much the latency of the latest call counts in the moving average.
+    LATENCY_WEIGHT = 0.2
+    # The number of consecutive timeouts after which to eject the connection.
+    EJECT_AFTER_TIMEOUTS = 3
+    # How long to eject the connection for, in seconds.
+    EJECT_FOR = 30
+
+    clock = reactor
+
+    def __init__(self):
+        super().__init__()
+        self.peer = None
+        self.in_flight = 0
+        self.latency = 0.0
+        self.timeouts = 0
+        self.ejected_until = None
+
+    @property
+    def ejected(self):
+        """Whether the connection is currently ejected."""
+        return (
+            self.ejected_until is not None
+            and self.ejected_until > self.clock.seconds()
+        )
+
+    def track(self, d, peer, timeout=None, started=None):
+        """Track the call that `d` is the result of.
+
+        :param peer: Something that identifies the far end of the
+            connection, for metrics.
+        :param timeout: The number of seconds after which the call is
+            cancelled, if any. Only calls cancelled once `timeout` has passed
+            count as timed out; others were cancelled by the caller.
+        :param started: When the call was made, by `clock`. Defaults to now.
+        """
+        if started is None:
+            started = self.clock.seconds()
+        self.peer = peer
+        self.in_flight += 1
+        self._updateMetrics(peer)
+
+        def done(result):
+            self.in_flight -= 1
+            elapsed = self.clock.seconds() - started
+            if isinstance(result, Failure) and result.check(CancelledError):
+                if timeout is not None and elapsed >= timeout:
+                    self._timedOut(peer)
+            elif isinstance(result, Failure) and result.check(
+                ConnectionClosed
+            ):
+                # The connection is going away; there's nothing to learn.
+                pass
+            else:
+                self.latency += self.LATENCY_WEIGHT * (elapsed - self.latency)
+                self.timeouts = 0
+            self._updateMetrics(peer)
+            return result
+
+        return d.addBoth(done)
+
+    def _timedOut(self, peer):
+        self.timeouts += 1
+        if self.timeouts >= self.EJECT_AFTER_TIMEOUTS:
+            self.timeouts = 0
+            self.ejected_until = self.clock.seconds() + self.EJECT_FOR
+            log.msg(
+                "Ejecting RPC connection to %s for %d seconds after %d "
+                "timeouts." % (peer, self.EJECT_FOR, self.EJECT_AFTER_TIMEOUTS)
+            )
+            PROMETHEUS_METRICS.update(
+                "maas_rpc_connection_ejections",
+                "inc",
+                labels={"peer": str(peer)},
+            )
+
+    def _updateMetrics(self, peer):
+        # There can be several connections to the same peer. Report their
+        # total calls in flight and mean latency, rather than have each
+        # overwrite the values of the others.
+        loads = [self]
+        loads.extend(
+            load
+            for load in _connection_loads.values()
+            if load is not self and load.peer == peer
+        )
+        labels = {"peer": str(peer)}
+        PROMETHEUS_METRICS.update(
+            "maas_rpc_connection_calls_in_flight",
+            "set",
+            value=sum(load.in_flight for load in loads),
+            labels=labels,
+        )
+        PROMETHEUS_METRICS.update(
+            "maas_rpc_connection_latency",
+            "set",
+            value=sum(load.latency for load in loads) / len(loads),
+            labels=labels,
+        )
+
+
+# Maps connections to their `ConnectionLoad`.
+_connection_loads = WeakKeyDictionary()
+
+
+def get_connection_load(conn):
+    """Return the `ConnectionLoad` for `conn`."""
+    try:
+        return _connection_loads[conn]
+    except KeyError:
+        load = _connection_loads[conn] = ConnectionLoad()
+        return load
+
+
+def choose_connection(connections):
+    """Choose the least loaded of `connections`.
+
+    Two connections are picked at random, and the one with the fewer calls
+    in flight, then the lower latency, is chosen. This spreads calls nearly
+    as well as comparing every connection, but without herding them all onto
+    the same one. Ejected connections are only chosen if all are ejected.
+
+    :param connections: A non-empty collection of connections.
+    """
+    connections = list(connections)
+    available = [
+        conn for conn in connections if not get_connection_load(conn).ejected
+    ]
+    if len(available) == 0:
+        available = connections
+    if len(available) == 1:
+        return available[0]
+
+    def load(conn):
+        load = get_connection_load(conn)
+        return load.in_flight, load.latency
+
+    return min(random.sample(available, 2), key=load)
+
+
 class Client:
     """Wrapper around an :class:`amp.AMP` instance.
 
@@ -170,12 +321,16 @@ class Client:
         timeout = kwargs.pop("_timeout", undefined)
         if timeout is undefined:
             timeout = 120  # 2 minutes
+        load = get_connection_load(self._conn)
+        started = load.clock.seconds()
         if timeout is None or timeout <= 0:
-            return self._conn.callRemote(cmd, **kwargs)
+            timeout = None
+            d = self._conn.callRemote(cmd, **kwargs)
         else:
-            return deferWithTimeout(
-                timeout, self._conn.callRemote, cmd, **kwargs
-            )
+            d = deferWithTimeout(timeout, self._conn.callRemote, cmd, **kwargs)
+        if isinstance(d, Deferred):
+            load.track(d, self._conn.ident, timeout=timeout, started=started)
+        return d
 
     @asynchronous
     def getHostCertificate(self):
@@ -227,6 +382,16 @@ def make_command_ref(box):
     )
 
 
+def get_box_size(box):
+    """Return the size in bytes of `box` on the wire.
+
+    The box's keys and values are already encoded, so this is cheap.
+    """
+    # Each key and value is preceded by its length in two bytes, and the box
+    # ends with an empty key.
+    return sum(4 + len(key) + len(value) for key, value in box.items()) + 2
+
+
 class RPCProtocol(amp.AMP):
     """A specialisation of `amp.AMP`.
 
@@ -239,8 +404,13 @@ class RPCProtocol(amp.AMP):
         been called, i.e. this protocol is now connected.
     :ivar onConnectionLost: A `Deferred` that fires when `connectionLost` has
         been called, i.e. this protocol is no longer connected.
+    :cvar box_size_observers: Maps command names to callables that are passed
+        the size in bytes of each box for that command sent or received, e.g.
+        to record it in a metric.
     """
 
+    box_size_observers = {}
+
     def __init__(self):
         super().__init__()
         self.onConnectionMade = Deferred()
@@ -275,6 +445,7 @@ class RPCProtocol(amp.AMP):
         disconnecting behaviour.
         """
         log.debug("[RPC <- received] {box}", box=box)
+        self._observeBoxSize(box[amp.COMMAND], box)
 
         d = super().dispatchCommand(box)
 
@@ -305,6 +476,17 @@ class RPCProtocol(amp.AMP):
 
         return d.addErrback(coerce_error)
 
+    def sendBox(self, box):
+        """Override `sendBox` to observe the size of sent commands."""
+        if amp.COMMAND in box:
+            self._observeBoxSize(box[amp.COMMAND], box)
+        return super().sendBox(box)
+
+    def _observeBoxSize(self, command, box):
+        observer = self.box_size_observers.get(command)
+        if observer is not None:
+            observer(get_box_size(box))
+
     def _safeEmit(self, box):
         """
         Override `_safeEmit` to log the RPC response.
@@ -7,6 +7,7 @@ __all__ = [
     "configure",
     "DHCPv4Server",
     "DHCPv6Server",
+    "update",
 ]
 
 from collections import namedtuple
@@ -28,6 +29,7 @@ from provisioningserver.rpc.exceptions import (
     CannotCreateHostMap,
     CannotModifyHostMap,
     CannotRemoveHostMap,
+    DHCPConfigVersionMismatch,
 )
 from provisioningserver.service_monitor import service_monitor
 from provisioningserver.utils.fs import sudo_delete_file, sudo_write_file
@@ -45,6 +47,10 @@ log = LegacyLogger()
 # Holds the current state of DHCPv4 and DHCPv6.
 _current_server_state = {}
 
+# Holds the version of the current state of DHCPv4 and DHCPv6, as given by
+# the region.
+_current_server_version = {}
+
 
 DHCPStateBase = namedtuple(
     "DHCPStateBase",
@@ -283,6 +289,7 @@ def configure(
     hosts,
     interfaces,
     global_dhcp_snippets=None,
+    version=None,
 ):
     """Configure the DHCPv6/DHCPv4 server, and restart it as appropriate.
 
@@ -299,9 +306,15 @@ def configure(
         contain a list of hosts the DHCP should statically.
     :param interfaces: List of interfaces that DHCP should use.
     :param global_dhcp_snippets: List of all global DHCP snippets
+    :param version: The version of this configuration, if any. Changes to
+        it can then be applied with `update`.
     """
     stopping = len(shared_networks) == 0
 
+    # Until this configuration is in place, changes to the previous one can't
+    # be applied.
+    _current_server_version.pop(server.dhcp_service, None)
+
     if global_dhcp_snippets is None:
         global_dhcp_snippets = []
 
@@ -447,6 +460,74 @@ def configure(
 
         # Update the current state to the new state.
         _current_server_state[server.dhcp_service] = new_state
+        _current_server_version[server.dhcp_service] = version
+
+
+@asynchronous
+def update(
+    server,
+    base_version,
+    version,
+    removed_hosts,
+    changed_hosts,
+    failover_peers=None,
+    shared_networks=None,
+    interfaces=None,
+    global_dhcp_snippets=None,
+):
+    """Apply changes to the configuration of the DHCPv6/DHCPv4 server.
+
+    The changes are merged into the current state, which is then configured
+    as by `configure`.
+
+    :param server: A `DHCPServer` instance.
+    :param base_version: The version of the configuration the changes are
+        relative to.
+    :param version: The version of the configuration with the changes.
+    :param removed_hosts: List of MAC addresses of hosts to remove.
+    :param changed_hosts: List of dicts with host parameters for hosts to
+        add, or to replace by MAC address.
+    :param failover_peers: See `configure`; unchanged if not given.
+    :param shared_networks: See `configure`; unchanged if not given.
+    :param interfaces: See `configure`; unchanged if not given.
+    :param global_dhcp_snippets: See `configure`; unchanged if not given.
+    :raise DHCPConfigVersionMismatch: If the current configuration is not
+        `base_version`.
+    """
+    state = _current_server_state.get(server.dhcp_service)
+    current_version = _current_server_version.get(server.dhcp_service)
+    if state is None or current_version is None:
+        raise DHCPConfigVersionMismatch(
+            "%s server has no versioned configuration."
+            % server.descriptive_name
+        )
+    elif current_version != base_version:
+        raise DHCPConfigVersionMismatch(
+            "%s server configuration is version %s, not %s."
+            % (server.descriptive_name, current_version, base_version)
+        )
+    hosts = dict(state.hosts)
+    for mac in removed_hosts:
+        hosts.pop(mac, None)
+    for host in changed_hosts:
+        hosts[host["mac"]] = host
+    if failover_peers is None:
+        failover_peers = state.failover_peers
+    if shared_networks is None:
+        shared_networks = state.shared_networks
+    if interfaces is None:
+        interfaces = [{"name": name} for name in state.interfaces]
+    if global_dhcp_snippets is None:
+        global_dhcp_snippets = state.global_dhcp_snippets
+    return configure(
+        server,
+        failover_peers,
+        shared_networks,
+        list(hosts.values()),
+        interfaces,
+        global_dhcp_snippets,
+        version=version,
+    )
 
 
 def _parse_dhcpd_errors(error_str):
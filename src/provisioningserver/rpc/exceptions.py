@@ -60,6 +60,10 @@ class CannotConfigureDHCP(Exception):
     """Failure while configuring a DHCP server."""
 
 
+class DHCPConfigVersionMismatch(Exception):
+    """The DHCP server's configuration is not the version being updated."""
+
+
 class CannotCreateHostMap(Exception):
     """The host map could not be created."""
 
@@ -0,0 +1,32 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Version of the external services configuration announced by the region."""
+
+
+from provisioningserver.utils.events import Event
+
+
+class ExternalConfigVersion:
+    """The latest version of the external services configuration.
+
+    The region tells the rack the version when it registers, and again
+    whenever the configuration changes. The version is opaque: it is only
+    ever compared with earlier versions. It is `None` while the region has
+    not told one, as older regions do not.
+
+    :ivar changed: Fired with the new version when the version changes.
+    """
+
+    def __init__(self):
+        self.value = None
+        self.changed = Event()
+
+    def set(self, value):
+        """Set the version, firing `changed` if it is a new one."""
+        if value != self.value:
+            self.value = value
+            self.changed.fire(value)
+
+
+external_config_version = ExternalConfigVersion()
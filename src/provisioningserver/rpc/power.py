@@ -3,32 +3,43 @@
 
 """Power control."""
 
+from collections import deque
 from datetime import timedelta
 from functools import partial
 import sys
 
-from twisted.internet import reactor
+from twisted.internet import defer, error, reactor
 from twisted.internet.defer import (
     CancelledError,
+    Deferred,
     DeferredList,
     DeferredSemaphore,
     inlineCallbacks,
+    maybeDeferred,
     returnValue,
     succeed,
 )
 from twisted.internet.task import deferLater
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
+from provisioningserver.drivers.pod.registry import PodDriverRegistry
 from provisioningserver.drivers.power import get_error_message, PowerError
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import EVENT_TYPES, send_node_event
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc import getRegionClient
 from provisioningserver.rpc.exceptions import (
     NoSuchNode,
     PowerActionAlreadyInProgress,
     PowerActionFail,
 )
-from provisioningserver.rpc.region import MarkNodeFailed, UpdateNodePowerState
+from provisioningserver.rpc.region import (
+    MarkNodeFailed,
+    UpdateNodePowerState,
+    UpdateNodePowerStates,
+)
 from provisioningserver.utils.twisted import (
     asynchronous,
     callOut,
@@ -59,6 +70,86 @@ def power_state_update(system_id, state):
     return client(UpdateNodePowerState, system_id=system_id, power_state=state)
 
 
+class PowerStateReporter:
+    """Report power states to the region in batches.
+
+    Power states reported within `delay` seconds of each other are sent to
+    the region together with a single `UpdateNodePowerStates` call, instead of
+    one `UpdateNodePowerState` call per node. A batch is sent early once it
+    holds `max_batch` power states.
+
+    Regions that don't support `UpdateNodePowerStates` are sent one
+    `UpdateNodePowerState` call per node instead.
+    """
+
+    def __init__(self, delay=0.5, max_batch=500, clock=reactor):
+        self.delay = delay
+        self.max_batch = max_batch
+        self.clock = clock
+        self.pending = []
+        self._flush_call = None
+
+    @asynchronous
+    def report(self, system_id, state):
+        """Report the power state of a node.
+
+        :return: A `Deferred` that fires once the region has been told about
+            the power state, or errbacks with `NoSuchNode` if the region does
+            not know about the node.
+        """
+        d = Deferred()
+        self.pending.append((system_id, state, d))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self._flush_call is None:
+            self._flush_call = self.clock.callLater(self.delay, self.flush)
+        return d
+
+    def flush(self):
+        """Send all the pending power states to the region now."""
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        pending, self.pending = self.pending, []
+        if len(pending) == 0:
+            return succeed(None)
+        d = self._send(pending)
+        d.addErrback(log.err, "Failed to report power states.")
+        return d
+
+    @inlineCallbacks
+    def _send(self, pending):
+        try:
+            client = getRegionClient()
+            response = yield client(
+                UpdateNodePowerStates,
+                power_states=[
+                    {"system_id": system_id, "power_state": state}
+                    for system_id, state, _ in pending
+                ],
+            )
+        except UnhandledCommand:
+            # The region hasn't been upgraded to support this method yet, so
+            # report the power states one by one.
+            for system_id, state, d in pending:
+                power_state_update(system_id, state).chainDeferred(d)
+        except Exception:
+            failure = Failure()
+            for _, _, d in pending:
+                d.errback(failure)
+        else:
+            missing = set(response["missing"])
+            for system_id, _, d in pending:
+                if system_id in missing:
+                    d.errback(NoSuchNode.from_system_id(system_id))
+                else:
+                    d.callback(None)
+
+
+power_state_reporter = PowerStateReporter()
+
+
 @asynchronous(timeout=15)
 @inlineCallbacks
 def power_change_failure(system_id, hostname, power_change, message):
@@ -369,7 +460,7 @@ def get_power_state(system_id, hostname, power_type, context, clock=reactor):
 def power_query_success(system_id, hostname, state):
     """Report a node that for which power querying has succeeded."""
     log.debug(f"Power state queried for node {system_id}: {state}")
-    yield power_state_update(system_id, state)
+    yield power_state_reporter.report(system_id, state)
 
 
 @inlineCallbacks
@@ -379,7 +470,7 @@ def power_query_failure(system_id, hostname, failure):
         "%s: Power state could not be queried: %s"
         % (hostname, failure.getErrorMessage())
     )
-    yield power_state_update(system_id, "error")
+    yield power_state_reporter.report(system_id, "error")
     yield send_node_event(
         EVENT_TYPES.NODE_POWER_QUERY_FAILED,
         system_id,
@@ -448,45 +539,210 @@ def maaslog_report_failure(node, failure):
         # log.err(failure, "Failed to refresh power state.")
 
 
-def query_node(node, clock):
+def query_node(node, clock, limit=maybeDeferred):
     """Calls `get_power_state` on the given node.
 
     Logs to maaslog as errors and power states change.
+
+    :param limit: Called as ``limit(func)`` to run the power query, like
+        `DeferredSemaphore.run`. The power state is reported to the region
+        once the query has left `limit`, so that waiting for a batch of power
+        states to be sent does not hold up other queries.
     """
-    if node["system_id"] in power_action_registry:
-        log.debug(
-            "{hostname}: Skipping query power status, "
-            "power action already in progress.",
-            hostname=node["hostname"],
-        )
-        return succeed(None)
-    else:
-        d = get_power_state(
-            node["system_id"],
-            node["hostname"],
+    system_id, hostname = node["system_id"], node["hostname"]
+
+    def query():
+        if system_id in power_action_registry:
+            log.debug(
+                "{hostname}: Skipping query power status, "
+                "power action already in progress.",
+                hostname=hostname,
+            )
+            return None
+        return get_power_state(
+            system_id,
+            hostname,
             node["power_type"],
             node["context"],
             clock=clock,
         )
-        d = report_power_state(d, node["system_id"], node["hostname"])
+
+    def report(result):
+        if result is None:
+            # The query was skipped.
+            return None
+        d = report_power_state(
+            maybeDeferred(lambda: result), system_id, hostname
+        )
         d.addCallbacks(
             partial(maaslog_report_success, node),
             partial(maaslog_report_failure, node),
         )
         return d
 
+    return limit(query).addBoth(report)
+
+
+# Initial and maximum number of concurrent power queries for each kind of
+# power driver. Drivers that shell out to a command-line tool (e.g. ipmi)
+# cost a process per query, drivers that talk HTTP (e.g. redfish) are cheap
+# to run concurrently, and pod drivers all tend to talk to a handful of
+# hypervisors.
+POWER_QUERY_BUDGETS = {
+    "subprocess": (5, 20),
+    "http": (10, 50),
+    "pod": (2, 10),
+}
 
-def query_all_nodes(nodes, max_concurrency=5, clock=reactor):
+# Power drivers that query the BMC over HTTP, rather than with a subprocess.
+HTTP_POWER_TYPES = frozenset(("openbmc", "proxmox", "redfish", "webhook"))
+
+# Power queries slower than this, in seconds, stop the concurrency budget for
+# their driver from growing. Queries that time out shrink it.
+POWER_QUERY_TARGET_LATENCY = 10.0
+
+
+def get_power_query_kind(power_type):
+    """Return the kind of power driver used for `power_type`.
+
+    :return: One of the keys of `POWER_QUERY_BUDGETS`.
+    """
+    if power_type in PodDriverRegistry:
+        return "pod"
+    elif power_type in HTTP_POWER_TYPES:
+        return "http"
+    else:
+        return "subprocess"
+
+
+class PowerQueryBudget:
+    """An adaptive limit on concurrent power queries for one power driver.
+
+    The limit grows by roughly one for each round of queries that succeed
+    within `target_latency` seconds, stops growing while queries are slower
+    than that, and halves whenever a query times out or is cancelled
+    (additive increase, multiplicative decrease). Other failures leave it
+    unchanged. It never drops below `minimum` or grows beyond `maximum`.
+    """
+
+    def __init__(
+        self,
+        power_type,
+        initial,
+        maximum,
+        minimum=1,
+        target_latency=POWER_QUERY_TARGET_LATENCY,
+        clock=reactor,
+    ):
+        self.power_type = power_type
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.clock = clock
+        self.active = 0
+        self.waiting = deque()
+
+    def __len__(self):
+        """Return the number of queries waiting to run."""
+        return len(self.waiting)
+
+    def run(self, func, *args, **kwargs):
+        """Call `func` once the budget allows it.
+
+        :return: A `Deferred` that fires with the result of `func`.
+        """
+        d = Deferred()
+        self.waiting.append((d, func, args, kwargs))
+        self._dispatch()
+        return d
+
+    def _dispatch(self):
+        while len(self.waiting) > 0 and self.active < int(self.limit):
+            d, func, args, kwargs = self.waiting.popleft()
+            self.active += 1
+            started = self.clock.seconds()
+            query = maybeDeferred(func, *args, **kwargs)
+            query.addBoth(self._finished, started)
+            query.chainDeferred(d)
+        PROMETHEUS_METRICS.update(
+            "maas_power_query_queue_depth",
+            "set",
+            value=len(self.waiting),
+            labels={"power_type": self.power_type},
+        )
+
+    def _finished(self, result, started):
+        self.active -= 1
+        elapsed = self.clock.seconds() - started
+        if not isinstance(result, Failure):
+            if elapsed <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        elif result.check(
+            CancelledError, defer.TimeoutError, error.TimeoutError
+        ):
+            self.limit = max(self.minimum, self.limit / 2)
+        self._dispatch()
+        return result
+
+
+class PowerQueryScheduler:
+    """Schedule power queries with a separate budget for each power driver.
+
+    A slow or overloaded kind of BMC therefore only holds back queries to
+    BMCs of the same kind.
+    """
+
+    def __init__(self, clock=reactor):
+        self.clock = clock
+        self.budgets = {}
+
+    def get_budget(self, power_type):
+        """Return the `PowerQueryBudget` for `power_type`."""
+        budget = self.budgets.get(power_type)
+        if budget is None:
+            initial, maximum = POWER_QUERY_BUDGETS[
+                get_power_query_kind(power_type)
+            ]
+            budget = self.budgets[power_type] = PowerQueryBudget(
+                power_type, initial, maximum, clock=self.clock
+            )
+        return budget
+
+    def query(self, node):
+        """Query the power state of `node` once its driver's budget allows.
+
+        :return: A `Deferred`; see `query_node`.
+        """
+        budget = self.get_budget(node["power_type"])
+        return query_node(node, self.clock, limit=budget.run)
+
+    def queued(self):
+        """Return the number of queries waiting to run, for all drivers."""
+        return sum(len(budget) for budget in self.budgets.values())
+
+
+def query_all_nodes(nodes, max_concurrency=5, clock=reactor, scheduler=None):
     """Queries the given nodes for their power state.
 
     Nodes' states are reported back to the region.
 
+    :param scheduler: A `PowerQueryScheduler`. When given, queries are run
+        with the scheduler's per-driver budgets and `max_concurrency` and
+        `clock` are ignored.
     :return: A deferred, which fires once all nodes have been queried,
         successfully or not.
     """
+    if scheduler is not None:
+        queries = (
+            scheduler.query(node)
+            for node in nodes
+            if node["power_type"] in PowerDriverRegistry
+        )
+        return DeferredList(queries, consumeErrors=True)
     semaphore = DeferredSemaphore(tokens=max_concurrency)
     queries = (
-        semaphore.run(query_node, node, clock)
+        query_node(node, clock, limit=semaphore.run)
         for node in nodes
         if node["power_type"] in PowerDriverRegistry
     )
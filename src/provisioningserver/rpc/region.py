@@ -32,7 +32,9 @@ __all__ = [
     "SendEventMACAddress",
     "UpdateControllerState",
     "UpdateLastImageSync",
+    "UpdateLeases",
     "UpdateNodePowerState",
+    "UpdateNodePowerStates",
 ]
 
 from twisted.protocols import amp
@@ -40,6 +42,7 @@ from twisted.protocols import amp
 from provisioningserver.rpc.arguments import (
     AmpList,
     Bytes,
+    CompressedAmpList,
     ParsedURL,
     StructureAsJSON,
 )
@@ -82,6 +85,9 @@ class RegisterRackController(amp.Command):
         (b"beacon_support", amp.Boolean(optional=True)),
         (b"version", amp.Unicode(optional=True)),
         (b"uuid", amp.Unicode(optional=True)),
+        # The version of the external services configuration; see
+        # `UpdateExternalConfigVersion`. Since 3.3.
+        (b"external_config_version", amp.Unicode(optional=True)),
     ]
     errors = {CannotRegisterRackController: b"CannotRegisterRackController"}
 
@@ -308,6 +314,32 @@ class UpdateNodePowerState(amp.Command):
     errors = {NoSuchNode: b"NoSuchNode"}
 
 
+class UpdateNodePowerStates(amp.Command):
+    """Update the power state of several nodes at once.
+
+    :since: 3.3
+    """
+
+    arguments = [
+        (
+            b"power_states",
+            AmpList(
+                [
+                    # The node's system_id.
+                    (b"system_id", amp.Unicode()),
+                    # The node's power_state.
+                    (b"power_state", amp.Unicode()),
+                ]
+            ),
+        ),
+    ]
+    response = [
+        # The system_ids of the nodes that could not be found.
+        (b"missing", amp.ListOf(amp.Unicode())),
+    ]
+    errors = []
+
+
 class RegisterEventType(amp.Command):
     """Register an event type.
 
@@ -501,6 +533,36 @@ class UpdateLease(amp.Command):
     errors = {NoSuchCluster: b"NoSuchCluster"}
 
 
+class UpdateLeases(amp.Command):
+    """Report several DHCP lease updates from a cluster controller at once.
+
+    The leases are processed in order, as if each had been sent with
+    `UpdateLease`.
+
+    :since: 3.3
+    """
+
+    arguments = [
+        (b"cluster_uuid", amp.Unicode()),
+        (
+            b"leases",
+            CompressedAmpList(
+                [
+                    (b"action", amp.Unicode()),
+                    (b"mac", amp.Unicode()),
+                    (b"ip_family", amp.Unicode()),
+                    (b"ip", amp.Unicode()),
+                    (b"timestamp", amp.Integer()),
+                    (b"lease_time", amp.Integer(optional=True)),
+                    (b"hostname", amp.Unicode(optional=True)),
+                ]
+            ),
+        ),
+    ]
+    response = []
+    errors = {NoSuchCluster: b"NoSuchCluster"}
+
+
 class UpdateServices(amp.Command):
     """Report service statuses that are monitored on the rackd.
 
@@ -0,0 +1,138 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for provisioningserver.rpc.boot_config"""
+
+
+from twisted.internet.task import Clock
+
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+from provisioningserver.rpc import boot_config
+from provisioningserver.rpc.boot_config import (
+    BootConfigCache,
+    invalidate_boot_config_cache,
+)
+
+
+def make_params(**params):
+    params.setdefault("system_id", factory.make_name("rack"))
+    params.setdefault("mac", factory.make_mac_address())
+    params.setdefault("local_ip", factory.make_ipv4_address())
+    params.setdefault("remote_ip", factory.make_ipv4_address())
+    params.setdefault("arch", "amd64")
+    params.setdefault("subarch", "generic")
+    return params
+
+
+def make_response(system_id=None):
+    return {
+        "system_id": (
+            factory.make_name("system_id") if system_id is None else system_id
+        ),
+        "hostname": factory.make_name("hostname"),
+        "purpose": "commissioning",
+    }
+
+
+class TestBootConfigCache(MAASTestCase):
+    def test_get_returns_none_when_not_cached(self):
+        cache = BootConfigCache(clock=Clock())
+        self.assertIsNone(cache.get(make_params()))
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+    def test_get_returns_cached_response(self):
+        cache = BootConfigCache(clock=Clock())
+        params, response = make_params(), make_response()
+        cache.set(params, response, cache.generation)
+        self.assertEqual(response, cache.get(params))
+        self.assertEqual((1, 0), (cache.hits, cache.misses))
+
+    def test_get_returns_copy(self):
+        cache = BootConfigCache(clock=Clock())
+        params, response = make_params(), make_response()
+        cache.set(params, response, cache.generation)
+        cache.get(params).clear()
+        response.clear()
+        self.assertNotEqual({}, cache.get(params))
+
+    def test_key_ignores_system_id_of_rack(self):
+        cache = BootConfigCache(clock=Clock())
+        params, response = make_params(), make_response()
+        cache.set(params, response, cache.generation)
+        other_params = dict(params, system_id=factory.make_name("rack"))
+        self.assertEqual(response, cache.get(other_params))
+
+    def test_key_includes_other_params(self):
+        cache = BootConfigCache(clock=Clock())
+        params, response = make_params(), make_response()
+        cache.set(params, response, cache.generation)
+        other_params = dict(params, local_ip=factory.make_ipv4_address())
+        self.assertIsNone(cache.get(other_params))
+
+    def test_get_expires_response_after_ttl(self):
+        clock = Clock()
+        cache = BootConfigCache(ttl=30, clock=clock)
+        params = make_params()
+        cache.set(params, make_response(), cache.generation)
+        clock.advance(29)
+        self.assertIsNotNone(cache.get(params))
+        clock.advance(1)
+        self.assertIsNone(cache.get(params))
+        self.assertEqual(0, len(cache))
+
+    def test_set_ignores_response_from_before_invalidation(self):
+        cache = BootConfigCache(clock=Clock())
+        params, response = make_params(), make_response()
+        generation = cache.generation
+        cache.invalidate([factory.make_name("system_id")])
+        cache.set(params, response, generation)
+        self.assertIsNone(cache.get(params))
+
+    def test_set_evicts_oldest_beyond_max_size(self):
+        cache = BootConfigCache(max_size=2, clock=Clock())
+        params = [make_params() for _ in range(3)]
+        for p in params:
+            cache.set(p, make_response(), cache.generation)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get(params[0]))
+        self.assertIsNotNone(cache.get(params[1]))
+        self.assertIsNotNone(cache.get(params[2]))
+
+    def test_invalidate_forgets_responses_for_system_ids(self):
+        cache = BootConfigCache(clock=Clock())
+        system_id = factory.make_name("system_id")
+        params = make_params(purpose="xinstall")
+        other_params = make_params()
+        cache.set(params, make_response(system_id), cache.generation)
+        cache.set(other_params, make_response(), cache.generation)
+        cache.invalidate([system_id])
+        self.assertIsNone(cache.get(params))
+        self.assertIsNotNone(cache.get(other_params))
+
+    def test_invalidate_forgets_responses_for_unknown_machines(self):
+        cache = BootConfigCache(clock=Clock())
+        params = make_params()
+        response = make_response()
+        del response["system_id"]
+        cache.set(params, response, cache.generation)
+        cache.invalidate([factory.make_name("system_id")])
+        self.assertIsNone(cache.get(params))
+
+    def test_invalidate_forgets_everything(self):
+        cache = BootConfigCache(clock=Clock())
+        for _ in range(3):
+            cache.set(make_params(), make_response(), cache.generation)
+        cache.invalidate()
+        self.assertEqual(0, len(cache))
+
+
+class TestInvalidateBootConfigCache(MAASTestCase):
+    def test_invalidates_module_cache(self):
+        cache = BootConfigCache(clock=Clock())
+        self.patch(boot_config, "boot_config_cache", cache)
+        system_id = factory.make_name("system_id")
+        params = make_params()
+        cache.set(params, make_response(system_id), cache.generation)
+        invalidate_boot_config_cache([system_id])
+        self.assertIsNone(cache.get(params))
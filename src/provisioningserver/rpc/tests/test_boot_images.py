@@ -24,7 +24,9 @@ from provisioningserver.import_images import boot_resources
 from provisioningserver.rpc import boot_images, clusterservice, region
 from provisioningserver.rpc.boot_images import (
     _run_import,
+    BootImageIndex,
     fix_sources_for_cluster,
+    get_boot_images_index,
     get_hosts_from_sources,
     import_boot_images,
     is_import_boot_images_running,
@@ -33,6 +35,10 @@ from provisioningserver.rpc.boot_images import (
 )
 from provisioningserver.rpc.region import UpdateLastImageSync
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
+from provisioningserver.testing.boot_images import (
+    make_boot_image_params,
+    make_image,
+)
 from provisioningserver.testing.config import (
     BootSourcesFixture,
     ClusterConfigurationFixture,
@@ -88,12 +94,98 @@ class TestReloadBootImages(MAASTestCase):
         self.patch(
             boot_images, "CACHED_BOOT_IMAGES", factory.make_name("old_cache")
         )
-        fake_boot_images = [factory.make_name("image") for _ in range(3)]
+        self.patch(boot_images, "CACHED_BOOT_IMAGES_INDEX", None)
+        fake_boot_images = [
+            make_image(make_boot_image_params(), "commissioning")
+            for _ in range(3)
+        ]
         mock_list_boot_images = self.patch(tftppath, "list_boot_images")
         mock_list_boot_images.return_value = fake_boot_images
         reload_boot_images()
         self.assertEqual(boot_images.CACHED_BOOT_IMAGES, fake_boot_images)
 
+    def test_indexes_boot_images(self):
+        self.patch(boot_images, "CACHED_BOOT_IMAGES", None)
+        self.patch(boot_images, "CACHED_BOOT_IMAGES_INDEX", None)
+        fake_boot_images = [
+            make_image(make_boot_image_params(), "commissioning")
+            for _ in range(3)
+        ]
+        self.patch(
+            tftppath, "list_boot_images"
+        ).return_value = fake_boot_images
+        reload_boot_images()
+        images, index = boot_images.CACHED_BOOT_IMAGES_INDEX
+        self.assertIs(fake_boot_images, images)
+        self.assertIs(index, get_boot_images_index(fake_boot_images))
+
+
+class TestGetBootImagesIndex(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(boot_images, "CACHED_BOOT_IMAGES_INDEX", None)
+
+    def test_reuses_index_for_same_images(self):
+        images = [make_image(make_boot_image_params(), "install")]
+        self.assertIs(
+            get_boot_images_index(images), get_boot_images_index(images)
+        )
+
+    def test_rebuilds_index_for_other_images(self):
+        images = [make_image(make_boot_image_params(), "install")]
+        index = get_boot_images_index(images)
+        self.assertIsNot(index, get_boot_images_index(list(images)))
+
+
+class TestBootImageIndex(MAASTestCase):
+    def find(self, index, image, **kwargs):
+        params = {
+            "osystem": image["osystem"],
+            "release": image["release"],
+            "arch": image["architecture"],
+            "subarch": image["subarchitecture"],
+            "purpose": image["purpose"],
+        }
+        params.update(kwargs)
+        return index.find(**params)
+
+    def test_finds_image_by_exact_subarch(self):
+        images = [
+            make_image(make_boot_image_params(), purpose)
+            for purpose in ("commissioning", "install", "xinstall")
+        ]
+        index = BootImageIndex(images)
+        for image in images:
+            self.assertIs(image, self.find(index, image))
+
+    def test_finds_image_by_supported_subarch(self):
+        image = make_image(make_boot_image_params(), "commissioning")
+        image["supported_subarches"] = "hwe-p,hwe-t"
+        index = BootImageIndex([image])
+        self.assertIs(image, self.find(index, image, subarch="hwe-t"))
+
+    def test_prefers_exact_subarch(self):
+        params = make_boot_image_params()
+        supporting = make_image(params, "commissioning")
+        supporting["subarchitecture"] = "generic"
+        supporting["supported_subarches"] = "hwe-t"
+        exact = make_image(params, "commissioning")
+        exact["subarchitecture"] = "hwe-t"
+        index = BootImageIndex([supporting, exact])
+        self.assertIs(exact, self.find(index, exact))
+
+    def test_prefers_first_image(self):
+        params = make_boot_image_params()
+        first = make_image(params, "install")
+        second = make_image(params, "install")
+        index = BootImageIndex([first, second])
+        self.assertIs(first, self.find(index, first))
+
+    def test_returns_None_for_missing_image(self):
+        image = make_image(make_boot_image_params(), "install")
+        index = BootImageIndex([image])
+        self.assertIsNone(self.find(index, image, purpose="commissioning"))
+
 
 class TestGetHostsFromSources(MAASTestCase):
     def test_returns_set_of_hosts_from_sources(self):
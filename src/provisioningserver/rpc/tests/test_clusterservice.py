@@ -110,6 +110,7 @@ from provisioningserver.rpc.clusterservice import (
     get_scan_all_networks_args,
     spawnProcessAndNullifyStdout,
 )
+from provisioningserver.rpc.common import get_connection_load
 from provisioningserver.rpc.interfaces import IConnection
 from provisioningserver.rpc.osystems import gen_operating_systems
 from provisioningserver.rpc.testing import (
@@ -1304,6 +1305,16 @@ class TestClusterClientService(MAASTestCase):
             {common.Client(conn) for conn in service.connections.values()},
         )
 
+    def test_getClient_prefers_least_loaded_connection(self):
+        service = ClusterClientService(Clock())
+        busy, idle = DummyConnection(), DummyConnection()
+        get_connection_load(busy).in_flight = 1
+        service.connections = {
+            sentinel.eventloop01: busy,
+            sentinel.eventloop02: idle,
+        }
+        self.assertEqual(common.Client(idle), service.getClient())
+
     def test_getClient_when_there_are_no_connections(self):
         service = ClusterClientService(Clock())
         service.connections = {}
@@ -1994,6 +2005,38 @@ class TestClusterClient(MAASTestCase):
             maas_uuid="a-b-c", service_type="rack"
         )
 
+    @inlineCallbacks
+    def test_registerRackWithRegion_sets_external_config_version(self):
+        version = self.patch(clusterservice, "external_config_version")
+        client = self.make_running_client()
+
+        callRemote = self.patch_autospec(client, "callRemote")
+        callRemote.side_effect = always_succeed_with(
+            {
+                "system_id": factory.make_name("id"),
+                "external_config_version": "abc",
+            }
+        )
+
+        result = yield client.registerRackWithRegion()
+        self.assertTrue(result)
+        self.assertThat(version.set, MockCalledOnceWith("abc"))
+
+    @inlineCallbacks
+    def test_registerRackWithRegion_clears_external_config_version(self):
+        # Older regions do not send a version.
+        version = self.patch(clusterservice, "external_config_version")
+        client = self.make_running_client()
+
+        callRemote = self.patch_autospec(client, "callRemote")
+        callRemote.side_effect = always_succeed_with(
+            {"system_id": factory.make_name("id")}
+        )
+
+        result = yield client.registerRackWithRegion()
+        self.assertTrue(result)
+        self.assertThat(version.set, MockCalledOnceWith(None))
+
     @inlineCallbacks
     def test_registerRackWithRegion_returns_False_when_rejected(self):
         client = self.make_running_client()
@@ -2787,6 +2830,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
                 hosts,
                 interfaces,
                 None,
+                None,
             ),
         )
 
@@ -2801,6 +2845,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=None,
         ):
             self.assertTrue(self.concurrency_lock.locked)
             # While we're here, check this is the IO thread.
@@ -2862,6 +2907,7 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             hosts,
             interfaces,
             global_dhcp_snippets,
+            version=None,
         ):
             # Pause longer than the timeout.
             return pause(5)
@@ -2882,8 +2928,111 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             )
 
 
-class TestClusterProtocol_ValidateDHCP(MAASTestCase):
+class TestClusterProtocol_UpdateDHCP(MAASTestCase):
+    scenarios = (
+        (
+            "DHCPv4",
+            {
+                "dhcp_server": (dhcp, "DHCPv4Server"),
+                "command": cluster.UpdateDHCPv4,
+                "concurrency_lock": concurrency.dhcpv4,
+            },
+        ),
+        (
+            "DHCPv6",
+            {
+                "dhcp_server": (dhcp, "DHCPv6Server"),
+                "command": cluster.UpdateDHCPv6,
+                "concurrency_lock": concurrency.dhcpv6,
+            },
+        ),
+    )
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=TIMEOUT)
+
+    def make_arguments(self):
+        return {
+            "omapi_key": factory.make_name("key"),
+            "base_version": factory.make_name("version"),
+            "version": factory.make_name("version"),
+            "removed_hosts": [factory.make_mac_address()],
+            "changed_hosts": [make_host()],
+        }
+
+    def test_is_registered(self):
+        self.assertIsNotNone(
+            Cluster().locateResponder(self.command.commandName)
+        )
+
+    @inlineCallbacks
+    def test_executes_update(self):
+        DHCPServer = self.patch_autospec(*self.dhcp_server)
+        update = self.patch_autospec(dhcp, "update")
+        arguments = self.make_arguments()
+        interfaces = [make_interface()]
 
+        yield call_responder(
+            Cluster(), self.command, dict(arguments, interfaces=interfaces)
+        )
+
+        self.assertThat(DHCPServer, MockCalledOnceWith(arguments["omapi_key"]))
+        self.assertThat(
+            update,
+            MockCalledOnceWith(
+                DHCPServer.return_value,
+                base_version=arguments["base_version"],
+                version=arguments["version"],
+                removed_hosts=arguments["removed_hosts"],
+                changed_hosts=arguments["changed_hosts"],
+                failover_peers=None,
+                shared_networks=None,
+                interfaces=interfaces,
+                global_dhcp_snippets=None,
+            ),
+        )
+
+    @inlineCallbacks
+    def test_limits_concurrency(self):
+        self.patch_autospec(*self.dhcp_server)
+
+        def check_dhcp_locked(server, **arguments):
+            self.assertTrue(self.concurrency_lock.locked)
+
+        self.patch(dhcp, "update", check_dhcp_locked)
+
+        self.assertFalse(self.concurrency_lock.locked)
+        yield call_responder(Cluster(), self.command, self.make_arguments())
+        self.assertFalse(self.concurrency_lock.locked)
+
+    @inlineCallbacks
+    def test_propagates_DHCPConfigVersionMismatch(self):
+        self.patch_autospec(*self.dhcp_server)
+        update = self.patch_autospec(dhcp, "update")
+        update.side_effect = exceptions.DHCPConfigVersionMismatch()
+
+        with ExpectedException(exceptions.DHCPConfigVersionMismatch):
+            yield call_responder(
+                Cluster(), self.command, self.make_arguments()
+            )
+
+    @inlineCallbacks
+    def test_times_out(self):
+        self.patch_autospec(*self.dhcp_server)
+        self.patch(clusterservice, "DHCP_TIMEOUT", 1)
+
+        def check_dhcp_locked(server, **arguments):
+            # Pause longer than the timeout.
+            return pause(5)
+
+        self.patch(dhcp, "update", check_dhcp_locked)
+
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield call_responder(
+                Cluster(), self.command, self.make_arguments()
+            )
+
+
+class TestClusterProtocol_ValidateDHCP(MAASTestCase):
     scenarios = (
         (
             "DHCPv4",
@@ -3195,6 +3344,7 @@ class TestClusterProtocol_ScanNetworks(
                 clusterservice.executeScanNetworksSubprocess,
                 cidrs=None,
                 force_ping=None,
+                force_icmp=None,
                 interface=None,
                 scan_all=True,
                 slow=None,
@@ -3269,6 +3419,7 @@ class TestClusterProtocol_ScanNetworks(
             slow=True,
             threads=threads,
             force_ping=True,
+            force_icmp=True,
             interface="eth0",
             cidrs=[IPNetwork("192.168.0.0/24"), IPNetwork("192.168.1.0/24")],
         )
@@ -3281,6 +3432,7 @@ class TestClusterProtocol_ScanNetworks(
                     b"--threads",
                     str(threads).encode("utf-8"),
                     b"--ping",
+                    b"--icmp",
                     b"--slow",
                     b"eth0",
                     b"192.168.0.0/24",
@@ -4473,3 +4625,58 @@ class TestClusterProtocol_CheckIPs(MAASTestCaseThatWaitsForDeferredThreads):
                 }
             ),
         )
+
+
+class TestClusterProtocol_InvalidateBootConfigCache(MAASTestCase):
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=TIMEOUT)
+
+    def test_is_registered(self):
+        protocol = Cluster()
+        responder = protocol.locateResponder(
+            cluster.InvalidateBootConfigCache.commandName
+        )
+        self.assertIsNotNone(responder)
+
+    @inlineCallbacks
+    def test_invalidates_system_ids(self):
+        invalidate = self.patch(clusterservice, "invalidate_boot_config_cache")
+        system_ids = [factory.make_name("system_id") for _ in range(3)]
+        response = yield call_responder(
+            Cluster(),
+            cluster.InvalidateBootConfigCache,
+            {"system_ids": system_ids},
+        )
+        self.assertEqual({}, response)
+        self.assertThat(invalidate, MockCalledOnceWith(system_ids))
+
+    @inlineCallbacks
+    def test_invalidates_everything(self):
+        invalidate = self.patch(clusterservice, "invalidate_boot_config_cache")
+        response = yield call_responder(
+            Cluster(), cluster.InvalidateBootConfigCache, {}
+        )
+        self.assertEqual({}, response)
+        self.assertThat(invalidate, MockCalledOnceWith(None))
+
+
+class TestClusterProtocol_UpdateExternalConfigVersion(MAASTestCase):
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=TIMEOUT)
+
+    def test_is_registered(self):
+        protocol = Cluster()
+        responder = protocol.locateResponder(
+            cluster.UpdateExternalConfigVersion.commandName
+        )
+        self.assertIsNotNone(responder)
+
+    @inlineCallbacks
+    def test_sets_version(self):
+        version = self.patch(clusterservice, "external_config_version")
+        value = factory.make_name("version")
+        response = yield call_responder(
+            Cluster(),
+            cluster.UpdateExternalConfigVersion,
+            {"version": value},
+        )
+        self.assertEqual({}, response)
+        self.assertThat(version.set, MockCalledOnceWith(value))
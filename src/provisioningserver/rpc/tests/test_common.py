@@ -6,12 +6,13 @@
 
 import random
 import re
-from unittest.mock import ANY, sentinel
+from unittest.mock import ANY, call, Mock, sentinel
 
 from testtools import ExpectedException
 from testtools.matchers import Equals, Is, IsInstance, Not
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import CancelledError, Deferred
 from twisted.internet.protocol import connectionDone
+from twisted.internet.task import Clock
 from twisted.internet.testing import StringTransport
 from twisted.protocols import amp
 
@@ -20,6 +21,7 @@ from maastesting.matchers import (
     IsFiredDeferred,
     IsUnfiredDeferred,
     MockCalledOnceWith,
+    MockCallsMatch,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import (
@@ -216,6 +218,189 @@ class TestClient(MAASTestCase):
         # The hash of a common.Client object is that of its connection.
         self.assertThat(hash(conn), Equals(hash(client)))
 
+    def test_call_counts_only_real_timeouts(self):
+        conn, client = self.make_connection_and_client()
+        self.patch_autospec(conn, "callRemote")
+        conn.callRemote.side_effect = lambda *args, **kwargs: Deferred()
+        clock = self.patch(common.ConnectionLoad, "clock", Clock())
+        load = common.get_connection_load(conn)
+        d = client(sentinel.command, _timeout=10)
+        d.cancel()
+        self.assertRaises(CancelledError, extract_result, d)
+        self.assertEqual(0, load.timeouts)
+        d = client(sentinel.command, _timeout=10)
+        clock.advance(10)
+        d.cancel()
+        self.assertRaises(CancelledError, extract_result, d)
+        self.assertEqual(1, load.timeouts)
+
+    def test_call_tracks_connection_load(self):
+        conn, client = self.make_connection_and_client()
+        d = Deferred()
+        self.patch_autospec(conn, "callRemote")
+        conn.callRemote.return_value = d
+        client(sentinel.command, _timeout=None)
+        load = common.get_connection_load(conn)
+        self.assertEqual(1, load.in_flight)
+        d.callback(sentinel.response)
+        self.assertEqual(0, load.in_flight)
+
+
+class TestConnectionLoad(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(common.ConnectionLoad, "clock", Clock())
+        self.peer = factory.make_name("peer")
+
+    def time_out(self, load, timeout=10):
+        d = load.track(Deferred(), self.peer, timeout=timeout)
+        load.clock.advance(timeout)
+        d.cancel()
+        self.assertRaises(CancelledError, extract_result, d)
+
+    def test_tracks_calls_in_flight(self):
+        load = common.ConnectionLoad()
+        d1, d2 = Deferred(), Deferred()
+        load.track(d1, self.peer)
+        load.track(d2, self.peer)
+        self.assertEqual(2, load.in_flight)
+        d1.callback(None)
+        self.assertEqual(1, load.in_flight)
+        d2.errback(ZeroDivisionError())
+        self.assertEqual(0, load.in_flight)
+        self.assertRaises(ZeroDivisionError, extract_result, d2)
+
+    def test_tracks_moving_average_of_latency(self):
+        load = common.ConnectionLoad()
+        for _ in range(2):
+            d = load.track(Deferred(), self.peer)
+            load.clock.advance(10)
+            d.callback(None)
+        self.assertAlmostEqual(3.6, load.latency)
+
+    def test_ejects_after_consecutive_timeouts(self):
+        load = common.ConnectionLoad()
+        for _ in range(load.EJECT_AFTER_TIMEOUTS - 1):
+            self.time_out(load)
+        self.assertFalse(load.ejected)
+        self.time_out(load)
+        self.assertTrue(load.ejected)
+        load.clock.advance(load.EJECT_FOR)
+        self.assertFalse(load.ejected)
+
+    def test_answers_reset_timeouts(self):
+        load = common.ConnectionLoad()
+        for _ in range(load.EJECT_AFTER_TIMEOUTS - 1):
+            self.time_out(load)
+        load.track(Deferred(), self.peer).callback(None)
+        self.time_out(load)
+        self.assertFalse(load.ejected)
+
+    def test_cancellation_before_timeout_is_not_a_timeout(self):
+        load = common.ConnectionLoad()
+        for _ in range(load.EJECT_AFTER_TIMEOUTS):
+            d = load.track(Deferred(), self.peer, timeout=10)
+            load.clock.advance(5)
+            d.cancel()
+            self.assertRaises(CancelledError, extract_result, d)
+        self.assertEqual(0, load.timeouts)
+        self.assertFalse(load.ejected)
+
+    def test_cancellation_without_timeout_is_not_a_timeout(self):
+        load = common.ConnectionLoad()
+        d = load.track(Deferred(), self.peer)
+        load.clock.advance(60)
+        d.cancel()
+        self.assertRaises(CancelledError, extract_result, d)
+        self.assertEqual(0, load.timeouts)
+
+    def test_records_metrics(self):
+        mock_metrics = self.patch(PROMETHEUS_METRICS, "update")
+        load = common.ConnectionLoad()
+        load.track(Deferred(), self.peer)
+        self.assertThat(
+            mock_metrics,
+            MockCallsMatch(
+                call(
+                    "maas_rpc_connection_calls_in_flight",
+                    "set",
+                    value=1,
+                    labels={"peer": self.peer},
+                ),
+                call(
+                    "maas_rpc_connection_latency",
+                    "set",
+                    value=0.0,
+                    labels={"peer": self.peer},
+                ),
+            ),
+        )
+
+    def test_records_metrics_for_all_connections_to_peer(self):
+        conns = [DummyConnection(), DummyConnection()]
+        loads = [common.get_connection_load(conn) for conn in conns]
+        loads[0].track(Deferred(), self.peer)
+        loads[0].latency = 2.0
+        mock_metrics = self.patch(PROMETHEUS_METRICS, "update")
+        loads[1].track(Deferred(), self.peer)
+        self.assertThat(
+            mock_metrics,
+            MockCallsMatch(
+                call(
+                    "maas_rpc_connection_calls_in_flight",
+                    "set",
+                    value=2,
+                    labels={"peer": self.peer},
+                ),
+                call(
+                    "maas_rpc_connection_latency",
+                    "set",
+                    value=1.0,
+                    labels={"peer": self.peer},
+                ),
+            ),
+        )
+
+
+class TestChooseConnection(MAASTestCase):
+    def test_returns_only_connection(self):
+        conn = DummyConnection()
+        self.assertIs(conn, common.choose_connection([conn]))
+
+    def test_prefers_fewer_calls_in_flight(self):
+        busy, idle = DummyConnection(), DummyConnection()
+        common.get_connection_load(busy).in_flight = 1
+        common.get_connection_load(idle).latency = 10.0
+        self.assertIs(idle, common.choose_connection([busy, idle]))
+
+    def test_prefers_lower_latency(self):
+        slow, fast = DummyConnection(), DummyConnection()
+        common.get_connection_load(slow).latency = 10.0
+        self.assertIs(fast, common.choose_connection({slow, fast}))
+
+    def test_avoids_ejected_connections(self):
+        ejected, conn = DummyConnection(), DummyConnection()
+        common.get_connection_load(conn).in_flight = 10
+        common.get_connection_load(ejected).ejected_until = (
+            common.ConnectionLoad.clock.seconds() + 30
+        )
+        self.assertIs(conn, common.choose_connection([ejected, conn]))
+
+    def test_uses_ejected_connections_when_all_are_ejected(self):
+        conn = DummyConnection()
+        common.get_connection_load(conn).ejected_until = (
+            common.ConnectionLoad.clock.seconds() + 30
+        )
+        self.assertIs(conn, common.choose_connection([conn]))
+
+    def test_compares_two_random_connections(self):
+        conns = [DummyConnection() for _ in range(5)]
+        sample = self.patch(common.random, "sample")
+        sample.return_value = conns[3:]
+        common.get_connection_load(conns[3]).in_flight = 1
+        self.assertIs(conns[4], common.choose_connection(conns))
+        self.assertThat(sample, MockCalledOnceWith(conns, 2))
+
 
 class TestRPCProtocol(MAASTestCase):
     def test_init(self):
@@ -235,9 +420,29 @@ class TestRPCProtocol(MAASTestCase):
         protocol.connectionLost(connectionDone)
         self.assertThat(protocol.onConnectionLost, IsFiredDeferred())
 
+    def test_observes_size_of_sent_commands(self):
+        self.patch(common.log, "debug")
+        observer = Mock()
+        protocol = common.RPCProtocol()
+        protocol.box_size_observers = {common.Ping.commandName: observer}
+        protocol.makeConnection(StringTransport())
+        protocol.callRemote(common.Ping)
+        self.assertThat(
+            observer, MockCalledOnceWith(len(protocol.transport.value()))
+        )
+
+    def test_observes_size_of_received_commands(self):
+        self.patch(common.log, "debug")
+        observer = Mock()
+        protocol = common.RPCProtocol()
+        protocol.box_size_observers = {common.Ping.commandName: observer}
+        protocol.makeConnection(StringTransport())
+        box = amp.AmpBox(_ask=b"1", _command=common.Ping.commandName)
+        protocol.ampBoxReceived(box)
+        self.assertThat(observer, MockCalledOnceWith(len(box.serialize())))
 
-class TestRPCProtocol_UnhandledErrorsWhenHandlingResponses(MAASTestCase):
 
+class TestRPCProtocol_UnhandledErrorsWhenHandlingResponses(MAASTestCase):
     answer_seq = b"%d" % random.randrange(0, 2**32)
     answer_box = amp.AmpBox(_answer=answer_seq)
 
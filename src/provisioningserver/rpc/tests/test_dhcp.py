@@ -776,6 +776,31 @@ class TestConfigureDHCP(MAASTestCase):
             ),
         )
 
+    @inlineCallbacks
+    def test_records_version_of_configuration(self):
+        self.addCleanup(dhcp._current_server_version.clear)
+        self.patch_sudo_write_file()
+        self.patch_restartService()
+        self.patch_get_config().return_value = factory.make_name("config")
+        dhcp_service = dhcp.service_monitor.getServiceByName(
+            self.server.dhcp_service
+        )
+        self.patch_autospec(dhcp_service, "on")
+        version = factory.make_name("version")
+
+        yield dhcp.configure(
+            self.server(factory.make_name("omapi_key")),
+            [],
+            [make_shared_network()],
+            [make_host()],
+            [make_interface()],
+            version=version,
+        )
+
+        self.assertEqual(
+            version, dhcp._current_server_version[self.server.dhcp_service]
+        )
+
     @inlineCallbacks
     def test_writes_config_and_calls_restart_when_non_host_state_diff(self):
         write_file = self.patch_sudo_write_file()
@@ -1335,8 +1360,97 @@ class TestConfigureDHCP(MAASTestCase):
         )
 
 
-class TestValidateDHCP(MAASTestCase):
+class TestUpdateDHCP(MAASTestCase):
+    scenarios = (
+        ("DHCPv4", {"server": dhcp.DHCPv4Server}),
+        ("DHCPv6", {"server": dhcp.DHCPv6Server}),
+    )
 
+    def setUp(self):
+        super().setUp()
+        # The dhcp server states are global so we clean them after each test.
+        self.addCleanup(dhcp._current_server_state.clear)
+        self.addCleanup(dhcp._current_server_version.clear)
+        self.configure = self.patch_autospec(dhcp, "configure")
+
+    def make_state(self, version):
+        server = self.server(factory.make_name("omapi_key"))
+        state = dhcp.DHCPState(
+            server.omapi_key,
+            [make_failover_peer_config()],
+            [make_shared_network()],
+            [make_host(), make_host()],
+            [make_interface()],
+            make_global_dhcp_snippets(),
+        )
+        dhcp._current_server_state[server.dhcp_service] = state
+        dhcp._current_server_version[server.dhcp_service] = version
+        return server, state
+
+    def test_raises_DHCPConfigVersionMismatch_without_state(self):
+        server = self.server(factory.make_name("omapi_key"))
+        with ExpectedException(exceptions.DHCPConfigVersionMismatch):
+            dhcp.update(server, "base", "version", [], [])
+        self.assertThat(self.configure, MockNotCalled())
+
+    def test_raises_DHCPConfigVersionMismatch_without_version(self):
+        server, _ = self.make_state(None)
+        with ExpectedException(exceptions.DHCPConfigVersionMismatch):
+            dhcp.update(server, "base", "version", [], [])
+        self.assertThat(self.configure, MockNotCalled())
+
+    def test_raises_DHCPConfigVersionMismatch_for_other_version(self):
+        server, _ = self.make_state("other")
+        with ExpectedException(exceptions.DHCPConfigVersionMismatch):
+            dhcp.update(server, "base", "version", [], [])
+        self.assertThat(self.configure, MockNotCalled())
+
+    def test_configures_current_state_with_changed_hosts(self):
+        server, state = self.make_state("base")
+        removed, kept = state.hosts.values()
+        changed = make_host()
+        dhcp.update(server, "base", "version", [removed["mac"]], [changed])
+        self.assertThat(
+            self.configure,
+            MockCalledOnceWith(
+                server,
+                state.failover_peers,
+                state.shared_networks,
+                [kept, changed],
+                [{"name": name} for name in state.interfaces],
+                state.global_dhcp_snippets,
+                version="version",
+            ),
+        )
+
+    def test_configures_given_parts(self):
+        server, state = self.make_state("base")
+        shared_networks = [make_shared_network()]
+        interfaces = [make_interface()]
+        dhcp.update(
+            server,
+            "base",
+            "version",
+            [],
+            [],
+            shared_networks=shared_networks,
+            interfaces=interfaces,
+        )
+        self.assertThat(
+            self.configure,
+            MockCalledOnceWith(
+                server,
+                state.failover_peers,
+                shared_networks,
+                list(state.hosts.values()),
+                interfaces,
+                state.global_dhcp_snippets,
+                version="version",
+            ),
+        )
+
+
+class TestValidateDHCP(MAASTestCase):
     scenarios = (
         ("DHCPv4", {"server": dhcp.DHCPv4Server}),
         ("DHCPv6", {"server": dhcp.DHCPv6Server}),
@@ -0,0 +1,38 @@
+# Copyright 2022 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for provisioningserver.rpc.external_config"""
+
+
+from unittest.mock import call, Mock
+
+from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith, MockCallsMatch
+from maastesting.testcase import MAASTestCase
+from provisioningserver.rpc.external_config import ExternalConfigVersion
+
+
+class TestExternalConfigVersion(MAASTestCase):
+    def test_value_is_initially_none(self):
+        self.assertIsNone(ExternalConfigVersion().value)
+
+    def test_set_fires_changed(self):
+        version = ExternalConfigVersion()
+        handler = Mock()
+        version.changed.registerHandler(handler)
+        value = factory.make_name("version")
+        version.set(value)
+        self.assertEqual(value, version.value)
+        self.assertThat(handler, MockCalledOnceWith(value))
+
+    def test_set_does_not_fire_changed_for_same_version(self):
+        version = ExternalConfigVersion()
+        handler = Mock()
+        version.changed.registerHandler(handler)
+        version.set("a")
+        version.set("a")
+        version.set("b")
+        version.set(None)
+        self.assertThat(
+            handler, MockCallsMatch(call("a"), call("b"), call(None))
+        )
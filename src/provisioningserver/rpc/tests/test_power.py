@@ -14,6 +14,7 @@ from testtools.deferredruntest import assert_fails_with
 from testtools.matchers import Equals, IsInstance, Not
 from twisted.internet import reactor
 from twisted.internet.defer import (
+    CancelledError,
     Deferred,
     fail,
     inlineCallbacks,
@@ -22,6 +23,7 @@ from twisted.internet.defer import (
     succeed,
 )
 from twisted.internet.task import Clock
+from twisted.protocols.amp import UnhandledCommand
 from twisted.python.failure import Failure
 
 from maastesting import get_testing_timeout
@@ -39,10 +41,12 @@ from maastesting.twisted import (
     extract_result,
     TwistedLoggerFixture,
 )
+from provisioningserver.drivers.power import (
+    DEFAULT_WAITING_POLICY,
+)
 from provisioningserver.drivers.power import (
     get_error_message as get_driver_error_message,
 )
-from provisioningserver.drivers.power import DEFAULT_WAITING_POLICY
 from provisioningserver.drivers.power import PowerError
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import EVENT_TYPES
@@ -789,6 +793,8 @@ class TestPowerQuery(MAASTestCase):
         hostname = factory.make_name("hostname")
         message = factory.make_name("message")
         SendEvent, _, io = self.patch_rpc_methods()
+        report = self.patch_autospec(power.power_state_reporter, "report")
+        report.return_value = succeed(None)
         d = power.power_query_failure(
             system_id, hostname, Failure(Exception(message))
         )
@@ -869,21 +875,20 @@ class TestPowerQuery(MAASTestCase):
         err_msg = factory.make_name("error")
 
         _, _, io = self.patch_rpc_methods()
-        self.patch_autospec(power, "power_state_update")
+        report = self.patch_autospec(power.power_state_reporter, "report")
+        report.return_value = succeed(None)
 
         # Simulate a failure when querying state.
         query = fail(exceptions.PowerActionFail(err_msg))
-        report = power.report_power_state(query, system_id, hostname)
+        d = power.report_power_state(query, system_id, hostname)
         # This blocks until the deferred is complete.
         io.flush()
 
         error = self.assertRaises(
-            exceptions.PowerActionFail, extract_result, report
+            exceptions.PowerActionFail, extract_result, d
         )
         self.assertEqual(err_msg, str(error))
-        self.assertThat(
-            power.power_state_update, MockCalledOnceWith(system_id, "error")
-        )
+        self.assertThat(report, MockCalledOnceWith(system_id, "error"))
 
     def test_report_power_state_changes_power_state_if_success(self):
         system_id = factory.make_name("system_id")
@@ -891,19 +896,17 @@ class TestPowerQuery(MAASTestCase):
         power_state = random.choice(["on", "off"])
 
         _, _, io = self.patch_rpc_methods()
-        self.patch_autospec(power, "power_state_update")
+        report = self.patch_autospec(power.power_state_reporter, "report")
+        report.return_value = succeed(None)
 
         # Simulate a success when querying state.
         query = succeed(power_state)
-        report = power.report_power_state(query, system_id, hostname)
+        d = power.report_power_state(query, system_id, hostname)
         # This blocks until the deferred is complete.
         io.flush()
 
-        self.assertEqual(power_state, extract_result(report))
-        self.assertThat(
-            power.power_state_update,
-            MockCalledOnceWith(system_id, power_state),
-        )
+        self.assertEqual(power_state, extract_result(d))
+        self.assertThat(report, MockCalledOnceWith(system_id, power_state))
 
     def test_report_power_state_changes_power_state_if_unknown(self):
         system_id = factory.make_name("system_id")
@@ -911,23 +914,198 @@ class TestPowerQuery(MAASTestCase):
         power_state = "unknown"
 
         _, _, io = self.patch_rpc_methods()
-        self.patch_autospec(power, "power_state_update")
+        report = self.patch_autospec(power.power_state_reporter, "report")
+        report.return_value = succeed(None)
 
         # Simulate a success when querying state.
         query = succeed(power_state)
-        report = power.report_power_state(query, system_id, hostname)
+        d = power.report_power_state(query, system_id, hostname)
         # This blocks until the deferred is complete.
         io.flush()
 
-        self.assertEqual(power_state, extract_result(report))
+        self.assertEqual(power_state, extract_result(d))
+        self.assertThat(report, MockCalledOnceWith(system_id, power_state))
+
+
+class TestPowerStateReporter(MAASTestCase):
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=TIMEOUT)
+
+    def patch_region_client(self, missing=()):
+        client = MagicMock()
+        client.return_value = succeed({"missing": list(missing)})
+        self.patch(power, "getRegionClient").return_value = client
+        return client
+
+    def test_report_sends_power_states_together_after_delay(self):
+        client = self.patch_region_client()
+        clock = Clock()
+        reporter = power.PowerStateReporter(delay=0.5, clock=clock)
+        system_ids = [factory.make_name("system_id") for _ in range(3)]
+        reports = [
+            reporter.report(system_id, "on") for system_id in system_ids
+        ]
+        self.assertThat(client, MockNotCalled())
+        clock.advance(0.5)
         self.assertThat(
-            power.power_state_update,
-            MockCalledOnceWith(system_id, power_state),
+            client,
+            MockCalledOnceWith(
+                region.UpdateNodePowerStates,
+                power_states=[
+                    {"system_id": system_id, "power_state": "on"}
+                    for system_id in system_ids
+                ],
+            ),
         )
+        for report in reports:
+            self.assertIsNone(extract_result(report))
+        self.assertEqual([], reporter.pending)
 
+    def test_report_sends_power_states_once_batch_is_full(self):
+        client = self.patch_region_client()
+        clock = Clock()
+        reporter = power.PowerStateReporter(max_batch=2, clock=clock)
+        reporter.report(factory.make_name("system_id"), "on")
+        self.assertThat(client, MockNotCalled())
+        reporter.report(factory.make_name("system_id"), "off")
+        self.assertThat(client, MockCalledOnceWith(ANY, power_states=ANY))
+        self.assertEqual([], clock.getDelayedCalls())
+
+    def test_report_fails_with_NoSuchNode_for_missing_nodes(self):
+        system_id = factory.make_name("system_id")
+        other_system_id = factory.make_name("system_id")
+        self.patch_region_client(missing=[system_id])
+        clock = Clock()
+        reporter = power.PowerStateReporter(clock=clock)
+        missing = reporter.report(system_id, "on")
+        found = reporter.report(other_system_id, "on")
+        reporter.flush()
+        self.assertRaises(exceptions.NoSuchNode, extract_result, missing)
+        self.assertIsNone(extract_result(found))
+
+    def test_report_falls_back_to_UpdateNodePowerState(self):
+        client = self.patch_region_client()
+        client.return_value = fail(UnhandledCommand())
+        power_state_update = self.patch_autospec(power, "power_state_update")
+        power_state_update.return_value = succeed(None)
+        system_id = factory.make_name("system_id")
+        reporter = power.PowerStateReporter(clock=Clock())
+        d = reporter.report(system_id, "off")
+        reporter.flush()
+        self.assertIsNone(extract_result(d))
+        self.assertThat(
+            power_state_update, MockCalledOnceWith(system_id, "off")
+        )
 
-class TestPowerQueryExceptions(MAASTestCase):
 
+class TestPowerQueryBudget(MAASTestCase):
+    def make_budget(self, initial=2, maximum=4, **kwargs):
+        clock = Clock()
+        budget = power.PowerQueryBudget(
+            factory.make_name("power_type"),
+            initial,
+            maximum,
+            clock=clock,
+            **kwargs
+        )
+        return budget, clock
+
+    def test_run_holds_back_calls_beyond_the_limit(self):
+        budget, _ = self.make_budget(initial=2)
+        queries = [Deferred() for _ in range(3)]
+        results = [budget.run(lambda query=query: query) for query in queries]
+        self.assertEqual(2, budget.active)
+        self.assertEqual(1, len(budget))
+        queries[0].callback(sentinel.result)
+        self.assertIs(sentinel.result, extract_result(results[0]))
+        self.assertEqual(2, budget.active)
+        self.assertEqual(0, len(budget))
+
+    def test_fast_results_grow_the_limit(self):
+        budget, _ = self.make_budget(initial=2, maximum=4)
+        for _ in range(20):
+            budget.run(succeed, None)
+        self.assertEqual(4, budget.limit)
+
+    def test_slow_results_do_not_grow_the_limit(self):
+        budget, clock = self.make_budget(initial=2, target_latency=1)
+        query = Deferred()
+        budget.run(lambda: query)
+        clock.advance(2)
+        query.callback(None)
+        self.assertEqual(2, budget.limit)
+
+    def test_timeouts_halve_the_limit(self):
+        budget, _ = self.make_budget(initial=4, maximum=8)
+        d = budget.run(fail, CancelledError())
+        self.assertRaises(CancelledError, extract_result, d)
+        self.assertEqual(2, budget.limit)
+        budget.run(fail, CancelledError()).addErrback(lambda _: None)
+        budget.run(fail, CancelledError()).addErrback(lambda _: None)
+        self.assertEqual(1, budget.limit)
+
+    def test_other_failures_leave_the_limit(self):
+        budget, _ = self.make_budget(initial=2, maximum=4)
+        d = budget.run(fail, exceptions.PowerActionFail())
+        self.assertRaises(exceptions.PowerActionFail, extract_result, d)
+        self.assertEqual(2, budget.limit)
+
+
+class TestPowerQueryScheduler(MAASTestCase):
+    def test_get_power_query_kind(self):
+        self.assertEqual("subprocess", power.get_power_query_kind("ipmi"))
+        self.assertEqual("http", power.get_power_query_kind("redfish"))
+        self.assertEqual("pod", power.get_power_query_kind("virsh"))
+
+    def test_get_budget_uses_defaults_for_driver_kind(self):
+        scheduler = power.PowerQueryScheduler(clock=Clock())
+        budget = scheduler.get_budget("redfish")
+        self.assertIs(budget, scheduler.get_budget("redfish"))
+        initial, maximum = power.POWER_QUERY_BUDGETS["http"]
+        self.assertEqual((initial, maximum), (budget.limit, budget.maximum))
+
+    def test_query_uses_budget_per_power_type(self):
+        queries = []
+
+        def get_power_state(system_id, hostname, power_type, context, clock):
+            queries.append((power_type, Deferred()))
+            return queries[-1][1]
+
+        self.patch(power, "get_power_state").side_effect = get_power_state
+        suppress_reporting(self)
+        scheduler = power.PowerQueryScheduler(clock=Clock())
+        for power_type in ("ipmi", "redfish"):
+            budget = scheduler.get_budget(power_type)
+            budget.limit = budget.maximum = budget.minimum = 1
+            for _ in range(2):
+                scheduler.query(self.make_node(power_type))
+        self.assertEqual(["ipmi", "redfish"], [q[0] for q in queries])
+        self.assertEqual(2, scheduler.queued())
+        # A slow ipmi query holds back other ipmi queries only.
+        queries[1][1].callback("on")
+        self.assertEqual(1, scheduler.queued())
+        self.assertEqual(1, len(scheduler.get_budget("ipmi")))
+
+    def test_query_does_not_hold_budget_while_reporting(self):
+        self.patch(power, "get_power_state").return_value = succeed("on")
+        report = self.patch(power.power_state_reporter, "report")
+        report.return_value = Deferred()
+        scheduler = power.PowerQueryScheduler(clock=Clock())
+        node = self.make_node("ipmi")
+        scheduler.query(node)
+        self.assertThat(report, MockCalledOnceWith(node["system_id"], "on"))
+        self.assertEqual(0, scheduler.get_budget("ipmi").active)
+
+    def make_node(self, power_type):
+        return {
+            "context": {},
+            "hostname": factory.make_name("hostname"),
+            "power_state": "unknown",
+            "power_type": power_type,
+            "system_id": factory.make_name("system_id"),
+        }
+
+
+class TestPowerQueryExceptions(MAASTestCase):
     scenarios = tuple(
         (
             driver.name,
@@ -968,9 +1146,9 @@ class TestPowerQueryExceptions(MAASTestCase):
         query = self.patch_autospec(power, self.func)
         query.side_effect = always_fail_with(exception)
 
-        # Intercept calls to power_state_update() and send_node_event().
-        power_state_update = self.patch_autospec(power, "power_state_update")
-        power_state_update.return_value = succeed(None)
+        # Intercept calls to power_state_reporter and send_node_event().
+        report = self.patch_autospec(power.power_state_reporter, "report")
+        report.return_value = succeed(None)
         send_node_event = self.patch_autospec(power, "send_node_event")
         send_node_event.return_value = succeed(None)
 
@@ -1009,9 +1187,7 @@ class TestPowerQueryExceptions(MAASTestCase):
         )
 
         # An attempt was made to report the failure to the region.
-        self.assertThat(
-            power_state_update, MockCalledOnceWith(system_id, "error")
-        )
+        self.assertThat(report, MockCalledOnceWith(system_id, "error"))
         # An attempt was made to log a node event with details.
         self.assertThat(
             send_node_event,
@@ -1089,7 +1265,7 @@ class TestPowerQueryAsync(MAASTestCase):
         report_power_state = self.patch(power, "report_power_state")
         report_power_state.side_effect = lambda d, sid, hn: d
 
-        yield power.query_all_nodes(nodes)
+        results = yield power.query_all_nodes(nodes)
         self.assertThat(
             get_power_state,
             MockCallsMatch(
@@ -1109,11 +1285,28 @@ class TestPowerQueryAsync(MAASTestCase):
             report_power_state,
             MockCallsMatch(
                 *(
-                    call(query, node["system_id"], node["hostname"])
-                    for query, node in zip(queries, nodes)
+                    call(ANY, node["system_id"], node["hostname"])
+                    for node in nodes
                 )
             ),
         )
+        self.assertEqual(
+            [(True, power_state) for power_state in power_states], results
+        )
+
+    def test_query_all_nodes_does_not_hold_slot_while_reporting(self):
+        nodes = self.make_nodes(2)
+        get_power_state = self.patch(power, "get_power_state")
+        get_power_state.side_effect = [
+            succeed(node["power_state"]) for node in nodes
+        ]
+        report = self.patch(power.power_state_reporter, "report")
+        report.side_effect = lambda system_id, state: Deferred()
+
+        power.query_all_nodes(nodes, max_concurrency=1)
+        # The second query runs while the first waits to be reported.
+        self.assertEqual(2, get_power_state.call_count)
+        self.assertEqual(2, report.call_count)
 
     @inlineCallbacks
     def test_query_all_nodes_skips_nodes_in_action_registry(self):
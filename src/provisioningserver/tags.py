@@ -8,6 +8,7 @@ from collections import OrderedDict
 from functools import partial
 import http.client
 import json
+import threading
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -31,6 +32,54 @@ maaslog = get_maas_logger("tag_processing")
 DEFAULT_BATCH_SIZE = 100
 
 
+class TagExpressions:
+    """A bounded registry of compiled tag expressions.
+
+    Compiling a tag's XPath expression is repeated every time the tag is
+    evaluated; this keeps the most recently used compiled expressions, keyed
+    by definition and namespaces, so that they can be reused. Compiled
+    expressions are safe to share between threads.
+
+    :ivar hits: The number of lookups that found a compiled expression.
+    :ivar misses: The number of lookups that needed to compile one.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._expressions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, definition, namespaces):
+        """Return `definition` compiled with `namespaces`.
+
+        :raise etree.XPathSyntaxError: If `definition` is not valid.
+        """
+        key = definition, tuple(sorted(namespaces.items()))
+        with self._lock:
+            xpath = self._expressions.get(key)
+            if xpath is not None:
+                self._expressions.move_to_end(key)
+                self.hits += 1
+                return xpath
+            self.misses += 1
+        xpath = etree.XPath(definition, namespaces=namespaces)
+        with self._lock:
+            self._expressions[key] = xpath
+            while len(self._expressions) > self.max_size:
+                self._expressions.popitem(last=False)
+        return xpath
+
+    def clear(self):
+        """Forget all the compiled expressions."""
+        with self._lock:
+            self._expressions.clear()
+
+
+tag_expressions = TagExpressions()
+
+
 def process_response(response):
     """All responses should be httplib.OK.
 
@@ -334,7 +383,7 @@ def process_node_tags(
     """
     # We evaluate this early, so we can fail before sending a bunch of data to
     # the server
-    xpath = etree.XPath(tag_definition, namespaces=tag_nsmap)
+    xpath = tag_expressions.get(tag_definition, tag_nsmap)
     system_ids = [node["system_id"] for node in nodes]
     process_all(
         client,
@@ -372,6 +372,41 @@ class TestMergeDetails(TestMergeDetailsCleanly):
         )
 
 
+class TestTagExpressions(MAASTestCase):
+    def test_get_compiles_definition(self):
+        expressions = tags.TagExpressions()
+        xpath = expressions.get("//lshw:node", {"lshw": "lshw"})
+        self.assertIsInstance(xpath, etree.XPath)
+        self.assertEqual("//lshw:node", xpath.path)
+        self.assertEqual((0, 1), (expressions.hits, expressions.misses))
+
+    def test_get_reuses_compiled_definition(self):
+        expressions = tags.TagExpressions()
+        xpath = expressions.get("//node", {"lshw": "lshw"})
+        self.assertIs(xpath, expressions.get("//node", {"lshw": "lshw"}))
+        self.assertEqual((1, 1), (expressions.hits, expressions.misses))
+
+    def test_get_keys_by_namespaces(self):
+        expressions = tags.TagExpressions()
+        xpath = expressions.get("//node", {"lshw": "lshw"})
+        self.assertIsNot(xpath, expressions.get("//node", {"lldp": "lldp"}))
+
+    def test_get_evicts_least_recently_used(self):
+        expressions = tags.TagExpressions(max_size=2)
+        expressions.get("//a", {})
+        expressions.get("//b", {})
+        expressions.get("//a", {})
+        expressions.get("//c", {})
+        expressions.get("//a", {})
+        self.assertEqual((2, 3), (expressions.hits, expressions.misses))
+        expressions.get("//b", {})
+        self.assertEqual((2, 4), (expressions.hits, expressions.misses))
+
+    def test_get_raises_for_invalid_definition(self):
+        expressions = tags.TagExpressions()
+        self.assertRaises(etree.XPathSyntaxError, expressions.get, "//[", {})
+
+
 class TestGenBatchSlices(MAASTestCase):
     def test_batch_of_1_no_things(self):
         self.assertSequenceEqual([], list(tags.gen_batch_slices(0, 1)))
@@ -176,6 +176,27 @@ def are_identical_files(old, new):
         return False
 
 
+def get_file_stamp(path):
+    """Return a value that changes when the file at `path` changes.
+
+    Replacing, editing, or deleting the file, or adding, removing or
+    renaming entries when `path` is a directory, all change it.
+
+    :return: A tuple, or `None` if there is nothing at `path`.
+    """
+    try:
+        stat_result = stat(path)
+    except FileNotFoundError:
+        return None
+    else:
+        return (
+            stat_result.st_dev,
+            stat_result.st_ino,
+            stat_result.st_mtime_ns,
+            stat_result.st_size,
+        )
+
+
 def atomic_copy(source, destination):
     """Copy a file at path `source` as `destination` in an atomic fashion.
 
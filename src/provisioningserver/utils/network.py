@@ -3,8 +3,10 @@
 
 """Generic helpers for `netaddr` and network-related types."""
 
+import bisect
 import codecs
 from collections import namedtuple
+import heapq
 import json
 from operator import attrgetter, itemgetter
 import random
@@ -381,11 +383,18 @@ class IPRangeStatistics:
 
 
 class MAASIPSet(set):
+    """A set of non-overlapping `MAASIPRange` objects.
+
+    The ranges are kept sorted by their first address, alongside the integer
+    value of that first address, so that looking up the range containing an
+    address is a binary search rather than a scan.
+    """
+
     def __init__(self, ranges, cidr=None):
         self.cidr = cidr
         self.ranges = ranges
         self._condense()
-        super().__init__(set(self.ranges))
+        super().__init__(self.ranges)
 
     def _condense(self):
         """Condenses the `ranges` ivar in this `MAASIPSet` by:
@@ -395,18 +404,33 @@ class MAASIPSet(set):
         (3) Combining adjacent ranges with an identical purpose.
         """
         self.ranges = _normalize_ipranges(self.ranges)
+        self._index()
+
+    def _index(self):
         self.ranges = _combine_overlapping_maasipranges(self.ranges)
         self.ranges = _coalesce_adjacent_purposes(self.ranges)
+        self._firsts = [item.first for item in self.ranges]
 
     def __ior__(self, other):
         """Return self |= other."""
-        self.ranges.extend(list(other.ranges))
-        self._condense()
+        # Both lists are already sorted, so merge them rather than sorting
+        # the concatenation.
+        self.ranges = list(
+            heapq.merge(self.ranges, _normalize_ipranges(other.ranges))
+        )
+        self._index()
         # Replace the underlying set with the new ranges.
         super().clear()
-        super().__ior__(set(self.ranges))
+        super().update(self.ranges)
         return self
 
+    def _find_index(self, first, last) -> Optional[int]:
+        """Return the index of the range containing `first` to `last`."""
+        index = bisect.bisect_right(self._firsts, first) - 1
+        if index >= 0 and last <= self.ranges[index].last:
+            return index
+        return None
+
     def find(self, search) -> Optional[MAASIPRange]:
         """Searches the list of IPRange objects until it finds the specified
         search parameter, and returns the range it belongs to if found.
@@ -415,19 +439,33 @@ class MAASIPSet(set):
         within that range.)
         """
         if isinstance(search, IPRange):
-            for item in self.ranges:
-                if (
-                    item.first <= search.first <= item.last
-                    and item.first <= search.last <= item.last
-                ):
-                    return item
+            index = self._find_index(search.first, search.last)
         else:
-            addr = IPAddress(search)
-            addr = int(addr)
-            for item in self.ranges:
-                if item.first <= addr <= item.last:
-                    return item
-        return None
+            addr = int(IPAddress(search))
+            index = self._find_index(addr, addr)
+        if index is None:
+            return None
+        return self.ranges[index]
+
+    def discard_ip(self, ip):
+        """Remove the specified IP address from this set, if present.
+
+        The range containing the address is split around it.
+        """
+        addr = int(IPAddress(ip))
+        index = self._find_index(addr, addr)
+        if index is None:
+            return
+        item = self.ranges[index]
+        pieces = []
+        if item.first < addr:
+            pieces.append(make_iprange(item.first, addr - 1, item.purpose))
+        if addr < item.last:
+            pieces.append(make_iprange(addr + 1, item.last, item.purpose))
+        self.ranges[index : index + 1] = pieces
+        self._firsts[index : index + 1] = [piece.first for piece in pieces]
+        super().discard(item)
+        super().update(pieces)
 
     @property
     def first(self) -> Optional[MAASIPRange]:
@@ -531,10 +569,18 @@ class MAASIPSet(set):
             addresses considered "unused". If an IPRange is supplied,
             all addresses in the range will be considered unused.
         """
+        return MAASIPSet(list(self.iter_unused_ranges(outer_range, purpose)))
+
+    def iter_unused_ranges(
+        self, outer_range: OuterRange, purpose=IPRANGE_TYPE.UNUSED
+    ) -> Iterable[MAASIPRange]:
+        """Yields the unused IP ranges within `outer_range`, in order.
+
+        See `get_unused_ranges` for the meaning of the arguments.
+        """
         if isinstance(outer_range, (bytes, str)):
             if "/" in outer_range:
                 outer_range = IPNetwork(outer_range)
-        unused_ranges = []
         if type(outer_range) == IPNetwork:
             # Skip the network address, if this is a network
             prefixlen = outer_range.prefixlen
@@ -556,9 +602,7 @@ class MAASIPSet(set):
             # candidate range, and the address just before the next used
             # range.
             if candidate_end - candidate_start >= 0:
-                unused_ranges.append(
-                    make_iprange(candidate_start, candidate_end, purpose)
-                )
+                yield make_iprange(candidate_start, candidate_end, purpose)
             candidate_start = used_range.last + 1
         # Skip the broadcast address, if this is an IPv4 network
         if type(outer_range) == IPNetwork:
@@ -572,10 +616,7 @@ class MAASIPSet(set):
         # Check if there is a gap between the last used range and the end
         # of the range we're checking against.
         if candidate_end - candidate_start >= 0:
-            unused_ranges.append(
-                make_iprange(candidate_start, candidate_end, purpose)
-            )
-        return MAASIPSet(unused_ranges)
+            yield make_iprange(candidate_start, candidate_end, purpose)
 
     def get_full_range(self, outer_range):
         unused_ranges = self.get_unused_ranges(outer_range)
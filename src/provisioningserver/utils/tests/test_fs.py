@@ -61,6 +61,7 @@ from provisioningserver.utils.fs import (
     atomic_write,
     FileLock,
     FilesystemLock,
+    get_file_stamp,
     get_library_script_path,
     get_maas_common_command,
     get_root_path,
@@ -110,6 +111,35 @@ class TestFilesystemLock(MAASTestCase):
         self.assertTrue(locked)
 
 
+class TestGetFileStamp(MAASTestCase):
+    """Test `get_file_stamp`."""
+
+    def test_returns_none_if_file_does_not_exist(self):
+        self.assertIsNone(
+            get_file_stamp(os.path.join(self.make_dir(), "missing"))
+        )
+
+    def test_changes_when_file_is_changed(self):
+        filename = self.make_file(contents=b"old")
+        stamp = get_file_stamp(filename)
+        self.assertEqual(stamp, get_file_stamp(filename))
+        with open(filename, "wb") as stream:
+            stream.write(b"new content")
+        self.assertNotEqual(stamp, get_file_stamp(filename))
+
+    def test_changes_when_file_is_replaced(self):
+        filename = self.make_file(contents=b"same")
+        stamp = get_file_stamp(filename)
+        atomic_write(b"same", filename)
+        self.assertNotEqual(stamp, get_file_stamp(filename))
+
+    def test_changes_when_directory_entries_change(self):
+        directory = self.make_dir()
+        stamp = get_file_stamp(directory)
+        factory.make_file(directory)
+        self.assertNotEqual(stamp, get_file_stamp(directory))
+
+
 class TestAtomicWrite(MAASTestCase):
     """Test `atomic_write`."""
 
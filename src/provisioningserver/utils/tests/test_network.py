@@ -965,6 +965,62 @@ class TestMAASIPSet(MAASTestCase):
         self.assertThat(str(IPAddress(s1.first)), Equals("10.0.0.1"))
         self.assertThat(str(IPAddress(s1.last)), Equals("10.0.0.8"))
 
+    def test_find_returns_range_among_many(self):
+        s = MAASIPSet(
+            [
+                make_iprange("10.0.%d.1" % i, "10.0.%d.10" % i, purpose=i)
+                for i in range(200)
+            ]
+        )
+        found = s.find("10.0.123.5")
+        self.assertEqual("10.0.123.1", str(IPAddress(found.first)))
+        self.assertEqual("10.0.123.10", str(IPAddress(found.last)))
+        self.assertIsNone(s.find("10.0.123.11"))
+        self.assertIsNone(s.find("10.0.0.0"))
+        self.assertIsNone(s.find(IPRange("10.0.123.5", "10.0.124.1")))
+
+    def test_discard_ip_splits_range(self):
+        s = MAASIPSet([make_iprange("10.0.0.1", "10.0.0.10", purpose="foo")])
+        s.discard_ip("10.0.0.5")
+        self.assertEqual(
+            [("10.0.0.1", "10.0.0.4"), ("10.0.0.6", "10.0.0.10")],
+            [
+                (str(IPAddress(r.first)), str(IPAddress(r.last)))
+                for r in s.ranges
+            ],
+        )
+        self.assertEqual(set(s.ranges), set(s))
+        self.assertThat(s, Not(Contains("10.0.0.5")))
+        self.assertThat(s, Contains("10.0.0.6"))
+        self.assertEqual({"foo"}, s.find("10.0.0.6").purpose)
+
+    def test_discard_ip_removes_single_address_range(self):
+        s = MAASIPSet(
+            [make_iprange("10.0.0.1"), make_iprange("10.0.0.3", "10.0.0.4")]
+        )
+        s.discard_ip(IPAddress("10.0.0.1"))
+        self.assertThat(s.ranges, HasLength(1))
+        self.assertThat(s, HasLength(1))
+        self.assertThat(s, Not(Contains("10.0.0.1")))
+
+    def test_discard_ip_ignores_missing_address(self):
+        s = MAASIPSet([make_iprange("10.0.0.1", "10.0.0.10")])
+        s.discard_ip("10.0.0.11")
+        self.assertThat(s.ranges, HasLength(1))
+
+    def test_iter_unused_ranges_matches_get_unused_ranges(self):
+        s = MAASIPSet(
+            [
+                make_iprange("10.0.0.2"),
+                make_iprange("10.0.0.5", "10.0.0.100"),
+                make_iprange("10.0.0.200", "10.0.0.210"),
+            ]
+        )
+        self.assertEqual(
+            s.get_unused_ranges("10.0.0.0/24").ranges,
+            list(s.iter_unused_ranges("10.0.0.0/24")),
+        )
+
 
 class TestIPRangeStatistics(MAASTestCase):
     def test_statistics_are_accurate(self):
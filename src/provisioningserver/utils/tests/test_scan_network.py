@@ -8,6 +8,7 @@ from argparse import ArgumentParser
 import io
 import os
 import random
+import struct
 import subprocess
 from unittest.mock import ANY, Mock
 
@@ -21,14 +22,27 @@ from testtools.matchers import (
 )
 
 from maastesting.factory import factory
-from maastesting.matchers import DocTestMatches, Matches, MockCalledOnceWith
+from maastesting.matchers import (
+    DocTestMatches,
+    Matches,
+    MockCalledOnceWith,
+    MockNotCalled,
+)
 from maastesting.testcase import MAASTestCase
 from provisioningserver.utils import scan_network as scan_network_module
 from provisioningserver.utils.scan_network import (
     add_arguments,
     get_nmap_arguments,
     get_ping_arguments,
+    icmp_checksum,
+    ICMP_PAYLOAD,
+    icmp_scan,
+    ICMP_SLOW_RATE,
+    ICMPScanner,
+    make_icmp_echo_request,
     NmapParameters,
+    open_icmp_socket,
+    parse_icmp_echo_reply,
     PingParameters,
     run,
     run_nmap,
@@ -84,11 +98,11 @@ class TestScanNetworkCommand(MAASTestCase):
         return run(parsed_args, stdout=self.output, stderr=self.error_output)
 
     def test_interprets_long_arguments(self):
-        self.run_command("--ping", "--threads", "37", "--slow")
+        self.run_command("--ping", "--threads", "37", "--slow", "--icmp")
         self.assertThat(
             self.scan_networks_mock,
             MockCalledOnceWith(
-                ArgumentsMatching(threads=37, slow=True, ping=True),
+                ArgumentsMatching(threads=37, slow=True, ping=True, icmp=True),
                 ANY,
                 ANY,
                 ANY,
@@ -100,7 +114,9 @@ class TestScanNetworkCommand(MAASTestCase):
         self.assertThat(
             self.scan_networks_mock,
             MockCalledOnceWith(
-                ArgumentsMatching(threads=None, slow=False, ping=False),
+                ArgumentsMatching(
+                    threads=None, slow=False, ping=False, icmp=False
+                ),
                 ANY,
                 ANY,
                 ANY,
@@ -325,6 +341,48 @@ class TestScanNetworkCommandEndToEnd(MAASTestCase):
             DocTestMatches("...scan...completed...second..."),
         )
 
+    def test_runs_icmp_e2e(self):
+        # Force the use of `nmap` if not for --icmp.
+        self.has_command_available_mock.return_value = True
+        icmp_scan = self.patch(scan_network_module, "icmp_scan")
+        icmp_scan.return_value = [
+            {
+                "scan_type": "icmp",
+                "interface": "eth1",
+                "ip": "192.168.0.2",
+                "result": True,
+            },
+            {
+                "scan_type": "icmp",
+                "interface": "eth1",
+                "ip": "192.168.0.3",
+                "result": False,
+            },
+        ]
+        slow = random.choice([True, False])
+        args = ["--icmp", "eth1", "192.168.0.0/24"]
+        if slow is True:
+            args.append("--slow")
+        self.run_command(*args)
+        self.assertThat(
+            icmp_scan,
+            MockCalledOnceWith({"eth1": ["192.168.0.0/24"]}, slow=slow),
+        )
+        self.assertThat(self.popen, MockNotCalled())
+        self.assertThat(
+            self.output.getvalue(),
+            DocTestMatches(
+                '{..."ip": "192.168.0.2", "result": true}\n'
+                '{..."ip": "192.168.0.3", "result": false}\n'
+            ),
+        )
+        self.assertThat(
+            self.error_output.getvalue(),
+            DocTestMatches(
+                "Sent ICMP echo requests to 2 hosts (1 up) in...second..."
+            ),
+        )
+
     def test_prints_error_for_missing_cidr(self):
         self.run_command("8.8.8.0/24")
         self.assertThat(
@@ -435,3 +493,201 @@ class TestYieldPingParameters(MAASTestCase):
                 }
             ),
         )
+
+
+class FakeICMPSocket:
+    """A raw ICMP socket which replies to requests for the `up` addresses."""
+
+    def __init__(self, up=()):
+        self.up = set(up)
+        self.sent = []
+        self.replies = []
+        self.closed = False
+
+    def sendto(self, packet, address):
+        self.sent.append((packet, address))
+        ip, _ = address
+        if ip in self.up:
+            # An IPv4 header, followed by the echo reply.
+            header = b"\x45" + bytes(19)
+            reply = b"\x00" + packet[1:]
+            self.replies.append((header + reply, (ip, 0)))
+
+    def recvfrom(self, bufsize):
+        if len(self.replies) == 0:
+            raise BlockingIOError()
+        return self.replies.pop(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.closed = True
+
+
+class TestICMPPackets(MAASTestCase):
+    def test_icmp_checksum_of_checksummed_data_is_zero(self):
+        packet = make_icmp_echo_request(
+            random.getrandbits(16), random.getrandbits(16)
+        )
+        self.assertEqual(0, icmp_checksum(packet))
+
+    def test_icmp_checksum_pads_odd_length_data(self):
+        self.assertEqual(
+            icmp_checksum(b"\x01\x02\x03\x00"), icmp_checksum(b"\x01\x02\x03")
+        )
+
+    def test_make_icmp_echo_request(self):
+        packet = make_icmp_echo_request(0x1234, 0x5678)
+        self.assertEqual(
+            (8, 0, 0x1234, 0x5678),
+            struct.unpack("!BBxxHH", packet[:8]),
+        )
+        self.assertEqual(ICMP_PAYLOAD, packet[8:])
+
+    def test_parse_icmp_echo_reply(self):
+        reply = b"\x00" + make_icmp_echo_request(0x1234, 0x5678)[1:]
+        self.assertEqual(
+            (0x1234, 0x5678),
+            parse_icmp_echo_reply(b"\x45" + bytes(19) + reply),
+        )
+
+    def test_parse_icmp_echo_reply_honours_header_length(self):
+        reply = b"\x00" + make_icmp_echo_request(0x1234, 0x5678)[1:]
+        self.assertEqual(
+            (0x1234, 0x5678),
+            parse_icmp_echo_reply(b"\x46" + bytes(23) + reply),
+        )
+
+    def test_parse_icmp_echo_reply_ignores_other_messages(self):
+        request = make_icmp_echo_request(0x1234, 0x5678)
+        self.assertIsNone(parse_icmp_echo_reply(b"\x45" + bytes(19) + request))
+        self.assertIsNone(parse_icmp_echo_reply(b"\x45" + bytes(19)))
+
+
+class TestOpenICMPSocket(MAASTestCase):
+    def test_raises_ActionScriptError_without_privileges(self):
+        mock_socket = self.patch(scan_network_module.socket, "socket")
+        mock_socket.side_effect = PermissionError()
+        with ExpectedException(ActionScriptError, ".*root privileges.*"):
+            open_icmp_socket("eth0")
+
+
+class TestICMPScanner(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        # Replies are available as soon as they are sent.
+        self.patch(
+            scan_network_module.select, "select"
+        ).side_effect = lambda rlist, wlist, xlist, timeout: (rlist, [], [])
+
+    def test_correlates_replies_beyond_sequence_number_range(self):
+        ips = [
+            "10.%d.%d.%d" % (i >> 16, (i >> 8) & 255, i & 255)
+            for i in range(70000)
+        ]
+        scanner = ICMPScanner(ips, ident=0xFFFF)
+        request = scanner.make_request(69999)
+        ident, seq = struct.unpack("!HH", request[4:8])
+        self.assertEqual((0, 69999 & 0xFFFF), (ident, seq))
+        self.assertEqual(69999, scanner.match_reply(ident, seq, ips[69999]))
+
+    def test_ignores_replies_from_other_addresses(self):
+        scanner = ICMPScanner(["192.168.0.1", "192.168.0.2"])
+        request = scanner.make_request(1)
+        ident, seq = struct.unpack("!HH", request[4:8])
+        self.assertIsNone(scanner.match_reply(ident, seq, "192.168.0.1"))
+        self.assertIsNone(scanner.match_reply(ident + 1, seq, "192.168.0.2"))
+
+    def test_scan_reports_each_target_once(self):
+        ips = ["192.168.0.%d" % i for i in range(1, 255)]
+        up = set(random.sample(ips, 10))
+        sock = FakeICMPSocket(up)
+        scanner = ICMPScanner(ips, rate=1e6, attempts=3, timeout=0)
+        results = list(scanner.scan(sock))
+        self.assertCountEqual([(ip, ip in up) for ip in ips], results)
+        # Hosts that are down are tried on each attempt.
+        sent = [address for _, address in sock.sent]
+        self.assertCountEqual(
+            [(ip, 0) for ip in up]
+            + [(ip, 0) for ip in ips if ip not in up] * 3,
+            sent,
+        )
+
+    def test_scan_retries_when_socket_would_block(self):
+        sock = FakeICMPSocket(["192.168.0.1"])
+        sendto = sock.sendto
+        blocked = []
+
+        def sendto_once_blocked(packet, address):
+            if len(blocked) == 0:
+                blocked.append(address)
+                raise BlockingIOError()
+            return sendto(packet, address)
+
+        sock.sendto = sendto_once_blocked
+        scanner = ICMPScanner(["192.168.0.1"], rate=1e6, timeout=0)
+        self.assertEqual([("192.168.0.1", True)], list(scanner.scan(sock)))
+
+    def test_scan_continues_after_send_errors(self):
+        sock = FakeICMPSocket(["192.168.0.2"])
+        sendto = sock.sendto
+
+        def sendto_unreachable(packet, address):
+            if address[0] == "192.168.0.1":
+                raise OSError("Network is unreachable")
+            return sendto(packet, address)
+
+        sock.sendto = sendto_unreachable
+        scanner = ICMPScanner(
+            ["192.168.0.1", "192.168.0.2"], rate=1e6, timeout=0
+        )
+        self.assertCountEqual(
+            [("192.168.0.1", False), ("192.168.0.2", True)],
+            list(scanner.scan(sock)),
+        )
+
+
+class TestICMPScan(MAASTestCase):
+    def test_yields_events_for_each_interface(self):
+        self.patch(
+            scan_network_module.select, "select"
+        ).side_effect = lambda rlist, wlist, xlist, timeout: (rlist, [], [])
+        sockets = {
+            "eth0": FakeICMPSocket(["192.168.0.1", "192.168.0.2"]),
+            "eth1": FakeICMPSocket(["192.168.1.1", "192.168.1.2"]),
+        }
+        self.patch(
+            scan_network_module, "open_icmp_socket"
+        ).side_effect = sockets.get
+        events = list(
+            icmp_scan({"eth0": ["192.168.0.0/30"], "eth1": ["192.168.1.0/30"]})
+        )
+        self.assertCountEqual(
+            [
+                {
+                    "scan_type": "icmp",
+                    "interface": interface,
+                    "ip": ip,
+                    "result": True,
+                }
+                for interface in sockets
+                for ip in sockets[interface].up
+            ],
+            events,
+        )
+        # Each socket is closed once its interface has been scanned.
+        self.assertTrue(sockets["eth0"].closed)
+        self.assertTrue(sockets["eth1"].closed)
+
+    def test_slow_scan_limits_rate(self):
+        scanner = self.patch(scan_network_module, "ICMPScanner")
+        scanner.return_value.scan.return_value = []
+        self.patch(scan_network_module, "open_icmp_socket")
+        list(icmp_scan({"eth0": ["192.168.0.0/30"]}, slow=True))
+        self.assertThat(
+            scanner,
+            MockCalledOnceWith(
+                ["192.168.0.1", "192.168.0.2"], rate=ICMP_SLOW_RATE
+            ),
+        )